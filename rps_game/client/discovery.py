@@ -0,0 +1,142 @@
+import time
+from threading import Thread, Event
+
+import grpc
+
+import protos.game_service_pb2_grpc as game_pb2_grpc
+
+from common.channels import ChannelManager
+
+LEADER_KEY = "service/rps-game/leader"
+SERVICE_NAME = "rps-game-service"
+
+class GameServerDirectory:
+    """Game server leader and read replicas, found through Consul or given directly"""
+
+    def __init__(self, config, on_status=None, server_url=None, log=print):
+        self.config = config
+        self.on_status = on_status or (lambda connected: None)
+        self.fixed_url = server_url
+        self.log = log
+        self.consul_client = None
+        self.leader_url = None
+        self.leader = None
+        self.connected = False
+
+        # Read-only replicas (healthy game servers from the Consul catalog)
+        self.replicas = {}
+        self.replica_urls = []
+        self.next_replica = 0
+
+        # One channel per game server, shared by the leader and replica stubs
+        self.channels = ChannelManager(config.get('channels', {}))
+        self.channels.add_listener(self._on_channel_state)
+        self._recheck = Event()
+
+    def connect(self):
+        """Pin the given server, or create the Consul client used for discovery"""
+        if self.fixed_url:
+            self._set_leader(self.fixed_url)
+            return
+        # Imported here: scripted use with a fixed server never pays for it
+        import consul
+        consul_host = self.config['consul']['host']
+        consul_port = self.config['consul']['port']
+        self.consul_client = consul.Consul(host=consul_host, port=consul_port)
+        self.log(f"[Client] Connected to Consul at {consul_host}:{consul_port}")
+
+    def start(self):
+        """Keep following the leader in the background"""
+        if self.consul_client is not None:
+            Thread(target=self._monitor, daemon=True).start()
+
+    def refresh(self):
+        """One discovery pass: current leader and healthy replicas"""
+        index, data = self.consul_client.kv.get(LEADER_KEY)
+        if data:
+            leader_url = data['Value'].decode('utf-8')
+            if leader_url != self.leader_url:
+                self.log(f"[Client] Game Server Leader: {leader_url}")
+                self._set_leader(leader_url)
+        else:
+            self.leader_url = None
+            self.leader = None
+            self._set_connected(False)
+        self._refresh_replicas()
+
+    def _monitor(self):
+        """Monitor game server leader from Consul"""
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.log(f"[Server Monitor Error] {e}")
+                self._set_connected(False)
+
+            # Poll fast while the leader's channel is down so a new leader is picked up quickly
+            failing = self.leader_url is None or self.channels.is_failing(self.leader_url)
+            self._recheck.wait(0.5 if failing else 2)
+            self._recheck.clear()
+
+    def _set_leader(self, url):
+        self.leader_url = url
+        self.leader = self.channels.stub(url, game_pb2_grpc.GameServiceStub)
+        self.log(f"[Client] Connected to game server at {url.replace('http://', '')}")
+        self._set_connected(True)
+
+    def _set_connected(self, connected):
+        self.connected = connected
+        self.on_status(connected)
+
+    def _on_channel_state(self, url, state):
+        """Connectivity of the leader's channel is reported without waiting for a poll"""
+        if url != self.leader_url:
+            return
+        if state == grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            self._set_connected(False)
+            self._recheck.set()
+        elif state == grpc.ChannelConnectivity.READY and self.leader is not None:
+            self._set_connected(True)
+
+    def _refresh_replicas(self):
+        """Track healthy game servers that can serve reads"""
+        index, nodes = self.consul_client.health.service(SERVICE_NAME, passing=True)
+        urls = [f"http://{n['Service']['Address']}:{n['Service']['Port']}" for n in nodes]
+
+        self.replicas = {url: self.channels.stub(url, game_pb2_grpc.GameServiceStub) for url in urls}
+        self.replica_urls = urls
+        # Close channels of servers that left, but never the leader's
+        self.channels.retain(set(urls) | {self.leader_url})
+
+    def wait_for_leader(self, timeout=5.0):
+        """True once a leader is known"""
+        deadline = time.monotonic() + timeout
+        while self.leader is None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.leader is not None
+
+    def call(self, method, request, timeout=None):
+        """Send a request to the leader"""
+        if self.leader is None:
+            raise ConnectionError("No game server leader")
+        return getattr(self.leader, method)(request, timeout=timeout)
+
+    def read(self, method, request, timeout=None):
+        """Send a read to the next replica, falling back to the leader"""
+        urls = self.replica_urls
+        if urls:
+            self.next_replica = (self.next_replica + 1) % len(urls)
+            replica = self.replicas.get(urls[self.next_replica])
+            if replica:
+                try:
+                    response = getattr(replica, method)(request, timeout=timeout or 2)
+                    if getattr(response, 'error', '') != "STALE_REPLICA":
+                        return response
+                except grpc.RpcError as e:
+                    self.log(f"[Client] Replica read failed: {e.code().name}")
+
+        # Writes and failed reads go to the leader
+        return self.call(method, request, timeout)
+
+    def close(self):
+        self.channels.close_all()
@@ -0,0 +1,108 @@
+import threading
+
+FRAME_MS = 16  # At most one redraw per frame, however many states arrive
+
+# Colors of the status bar
+RED = "#e74c3c"
+ORANGE = "#f39c12"
+GREEN = "#27ae60"
+BLUE = "#3498db"
+
+CHOICE_WIDGETS = ("rock", "paper", "scissors")
+
+def view_props(response, player_id, connected):
+    """Widget options for a game state; widgets left out keep what they show"""
+    if not connected:
+        props = {"status": {"text": "Waiting for connection...", "bg": RED, "fg": "white"}}
+        props.update((name, {"state": "disabled"}) for name in CHOICE_WIDGETS)
+        return props
+    if response is None:
+        return {}
+
+    props = {
+        "info": {"text": f"Player: {player_id}\nRoom: #{response.game_id}\n" +
+                         f"Players: {response.player1} vs {response.player2}"},
+        "score": {"text": f"Score: {response.player1_score} - {response.player2_score}"},
+        "result": {"text": response.round_result},
+    }
+
+    choices = "disabled"
+    next_round = "disabled"
+    if response.status == "waiting":
+        status = ("Waiting for opponent...", ORANGE)
+    elif response.status == "ready":
+        is_player1 = (player_id == response.player1)
+        my_choice = response.player1_choice if is_player1 else response.player2_choice
+        if my_choice == "waiting":
+            status = ("Make your choice!", GREEN)
+            choices = "normal"
+        else:
+            status = ("Waiting for opponent's choice...", ORANGE)
+    else:
+        status = ("Round Complete!", BLUE)
+        next_round = "normal"
+
+    props["status"] = {"text": status[0], "bg": status[1], "fg": "white"}
+    props.update((name, {"state": choices}) for name in CHOICE_WIDGETS)
+    props["next_round"] = {"state": next_round}
+    return props
+
+class RenderStore:
+    """Latest game state and what is on screen; redraws only widgets that changed"""
+
+    def __init__(self, schedule, apply):
+        self.schedule = schedule  # schedule(callback): run callback on the UI thread after a frame
+        self.apply = apply        # apply(widget, options): configure one widget, UI thread only
+        self.player_id = ""
+        self.response = None
+        self.connected = True
+        self.rendered = {}  # widget -> options currently shown
+        self.pending = False
+        self.received = 0
+        self.redraws = 0
+        self.widget_updates = 0
+        self._lock = threading.Lock()
+
+    def submit(self, response):
+        """Offer a new state from any thread; identical states never reach the UI"""
+        with self._lock:
+            self.received += 1
+            if response == self.response:
+                return
+            self.response = response
+            self._request_redraw()
+
+    def set_connected(self, connected):
+        with self._lock:
+            if connected == self.connected:
+                return
+            self.connected = connected
+            self._request_redraw()
+
+    def reset(self, player_id):
+        """New game screen: nothing rendered yet"""
+        with self._lock:
+            self.player_id = player_id
+            self.response = None
+            self.rendered = {}
+
+    def _request_redraw(self):
+        if not self.pending:
+            self.pending = True
+            self.schedule(self._redraw)
+
+    def _redraw(self):
+        with self._lock:
+            self.pending = False
+            props = view_props(self.response, self.player_id, self.connected)
+            changes = []
+            for widget, options in props.items():
+                shown = self.rendered.setdefault(widget, {})
+                changed = {key: value for key, value in options.items() if shown.get(key) != value}
+                if changed:
+                    shown.update(changed)
+                    changes.append((widget, changed))
+            self.redraws += 1
+            self.widget_updates += len(changes)
+        for widget, changed in changes:
+            self.apply(widget, changed)
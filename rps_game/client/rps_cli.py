@@ -0,0 +1,235 @@
+"""
+Headless Rock Paper Scissors client: no Tk, scriptable, pipe friendly.
+
+  python -m client.rps_cli create 1234 --player alice
+  python -m client.rps_cli join 1234 --player bob
+  python -m client.rps_cli move 1234 rock --player alice
+  python -m client.rps_cli state 1234
+  printf 'create 1234 alice\\njoin 1234 bob\\n' | python -m client.rps_cli batch
+
+One result line per command on stdout (--json for JSON lines), diagnostics on stderr.
+Exit status is 0 if every command succeeded, 1 otherwise.
+"""
+import argparse
+import json
+import os
+import shlex
+import sys
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grpc
+from google.protobuf.json_format import MessageToDict
+
+import protos.game_service_pb2 as game_pb2
+
+from client.discovery import GameServerDirectory
+
+CHOICES = ("rock", "paper", "scissors")
+
+def log(message):
+    print(message, file=sys.stderr)
+
+def format_game(response):
+    return (f"room={response.game_id} status={response.status} "
+            f"players={response.player1 or '-'}/{response.player2 or '-'} "
+            f"choices={response.player1_choice or '-'}/{response.player2_choice or '-'} "
+            f"score={response.player1_score}-{response.player2_score} "
+            f"version={response.state_version}")
+
+def format_response(response):
+    """One human readable line for any response message"""
+    if isinstance(response, game_pb2.GameResponse):
+        return format_game(response)
+    if isinstance(response, game_pb2.CheckResponse):
+        return f"exists={str(response.exists).lower()} room={response.game_id or '-'}"
+    if isinstance(response, game_pb2.ExitResponse):
+        return f"success={str(response.success).lower()}"
+    if isinstance(response, game_pb2.LeaderboardResponse):
+        rows = [f"{e.rank}. {e.player_id} w={e.wins} l={e.losses} d={e.draws}" for e in response.entries]
+        return "\n".join(rows + [f"total={response.total_players}"])
+    if isinstance(response, game_pb2.PlayerRankResponse):
+        if not response.found:
+            return "found=false"
+        e = response.entry
+        return f"rank={e.rank} player={e.player_id} w={e.wins} l={e.losses} d={e.draws}"
+    return str(response).strip()
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='RPS headless client')
+    parser.add_argument('--server', type=str, help='Game server host:port (skips Consul discovery)')
+    parser.add_argument('--consul-host', type=str, help='Consul host address')
+    parser.add_argument('--consul-port', type=int, help='Consul port')
+    parser.add_argument('--timeout', type=float, default=5.0, help='Per-call timeout in seconds')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON lines')
+    add_commands(parser.add_subparsers(dest='command', required=True))
+    return parser
+
+def add_commands(commands):
+    create = commands.add_parser('create', help='Create a room (or rejoin it)')
+    create.add_argument('room')
+    create.add_argument('player', nargs='?')
+    create.add_argument('--player', dest='player_opt')
+
+    join = commands.add_parser('join', help='Join an existing room')
+    join.add_argument('room')
+    join.add_argument('player', nargs='?')
+    join.add_argument('--player', dest='player_opt')
+
+    move = commands.add_parser('move', help='Play rock, paper or scissors')
+    move.add_argument('room')
+    move.add_argument('choice', choices=CHOICES)
+    move.add_argument('player', nargs='?')
+    move.add_argument('--player', dest='player_opt')
+
+    state = commands.add_parser('state', help='Show the room state')
+    state.add_argument('room')
+    state.add_argument('--leader', action='store_true', help='Read from the leader, not a replica')
+
+    reset = commands.add_parser('reset', help='Start the next round')
+    reset.add_argument('room')
+
+    leave = commands.add_parser('exit', help='Leave the room')
+    leave.add_argument('room')
+    leave.add_argument('player', nargs='?')
+    leave.add_argument('--player', dest='player_opt')
+
+    session = commands.add_parser('session', help='Find the room a player is in')
+    session.add_argument('player', nargs='?')
+    session.add_argument('--player', dest='player_opt')
+
+    leaderboard = commands.add_parser('leaderboard', help='Top players')
+    leaderboard.add_argument('-k', type=int, default=10)
+    leaderboard.add_argument('--offset', type=int, default=0)
+
+    rank = commands.add_parser('rank', help='Rank of one player')
+    rank.add_argument('player', nargs='?')
+    rank.add_argument('--player', dest='player_opt')
+
+    commands.add_parser('batch', help='Read commands from stdin, one per line')
+
+def player_of(args):
+    player = getattr(args, 'player_opt', None) or getattr(args, 'player', None)
+    if not player:
+        raise ValueError("player is required")
+    return player
+
+def run_command(directory, args, timeout):
+    """Send one parsed command; returns the response message"""
+    command = args.command
+    if command in ('create', 'join'):
+        return directory.call("CreateGame", game_pb2.CreateRequest(
+            player_id=f"{player_of(args)}|{args.room}",
+            is_join_only=(command == 'join')
+        ), timeout)
+    if command == 'move':
+        return directory.call("MakeMove", game_pb2.MoveRequest(
+            game_id=args.room, player_id=player_of(args), choice=args.choice
+        ), timeout)
+    if command == 'state':
+        request = game_pb2.StateRequest(game_id=args.room)
+        if args.leader:
+            return directory.call("GetState", request, timeout)
+        return directory.read("GetState", request, timeout)
+    if command == 'reset':
+        return directory.call("ResetGame", game_pb2.StateRequest(game_id=args.room), timeout)
+    if command == 'exit':
+        return directory.call("ExitGame", game_pb2.ExitRequest(
+            game_id=args.room, player_id=player_of(args)
+        ), timeout)
+    if command == 'session':
+        return directory.read("CheckSession", game_pb2.CheckRequest(player_id=player_of(args)), timeout)
+    if command == 'leaderboard':
+        return directory.read("GetLeaderboard", game_pb2.LeaderboardRequest(
+            k=args.k, offset=args.offset
+        ), timeout)
+    if command == 'rank':
+        return directory.read("GetPlayerRank", game_pb2.PlayerRankRequest(player_id=player_of(args)), timeout)
+    raise ValueError(f"Unknown command: {command}")
+
+def report(args, response, as_json):
+    """Print the result line; returns True if the command succeeded"""
+    error = getattr(response, 'error', '') if response is not None else ''
+    ok = not error and (not isinstance(response, game_pb2.ExitResponse) or response.success)
+    if as_json:
+        body = MessageToDict(response, preserving_proto_field_name=True)
+        print(json.dumps({"command": args.command, "ok": ok, "response": body}, ensure_ascii=False))
+    elif error:
+        print(f"error={error}")
+    else:
+        print(format_response(response))
+    sys.stdout.flush()
+    return ok
+
+def execute(directory, args, options):
+    try:
+        response = run_command(directory, args, options.timeout)
+    except grpc.RpcError as e:
+        return fail(args.command, f"{e.code().name}: {e.details()}", options.json)
+    except (ValueError, ConnectionError) as e:
+        return fail(args.command, str(e), options.json)
+    return report(args, response, options.json)
+
+def fail(command, message, as_json):
+    if as_json:
+        print(json.dumps({"command": command, "ok": False, "error": message}, ensure_ascii=False))
+    else:
+        print(f"error={message}")
+    sys.stdout.flush()
+    return False
+
+def run_batch(directory, parser, options):
+    """Commands from stdin, one per line; blank lines and # comments are skipped"""
+    ok = True
+    for line in sys.stdin:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            # Parse as if the global options came first, so every line is just a command
+            args = parser.parse_args(['--timeout', str(options.timeout)] + shlex.split(line))
+        except SystemExit:
+            ok = fail(line.split()[0], "invalid command", options.json) and ok
+            continue
+        if args.command == 'batch':
+            ok = fail('batch', "batch cannot be nested", options.json) and ok
+            continue
+        ok = execute(directory, args, options) and ok
+    return ok
+
+def main(argv=None):
+    parser = build_parser()
+    options = parser.parse_args(argv)
+
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    if options.consul_host:
+        config['consul']['host'] = options.consul_host
+    if options.consul_port:
+        config['consul']['port'] = options.consul_port
+
+    server_url = f"http://{options.server}" if options.server else None
+    directory = GameServerDirectory(config, server_url=server_url, log=log)
+    try:
+        directory.connect()
+        if directory.consul_client is not None:
+            directory.refresh()
+    except Exception as e:
+        log(f"[Client] Discovery failed: {e}")
+        return 1
+    if not directory.wait_for_leader(options.timeout):
+        log("[Client] No game server leader")
+        return 1
+
+    try:
+        if options.command == 'batch':
+            ok = run_batch(directory, parser, options)
+        else:
+            ok = execute(directory, options, options)
+    finally:
+        directory.close()
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
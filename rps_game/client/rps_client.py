@@ -5,7 +5,6 @@ import json
 import sys
 import os
 import random
-import consul
 from threading import Thread
 import time
 
@@ -16,6 +15,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import protos.game_service_pb2 as game_pb2
 import protos.game_service_pb2_grpc as game_pb2_grpc
 
+from client.discovery import GameServerDirectory
+from client.render_store import RenderStore, FRAME_MS
+
 class RPSClient:
     def __init__(self, root):
         self.root = root
@@ -28,15 +30,21 @@ class RPSClient:
             self.config = json.load(f)
         
         # Game state
-        self.client = None
         self.game_id = None
         self.player_id = ""
         self.polling = False
-        self.current_server_url = None
         self.is_connected = False
+        self.last_state_version = 0
+        
+        # Leader and read replicas, shared with the headless client
+        self.directory = GameServerDirectory(self.config, on_status=self._on_server_status)
         
-        # Consul client
-        self.consul_client = None
+        # What the game screen shows; bursts of states become one redraw per frame
+        self.widgets = {}
+        self.store = RenderStore(
+            schedule=lambda redraw: self.root.after(FRAME_MS, redraw),
+            apply=self._apply_widget
+        )
         
         # Connect to Consul and monitor game server
         self._connect_to_consul()
@@ -44,60 +52,27 @@ class RPSClient:
         # Create UI
         self._create_login_screen()
         
+    @property
+    def client(self):
+        """Stub of the current game server leader, None while there is none"""
+        return self.directory.leader
+    
     def _connect_to_consul(self):
         """Connect to Consul and start monitoring game server leader"""
         try:
-            consul_host = self.config['consul']['host']
-            consul_port = self.config['consul']['port']
-            self.consul_client = consul.Consul(host=consul_host, port=consul_port)
-            print(f"[Client] Connected to Consul at {consul_host}:{consul_port}")
-            
-            # Start monitoring game server leader
-            Thread(target=self._monitor_game_server, daemon=True).start()
-            
+            self.directory.connect()
+            self.directory.start()
         except Exception as e:
             messagebox.showerror("Consul Error", f"Failed to connect to Consul: {e}")
     
-    def _monitor_game_server(self):
-        """Monitor game server leader from Consul"""
-        while True:
-            try:
-                if self.consul_client:
-                    index, data = self.consul_client.kv.get("service/rps-game/leader")
-                    if data:
-                        leader_url = data['Value'].decode('utf-8')
-                        if leader_url != self.current_server_url:
-                            self.current_server_url = leader_url
-                            print(f"[Client] Game Server Leader: {leader_url}")
-                            self._connect_to_server(leader_url)
-                    else:
-                        self.current_server_url = None
-                        self.client = None
-                        self.is_connected = False
-                        self._set_connection_status(False)
-                        
-            except Exception as e:
-                print(f"[Server Monitor Error] {e}")
-                self.is_connected = False
-                self._set_connection_status(False)
-            
-            time.sleep(2)
+    def _on_server_status(self, connected):
+        """Leader found, lost, or its channel changed state"""
+        self.is_connected = connected
+        self._set_connection_status(connected)
     
-    def _connect_to_server(self, server_url):
-        """Connect to game server"""
-        try:
-            # Remove http:// prefix if present
-            server_addr = server_url.replace('http://', '')
-            channel = grpc.insecure_channel(server_addr)
-            self.client = game_pb2_grpc.GameServiceStub(channel)
-            print(f"[Client] Connected to game server at {server_addr}")
-            self.is_connected = True
-            self._set_connection_status(True)
-        except Exception as e:
-            print(f"[Connection Error] {e}")
-            self.client = None
-            self.is_connected = False
-            self._set_connection_status(False)
+    def _read(self, method, request):
+        """Send a read to the next replica, falling back to the leader"""
+        return self.directory.read(method, request)
     
     def _wait_for_server(self):
         """Wait for server to be available"""
@@ -188,7 +163,8 @@ class RPSClient:
         
         # Check for existing session
         try:
-            response = self.client.CheckSession(
+            response = self._read(
+                "CheckSession",
                 game_pb2.CheckRequest(player_id=self.player_id)
             )
             
@@ -438,6 +414,19 @@ class RPSClient:
             state=tk.DISABLED
         )
         self.next_round_btn.pack(pady=20)
+        
+        self.widgets = {
+            "info": self.info_label,
+            "status": self.status_label,
+            "score": self.score_label,
+            "result": self.result_label,
+            "rock": self.rock_btn,
+            "paper": self.paper_btn,
+            "scissors": self.scissors_btn,
+            "next_round": self.next_round_btn,
+        }
+        self.store.reset(self.player_id)
+        self.store.set_connected(self.is_connected)
     
     def _make_choice(self, choice):
         """Player makes a choice"""
@@ -483,108 +472,58 @@ class RPSClient:
     def _start_polling(self):
         """Start polling for game state updates"""
         self.polling = True
+        self.last_state_version = 0
         
         def poll():
             while self.polling:
                 try:
                     if self.client and self.is_connected:
-                        response = self.client.GetState(
+                        response = self._read(
+                            "GetState",
                             game_pb2.StateRequest(
                                 game_id=self.game_id,
-                                player_id=self.player_id
+                                player_id=self.player_id,
+                                known_version=self.last_state_version
                             )
                         )
                         
-                        if not response.error:
-                            self.root.after(0, lambda: self._update_ui(response))
-                    
+                        # Replicas lag a little; never step back to an older state
+                        is_older = 0 < response.state_version < self.last_state_version
+                        
+                        if not response.error and not response.not_modified and not is_older:
+                            self._update_ui(response)
+
+                except grpc.RpcError as e:
+                    if e.code() == grpc.StatusCode.RESOURCE_EXHAUSTED:
+                        # Server shed the poll under load, keep the connection
+                        pass
+                    else:
+                        print(f"[Polling Error] {e}")
+                        self.is_connected = False
+                        self._set_connection_status(False)
                 except Exception as e:
                     print(f"[Polling Error] {e}")
                     self.is_connected = False
-                    self.root.after(0, lambda: self._set_connection_status(False))
+                    self._set_connection_status(False)
                 
                 time.sleep(2)
         
         Thread(target=poll, daemon=True).start()
     
     def _update_ui(self, response):
-        """Update UI with game state"""
-        # Check connection status first
-        if not self.is_connected:
-            self.status_label.config(text="Waiting for connection...", bg="#e74c3c", fg="white")
-            self._disable_buttons()
-            return
-        
-        # Update info
-        self.info_label.config(
-            text=f"Player: {self.player_id}\nRoom: #{response.game_id}\n" +
-                 f"Players: {response.player1} vs {response.player2}"
-        )
-        
-        # Update score
-        self.score_label.config(
-            text=f"Score: {response.player1_score} - {response.player2_score}"
-        )
-        
-        # Update status
-        if response.status == "waiting":
-            self.status_label.config(text="Waiting for opponent...", bg="#f39c12", fg="white")
-            self._disable_buttons()
-        elif response.status == "ready":
-            # Check if current player has made a choice
-            is_player1 = (self.player_id == response.player1)
-            my_choice = response.player1_choice if is_player1 else response.player2_choice
-            
-            if my_choice == "waiting":
-                self.status_label.config(text="Make your choice!", bg="#27ae60", fg="white")
-                self._enable_buttons()
-            else:
-                self.status_label.config(text="Waiting for opponent's choice...", bg="#f39c12", fg="white")
-                self._disable_buttons()
-        else:
-            # Round finished
-            self.status_label.config(text="Round Complete!", bg="#3498db", fg="white")
-            self._disable_buttons()
-            self.next_round_btn.config(state=tk.NORMAL)
-        
-        # Update result
-        self.result_label.config(text=response.round_result)
+        """Hand a game state to the render store (safe from any thread)"""
+        self.last_state_version = max(self.last_state_version, response.state_version)
+        self.store.submit(response)
     
-    def _enable_buttons(self):
-        """Enable choice buttons"""
-        if self.is_connected:
-            self.rock_btn.config(state=tk.NORMAL)
-            self.paper_btn.config(state=tk.NORMAL)
-            self.scissors_btn.config(state=tk.NORMAL)
-            self.next_round_btn.config(state=tk.DISABLED)
-    
-    def _disable_buttons(self):
-        """Disable choice buttons"""
-        self.rock_btn.config(state=tk.DISABLED)
-        self.paper_btn.config(state=tk.DISABLED)
-        self.scissors_btn.config(state=tk.DISABLED)
+    def _apply_widget(self, name, options):
+        """Configure one game screen widget with only the options that changed"""
+        widget = self.widgets.get(name)
+        if widget is not None:
+            widget.config(**options)
     
     def _set_connection_status(self, connected):
         """Update UI based on connection status"""
-        def update():
-            if not connected:
-                # Show red "Waiting for connection..." message
-                if hasattr(self, 'status_label'):
-                    self.status_label.config(
-                        text="Waiting for connection...",
-                        bg="#e74c3c",
-                        fg="white"
-                    )
-                if hasattr(self, 'rock_btn'):
-                    self._disable_buttons()
-            else:
-                # Connection restored
-                if hasattr(self, 'status_label') and self.game_id:
-                    # Will be updated by next poll
-                    pass
-        
-        if hasattr(self, 'root'):
-            self.root.after(0, update)
+        self.store.set_connected(connected)
     
     def _exit_game(self):
         """Exit the game"""
@@ -0,0 +1,77 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qsl
+
+class AdminServer:
+    """Opt-in HTTP endpoint exposing server metrics and admin actions"""
+
+    def __init__(self, port, service_name):
+        self.port = port
+        self.service_name = service_name
+        self.metric_sources = []
+        self.routes = {}  # (HTTP method, path) -> handler(params) returning (status, body)
+        self.httpd = None
+
+    def add_metrics(self, source):
+        """Register a callable returning (name, labels, value) tuples"""
+        self.metric_sources.append(source)
+
+    def add_route(self, method, path, handler):
+        """Serve method path with handler(params), which returns (status, body)"""
+        self.routes[(method, path)] = handler
+
+    def render_metrics(self):
+        """Render all metrics in Prometheus text format"""
+        lines = []
+        for source in self.metric_sources:
+            for name, labels, value in source():
+                labels = dict(labels, service=self.service_name)
+                label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+                lines.append(f"{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def start(self):
+        admin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] == '/metrics':
+                    admin._reply(self, 200, admin.render_metrics())
+                else:
+                    admin._route(self, "GET")
+
+            def do_POST(self):
+                admin._route(self, "POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('0.0.0.0', self.port), Handler)
+        self.httpd.daemon_threads = True
+        Thread(target=self.httpd.serve_forever, daemon=True).start()
+        print(f"[Admin] Metrics on http://0.0.0.0:{self.port}/metrics")
+
+    def _route(self, handler, method):
+        path, _, query = handler.path.partition('?')
+        route = self.routes.get((method, path))
+        if route is None:
+            self._reply(handler, 404, "not found\n")
+            return
+        try:
+            status, body = route(dict(parse_qsl(query)))
+        except Exception as e:
+            status, body = 500, f"{e}\n"
+        self._reply(handler, status, body)
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+
+    @staticmethod
+    def _reply(handler, status, body, content_type="text/plain; charset=utf-8"):
+        data = body.encode('utf-8')
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
@@ -0,0 +1,196 @@
+import grpc
+from concurrent import futures
+import threading
+import time
+
+# Requests are shed by class: cheap reads go first, writes only under heavy overload
+READ = "read"
+WRITE = "write"
+
+_local = threading.local()
+
+def current_queue_delay():
+    """Seconds the current RPC spent waiting in the executor queue"""
+    enqueued_at = getattr(_local, 'enqueued_at', None)
+    if enqueued_at is None:
+        return 0.0
+    return time.monotonic() - enqueued_at
+
+class QueueTimingExecutor(futures.ThreadPoolExecutor):
+    """Thread pool that remembers when each work item was queued"""
+
+    def submit(self, fn, *args, **kwargs):
+        return super().submit(self._run_timed, time.monotonic(), fn, *args, **kwargs)
+
+    @staticmethod
+    def _run_timed(enqueued_at, fn, *args, **kwargs):
+        _local.enqueued_at = enqueued_at
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _local.enqueued_at = None
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limit driven by observed queueing delay"""
+
+    def __init__(self, target_delay=0.05, min_limit=2, max_limit=64,
+                 read_share=0.75, write_delay_factor=3.0):
+        self.target_delay = target_delay
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.read_share = read_share
+        self.write_delay_factor = write_delay_factor
+
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.shed = {}
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, method, priority, queue_delay):
+        """Admit a request or count it as shed"""
+        with self._lock:
+            if priority == READ:
+                rejected = (queue_delay > self.target_delay or
+                            self.in_flight >= self.limit * self.read_share)
+            else:
+                rejected = (queue_delay > self.target_delay * self.write_delay_factor or
+                            self.in_flight >= self.limit)
+
+            if rejected:
+                key = (method, priority)
+                self.shed[key] = self.shed.get(key, 0) + 1
+                self._decrease()
+                return False
+
+            self.in_flight += 1
+            return True
+
+    def release(self, queue_delay):
+        """Finish an admitted request and adapt the limit"""
+        with self._lock:
+            self.in_flight -= 1
+            if queue_delay > self.target_delay:
+                self._decrease()
+            elif self.limit < self.max_limit:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+
+    def _decrease(self):
+        # Back off at most once per target interval so one burst does not collapse the limit
+        now = time.monotonic()
+        if now - self._last_decrease >= self.target_delay:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+            self._last_decrease = now
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        with self._lock:
+            lines = [
+                ("rps_admission_limit", {}, round(self.limit, 2)),
+                ("rps_admission_in_flight", {}, self.in_flight),
+            ]
+            for (method, priority), count in sorted(self.shed.items()):
+                lines.append(("rps_admission_shed_total",
+                              {"method": method, "class": priority}, count))
+            return lines
+
+class AdmissionInterceptor(grpc.ServerInterceptor):
+    """Rejects work with RESOURCE_EXHAUSTED when the limiter says so
+
+    Calls carrying admitted_header were admitted already by whoever sent them on
+    """
+
+    def __init__(self, limiter, priorities, default_priority=WRITE, admitted_header=None):
+        self.limiter = limiter
+        self.priorities = priorities
+        self.default_priority = default_priority
+        self.admitted_header = admitted_header
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.request_streaming or handler.response_streaming:
+            return handler
+        if self.admitted_header and any(key == self.admitted_header
+                                        for key, _ in handler_call_details.invocation_metadata or ()):
+            return handler
+
+        method = handler_call_details.method.rsplit('/', 1)[-1]
+        priority = self.priorities.get(method, self.default_priority)
+        behavior = handler.unary_unary
+        limiter = self.limiter
+
+        def admitted(request, context):
+            queue_delay = current_queue_delay()
+            if not limiter.try_acquire(method, priority, queue_delay):
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED,
+                              f"Overloaded, {method} shed")
+            try:
+                return behavior(request, context)
+            finally:
+                limiter.release(queue_delay)
+
+        return grpc.unary_unary_rpc_method_handler(
+            admitted,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+class UnarySlots(grpc.ServerInterceptor):
+    """Runs at most `slots` unary handlers at once, however many threads the pool has for streams
+
+    Waiting for a slot counts as queueing, so admission after it still sees the delay
+    """
+
+    def __init__(self, slots):
+        self.slots = slots
+        self._semaphore = threading.BoundedSemaphore(slots)
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.request_streaming or handler.response_streaming:
+            return handler
+        behavior = handler.unary_unary
+        semaphore = self._semaphore
+
+        def bounded(request, context):
+            with semaphore:
+                return behavior(request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            bounded,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+def create_server(section, admission_config, priorities, stream_workers=0, options=None, interceptors=(),
+                  admitted_header=None):
+    """Create a gRPC server with bounded workers and admission control
+
+    stream_workers are extra threads for long-lived streams, which hold a worker each;
+    unary handlers still run on at most max_workers of the threads at once. Interceptors run after admission, so shed requests never reach them. Only pass
+    admitted_header on a server that untrusted clients cannot reach
+    """
+    limiter = AdaptiveConcurrencyLimiter(
+        target_delay=admission_config.get('target_queue_delay_ms', 50) / 1000.0,
+        min_limit=admission_config.get('min_limit', 2),
+        max_limit=admission_config.get('max_limit', section.get('max_workers', 10)),
+        read_share=admission_config.get('read_share', 0.75)
+    )
+
+    chain = []
+    if stream_workers:
+        chain.append(UnarySlots(section.get('max_workers', 10)))
+    if admission_config.get('enabled', True):
+        chain.append(AdmissionInterceptor(limiter, priorities, admitted_header=admitted_header))
+    chain.extend(interceptors)
+
+    maximum_concurrent_rpcs = section.get('maximum_concurrent_rpcs')
+    if maximum_concurrent_rpcs is not None:
+        maximum_concurrent_rpcs += stream_workers
+    server = grpc.server(
+        QueueTimingExecutor(max_workers=section.get('max_workers', 10) + stream_workers),
+        interceptors=chain,
+        options=options,
+        maximum_concurrent_rpcs=maximum_concurrent_rpcs
+    )
+    return server, limiter
@@ -0,0 +1,171 @@
+import threading
+import time
+
+import grpc
+
+from common.logs import get_logger
+
+log = get_logger("Channels")
+
+COMPRESSION = {
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
+def channel_options(config):
+    """Client-side channel arguments from the channels section of config.json"""
+    return [
+        # Ping idle connections so a dead peer is noticed in seconds, not at the next call
+        ('grpc.keepalive_time_ms', config.get('keepalive_time_ms', 10000)),
+        ('grpc.keepalive_timeout_ms', config.get('keepalive_timeout_ms', 3000)),
+        ('grpc.keepalive_permit_without_calls', 1),
+        ('grpc.http2.max_pings_without_data', 0),
+        ('grpc.initial_reconnect_backoff_ms', config.get('initial_reconnect_backoff_ms', 200)),
+        ('grpc.max_reconnect_backoff_ms', config.get('max_reconnect_backoff_ms', 2000)),
+        ('grpc.max_send_message_length', config.get('max_message_bytes', 16 * 1024 * 1024)),
+        ('grpc.max_receive_message_length', config.get('max_message_bytes', 16 * 1024 * 1024)),
+    ]
+
+def server_options(config):
+    """Server arguments that accept the clients' keepalive pings"""
+    keepalive_time = config.get('keepalive_time_ms', 10000)
+    return [
+        ('grpc.keepalive_time_ms', keepalive_time),
+        ('grpc.keepalive_timeout_ms', config.get('keepalive_timeout_ms', 3000)),
+        ('grpc.keepalive_permit_without_calls', 1),
+        # Without this the server answers frequent pings with GOAWAY too_many_pings
+        ('grpc.http2.min_ping_interval_without_data_ms', keepalive_time // 2),
+        ('grpc.http2.max_pings_without_data', 0),
+        ('grpc.max_send_message_length', config.get('max_message_bytes', 16 * 1024 * 1024)),
+        ('grpc.max_receive_message_length', config.get('max_message_bytes', 16 * 1024 * 1024)),
+    ]
+
+# grpc's connectivity poll thread wakes every 0.2 s and stops once nobody is subscribed;
+# closing the channel under it makes it die with ValueError, so the close waits this long
+CLOSE_DELAY = 0.5
+
+def _ignore(state):
+    pass
+
+class ManagedChannel:
+    """A channel, its stubs and what we know about its connectivity"""
+
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+        self.stubs = {}
+        self.state = None
+        self.opened_at = time.monotonic()
+        self.failures = 0
+        self.callback = None
+        self.closed = False  # Set once close() ran; late callbacks must not touch the channel
+        self.lock = threading.Lock()
+
+class ChannelManager:
+    """One channel per target: reused across leader changes, closed when dropped"""
+
+    def __init__(self, config):
+        self.options = channel_options(config)
+        self.compression = COMPRESSION[config.get('compression', 'none')]
+        self.channels = {}  # url -> ManagedChannel
+        self.listeners = []
+        self.opened = 0
+        self.closed = 0
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """Call listener(url, state) on every connectivity change"""
+        self.listeners.append(listener)
+
+    def stub(self, url, stub_class):
+        """Stub for url, sharing the target's channel with every other stub"""
+        with self._lock:
+            managed = self.channels.get(url)
+            if managed is None:
+                managed = self._open(url)
+            stub = managed.stubs.get(stub_class)
+            if stub is None:
+                stub = managed.stubs[stub_class] = stub_class(managed.channel)
+            return stub
+
+    def state(self, url):
+        """Last connectivity state of the target, None if unknown"""
+        managed = self.channels.get(url)
+        return managed.state if managed else None
+
+    def is_failing(self, url):
+        return self.state(url) in (grpc.ChannelConnectivity.TRANSIENT_FAILURE,
+                                   grpc.ChannelConnectivity.SHUTDOWN)
+
+    def retain(self, urls):
+        """Close every channel whose target is not in urls"""
+        with self._lock:
+            stale = [self.channels.pop(url) for url in list(self.channels) if url not in urls]
+        for managed in stale:
+            self._close(managed)
+
+    def close(self, url):
+        with self._lock:
+            managed = self.channels.pop(url, None)
+        if managed is not None:
+            self._close(managed)
+
+    def close_all(self):
+        self.retain(())
+
+    def _open(self, url):
+        channel = grpc.insecure_channel(
+            url.replace('http://', ''),
+            options=self.options,
+            compression=self.compression
+        )
+        managed = ManagedChannel(url, channel)
+        managed.callback = lambda state: self._on_state(managed, state)
+        # Connect right away so a dead target shows up before the first call needs it
+        channel.subscribe(managed.callback, try_to_connect=True)
+        self.channels[url] = managed
+        self.opened += 1
+        return managed
+
+    def _close(self, managed):
+        with managed.lock:
+            managed.closed = True
+            managed.channel.unsubscribe(managed.callback)
+        # Calls already under way finish meanwhile; new ones get another channel
+        closer = threading.Timer(CLOSE_DELAY, managed.channel.close)
+        closer.daemon = True
+        closer.start()
+        self.closed += 1
+
+    def _on_state(self, managed, state):
+        with managed.lock:
+            # The poll thread can still deliver a state after close()
+            if managed.closed:
+                return
+            if state == grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+                managed.failures += 1
+            if state == grpc.ChannelConnectivity.IDLE and managed.state is not None:
+                # The peer said goodbye or the link went idle: reconnect now, so a dead
+                # leader shows up as TRANSIENT_FAILURE instead of an innocent-looking IDLE
+                managed.channel.subscribe(_ignore, try_to_connect=True)
+                managed.channel.unsubscribe(_ignore)
+            managed.state = state
+        for listener in self.listeners:
+            try:
+                listener(managed.url, state)
+            except Exception as e:
+                log.error("Listener failed", target=managed.url, error=e)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        samples = [
+            ("rps_channels_open", {}, len(self.channels)),
+            ("rps_channels_opened_total", {}, self.opened),
+            ("rps_channels_closed_total", {}, self.closed),
+        ]
+        for url, managed in list(self.channels.items()):
+            state = managed.state.name.lower() if managed.state else "unknown"
+            samples.append(("rps_channel_state", {"target": url, "state": state}, 1))
+            samples.append(("rps_channel_failures_total", {"target": url}, managed.failures))
+        return samples
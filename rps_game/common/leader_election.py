@@ -0,0 +1,149 @@
+import threading
+import time
+
+from common.logs import get_logger
+
+log = get_logger("Leader")
+
+# Longest a standby's blocking query waits before asking again
+STANDBY_WAIT = "30s"
+
+class LeaderElection:
+    """Consul session lock on a key, shared by the ORM and the game server
+
+    The leader renews its session every ttl * renew_fraction seconds and in between waits
+    on the key with a blocking query, so losing it is noticed at once. A standby waits on
+    the key the same way and acquires as soon as the leader's session releases it.
+    """
+
+    def __init__(self, consul_client, key, value, session_name, election_config,
+                 on_elected=None, on_lost=None):
+        self.consul = consul_client
+        self.key = key
+        self.value = value
+        self.session_name = session_name
+        self.ttl = election_config.get('ttl_s', 10)
+        self.renew_interval = max(1.0, self.ttl * election_config.get('renew_fraction', 0.3))
+        self.retry = election_config.get('retry_s', 2)
+        self.on_elected = on_elected
+        self.on_lost = on_lost
+
+        self.is_leader = False
+        self.session_id = None
+        self.elections = 0
+        self.losses = 0
+        self.renewals = 0
+        self.requests = 0  # Calls to Consul, blocking queries included
+        self.last_acquire = 0.0  # Seconds from seeing the key free to holding it
+        self.max_acquire = 0.0
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Step down and stop running; the key is released for a standby right away"""
+        self._stopping.set()
+        session_id = self.session_id
+        if session_id:
+            self._destroy(session_id)
+        if self._thread is not None:
+            self._thread.join(timeout=self.renew_interval + 1)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                free_since = self._wait_until_free()
+                if free_since is None:
+                    return
+                if self._acquire():
+                    acquire = time.monotonic() - free_since
+                    self.last_acquire = acquire
+                    self.max_acquire = max(self.max_acquire, acquire)
+                    self._lead()
+            except Exception as e:
+                log.error("Election failed", key=self.key, url=self.value, error=e)
+                self._stopping.wait(self.retry)
+            finally:
+                self._step_down()
+
+    def _get(self, index=None, wait=None):
+        self.requests += 1
+        return self.consul.kv.get(self.key, index=index, wait=wait)
+
+    def _wait_until_free(self):
+        """Block until nobody holds the key; returns when it was seen free, None when stopping"""
+        index = None
+        while not self._stopping.is_set():
+            # The first read returns at once and gives the index to block on
+            index, data = self._get(index=index, wait=STANDBY_WAIT if index else None)
+            if not data or not data.get('Session'):
+                return time.monotonic()
+        return None
+
+    def _acquire(self):
+        self.requests += 1
+        self.session_id = self.consul.session.create(
+            name=self.session_name,
+            ttl=self.ttl,
+            lock_delay=0,
+            behavior='delete'
+        )
+        self.requests += 1
+        # Another standby may have been quicker; then wait for the key again
+        return self.consul.kv.put(self.key, self.value, acquire=self.session_id)
+
+    def _lead(self):
+        self.is_leader = True
+        self.elections += 1
+        log.info("Elected", key=self.key, url=self.value, acquire_ms=round(self.last_acquire * 1000, 1))
+        if self.on_elected:
+            self.on_elected()
+
+        index = None
+        next_renewal = time.monotonic() + self.renew_interval
+        while not self._stopping.is_set():
+            wait = max(0.0, next_renewal - time.monotonic())
+            # Returns early when the key changes, otherwise when it is time to renew
+            index, data = self._get(index=index, wait=f"{max(100, int(wait * 1000))}ms")
+            if not data or data.get('Session') != self.session_id:
+                if not self._stopping.is_set():
+                    self.losses += 1
+                    log.warning("Leadership lost", key=self.key, url=self.value)
+                return
+            if time.monotonic() >= next_renewal:
+                self.requests += 1
+                # Raises once the session is gone, which ends our leadership
+                self.consul.session.renew(self.session_id)
+                self.renewals += 1
+                next_renewal = time.monotonic() + self.renew_interval
+
+    def _step_down(self):
+        was_leader = self.is_leader
+        self.is_leader = False
+        session_id, self.session_id = self.session_id, None
+        if session_id:
+            self._destroy(session_id)
+        if was_leader and self.on_lost:
+            self.on_lost()
+
+    def _destroy(self, session_id):
+        try:
+            self.requests += 1
+            self.consul.session.destroy(session_id)
+        except Exception:
+            pass
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_leader", {"key": self.key}, 1 if self.is_leader else 0),
+            ("rps_leader_elections_total", {}, self.elections),
+            ("rps_leader_lost_total", {}, self.losses),
+            ("rps_leader_renewals_total", {}, self.renewals),
+            ("rps_leader_consul_requests_total", {}, self.requests),
+            ("rps_leader_acquire_seconds", {}, round(self.last_acquire, 4)),
+            ("rps_leader_acquire_seconds_max", {}, round(self.max_acquire, 4)),
+        ]
@@ -0,0 +1,196 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+ROOT = "rps"
+
+def get_logger(tag):
+    """Logger whose lines read "[tag] message key=value ..." like the old prints"""
+    return StructuredLogger(logging.getLogger(f"{ROOT}.{tag}"))
+
+class StructuredLogger:
+    """Keep messages constant and put the variable parts in fields:
+    log.error("RPC failed", method="MakeMove", game_id=game_id, error=e)
+    """
+
+    __slots__ = ("logger", "context")
+
+    def __init__(self, logger, context=None):
+        self.logger = logger
+        self.context = context or {}
+
+    def bind(self, **context):
+        """Logger that adds context to every line"""
+        return StructuredLogger(self.logger, {**self.context, **context})
+
+    def debug(self, message, **fields):
+        self._log(logging.DEBUG, message, fields)
+
+    def info(self, message, **fields):
+        self._log(logging.INFO, message, fields)
+
+    def warning(self, message, **fields):
+        self._log(logging.WARNING, message, fields)
+
+    def error(self, message, **fields):
+        self._log(logging.ERROR, message, fields)
+
+    def _log(self, level, message, fields):
+        if self.logger.isEnabledFor(level):
+            if self.context:
+                fields = {**self.context, **fields}
+            self.logger.log(level, message, extra={"fields": fields})
+
+def _quote(value):
+    text = str(value)
+    if not text or any(c in text for c in ' "=\n'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+class KeyValueFormatter(logging.Formatter):
+    """12:00:00.123 ERROR [Game Server] RPC failed method=MakeMove error="..." """
+
+    def format(self, record):
+        stamp = time.strftime('%H:%M:%S', time.localtime(record.created))
+        tag = record.name.split('.', 1)[-1]
+        text = f"{stamp}.{int(record.msecs):03d} {record.levelname} [{tag}] {record.getMessage()}"
+        fields = getattr(record, 'fields', None)
+        if fields:
+            text += " " + " ".join(f"{key}={_quote(value)}" for key, value in fields.items())
+        return text
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers"""
+
+    def __init__(self, service_name):
+        super().__init__()
+        self.service_name = service_name
+
+    def format(self, record):
+        line = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "service": self.service_name,
+            "logger": record.name.split('.', 1)[-1],
+            "msg": record.getMessage(),
+        }
+        for key, value in (getattr(record, 'fields', None) or {}).items():
+            line[key] = value if isinstance(value, (int, float, bool)) or value is None else str(value)
+        return json.dumps(line, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """At most `limit` lines per message per interval for each limited level
+
+    The first line after a quiet period carries suppressed=N for what was dropped.
+    """
+
+    def __init__(self, limits, interval):
+        super().__init__()
+        self.limits = limits  # level number -> lines per interval
+        self.interval = interval
+        self.windows = {}  # (logger, level, message) -> [window start, lines, suppressed]
+        self.suppressed = 0
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        limit = self.limits.get(record.levelno)
+        if limit is None:
+            return True
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if len(self.windows) > 10000:
+                    self.windows.clear()
+                self.windows[key] = [now, 1, 0]
+                if window is not None and window[2]:
+                    record.fields = dict(getattr(record, 'fields', None) or {}, suppressed=window[2])
+                return True
+            if window[1] < limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the writer thread; drops them instead of blocking when it falls behind"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogPipeline:
+    """Request threads only enqueue; one background thread formats and writes"""
+
+    def __init__(self, handler, listener, rate_limit):
+        self.handler = handler
+        self.listener = listener
+        self.rate_limit = rate_limit
+
+    def stop(self):
+        """Write what is queued and stop the writer thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_log_queue_depth", {}, self.handler.queue.qsize()),
+            ("rps_log_dropped_total", {}, self.handler.dropped),
+            ("rps_log_suppressed_total", {}, self.rate_limit.suppressed),
+        ]
+
+def _default_handler():
+    """Until setup_logging runs (tools, scripts) lines go straight to stdout"""
+    root = logging.getLogger(ROOT)
+    if not root.handlers:
+        writer = logging.StreamHandler(sys.stdout)
+        writer.setFormatter(KeyValueFormatter())
+        root.addHandler(writer)
+        root.setLevel(logging.INFO)
+        root.propagate = False
+
+_default_handler()
+
+def setup_logging(service_name, logging_config, stream=None):
+    """Route every rps.* logger through a bounded queue to stdout"""
+    root = logging.getLogger(ROOT)
+    root.setLevel(logging_config.get('level', 'INFO'))
+    root.propagate = False
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    writer = logging.StreamHandler(stream or sys.stdout)
+    if logging_config.get('format', 'text') == 'json':
+        writer.setFormatter(JsonFormatter(service_name))
+    else:
+        writer.setFormatter(KeyValueFormatter())
+
+    limits = logging_config.get('rate_limit', {})
+    rate_limit = RateLimitFilter(
+        {logging.getLevelName(level): count for level, count in limits.items() if level != 'interval_s'},
+        limits.get('interval_s', 10)
+    )
+    handler = DroppingQueueHandler(queue.Queue(logging_config.get('queue_size', 10000)))
+    handler.addFilter(rate_limit)
+    root.addHandler(handler)
+
+    listener = logging.handlers.QueueListener(handler.queue, writer)
+    listener.start()
+    pipeline = LogPipeline(handler, listener, rate_limit)
+    atexit.register(pipeline.stop)
+    return pipeline
@@ -0,0 +1,237 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+import grpc
+
+from common.logs import get_logger
+
+log = get_logger("Profiler")
+
+CPROFILE = "cprofile"
+SAMPLE = "sample"
+
+class Profiler:
+    """On-demand cProfile or stack sampling of a live server, grouped by RPC method"""
+
+    def __init__(self, service_name, profiling_config):
+        self.service_name = service_name
+        self.directory = profiling_config.get('dir', 'profiles')
+        self.sample_interval = profiling_config.get('sample_interval_ms', 5) / 1000.0
+        self.max_seconds = profiling_config.get('max_seconds', 300)
+
+        self.mode = None
+        self.session = 0
+        self.deadline = 0.0
+        self.stats = {}           # method -> pstats.Stats (cprofile)
+        self.samples = Counter()  # collapsed stack -> samples (sample)
+        self.running = {}         # thread ident -> RPC method it is serving (sample)
+        self.calls = Counter()    # method -> profiled calls
+        self.skipped = 0
+        self.last_files = []
+        self.profiles_total = 0
+        self._stop = None
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def start(self, mode, seconds):
+        """Profile for up to seconds; files are written when it ends or is stopped"""
+        if mode not in (CPROFILE, SAMPLE):
+            raise ValueError(f"Unknown mode: {mode}")
+        seconds = min(float(seconds), self.max_seconds)
+        if seconds <= 0:
+            raise ValueError("seconds must be positive")
+        with self._lock:
+            if self.mode is not None:
+                raise RuntimeError(f"A {self.mode} profile is already running")
+            self.session += 1
+            self.stats = {}
+            self.samples = Counter()
+            self.calls = Counter()
+            self.skipped = 0
+            self.deadline = time.monotonic() + seconds
+            self._stop = threading.Event()
+            self.mode = mode
+            self._worker = threading.Thread(target=self._run, args=(mode, self._stop), daemon=True)
+            self._worker.start()
+        log.info("Started", mode=mode, seconds=seconds)
+
+    def stop(self):
+        """End the running profile early; returns the files written"""
+        with self._lock:
+            stop, worker = self._stop, self._worker
+        if stop is None:
+            return []
+        stop.set()
+        worker.join()
+        return self.last_files
+
+    def _run(self, mode, stop):
+        if mode == SAMPLE:
+            while not stop.wait(self.sample_interval) and time.monotonic() < self.deadline:
+                self._sample()
+        else:
+            stop.wait(max(0.0, self.deadline - time.monotonic()))
+        with self._lock:
+            self.mode = None
+            self._stop = None
+            self._worker = None
+            stats, samples, calls = self.stats, self.samples, self.calls
+        try:
+            self.last_files = self._dump(mode, stats, samples, calls)
+            self.profiles_total += 1
+            log.info("Finished", mode=mode, files=",".join(self.last_files) or "none")
+        except Exception as e:
+            self.last_files = []
+            log.error("Dump failed", mode=mode, error=e)
+
+    def profile_call(self, method, behavior, request, context):
+        """Run one RPC handler, profiled if a profile is running"""
+        mode = self.mode
+        if mode is None:
+            return behavior(request, context)
+
+        if mode == SAMPLE:
+            ident = threading.get_ident()
+            self.running[ident] = method
+            try:
+                return behavior(request, context)
+            finally:
+                self.running.pop(ident, None)
+                self.calls[method] += 1
+
+        session = self.session
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active cProfile per process: overlapping calls run unprofiled
+            self.skipped += 1
+            return behavior(request, context)
+        try:
+            return behavior(request, context)
+        finally:
+            profile.disable()
+            self._merge(session, method, profile)
+
+    def _merge(self, session, method, profile):
+        with self._lock:
+            # A call that outlived its profile must not leak into the next one
+            if session != self.session or self.mode != CPROFILE:
+                return
+            stats = self.stats.get(method)
+            if stats is None:
+                self.stats[method] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self.calls[method] += 1
+
+    def _sample(self):
+        """Record the stack of every thread, rooted at its RPC method or thread name"""
+        frames = sys._current_frames()
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        running = dict(self.running)
+        for ident, frame in frames.items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code is _PROFILE_CALL_CODE:
+                    # Frames below are the executor and interceptors, the same for every call
+                    break
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            root = running.get(ident) or f"[{names.get(ident, ident)}]"
+            stack.append(root)
+            stack.reverse()
+            self.samples[";".join(stack)] += 1
+
+    def _dump(self, mode, stats, samples, calls):
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"{self.service_name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        files = []
+        if mode == CPROFILE:
+            # One pstats file per method: python -m pstats <file>, or snakeviz
+            for method, method_stats in sorted(stats.items()):
+                path = f"{prefix}-{method}.pstats"
+                method_stats.dump_stats(path)
+                files.append(path)
+        elif samples:
+            # Collapsed stacks, one per line: flamegraph.pl / speedscope read them directly
+            path = f"{prefix}.collapsed"
+            with open(path, 'w') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            files.append(path)
+        return files
+
+    def status(self):
+        with self._lock:
+            if self.mode is None:
+                lines = ["mode=idle"]
+            else:
+                remaining = max(0.0, self.deadline - time.monotonic())
+                lines = [f"mode={self.mode}", f"remaining_s={remaining:.1f}"]
+            lines += [f"calls {method}={count}" for method, count in sorted(self.calls.items())]
+        lines += [f"file={path}" for path in self.last_files]
+        return "\n".join(lines) + "\n"
+
+    def register(self, admin):
+        """Expose /profile on the admin endpoint"""
+        admin.add_route("GET", "/profile", lambda params: (200, self.status()))
+        admin.add_route("POST", "/profile/start", self._start_route)
+        admin.add_route("POST", "/profile/stop", self._stop_route)
+        admin.add_metrics(self.metrics)
+
+    def _start_route(self, params):
+        try:
+            self.start(params.get('mode', SAMPLE), params.get('seconds', 30))
+        except ValueError as e:
+            return 400, f"{e}\n"
+        except RuntimeError as e:
+            return 409, f"{e}\n"
+        return 202, self.status()
+
+    def _stop_route(self, params):
+        files = self.stop()
+        return 200, "".join(f"file={path}\n" for path in files)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_profile_active", {}, 0 if self.mode is None else 1),
+            ("rps_profiles_total", {}, self.profiles_total),
+            ("rps_profile_skipped_calls", {}, self.skipped),
+        ]
+
+_PROFILE_CALL_CODE = Profiler.profile_call.__code__
+
+class ProfilingInterceptor(grpc.ServerInterceptor):
+    """Routes unary handlers through the profiler, which is a no-op while idle"""
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None or handler.request_streaming or handler.response_streaming:
+            return handler
+
+        method = handler_call_details.method.rsplit('/', 1)[-1]
+        behavior = handler.unary_unary
+        profiler = self.profiler
+
+        def profiled(request, context):
+            return profiler.profile_call(method, behavior, request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            profiled,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
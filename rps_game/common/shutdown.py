@@ -0,0 +1,55 @@
+import os
+import signal
+import threading
+import time
+
+from common.logs import get_logger
+
+log = get_logger("Shutdown")
+
+class GracefulShutdown:
+    """Runs the registered steps in order on SIGTERM or SIGINT; a second signal exits at once"""
+
+    def __init__(self, shutdown_config):
+        self.drain_timeout = shutdown_config.get('drain_timeout_s', 10)
+        self.steps = []  # (name, callable)
+        self.requested = threading.Event()
+        self.signal_name = None
+
+    def add_step(self, name, step):
+        self.steps.append((name, step))
+
+    def install(self):
+        """Take over SIGTERM and SIGINT (call from the main thread)"""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+
+    def _on_signal(self, signum, frame):
+        if self.requested.is_set():
+            # Someone is impatient: skip whatever is left
+            os._exit(1)
+        self.signal_name = signal.Signals(signum).name
+        self.requested.set()
+
+    def wait(self):
+        """Block until a signal arrives, then run every step"""
+        while not self.requested.wait(1):
+            pass
+        self.run()
+
+    def run(self):
+        started = time.monotonic()
+        log.info("Shutting down", signal=self.signal_name, drain_timeout_s=self.drain_timeout)
+        for name, step in self.steps:
+            step_started = time.monotonic()
+            try:
+                step()
+            except Exception as e:
+                log.error("Shutdown step failed", step=name, error=e)
+                continue
+            log.info("Shutdown step done", step=name, ms=round((time.monotonic() - step_started) * 1000, 1))
+        log.info("Stopped", ms=round((time.monotonic() - started) * 1000, 1))
+
+def drain(server, timeout):
+    """Refuse new RPCs and give the running ones up to timeout seconds to finish"""
+    server.stop(timeout).wait()
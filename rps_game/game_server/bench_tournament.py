@@ -0,0 +1,153 @@
+"""
+Benchmark for the tournament engine: one bracket with simulated players.
+Rooms live in a RoomCache and are written in their RoomActors turn as on the game server,
+but moves go straight to the cache and bracket batches to a counting sink, so this measures
+the engine and its scheduler, not gRPC or the ORM.
+
+Run from rps_game/:  python -m game_server.bench_tournament --players 65536
+                     python -m game_server.bench_tournament --format swiss --idle 0.01
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game_server.room_cache import RoomCache
+from game_server.room_actors import RoomActors
+from game_server.tournament import Scheduler, TournamentEngine, FORMATS, SINGLE_ELIMINATION
+
+CHOICES = ("rock", "paper", "scissors")
+
+class SimulatedPlayers:
+    """Every player answers a ready room after a random think time, scheduled on the shared scheduler"""
+
+    def __init__(self, cache, actors, scheduler, think, idle_players):
+        self.cache = cache
+        self.actors = actors
+        self.scheduler = scheduler
+        self.think = think
+        self.idle_players = idle_players
+        self.thinking = set()  # (room_id, player) with a move scheduled
+        self.moves = 0
+        self._lock = threading.Lock()
+        cache.add_listener(self._on_room_change)
+
+    def _on_room_change(self, game_id, game, version, deleted):
+        if deleted or game is None or game.status != "ready":
+            return
+        for player, choice in ((game.player1, game.player1_choice), (game.player2, game.player2_choice)):
+            if choice != "waiting" or player in self.idle_players:
+                continue
+            key = (game_id, player)
+            with self._lock:
+                if key in self.thinking:
+                    continue
+                self.thinking.add(key)
+            self.scheduler.call_later(random.random() * self.think, self._move, game_id, player)
+
+    def _move(self, game_id, player):
+        # In the room's turn, as MakeMove runs on the game server
+        self.actors.tell(game_id, lambda: self._play(game_id, player))
+
+    def _play(self, game_id, player):
+        with self._lock:
+            self.thinking.discard((game_id, player))
+        game, version = self.cache.get(game_id)
+        if game is None or not game.can_make_move(player):
+            return
+        game.make_move(player, random.choice(CHOICES))
+        self.moves += 1
+        self.cache.put(game_id, game)
+
+class CountingSink:
+    """Stands in for SaveBracket: counts batches, optionally sleeps like a round trip"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.batches = 0
+        self.matches = 0
+        self.tournament_rows = 0
+
+    def __call__(self, tournaments, matches):
+        if self.latency:
+            time.sleep(self.latency)
+        self.batches += 1
+        self.matches += len(matches)
+        self.tournament_rows += len(tournaments)
+
+def main():
+    parser = argparse.ArgumentParser(description='Tournament engine benchmark')
+    parser.add_argument('--players', type=int, default=65536)
+    parser.add_argument('--format', choices=FORMATS, default=SINGLE_ELIMINATION)
+    parser.add_argument('--rounds', type=int, default=0, help='Swiss rounds, 0 for log2(players)')
+    parser.add_argument('--wins', type=int, default=2, help='Games to win a match')
+    parser.add_argument('--think-ms', type=float, default=50, help='Longest simulated think time')
+    parser.add_argument('--idle', type=float, default=0.0, help='Fraction of players who never move')
+    parser.add_argument('--move-timeout', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, default=4, help='Scheduler pool threads')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--persist-ms', type=float, default=2, help='Simulated SaveBracket latency')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    players = [f"p{i:05d}" for i in range(args.players)]
+    idle = set(random.sample(players, int(len(players) * args.idle)))
+
+    cache = RoomCache(idle_ttl=3600, max_rooms=args.players)
+    actors = RoomActors()
+    scheduler = Scheduler(args.workers)
+    sink = CountingSink(args.persist_ms / 1000.0)
+    engine = TournamentEngine(cache, actors, scheduler, sink, {
+        "max_players": args.players,
+        "move_timeout_s": args.move_timeout,
+        "result_display_s": 0,
+        "round_break_s": 0,
+        "batch_size": args.batch_size,
+        "flush_interval_ms": 200,
+    })
+    simulated = SimulatedPlayers(cache, actors, scheduler, args.think_ms / 1000.0, idle)
+
+    print(f"{args.format} x {args.players} players, first to {args.wins}, "
+          f"think <= {args.think_ms:g} ms, {len(idle)} idle, {args.workers} scheduler threads")
+    started = time.perf_counter()
+    tournament = engine.create("bench", args.format, players, wins_needed=args.wins, rounds=args.rounds)
+
+    peak_live = 0
+    peak_pending = 0
+    last_round = 0
+    round_started = started
+    while tournament.status != "finished":
+        time.sleep(0.05)
+        peak_live = max(peak_live, len(engine.matches))
+        peak_pending = max(peak_pending, len(scheduler.heap))
+        if tournament.round != last_round:
+            now = time.perf_counter()
+            if last_round:
+                print(f"  round {last_round:>2} done in {now - round_started:6.2f} s")
+            last_round, round_started = tournament.round, now
+    elapsed = time.perf_counter() - started
+    print(f"  round {last_round:>2} done in {time.perf_counter() - round_started:6.2f} s")
+    engine.writer.flush()
+
+    print(f"Champion {tournament.champion} after {tournament.round} rounds in {elapsed:.2f} s")
+    print(f"  matches    {engine.matches_finished:>8}  {engine.matches_finished / elapsed:10.0f} /s")
+    print(f"  games      {engine.games_played:>8}  {engine.games_played / elapsed:10.0f} /s")
+    print(f"  moves      {simulated.moves:>8}  {simulated.moves / elapsed:10.0f} /s")
+    print(f"  forfeits   {engine.forfeits:>8}")
+    print(f"  peak live matches {peak_live}, peak scheduled timers {peak_pending}")
+    print(f"  scheduler: {scheduler.scheduled} scheduled, {scheduler.fired} fired, "
+          f"{scheduler.cancelled} cancelled, {scheduler.failed} failed")
+    print(f"  room actors: {actors.commands} commands, {actors.queued} queued behind another")
+    print(f"  bracket writes: {sink.batches} batches, {sink.matches} matches, "
+          f"{sink.tournament_rows} tournament rows")
+    threads = threading.active_count()
+    print(f"  threads alive: {threads}")
+    scheduler.stop()
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,9 @@
+import time
+
+# Room state kept in the database, named as in the ORM Game message
+STORED_FIELDS = ("player1", "player2", "player1_choice", "player2_choice",
+                 "status", "player1_score", "player2_score", "round_seq")
+
 class RockPaperScissorsGame:
     """Game logic for Rock Paper Scissors"""
     
@@ -9,6 +15,19 @@ class RockPaperScissorsGame:
         self.status = "waiting"  # waiting, ready, player1_won, player2_won, draw
         self.player1_score = 0
         self.player2_score = 0
+        self.round_seq = 0  # Sequence number of the last resolved round
+        self.rounds = []  # Resolved rounds not yet written to history
+        self.stored = None  # STORED_FIELDS values the database has, None if not known
+    
+    def mark_stored(self):
+        """Remember the current state as what the database holds"""
+        self.stored = tuple(getattr(self, field) for field in STORED_FIELDS)
+    
+    def changed_fields(self):
+        """Fields that differ from the database, or None if the whole room has to be written"""
+        if self.stored is None:
+            return None
+        return [field for field, value in zip(STORED_FIELDS, self.stored) if getattr(self, field) != value]
     
     def set_players(self, player1, player2):
         self.player1 = player1
@@ -52,6 +71,19 @@ class RockPaperScissorsGame:
         else:
             self.status = "player2_won"
             self.player2_score += 1
+        
+        # Microsecond based, like room versions, so a room recreated under the same id
+        # never reuses the numbers of its earlier rounds
+        self.round_seq = max(self.round_seq + 1, time.time_ns() // 1000)
+        # Rebind instead of append: cached copies of the game share the list
+        self.rounds = self.rounds + [(
+            self.player1, self.player2, p1, p2, self.status, int(time.time() * 1000), self.round_seq
+        )]
+    
+    def take_rounds(self):
+        """Return resolved rounds not yet recorded and forget them"""
+        rounds, self.rounds = self.rounds, []
+        return rounds
     
     def reset_round(self):
         """Reset for next round, keeping scores"""
@@ -1,5 +1,4 @@
 import grpc
-from concurrent import futures
 import json
 import sys
 import os
@@ -7,7 +6,8 @@ import consul
 import socket
 import time
 import argparse
-from threading import Thread
+import signal
+from threading import Thread, Lock, Event
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -19,6 +19,42 @@ import protos.orm_pb2 as orm_pb2
 import protos.orm_pb2_grpc as orm_pb2_grpc
 
 from game_server.game_logic import RockPaperScissorsGame
+from game_server.orm_client import ResilientOrmClient
+from game_server.room_cache import RoomCache
+from game_server.room_actors import RoomActors
+from game_server.leaderboard import Leaderboard
+from game_server.spectators import SpectatorHub, spectate_handler
+from game_server.room_changes import RoomChangeListener
+from game_server.tournament import Scheduler, TournamentEngine, SINGLE_ELIMINATION
+from game_server.replication import RoomReplicator, ReplicationServicer
+from game_server.workers import (Supervisor, WorkerLink, ShardingInterceptor, worker_address, shard_of,
+                                 FORWARDED_HEADER)
+from common.admission import create_server, READ, WRITE
+from common.admin import AdminServer
+from common.profiling import Profiler, ProfilingInterceptor
+from common.channels import ChannelManager, server_options
+from common.logs import get_logger, setup_logging
+from common.leader_election import LeaderElection
+from common.shutdown import GracefulShutdown, drain
+
+log = get_logger("Game Server")
+leaderboard_log = get_logger("Leaderboard")
+
+# Shed order under overload: polling reads before state-changing calls
+METHOD_PRIORITIES = {
+    "GetState": READ,
+    "CheckSession": READ,
+    "CreateGame": WRITE,
+    "MakeMove": WRITE,
+    "ResetGame": WRITE,
+    "ExitGame": WRITE,
+    "GetLeaderboard": READ,
+    "GetPlayerRank": READ,
+    "Spectate": READ,
+    "CreateTournament": WRITE,
+    "GetTournament": READ,
+    "Replicate": WRITE,
+}
 
 def get_local_ip():
     """Get local IP address"""
@@ -37,46 +73,175 @@ class GameServiceImpl(game_pb2_grpc.GameServiceServicer):
         self.consul_client = consul_client
         self.orm_client = None
         self.current_orm_url = None
+        # Shared by the ORM client and the replicator
+        self.channels = ChannelManager(config.get('channels', {}))
+        self.channels.add_listener(self._on_channel_state)
+        self._orm_recheck = Event()
+        # Workers of a supervised server pass this on to the supervisor instead
+        self.on_orm_failing = self._orm_recheck.set
+        self.orm = ResilientOrmClient(lambda: self.orm_client, config.get('orm_client', {}))
+        self.is_leader = False
+        self.replica = None
+        self.max_read_staleness = config.get('replication', {}).get('max_read_staleness_ms', 1000) / 1000.0
+        
+        cache_config = config.get('room_cache', {})
+        self.cache = RoomCache(
+            idle_ttl=cache_config.get('idle_ttl_s', 600),
+            max_rooms=cache_config.get('max_rooms', 100000)
+        )
+        # Load-modify-save of a room runs in the room's turn, so concurrent moves never interleave
+        self.actors = RoomActors()
+        
+        leaderboard_config = config.get('leaderboard', {})
+        self.leaderboard = Leaderboard()
+        self.leaderboard_max_k = leaderboard_config.get('max_k', 100)
+        self.leaderboard_page = leaderboard_config.get('page_size', 5000)
+        self.leaderboard_refresh = leaderboard_config.get('refresh_interval_s', 30)
+        # A worker only sees its own shard's rounds, so it keeps reloading the totals
+        self.owns_leaderboard = True
+        self._leaderboard_load_lock = Lock()
+        
+        # Every cached change (local or replicated) goes out to the room's spectators
+        self.spectators = SpectatorHub(config.get('spectate', {}))
+        self.cache.add_listener(self._publish_to_spectators)
         
-        # Start monitoring ORM leader
-        Thread(target=self._monitor_orm_leader, daemon=True).start()
+        # Rooms changed in the database by anyone else are dropped and reloaded
+        self.room_changes = RoomChangeListener(
+            lambda: self.orm_client, self.cache, self.actors, config.get('change_feed', {}),
+            on_stale=self._on_room_stale
+        )
+        self.room_changes.start()
+        
+        # Match rooms are stored like any room, so a new leader can resume the tournament;
+        # one scheduler handles every timed step
+        tournament_config = config.get('tournament', {})
+        self.scheduler = Scheduler(tournament_config.get('scheduler_workers', 4))
+        self.tournaments = TournamentEngine(
+            self.cache, self.actors, self.scheduler, self._save_bracket, tournament_config,
+            load_room=lambda room_id: self._load_game(room_id)[0],
+            save_room=self._save_game,
+            load_brackets=self._load_brackets
+        )
+        
+        # Start monitoring ORM leader (a supervisor does this for its workers)
+        if consul_client is not None:
+            Thread(target=self._monitor_orm_leader, daemon=True).start()
+        Thread(target=self._evict_idle_rooms, daemon=True).start()
+        Thread(target=self._refresh_leaderboard, daemon=True).start()
+    
+    def _evict_idle_rooms(self):
+        """Periodically forget rooms nobody plays in"""
+        while True:
+            time.sleep(30)
+            self.cache.evict_idle()
+    
+    def _refresh_leaderboard(self):
+        """Load totals from the ORM; afterwards the leader keeps them up to date itself"""
+        while True:
+            if not self.leaderboard.loaded or not self.is_leader or not self.owns_leaderboard:
+                try:
+                    self.load_leaderboard()
+                except Exception as e:
+                    leaderboard_log.error("Load failed", error=e)
+            time.sleep(self.leaderboard_refresh if self.leaderboard.loaded else 2)
+    
+    def load_leaderboard(self):
+        """Replace the leaderboard with the totals stored by the ORM, page by page"""
+        # Serialized so a slow background refresh cannot overwrite the load done on election
+        with self._leaderboard_load_lock:
+            self.leaderboard.begin_load()
+            rows = []
+            read_at = {}
+            after = ""
+            try:
+                while True:
+                    response = self.orm.call(
+                        "LoadPlayerStats",
+                        orm_pb2.PlayerStatsRequest(after_player_id=after, limit=self.leaderboard_page)
+                    )
+                    rows.extend((s.player_id, s.wins, s.losses, s.draws) for s in response.stats)
+                    for s in response.stats:
+                        read_at[s.player_id] = (response.history_id, response.history_position)
+                    if len(response.stats) < self.leaderboard_page:
+                        break
+                    after = response.stats[-1].player_id
+            except Exception:
+                self.leaderboard.cancel_load()
+                raise
+            self.leaderboard.load(rows, read_at)
+        leaderboard_log.info("Loaded", players=len(rows))
+    
+    def take_leadership(self, warm):
+        """Start taking writes; warm keeps the rooms replicated from the previous leader"""
+        if not warm:
+            # Nobody has kept us up to date recently, start cold rather than serve stale rooms
+            self.cache.clear()
+        else:
+            log.info("Taking over", warm_rooms=len(self.cache.rooms))
+        try:
+            # Catch up on totals the old leader recorded; from here on we update them ourselves
+            self.load_leaderboard()
+        except Exception as e:
+            leaderboard_log.error("Load failed", error=e)
+        self.is_leader = True
+        self.tournaments.active = True
+        self.scheduler.call_soon(self.tournaments.resume)
+    
+    def give_up_leadership(self):
+        self.is_leader = False
+        self.tournaments.active = False
+        # The next leader resumes tournaments from what reached the ORM
+        self.scheduler.call_soon(self.tournaments.writer.flush)
+    
+    def _on_channel_state(self, url, state):
+        if url == self.current_orm_url and state == grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            # The ORM leader stopped answering; look for its successor right away
+            self.on_orm_failing()
+    
+    def set_orm_leader(self, leader_url):
+        """Send ORM calls to leader_url from now on, None while there is no leader"""
+        if leader_url is None:
+            self.orm_client = None
+            self.current_orm_url = None
+            return
+        if leader_url != self.current_orm_url:
+            previous = self.current_orm_url
+            self.current_orm_url = leader_url
+            log.info("ORM leader changed", orm_leader=leader_url, previous=previous)
+            
+            # Connect to new ORM leader, closing the old leader's channel
+            self.orm_client = self.channels.stub(leader_url, orm_pb2_grpc.OrmStub)
+            if previous:
+                self.channels.close(previous)
+            # A new leader deserves a fresh chance
+            self.orm.breaker.reset()
+            self.room_changes.reconnect()
     
     def _monitor_orm_leader(self):
         """Monitor ORM leader from Consul"""
         while True:
             try:
                 index, data = self.consul_client.kv.get("service/rps-orm/leader")
-                if data:
-                    leader_url = data['Value'].decode('utf-8')
-                    if leader_url != self.current_orm_url:
-                        self.current_orm_url = leader_url
-                        print(f"[Game Server] ORM Leader: {leader_url}")
-                        
-                        # Connect to new ORM leader
-                        channel = grpc.insecure_channel(leader_url.replace('http://', ''))
-                        self.orm_client = orm_pb2_grpc.OrmStub(channel)
-                else:
-                    self.orm_client = None
-                    self.current_orm_url = None
-                    
+                self.set_orm_leader(data['Value'].decode('utf-8') if data else None)
             except Exception as e:
-                print(f"[ORM Monitor Error] {e}")
+                log.error("ORM leader lookup failed", orm_leader=self.current_orm_url, error=e)
             
-            time.sleep(1)
-    
-    def _wait_for_orm(self):
-        """Wait for ORM client to be available"""
-        for i in range(10):
-            if self.orm_client:
-                return self.orm_client
-            time.sleep(0.5)
-        raise Exception("ORM service not available")
+            # Poll fast while the current leader's channel is down so the switch is quick
+            failing = self.current_orm_url is None or self.channels.is_failing(self.current_orm_url)
+            self._orm_recheck.wait(0.2 if failing else 1)
+            self._orm_recheck.clear()
     
     def CheckSession(self, request, context):
         """Check if player has an active session"""
         try:
-            orm = self._wait_for_orm()
-            response = orm.CheckSession(
+            if self.is_leader or self._replica_is_fresh():
+                game_id, version = self.cache.find_player(request.player_id)
+                if game_id is not None:
+                    return game_pb2.CheckResponse(exists=True, game_id=game_id, state_version=version)
+            
+            # Not a hot room, ask the database (a read, so standbys may do it too)
+            response = self.orm.call(
+                "CheckSession",
                 orm_pb2.CheckSessionRequest(player_id=request.player_id)
             )
             return game_pb2.CheckResponse(
@@ -84,11 +249,13 @@ class GameServiceImpl(game_pb2_grpc.GameServiceServicer):
                 game_id=response.game_id
             )
         except Exception as e:
-            print(f"[Game Server Error] CheckSession: {e}")
+            log.error("RPC failed", method="CheckSession", player_id=request.player_id, error=e)
             return game_pb2.CheckResponse(exists=False, game_id="")
     
     def CreateGame(self, request, context):
         """Create or join a game"""
+        if not self.is_leader:
+            return game_pb2.GameResponse(error="NOT_LEADER")
         try:
             # Parse player_id format: "Nickname|RoomID"
             parts = request.player_id.split('|')
@@ -97,150 +264,398 @@ class GameServiceImpl(game_pb2_grpc.GameServiceServicer):
             
             nickname = parts[0]
             room_id = parts[1]
+            return self.actors.ask(room_id, lambda: self._create_or_join(room_id, nickname, request.is_join_only))
             
-            # Try to load existing game
-            game = self._load_game(room_id)
+        except Exception as e:
+            log.error("RPC failed", method="CreateGame", player_id=request.player_id, error=e)
+            return game_pb2.GameResponse(error=str(e))
+    
+    def _create_or_join(self, room_id, nickname, is_join_only):
+        # Try to load existing game
+        game, version = self._load_game(room_id)
+        
+        if game is None:
+            # Game doesn't exist
+            if is_join_only:
+                return game_pb2.GameResponse(error="ROOM_NOT_FOUND")
             
-            if game is None:
-                # Game doesn't exist
-                if request.is_join_only:
-                    return game_pb2.GameResponse(error="ROOM_NOT_FOUND")
-                
-                # Create new game
-                game = RockPaperScissorsGame()
+            # Create new game
+            game = RockPaperScissorsGame()
+            game.player1 = nickname
+            game.status = "waiting"
+        else:
+            # Game exists - try to join
+            if game.player1 == nickname or game.player2 == nickname:
+                # Player already in game
+                pass
+            elif not game.player1:
                 game.player1 = nickname
-                game.status = "waiting"
+            elif not game.player2:
+                game.player2 = nickname
+                game.status = "ready"
             else:
-                # Game exists - try to join
-                if game.player1 == nickname or game.player2 == nickname:
-                    # Player already in game
-                    pass
-                elif not game.player1:
-                    game.player1 = nickname
-                elif not game.player2:
-                    game.player2 = nickname
-                    game.status = "ready"
-                else:
-                    return game_pb2.GameResponse(error="ROOM_FULL")
-            
-            # Save game state
-            self._save_game(room_id, game)
-            
-            return self._map_to_response(room_id, game)
-            
-        except Exception as e:
-            print(f"[Game Server Error] CreateGame: {e}")
-            return game_pb2.GameResponse(error=str(e))
+                return game_pb2.GameResponse(error="ROOM_FULL")
+        
+        # Save game state
+        version = self._save_game(room_id, game)
+        
+        return self._map_to_response(room_id, game, version)
     
     def MakeMove(self, request, context):
         """Player makes a move"""
+        if not self.is_leader:
+            return game_pb2.GameResponse(error="NOT_LEADER")
         try:
-            game = self._load_game(request.game_id)
-            if game is None:
-                return game_pb2.GameResponse(error="ROOM_ERR")
-            
-            # Validate and make move
-            if not game.can_make_move(request.player_id):
-                return game_pb2.GameResponse(error="INVALID_MOVE")
-            
-            if not game.make_move(request.player_id, request.choice):
-                return game_pb2.GameResponse(error="INVALID_CHOICE")
-            
-            # Save updated game state
-            self._save_game(request.game_id, game)
-            
-            return self._map_to_response(request.game_id, game)
-            
+            return self.actors.ask(request.game_id, lambda: self._make_move(request))
         except Exception as e:
-            print(f"[Game Server Error] MakeMove: {e}")
+            log.error("RPC failed", method="MakeMove", game_id=request.game_id, error=e)
             return game_pb2.GameResponse(error=str(e))
     
+    def _make_move(self, request):
+        game, version = self._load_game(request.game_id)
+        if game is None:
+            return game_pb2.GameResponse(error="ROOM_ERR")
+        
+        # Validate and make move
+        if not game.can_make_move(request.player_id):
+            return game_pb2.GameResponse(error="INVALID_MOVE")
+        
+        if not game.make_move(request.player_id, request.choice):
+            return game_pb2.GameResponse(error="INVALID_CHOICE")
+        
+        # Save updated game state
+        version = self._save_game(request.game_id, game)
+        
+        return self._map_to_response(request.game_id, game, version)
+    
     def GetState(self, request, context):
         """Get current game state"""
         try:
-            game = self._load_game(request.game_id)
+            if request.known_version and (self.is_leader or self._replica_is_fresh()):
+                # Unchanged room: no copy, no ORM Load, no full response
+                if self.cache.version(request.game_id) == request.known_version:
+                    return game_pb2.GameResponse(
+                        game_id=request.game_id,
+                        state_version=request.known_version,
+                        not_modified=True
+                    )
+            
+            if self.is_leader:
+                # A cached room is read as it is; loading a cold one waits for the room's turn
+                game, version = self.cache.get(request.game_id)
+                if game is None:
+                    game, version = self.actors.ask(request.game_id, lambda: self._load_game(request.game_id))
+            elif self._replica_is_fresh():
+                # Follower read: serve the shadow copy, fall back to the database for cold rooms
+                game, version = self.cache.get(request.game_id)
+                if game is None:
+                    game, version = self._load_from_orm(request.game_id), 0
+            else:
+                return game_pb2.GameResponse(error="STALE_REPLICA")
+            
             if game is None:
                 return game_pb2.GameResponse(error="NOT_FOUND")
+            if request.known_version and version == request.known_version:
+                # Reloaded, and the database still had what the caller saw
+                return game_pb2.GameResponse(
+                    game_id=request.game_id,
+                    state_version=version,
+                    not_modified=True
+                )
             
-            return self._map_to_response(request.game_id, game)
+            return self._map_to_response(request.game_id, game, version)
             
         except Exception as e:
-            print(f"[Game Server Error] GetState: {e}")
+            log.error("RPC failed", method="GetState", game_id=request.game_id, error=e)
             return game_pb2.GameResponse(error=str(e))
     
     def ResetGame(self, request, context):
         """Reset game for new round"""
+        if not self.is_leader:
+            return game_pb2.GameResponse(error="NOT_LEADER")
         try:
-            game = self._load_game(request.game_id)
-            if game is None:
-                return game_pb2.GameResponse(error="NOT_FOUND")
-            
-            game.reset_round()
-            self._save_game(request.game_id, game)
-            
-            return self._map_to_response(request.game_id, game)
-            
+            return self.actors.ask(request.game_id, lambda: self._reset_game(request.game_id))
         except Exception as e:
-            print(f"[Game Server Error] ResetGame: {e}")
+            log.error("RPC failed", method="ResetGame", game_id=request.game_id, error=e)
             return game_pb2.GameResponse(error=str(e))
     
+    def _reset_game(self, game_id):
+        game, version = self._load_game(game_id)
+        if game is None:
+            return game_pb2.GameResponse(error="NOT_FOUND")
+        
+        game.reset_round()
+        version = self._save_game(game_id, game)
+        
+        return self._map_to_response(game_id, game, version)
+    
     def ExitGame(self, request, context):
         """Player exits game"""
+        if not self.is_leader:
+            return game_pb2.ExitResponse(success=False)
         try:
-            orm = self._wait_for_orm()
-            response = orm.ExitGame(
-                orm_pb2.ExitGameRequest(
-                    game_id=request.game_id,
-                    player_id=request.player_id
-                )
-            )
-            return game_pb2.ExitResponse(success=response.success)
-            
+            return self.actors.ask(request.game_id, lambda: self._exit_game(request.game_id, request.player_id))
         except Exception as e:
-            print(f"[Game Server Error] ExitGame: {e}")
+            log.error("RPC failed", method="ExitGame", game_id=request.game_id, error=e)
             return game_pb2.ExitResponse(success=False)
     
-    def _load_game(self, game_id):
-        """Load game from database"""
-        try:
-            orm = self._wait_for_orm()
-            response = orm.Load(orm_pb2.LoadRequest(game_id=game_id))
-            if response.success:
-                game = RockPaperScissorsGame()
-                game.player1 = response.game.player1
-                game.player2 = response.game.player2
-                game.player1_choice = response.game.player1_choice
-                game.player2_choice = response.game.player2_choice
-                game.status = response.game.status
-                game.player1_score = response.game.player1_score
-                game.player2_score = response.game.player2_score
-                return game
-            return None
-        except Exception as e:
-            print(f"[Game Server Error] Load: {e}")
-            return None
+    def _exit_game(self, game_id, player_id):
+        response = self.orm.call(
+            "ExitGame",
+            orm_pb2.ExitGameRequest(
+                game_id=game_id,
+                player_id=player_id
+            )
+        )
+        # Let the ORM decide what is left of the room; reload it on next access
+        self.cache.remove(game_id)
+        return game_pb2.ExitResponse(success=response.success)
     
-    def _save_game(self, game_id, game):
-        """Save game to database"""
+    def GetLeaderboard(self, request, context):
+        """Top players, ranked by wins then fewest losses"""
+        k = max(0, min(request.k or 10, self.leaderboard_max_k))
+        entries = [
+            game_pb2.LeaderboardEntry(rank=rank, player_id=player_id, wins=wins, losses=losses, draws=draws)
+            for rank, player_id, wins, losses, draws in self.leaderboard.top(k, max(0, request.offset))
+        ]
+        return game_pb2.LeaderboardResponse(entries=entries, total_players=len(self.leaderboard.stats))
+    
+    def GetPlayerRank(self, request, context):
+        """Rank and totals of one player"""
+        total = len(self.leaderboard.stats)
+        found = self.leaderboard.rank(request.player_id)
+        if found is None:
+            return game_pb2.PlayerRankResponse(found=False, total_players=total)
+        rank, wins, losses, draws = found
+        return game_pb2.PlayerRankResponse(
+            found=True,
+            entry=game_pb2.LeaderboardEntry(
+                rank=rank, player_id=request.player_id, wins=wins, losses=losses, draws=draws
+            ),
+            total_players=total
+        )
+    
+    def Spectate(self, request, context):
+        """Stream the room's state; responses are serialized bytes shared by all spectators"""
+        subscriber = self.spectators.subscribe(request.game_id)
+        if subscriber is None:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many spectators")
+        # Subscribed first so no change between this read and the stream start is missed
+        initial = self.GetState(game_pb2.StateRequest(game_id=request.game_id), context)
+        if initial.error:
+            self.spectators.unsubscribe(subscriber)
+            return iter([initial.SerializeToString()])
+        return self.spectators.stream(subscriber, (initial.state_version, initial.SerializeToString()), context)
+    
+    def CreateTournament(self, request, context):
+        """Schedule a single-elimination or Swiss tournament"""
+        if not self.is_leader:
+            return game_pb2.TournamentResponse(error="NOT_LEADER")
         try:
-            orm = self._wait_for_orm()
-            orm_game = orm_pb2.Game(
-                player1=game.player1,
-                player2=game.player2,
-                player1_choice=game.player1_choice,
-                player2_choice=game.player2_choice,
-                status=game.status,
-                player1_score=game.player1_score,
-                player2_score=game.player2_score
+            tournament = self.tournaments.create(
+                request.tournament_id,
+                request.format or SINGLE_ELIMINATION,
+                list(request.players),
+                wins_needed=request.wins_needed,
+                rounds=request.rounds,
+                start_in=request.start_in_s
             )
-            
-            orm.Save(
-                orm_pb2.SaveRequest(game=orm_game, game_id=game_id)
+            return self._map_tournament(tournament, "")
+        except ValueError as e:
+            return game_pb2.TournamentResponse(tournament_id=request.tournament_id, error=str(e))
+        except Exception as e:
+            log.error("RPC failed", method="CreateTournament", tournament_id=request.tournament_id, error=e)
+            return game_pb2.TournamentResponse(error=str(e))
+    
+    def GetTournament(self, request, context):
+        """Bracket progress, and the player's current room if one is given"""
+        if not self.is_leader:
+            # Brackets live on the leader only; readers fall back to it on STALE_REPLICA
+            return game_pb2.TournamentResponse(error="STALE_REPLICA")
+        tournament = self.tournaments.get(request.tournament_id)
+        if tournament is None:
+            return game_pb2.TournamentResponse(tournament_id=request.tournament_id, error="NOT_FOUND")
+        return self._map_tournament(tournament, request.player_id)
+    
+    def _map_tournament(self, tournament, player_id):
+        with tournament.lock:
+            response = game_pb2.TournamentResponse(
+                tournament_id=tournament.tournament_id,
+                format=tournament.format,
+                status=tournament.status,
+                round=tournament.round,
+                rounds=tournament.total_rounds,
+                players=len(tournament.players),
+                live_matches=tournament.pending,
+                champion=tournament.champion
             )
+            if player_id:
+                if player_id not in tournament.seed:
+                    response.error = "NOT_IN_TOURNAMENT"
+                else:
+                    response.room_id = tournament.rooms.get(player_id, "")
+                    response.eliminated = player_id in tournament.eliminated
+                    response.points = tournament.points[player_id]
+        return response
+    
+    def _save_bracket(self, tournaments, matches):
+        """Persist a batch of bracket changes through the ORM"""
+        response = self.orm.call("SaveBracket", orm_pb2.BracketBatch(
+            tournaments=[
+                orm_pb2.TournamentRecord(
+                    tournament_id=tournament_id, format=format, players=players, rounds=rounds,
+                    round=round, status=status, champion=champion, updated_at_ms=updated_at_ms,
+                    wins_needed=wins_needed, seeds=seeds
+                )
+                for (tournament_id, format, players, rounds, round, status, champion,
+                     updated_at_ms, wins_needed, seeds) in tournaments
+            ],
+            matches=[
+                orm_pb2.MatchRecord(
+                    tournament_id=tournament_id, round=round, slot=slot, room_id=room_id,
+                    player1=player1, player2=player2, player1_wins=wins1, player2_wins=wins2,
+                    winner=winner, finished_at_ms=finished_at_ms
+                )
+                for (tournament_id, round, slot, room_id, player1, player2,
+                     wins1, wins2, winner, finished_at_ms) in matches
+            ]
+        ))
+        if not response.success:
+            raise Exception("SAVE_FAILED")
+    
+    def _load_brackets(self):
+        """Unfinished tournaments and their finished matches, in the bracket writer's tuple shapes"""
+        response = self.orm.call("LoadTournaments", orm_pb2.LoadTournamentsRequest())
+        tournaments = [
+            (t.tournament_id, t.format, t.players, t.rounds, t.round, t.status, t.champion,
+             t.updated_at_ms, t.wins_needed, list(t.seeds))
+            for t in response.tournaments
+        ]
+        matches = [
+            (m.tournament_id, m.round, m.slot, m.room_id, m.player1, m.player2,
+             m.player1_wins, m.player2_wins, m.winner, m.finished_at_ms)
+            for m in response.matches
+        ]
+        return tournaments, matches
+    
+    def _publish_to_spectators(self, game_id, game, version, deleted):
+        """Cache listener: serialize the new state once for all spectators of the room"""
+        if not self.spectators.watching(game_id):
+            return
+        if deleted:
+            # Dropped from the cache does not mean closed; find out what is left of the room,
+            # on the scheduler pool rather than the thread that changed the cache
+            self.scheduler.call_soon(self._republish_room, game_id)
+            return
+        payload = self._map_to_response(game_id, game, version).SerializeToString()
+        self.spectators.publish(game_id, version, payload)
+    
+    def _on_room_stale(self, game_id):
+        """A stale room is reloaded on next use; spectators should not wait for one"""
+        if self.spectators.watching(game_id):
+            self.scheduler.call_soon(self._republish_room, game_id)
+    
+    def _republish_room(self, game_id):
+        try:
+            if self.is_leader:
+                # Reloading puts the room back in the cache, which publishes it
+                game, version = self.actors.ask(game_id, lambda: self._load_game(game_id))
+            else:
+                game, version = self._load_from_orm(game_id), 0
+                if game is not None:
+                    self.spectators.publish(game_id, version,
+                                            self._map_to_response(game_id, game).SerializeToString())
+            if game is None:
+                closed = game_pb2.GameResponse(game_id=game_id, error="ROOM_CLOSED")
+                self.spectators.publish(game_id, 0, closed.SerializeToString(), last=True)
         except Exception as e:
-            print(f"[Game Server Error] Save: {e}")
+            log.error("Spectator reload failed", game_id=game_id, error=e)
+    
+    def _replica_is_fresh(self):
+        """True if the shadow copy is within the allowed staleness"""
+        return self.replica is not None and self.replica.shadow_age() <= self.max_read_staleness
     
-    def _map_to_response(self, game_id, game):
+    def _load_game(self, game_id):
+        """Load game and its version from memory or database, (None, 0) if it does not exist"""
+        game, version = self.cache.get(game_id)
+        if game is not None:
+            return game, version
+        
+        game = self._load_from_orm(game_id)
+        if game is None:
+            # A stale copy of a room deleted meanwhile must not linger
+            self.cache.remove(game_id)
+            return None, 0
+        return game, self.cache.keep(game_id, game)
+    
+    def _load_from_orm(self, game_id):
+        """Load game from database, None if it does not exist"""
+        # ORM failures propagate so a lost Load never looks like an empty room
+        response = self.orm.call("Load", orm_pb2.LoadRequest(game_id=game_id))
+        if response.success:
+            game = RockPaperScissorsGame()
+            game.player1 = response.game.player1
+            game.player2 = response.game.player2
+            game.player1_choice = response.game.player1_choice
+            game.player2_choice = response.game.player2_choice
+            game.status = response.game.status
+            game.player1_score = response.game.player1_score
+            game.player2_score = response.game.player2_score
+            game.round_seq = response.game.round_seq
+            game.mark_stored()
+            return game
+        return None
+    
+    def _save_game(self, game_id, game):
+        """Save the changed part of the game to the database and return its new version"""
+        changed = game.changed_fields()
+        resolved = game.take_rounds()
+        if changed == [] and not resolved:
+            # Nothing the database does not already have, nor the cache
+            return self.cache.keep(game_id, game)
+        
+        # The whole room goes along so the ORM can insert it if the row is gone
+        orm_game = orm_pb2.Game(
+            player1=game.player1,
+            player2=game.player2,
+            player1_choice=game.player1_choice,
+            player2_choice=game.player2_choice,
+            status=game.status,
+            player1_score=game.player1_score,
+            player2_score=game.player2_score,
+            round_seq=game.round_seq
+        )
+        
+        rounds = [
+            orm_pb2.RoundEvent(
+                player1=player1,
+                player2=player2,
+                player1_choice=player1_choice,
+                player2_choice=player2_choice,
+                outcome=outcome,
+                played_at_ms=played_at_ms,
+                round_seq=round_seq
+            )
+            for player1, player2, player1_choice, player2_choice, outcome, played_at_ms, round_seq in resolved
+        ]
+        
+        request = orm_pb2.SaveRequest(game=orm_game, game_id=game_id, rounds=rounds)
+        if changed:
+            request.update_mask.paths.extend(changed)
+        self.room_changes.expect(game_id, game)
+        response = self.orm.call("Save", request)
+        if not response.success:
+            raise Exception("SAVE_FAILED")
+        game.mark_stored()
+        # Where the ORM queued each round, so a leaderboard load in progress can tell
+        # whether the totals it reads have the round already
+        positions = response.round_positions
+        for i, (player1, player2, player1_choice, player2_choice, outcome, played_at_ms, round_seq) in enumerate(resolved):
+            stored = (response.history_id, positions[i]) if i < len(positions) else None
+            self.leaderboard.record_round(player1, player2, outcome, stored)
+        return self.cache.put(game_id, game)
+    
+    def _map_to_response(self, game_id, game, version=0):
         """Map game object to gRPC response"""
         # Hide opponent's choice if round is not finished
         p1_choice = game.player1_choice
@@ -263,60 +678,82 @@ class GameServiceImpl(game_pb2_grpc.GameServiceServicer):
             current_player_id="",  # Not used in RPS
             player1_score=game.player1_score,
             player2_score=game.player2_score,
-            round_result=game.get_round_result()
+            round_result=game.get_round_result(),
+            state_version=version
         )
 
-def leader_election_loop(consul_client, service_id, my_url, config):
-    """Consul leader election loop for game server"""
-    leader_key = "service/rps-game/leader"
-    
-    while True:
-        session_id = None
-        try:
-            # Create session
-            session_id = consul_client.session.create(
-                name=f"game-leader-{config['server']['port']}",
-                ttl=10,
-                lock_delay=0,
-                behavior='delete'
-            )
-            
-            # Try to acquire leadership
-            acquired = consul_client.kv.put(
-                leader_key,
-                my_url,
-                acquire=session_id
-            )
-            
-            if acquired:
-                print(f"[{time.strftime('%H:%M:%S')}] [Leader] I am the GAME SERVER LEADER")
-                
-                # Maintain leadership
-                while True:
-                    try:
-                        consul_client.session.renew(session_id)
-                        time.sleep(1)
-                        
-                        # Check if still leader
-                        index, data = consul_client.kv.get(leader_key)
-                        if not data or data.get('Session') != session_id:
-                            print(f"[{time.strftime('%H:%M:%S')}] [Leader] Leadership LOST")
-                            break
-                    except:
-                        break
-            else:
-                # Not leader, wait
-                time.sleep(1)
-                
-        except Exception as e:
-            print(f"[Leader Election Error] {e}")
-            time.sleep(2)
-        finally:
-            if session_id:
-                try:
-                    consul_client.session.destroy(session_id)
-                except:
-                    pass
+def create_game_server(config, servicer, profiler, interceptors=(), admitted_header=None):
+    """gRPC server with the game service behind admission control (and the profiler, if enabled)"""
+    # Handlers are profiled on demand through the admin endpoint, so only wrap them when it is on
+    profiling = [ProfilingInterceptor(profiler)] if config['server'].get('admin_port') else []
+    spectate_config = config.get('spectate', {})
+    server, limiter = create_server(
+        config['server'], config.get('admission', {}), METHOD_PRIORITIES,
+        stream_workers=spectate_config.get('max_spectators', 1000),
+        # SO_REUSEPORT lets every worker of a supervised server listen on the same port
+        options=server_options(config.get('channels', {})) + [('grpc.so_reuseport', 1)],
+        interceptors=list(interceptors) + profiling,
+        admitted_header=admitted_header
+    )
+    # Registered ahead of the generated handlers so Spectate sends pre-serialized bytes
+    server.add_generic_rpc_handlers((
+        spectate_handler("rps.GameService", servicer.Spectate, game_pb2.SpectateRequest.FromString),
+    ))
+    game_pb2_grpc.add_GameServiceServicer_to_server(servicer, server)
+    return server, limiter
+
+def add_game_metrics(admin, servicer, limiter):
+    admin.add_metrics(limiter.metrics)
+    admin.add_metrics(servicer.orm.metrics)
+    admin.add_metrics(servicer.cache.metrics)
+    admin.add_metrics(servicer.actors.metrics)
+    admin.add_metrics(servicer.leaderboard.metrics)
+    admin.add_metrics(servicer.spectators.metrics)
+    admin.add_metrics(servicer.room_changes.metrics)
+    admin.add_metrics(servicer.tournaments.metrics)
+    admin.add_metrics(servicer.channels.metrics)
+
+def create_election(consul_client, my_url, config, on_elected, on_lost):
+    return LeaderElection(
+        consul_client, "service/rps-game/leader", my_url, f"game-leader-{config['server']['port']}",
+        config.get('election', {}), on_elected=on_elected, on_lost=on_lost
+    )
+
+def register_in_consul(consul_client, host_ip, port, election):
+    """Register the game port in Consul and run for leader in the background"""
+    service_id = f"rps-game-{port}"
+    try:
+        consul_client.agent.service.register(
+            name="rps-game-service",
+            service_id=service_id,
+            address=host_ip,
+            port=port,
+            check=consul.Check.tcp(host_ip, port, interval="2s")
+        )
+        
+        log.info("Registered in Consul", service_id=service_id)
+        
+        # Start leader election in background
+        election.start()
+        
+    except Exception as e:
+        log.error("Consul registration failed", error=e)
+    return service_id
+
+def step_down(servicer, timeout):
+    """Refuse new writes and let the room commands already queued finish"""
+    servicer.give_up_leadership()
+    if not servicer.actors.wait_idle(timeout):
+        log.warning("Room commands still running at step-down", rooms=len(servicer.actors.actors))
+
+def add_drain_steps(shutdown, servicer, servers):
+    """Shutdown steps after leadership is gone: end streams, drain RPCs, flush buffered writes"""
+    shutdown.add_step("close spectator streams", servicer.spectators.close_all)
+    for server in servers:
+        shutdown.add_step("drain RPCs", lambda server=server: drain(server, shutdown.drain_timeout))
+    shutdown.add_step("flush brackets", servicer.tournaments.writer.flush)
+    shutdown.add_step("stop scheduler", servicer.scheduler.stop)
+    shutdown.add_step("close channels", servicer.channels.close_all)
 
 def serve():
     # Parse command line arguments
@@ -324,6 +761,8 @@ def serve():
     parser.add_argument('--port', type=int, help='Port to run the server on')
     parser.add_argument('--consul-host', type=str, help='Consul host address')
     parser.add_argument('--consul-port', type=int, help='Consul port')
+    parser.add_argument('--admin-port', type=int, help='Port for the admin HTTP endpoint (0 disables)')
+    parser.add_argument('--workers', type=int, help='Worker processes sharing the port (1 runs in-process)')
     args = parser.parse_args()
     
     # Load config
@@ -337,56 +776,184 @@ def serve():
         config['consul']['host'] = args.consul_host
     if args.consul_port:
         config['consul']['port'] = args.consul_port
+    if args.admin_port is not None:
+        config['server']['admin_port'] = args.admin_port
+    if args.workers:
+        config['server']['workers'] = args.workers
+    
+    logs = setup_logging("rps-game", config.get('logging', {}))
     
     # Get local IP and port
     host_ip = get_local_ip()
     port = config['server']['port']
     my_url = f"http://{host_ip}:{port}"
+    workers = config['server'].get('workers', 1)
+    if workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        log.warning("SO_REUSEPORT unavailable, running one process", workers=workers)
+        workers = 1
+    if workers > 1 and config.get('replication', {}).get('enabled', True):
+        # Workers neither replicate rooms to standbys nor serve follower reads
+        parser.error("--workers needs replication.enabled set to false in config.json")
     
     print(f"[Game Server] Configuration:")
     print(f"  - Port: {port}")
     print(f"  - Consul: {config['consul']['host']}:{config['consul']['port']}")
+    if workers > 1:
+        print(f"  - Workers: {workers}")
     
     # Connect to Consul
     consul_host = config['consul']['host']
     consul_port = config['consul']['port']
     consul_client = consul.Consul(host=consul_host, port=consul_port)
     
-    # Create gRPC server
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    game_pb2_grpc.add_GameServiceServicer_to_server(
-        GameServiceImpl(config, consul_client),
-        server
-    )
+    if workers > 1:
+        supervise(config, workers, consul_client, host_ip, my_url, logs)
+        return
+    
+    profiler = Profiler("rps-game", config.get('profiling', {}))
+    servicer = GameServiceImpl(config, consul_client)
+    server, limiter = create_game_server(config, servicer, profiler)
+    
+    # Standbys keep a shadow copy of the leader's rooms so a takeover starts warm
+    replication_config = config.get('replication', {})
+    replicator = RoomReplicator(servicer.cache, consul_client, my_url, replication_config, servicer.channels)
+    replication_servicer = ReplicationServicer(servicer.cache, lambda: servicer.is_leader)
+    servicer.replica = replication_servicer
+    game_pb2_grpc.add_GameReplicationServicer_to_server(replication_servicer, server)
+    if replication_config.get('enabled', True):
+        replicator.start()
+    max_shadow_age = replication_config.get('max_shadow_age_ms', 5000) / 1000.0
+    
+    def on_elected():
+        servicer.take_leadership(replication_servicer.shadow_age() <= max_shadow_age)
+        replicator.set_active(True)
+    
+    def on_lost():
+        servicer.give_up_leadership()
+        replicator.set_active(False)
+    election = create_election(consul_client, my_url, config, on_elected, on_lost)
     server.add_insecure_port(f'[::]:{port}')
     server.start()
     
-    print(f"[Game Server] Started on {my_url}")
+    log.info("Started", url=my_url)
+    
+    if config['server'].get('admin_port'):
+        admin = AdminServer(config['server']['admin_port'], "rps-game")
+        add_game_metrics(admin, servicer, limiter)
+        admin.add_metrics(replicator.metrics)
+        admin.add_metrics(election.metrics)
+        admin.add_metrics(logs.metrics)
+        profiler.register(admin)
+        admin.start()
     
     # Register service in Consul
-    try:
-        service_id = f"rps-game-{port}"
-        consul_client.agent.service.register(
-            name="rps-game-service",
-            service_id=service_id,
-            address=host_ip,
-            port=port,
-            check=consul.Check.tcp(host_ip, port, interval="2s")
-        )
-        
-        print(f"[Consul] Registered as {service_id}")
-        
-        # Start leader election in background
-        Thread(target=leader_election_loop, args=(consul_client, service_id, my_url, config), daemon=True).start()
-        
-    except Exception as e:
-        print(f"[Consul Error] {e}")
+    service_id = register_in_consul(consul_client, host_ip, port, election)
     
-    try:
-        server.wait_for_termination()
-    except KeyboardInterrupt:
-        print("[Game Server] Shutting down...")
-        server.stop(0)
+    # Stop writes and hand the rooms over before the lock goes, so the successor starts warm
+    # and no write of ours lands after it took over. Released after the handoff, the lock
+    # is held at most replication.handoff_timeout_ms longer; a standby that already took
+    # over would refuse the snapshot
+    shutdown = GracefulShutdown(config.get('shutdown', {}))
+    leader_at_shutdown = Event()
+    
+    def stop_writes():
+        if servicer.is_leader:
+            leader_at_shutdown.set()
+        step_down(servicer, shutdown.drain_timeout)
+    
+    def hand_off():
+        if leader_at_shutdown.is_set():
+            replicator.handoff()
+    
+    shutdown.add_step("step down", stop_writes)
+    if replication_config.get('enabled', True):
+        shutdown.add_step("hand off rooms", hand_off)
+    shutdown.add_step("release leader lock", election.stop)
+    shutdown.add_step("deregister", lambda: consul_client.agent.service.deregister(service_id))
+    add_drain_steps(shutdown, servicer, [server])
+    shutdown.install()
+    shutdown.wait()
+
+def supervise(config, workers, consul_client, host_ip, my_url, logs):
+    """Run the workers; only this process talks to Consul, it relays leadership to them"""
+    port = config['server']['port']
+    supervisor = Supervisor(config, workers, serve_worker)
+    supervisor.start()
+    Thread(target=supervisor.watch_orm_leader, args=(consul_client,), daemon=True).start()
+    election = create_election(consul_client, my_url, config,
+                               lambda: supervisor.set_leader(True), lambda: supervisor.set_leader(False))
+    
+    admin_port = config['server'].get('admin_port')
+    if admin_port:
+        admin = AdminServer(admin_port, "rps-game")
+        admin.add_metrics(supervisor.metrics)
+        admin.add_metrics(election.metrics)
+        admin.add_metrics(logs.metrics)
+        admin.start()
+    
+    service_id = register_in_consul(consul_client, host_ip, port, election)
+    
+    shutdown = GracefulShutdown(config.get('shutdown', {}))
+    shutdown.add_step("step down", lambda: supervisor.step_down(shutdown.drain_timeout))
+    shutdown.add_step("release leader lock", election.stop)
+    shutdown.add_step("deregister", lambda: consul_client.agent.service.deregister(service_id))
+    # Each worker drains its own RPCs and flushes its own buffers
+    shutdown.add_step("stop workers", lambda: supervisor.stop(shutdown.drain_timeout + 5))
+    shutdown.install()
+    shutdown.wait()
+
+def serve_worker(config, shard, count, conn):
+    """One worker process: serves its shard of rooms on the shared port, forwards the rest"""
+    name = f"rps-game-{shard}"
+    # Ctrl-C reaches the whole process group; the supervisor decides when workers stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    logs = setup_logging(name, config.get('logging', {}))
+    link = WorkerLink(conn)
+    
+    servicer = GameServiceImpl(config, None)
+    servicer.owns_leaderboard = False
+    servicer.tournaments.owns = lambda tournament_id: shard_of(tournament_id, count) == shard
+    servicer.on_orm_failing = lambda: link.send("orm_failing")
+    
+    # Public port: requests for other shards go to their owner over its local socket
+    profiler = Profiler(name, config.get('profiling', {}))
+    peers = [worker_address(config['server'], shard_index) for shard_index in range(count)]
+    sharding = ShardingInterceptor(shard, peers, servicer.channels)
+    server, limiter = create_game_server(config, servicer, profiler, [sharding])
+    server.add_insecure_port(f"[::]:{config['server']['port']}")
+    # Local socket: requests forwarded by the other workers, always for this shard. They
+    # passed admission on the worker that took them, so only unmarked calls are checked here
+    internal, internal_limiter = create_game_server(config, servicer, profiler,
+                                                    admitted_header=FORWARDED_HEADER)
+    internal.add_insecure_port(peers[shard])
+    server.start()
+    internal.start()
+    log.info("Worker started", shard=shard, workers=count, pid=os.getpid())
+    
+    admin_port = config['server'].get('admin_port')
+    if admin_port:
+        # The supervisor has admin_port; worker N is on admin_port + 1 + N
+        admin = AdminServer(admin_port + 1 + shard, name)
+        add_game_metrics(admin, servicer, limiter)
+        admin.add_metrics(sharding.metrics)
+        admin.add_metrics(logs.metrics)
+        profiler.register(admin)
+        admin.start()
+    
+    shutdown = GracefulShutdown(config.get('shutdown', {}))
+    
+    def on_leader(is_leader):
+        # Nothing replicates into a worker, so it always takes over cold
+        if is_leader:
+            servicer.take_leadership(False)
+        else:
+            step_down(servicer, shutdown.drain_timeout)
+            link.send("stepped_down", shard)
+    
+    link.serve({"leader": on_leader, "orm": servicer.set_orm_leader})
+    shutdown.signal_name = "supervisor"
+    add_drain_steps(shutdown, servicer, [server, internal])
+    shutdown.run()
 
 if __name__ == '__main__':
     serve()
@@ -0,0 +1,208 @@
+import random
+import threading
+
+MAX_LEVEL = 32
+
+class _Node:
+    __slots__ = ("key", "next", "width")
+
+    def __init__(self, key, level):
+        self.key = key
+        self.next = [None] * level
+        self.width = [1] * level  # Bottom-level steps to next[level]
+
+class IndexableSkipList:
+    """Sorted unique keys with O(log n) insert, remove, rank and access by position"""
+
+    def __init__(self):
+        self.head = _Node(None, MAX_LEVEL)
+        self.level = 1  # Levels in use; the head's widths above it are not maintained
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def _chain(self, key):
+        """Last node before key on every level and its position (head is 0)"""
+        chain = [self.head] * self.level
+        steps = [0] * self.level
+        node = self.head
+        position = 0
+        for level in reversed(range(self.level)):
+            nxt = node.next[level]
+            while nxt is not None and nxt.key < key:
+                position += node.width[level]
+                node = nxt
+                nxt = node.next[level]
+            chain[level] = node
+            steps[level] = position
+        return chain, steps
+
+    def insert(self, key):
+        chain, steps = self._chain(key)
+        position = steps[0]
+        level = 1
+        while level < MAX_LEVEL and random.random() < 0.5:
+            level += 1
+        if level > self.level:
+            for i in range(self.level, level):
+                self.head.width[i] = self.size + 1
+                chain.append(self.head)
+                steps.append(0)
+            self.level = level
+        node = _Node(key, level)
+        for i in range(level):
+            prev = chain[i]
+            node.next[i] = prev.next[i]
+            prev.next[i] = node
+            node.width[i] = prev.width[i] - (position - steps[i])
+            prev.width[i] = position + 1 - steps[i]
+        for i in range(level, self.level):
+            chain[i].width[i] += 1
+        self.size += 1
+
+    def remove(self, key):
+        chain, steps = self._chain(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        for i in range(len(node.next)):
+            prev = chain[i]
+            prev.width[i] += node.width[i] - 1
+            prev.next[i] = node.next[i]
+        for i in range(len(node.next), self.level):
+            chain[i].width[i] -= 1
+        self.size -= 1
+
+    def rank(self, key):
+        """0-based position of key"""
+        chain, steps = self._chain(key)
+        node = chain[0].next[0]
+        if node is None or node.key != key:
+            raise KeyError(key)
+        return steps[0]
+
+    def slice(self, offset, count):
+        """Up to count keys starting at 0-based position offset"""
+        if offset >= self.size or count <= 0:
+            return []
+        remaining = offset + 1
+        node = self.head
+        for level in reversed(range(self.level)):
+            while node.next[level] is not None and node.width[level] <= remaining:
+                remaining -= node.width[level]
+                node = node.next[level]
+        keys = []
+        while node is not None and len(keys) < count:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+class Leaderboard:
+    """Per-player win/loss/draw totals, kept ranked as rounds resolve"""
+
+    def __init__(self):
+        self.stats = {}  # player -> (wins, losses, draws)
+        self.ranking = IndexableSkipList()
+        self.loaded = False
+        self.during_load = None  # Rounds recorded since begin_load(), replayed onto the loaded totals
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(player_id, wins, losses, draws):
+        # Most wins first, then fewest losses, then by name for a stable order
+        return (-wins, losses, player_id)
+
+    def begin_load(self):
+        """Start remembering rounds, before the totals for load() are read"""
+        with self._lock:
+            self.during_load = []
+
+    def cancel_load(self):
+        with self._lock:
+            self.during_load = None
+
+    def load(self, rows, read_at=None):
+        """Replace everything with (player_id, wins, losses, draws) rows
+
+        Rounds recorded since begin_load() are replayed onto the new totals, except for
+        players whose row already has them. read_at maps a player to the (history_id,
+        position) of the ORM history their row was read at, and a round counts as in the
+        row when the Save that stored it reported the same history and a position no later.
+        A round from another history (the ORM changed during the load) is replayed. Swap and
+        replay share one lock hold, so a round recorded meanwhile lands exactly once.
+        """
+        read_at = read_at or {}
+        ranking = IndexableSkipList()
+        stats = {}
+        for player_id, wins, losses, draws in rows:
+            stats[player_id] = (wins, losses, draws)
+            ranking.insert(self._key(player_id, wins, losses, draws))
+        with self._lock:
+            self.stats = stats
+            self.ranking = ranking
+            for player1, player2, outcome, stored in self.during_load or ():
+                self._record(
+                    self._unless_read(player1, stored, read_at),
+                    self._unless_read(player2, stored, read_at),
+                    outcome
+                )
+            self.during_load = None
+            self.loaded = True
+
+    @staticmethod
+    def _unless_read(player_id, stored, read_at):
+        # None skips the player in _add(): their loaded row already counts the round
+        read = read_at.get(player_id)
+        if stored is None or read is None:
+            return player_id
+        history_id, position = stored
+        if history_id == read[0] and position <= read[1]:
+            return None
+        return player_id
+
+    def record_round(self, player1, player2, outcome, stored=None):
+        """stored is the (history_id, position) the ORM reported for the round's Save"""
+        with self._lock:
+            if self.during_load is not None:
+                self.during_load.append((player1, player2, outcome, stored))
+            self._record(player1, player2, outcome)
+
+    def _record(self, player1, player2, outcome):
+        if outcome == "draw":
+            self._add(player1, 0, 0, 1)
+            self._add(player2, 0, 0, 1)
+        elif outcome == "player1_won":
+            self._add(player1, 1, 0, 0)
+            self._add(player2, 0, 1, 0)
+        elif outcome == "player2_won":
+            self._add(player1, 0, 1, 0)
+            self._add(player2, 1, 0, 0)
+
+    def _add(self, player_id, wins, losses, draws):
+        if not player_id:
+            return
+        old = self.stats.get(player_id)
+        if old is not None:
+            self.ranking.remove(self._key(player_id, *old))
+            wins, losses, draws = old[0] + wins, old[1] + losses, old[2] + draws
+        self.stats[player_id] = (wins, losses, draws)
+        self.ranking.insert(self._key(player_id, wins, losses, draws))
+
+    def top(self, k, offset=0):
+        """List of (rank, player_id, wins, losses, draws), ranks are 1-based"""
+        with self._lock:
+            keys = self.ranking.slice(offset, k)
+            return [(offset + i + 1, key[2]) + self.stats[key[2]] for i, key in enumerate(keys)]
+
+    def rank(self, player_id):
+        """(rank, wins, losses, draws) of the player, or None"""
+        with self._lock:
+            stats = self.stats.get(player_id)
+            if stats is None:
+                return None
+            return (self.ranking.rank(self._key(player_id, *stats)) + 1,) + stats
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [("rps_leaderboard_players", {}, len(self.stats))]
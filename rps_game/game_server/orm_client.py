@@ -0,0 +1,239 @@
+import grpc
+import random
+import threading
+import time
+
+# Errors worth another attempt; anything else is the ORM telling us "no"
+RETRYABLE_CODES = (
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+)
+# Retryable, but the ORM did answer: shedding load is not a sign it is down
+ANSWERED_CODES = (grpc.StatusCode.RESOURCE_EXHAUSTED,)
+
+DEFAULT_METHODS = {
+    "CheckSession": {"timeout_ms": 500, "retries": 2, "hedge_after_ms": 0},
+    "Load": {"timeout_ms": 500, "retries": 2, "hedge_after_ms": 50},
+    "Save": {"timeout_ms": 1000, "retries": 1, "hedge_after_ms": 0},
+    "ExitGame": {"timeout_ms": 1000, "retries": 0, "hedge_after_ms": 0},
+    "LoadPlayerStats": {"timeout_ms": 2000, "retries": 2, "hedge_after_ms": 0},
+    "SaveBracket": {"timeout_ms": 2000, "retries": 2, "hedge_after_ms": 0},
+    "LoadTournaments": {"timeout_ms": 5000, "retries": 2, "hedge_after_ms": 0},
+}
+
+class OrmUnavailable(Exception):
+    """Raised when the ORM cannot serve a call within its policy"""
+
+class CircuitBreaker:
+    """Closed -> open after consecutive failures, half-open probe after a cool-down"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=2.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                # Let exactly one probe through to test the ORM
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def reset(self):
+        self.record_success()
+
+class RetryBudget:
+    """Token bucket that caps retries and hedges to a fraction of real traffic"""
+
+    def __init__(self, ratio=0.2, min_per_second=5.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max(10.0, min_per_second * 10)
+        self.tokens = self.max_tokens
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record_request(self):
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.max_tokens, self.tokens + (now - self._last_refill) * self.min_per_second)
+        self._last_refill = now
+
+class ResilientOrmClient:
+    """Calls the ORM leader with per-method timeouts, retries, hedging and a circuit breaker"""
+
+    def __init__(self, get_stub, config=None):
+        config = config or {}
+        self.get_stub = get_stub
+        self.methods = {name: dict(policy) for name, policy in DEFAULT_METHODS.items()}
+        for name, policy in config.get('methods', {}).items():
+            self.methods.setdefault(name, {}).update(policy)
+
+        breaker = config.get('breaker', {})
+        self.breaker = CircuitBreaker(
+            failure_threshold=breaker.get('failure_threshold', 5),
+            reset_timeout=breaker.get('reset_timeout_ms', 2000) / 1000.0
+        )
+        budget = config.get('retry_budget', {})
+        self.budget = RetryBudget(
+            ratio=budget.get('ratio', 0.2),
+            min_per_second=budget.get('min_per_second', 5.0)
+        )
+        self.backoff_base = config.get('backoff_base_ms', 25) / 1000.0
+        self.backoff_max = config.get('backoff_max_ms', 250) / 1000.0
+        self.leader_wait = config.get('leader_wait_ms', 2000) / 1000.0
+
+        self.counters = {}
+        self._counter_lock = threading.Lock()
+
+    def call(self, method, request):
+        """Run one logical ORM call according to the method's policy"""
+        policy = self.methods.get(method, {})
+        timeout = policy.get('timeout_ms', 1000) / 1000.0
+        retries = policy.get('retries', 0)
+        hedge_after = policy.get('hedge_after_ms', 0) / 1000.0
+
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self._count(method, "rejected_open")
+                raise OrmUnavailable(f"ORM circuit open, {method} not sent")
+
+            try:
+                stub = self._wait_for_stub()
+            except OrmUnavailable:
+                self.breaker.record_failure()
+                self._count(method, "no_leader")
+                raise
+            try:
+                if hedge_after > 0:
+                    response = self._hedged_call(stub, method, request, timeout, hedge_after)
+                else:
+                    response = getattr(stub, method)(request, timeout=timeout)
+                self.breaker.record_success()
+                self._count(method, "ok")
+                return response
+            except grpc.RpcError as e:
+                code = e.code()
+                if code not in RETRYABLE_CODES:
+                    # The ORM answered; it is healthy even if the call failed
+                    self.breaker.record_success()
+                    self._count(method, "error")
+                    raise OrmUnavailable(f"ORM {method} failed: {code.name}")
+
+                if code in ANSWERED_CODES:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                if attempt >= retries or not self.budget.try_spend():
+                    self._count(method, "failed")
+                    raise OrmUnavailable(f"ORM {method} failed: {code.name}")
+
+            attempt += 1
+            self._count(method, "retry")
+            # Full jitter keeps retries from synchronising across worker threads
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+
+    def _hedged_call(self, stub, method, request, timeout, hedge_after):
+        """Send a second copy of an idempotent call if the first one is slow"""
+        done = threading.Event()
+        futures_ = [getattr(stub, method).future(request, timeout=timeout)]
+        futures_[0].add_done_callback(lambda f: done.set())
+
+        if not done.wait(hedge_after) and self.budget.try_spend():
+            self._count(method, "hedge")
+            hedge = getattr(stub, method).future(request, timeout=timeout)
+            hedge.add_done_callback(lambda f: done.set())
+            futures_.append(hedge)
+
+        last_error = None
+        deadline = time.monotonic() + timeout
+        while True:
+            pending = []
+            for future in futures_:
+                if not future.done():
+                    pending.append(future)
+                    continue
+                try:
+                    response = future.result()
+                except grpc.RpcError as e:
+                    last_error = e
+                    continue
+                for other in futures_:
+                    if other is not future:
+                        other.cancel()
+                return response
+
+            if not pending:
+                raise last_error
+
+            done.clear()
+            # A future may have finished between the scan and clear()
+            if not any(f.done() for f in pending):
+                done.wait(max(0.0, deadline - time.monotonic()) + 0.05)
+
+    def _wait_for_stub(self):
+        deadline = time.monotonic() + self.leader_wait
+        while True:
+            stub = self.get_stub()
+            if stub:
+                return stub
+            if time.monotonic() >= deadline:
+                raise OrmUnavailable("ORM service not available")
+            time.sleep(0.05)
+
+    def _count(self, method, outcome):
+        with self._counter_lock:
+            key = (method, outcome)
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        state_values = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+        lines = [("rps_orm_breaker_state", {}, state_values[self.breaker.state])]
+        with self._counter_lock:
+            for (method, outcome), count in sorted(self.counters.items()):
+                lines.append(("rps_orm_calls_total", {"method": method, "outcome": outcome}, count))
+        return lines
@@ -0,0 +1,242 @@
+import grpc
+import threading
+import time
+from threading import Thread
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+
+from game_server.game_logic import RockPaperScissorsGame
+from common.logs import get_logger
+
+log = get_logger("Replication")
+
+SERVICE_NAME = "rps-game-service"
+
+def to_snapshot(game_id, game, version, deleted=False):
+    """Room state -> RoomSnapshot message"""
+    if deleted or game is None:
+        return game_pb2.RoomSnapshot(game_id=game_id, version=version, deleted=True)
+    return game_pb2.RoomSnapshot(
+        game_id=game_id,
+        player1=game.player1,
+        player2=game.player2,
+        player1_choice=game.player1_choice,
+        player2_choice=game.player2_choice,
+        status=game.status,
+        player1_score=game.player1_score,
+        player2_score=game.player2_score,
+        round_seq=game.round_seq,
+        version=version
+    )
+
+def from_snapshot(snapshot):
+    """RoomSnapshot message -> room state"""
+    game = RockPaperScissorsGame()
+    game.player1 = snapshot.player1
+    game.player2 = snapshot.player2
+    game.player1_choice = snapshot.player1_choice
+    game.player2_choice = snapshot.player2_choice
+    game.status = snapshot.status
+    game.player1_score = snapshot.player1_score
+    game.player2_score = snapshot.player2_score
+    game.round_seq = snapshot.round_seq
+    return game
+
+class RoomReplicator:
+    """Leader side: streams room changes to every healthy standby"""
+
+    def __init__(self, cache, consul_client, my_url, config, channels):
+        self.cache = cache
+        self.channels = channels
+        self.consul_client = consul_client
+        self.my_url = my_url
+        self.interval = config.get('interval_ms', 50) / 1000.0
+        self.heartbeat = config.get('heartbeat_ms', 500) / 1000.0
+        self.discovery_interval = config.get('discovery_interval_ms', 2000) / 1000.0
+        self.timeout = config.get('timeout_ms', 1000) / 1000.0
+        # For the whole handoff, not per standby: the leader lock is held until it is over
+        self.handoff_timeout = config.get('handoff_timeout_ms', 1000) / 1000.0
+
+        self.active = False
+        self.pending = {}
+        self.standbys = {}  # url -> [stub, synced]
+        self.sent_batches = 0
+        self.failed_batches = 0
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._last_discovery = 0.0
+
+        cache.add_listener(self._on_change)
+        channels.add_listener(self._on_channel_state)
+
+    def start(self):
+        Thread(target=self._run, daemon=True).start()
+
+    def set_active(self, active):
+        """Only the leader replicates; standbys just receive"""
+        self.active = active
+        if active:
+            for standby in self.standbys.values():
+                standby[1] = False
+            self._wakeup.set()
+
+    def _on_change(self, game_id, game, version, deleted):
+        if not self.active:
+            return
+        with self._pending_lock:
+            # Only the newest state of a room matters for a shadow copy
+            self.pending[game_id] = to_snapshot(game_id, game, version, deleted)
+        self._wakeup.set()
+
+    def _on_channel_state(self, url, state):
+        standby = self.standbys.get(url)
+        if standby is not None and state == grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            # Whatever it missed while unreachable comes back as a full snapshot
+            standby[1] = False
+
+    def _run(self):
+        last_sent = 0.0
+        while True:
+            self._wakeup.wait(self.heartbeat)
+            self._wakeup.clear()
+            if not self.active:
+                continue
+            try:
+                now = time.monotonic()
+                if now - self._last_discovery >= self.discovery_interval:
+                    self._discover_standbys()
+                    self._last_discovery = now
+
+                with self._pending_lock:
+                    batch = list(self.pending.values())
+                    self.pending = {}
+
+                if batch or now - last_sent >= self.heartbeat:
+                    self._send(batch)
+                    last_sent = now
+            except Exception as e:
+                log.error("Replication failed", error=e)
+            time.sleep(self.interval)
+
+    def _discover_standbys(self):
+        index, nodes = self.consul_client.health.service(SERVICE_NAME, passing=True)
+        urls = set()
+        for node in nodes:
+            service = node['Service']
+            url = f"http://{service['Address']}:{service['Port']}"
+            if url != self.my_url:
+                urls.add(url)
+
+        for url in list(self.standbys):
+            if url not in urls:
+                del self.standbys[url]
+                self.channels.close(url)
+        for url in urls:
+            if url not in self.standbys:
+                self.standbys[url] = [self.channels.stub(url, game_pb2_grpc.GameReplicationStub), False]
+
+    def _send(self, batch):
+        for url, standby in list(self.standbys.items()):
+            stub, synced = standby
+            try:
+                if not synced:
+                    # New or recovered standby: bring it up to date with a full snapshot first
+                    self._stream_snapshot(stub, self.timeout * 5)
+                    standby[1] = True
+                else:
+                    stub.Replicate(
+                        game_pb2.RoomBatch(leader_url=self.my_url, rooms=batch),
+                        timeout=self.timeout
+                    )
+                self.sent_batches += 1
+            except grpc.RpcError as e:
+                self.failed_batches += 1
+                standby[1] = False
+                log.warning("Standby unreachable", standby=url, code=e.code().name)
+
+    def _stream_snapshot(self, stub, timeout):
+        rooms = self.cache.snapshot()
+        metadata = (('leader-url', self.my_url),)
+        ack = stub.Handoff(
+            (to_snapshot(game_id, game, version) for game_id, game, version in rooms),
+            timeout=timeout,
+            metadata=metadata
+        )
+        return ack
+
+    def handoff(self):
+        """Stepping down: push every active room to all standbys so the successor starts warm
+
+        Takes at most handoff_timeout in all; standbys not reached by then start cold.
+        """
+        deadline = time.monotonic() + self.handoff_timeout
+        if not self.standbys:
+            try:
+                self._discover_standbys()
+            except Exception as e:
+                log.error("Handoff discovery failed", error=e)
+                return
+        self.active = False
+        for url, standby in list(self.standbys.items()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                log.error("Handoff out of time", standby=url)
+                continue
+            try:
+                ack = self._stream_snapshot(standby[0], remaining)
+                log.info("Handed off", standby=url, rooms=ack.applied)
+            except grpc.RpcError as e:
+                log.error("Handoff failed", standby=url, code=e.code().name)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_replication_standbys", {}, len(self.standbys)),
+            ("rps_replication_batches_total", {"outcome": "ok"}, self.sent_batches),
+            ("rps_replication_batches_total", {"outcome": "failed"}, self.failed_batches),
+        ]
+
+class ReplicationServicer(game_pb2_grpc.GameReplicationServicer):
+    """Standby side: keeps a shadow copy of the leader's rooms"""
+
+    def __init__(self, cache, is_leader):
+        self.cache = cache
+        self.is_leader = is_leader
+        self.leader_url = None
+        self.last_replicated_at = 0.0
+
+    def Replicate(self, request, context):
+        if self.is_leader():
+            return game_pb2.ReplicationAck(accepted=False)
+        applied = self._apply(request.rooms)
+        self.leader_url = request.leader_url
+        self.last_replicated_at = time.monotonic()
+        return game_pb2.ReplicationAck(accepted=True, applied=applied)
+
+    def Handoff(self, request_iterator, context):
+        # Accepted even by a fresh leader: the version check keeps its own newer writes
+        received = set()
+        applied = self._apply(request_iterator, received)
+        if not self.is_leader():
+            # A full snapshot replaces the shadow copy, dropping rooms the leader no longer has
+            self.cache.retain(received)
+        self.leader_url = dict(context.invocation_metadata()).get('leader-url', self.leader_url)
+        self.last_replicated_at = time.monotonic()
+        return game_pb2.ReplicationAck(accepted=True, applied=applied)
+
+    def _apply(self, snapshots, received=None):
+        applied = 0
+        for snapshot in snapshots:
+            if received is not None:
+                received.add(snapshot.game_id)
+            game = None if snapshot.deleted else from_snapshot(snapshot)
+            if self.cache.apply(snapshot.game_id, game, snapshot.version, snapshot.deleted):
+                applied += 1
+        return applied
+
+    def shadow_age(self):
+        """Seconds since the last update from the leader"""
+        if not self.last_replicated_at:
+            return float('inf')
+        return time.monotonic() - self.last_replicated_at
@@ -0,0 +1,125 @@
+import threading
+from collections import deque
+
+from common.logs import get_logger
+
+log = get_logger("Room Actors")
+
+# Commands one thread runs for a room before handing it to the next waiting caller
+MAX_BATCH = 32
+
+class Envelope:
+    """One command in a room's mailbox"""
+
+    __slots__ = ("command", "result", "error", "done", "handed_over")
+
+    def __init__(self, command, done):
+        self.command = command
+        self.result = None
+        self.error = None
+        self.done = done  # Event for ask(), None for tell()
+        self.handed_over = False
+
+class RoomActor:
+    """A room's mailbox; while running is set, exactly one thread executes its commands"""
+
+    __slots__ = ("room_id", "mailbox", "running")
+
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.mailbox = deque()
+        self.running = False
+
+class RoomActors:
+    """Runs commands one at a time, in arrival order, per room; different rooms run in parallel
+
+    There is no thread per actor: a caller that finds its room idle runs the command itself,
+    then whatever queued up behind it. Callers that find the room busy wait for their turn.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self.actors = {}  # room_id -> RoomActor, only while it has work
+        self.commands = 0
+        self.queued = 0  # Commands that had to wait behind another one for the same room
+        self.handoffs = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)  # Notified when the last actor goes away
+
+    def ask(self, room_id, command):
+        """Run command() in the room's turn and return its result (or raise its error)
+
+        A command must not ask() for its own room: it would wait for itself.
+        """
+        envelope = Envelope(command, threading.Event())
+        if self._post(room_id, envelope):
+            envelope.done.wait()
+            if envelope.handed_over:
+                self._drain(self.actors[room_id], envelope)
+        if envelope.error is not None:
+            raise envelope.error
+        return envelope.result
+
+    def tell(self, room_id, command):
+        """Queue command() for the room without waiting; errors are logged"""
+        self._post(room_id, Envelope(command, None))
+
+    def wait_idle(self, timeout):
+        """Wait until no room has a command running or queued; False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.actors, timeout)
+
+    def _post(self, room_id, envelope):
+        """Run the envelope now if the room is idle; True if it was queued behind others"""
+        with self._lock:
+            actor = self.actors.get(room_id)
+            if actor is None:
+                actor = self.actors[room_id] = RoomActor(room_id)
+            if actor.running:
+                actor.mailbox.append(envelope)
+                self.queued += 1
+                return True
+            actor.running = True
+        self._drain(actor, envelope)
+        return False
+
+    def _drain(self, actor, envelope):
+        """Run envelope, then the mailbox, until it is empty or the batch is used up"""
+        ran = 0
+        while True:
+            self._execute(actor, envelope)
+            ran += 1
+            with self._lock:
+                if not actor.mailbox:
+                    actor.running = False
+                    del self.actors[actor.room_id]
+                    if not self.actors:
+                        self._idle.notify_all()
+                    return
+                envelope = actor.mailbox.popleft()
+                if ran >= self.max_batch and envelope.done is not None:
+                    # Our own caller has waited long enough: the next asker runs the room
+                    self.handoffs += 1
+                    envelope.handed_over = True
+                    envelope.done.set()
+                    return
+
+    def _execute(self, actor, envelope):
+        try:
+            envelope.result = envelope.command()
+        except Exception as e:
+            envelope.error = e
+            if envelope.done is None:
+                log.error("Command failed", room_id=actor.room_id, error=e)
+        self.commands += 1
+        if envelope.done is not None and not envelope.handed_over:
+            envelope.done.set()
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_room_actors_active", {}, len(self.actors)),
+            ("rps_room_actor_commands_total", {}, self.commands),
+            ("rps_room_actor_queued_total", {}, self.queued),
+            ("rps_room_actor_handoffs_total", {}, self.handoffs),
+        ]
@@ -0,0 +1,219 @@
+import copy
+import threading
+import time
+
+_version_lock = threading.Lock()
+_last_version = 0
+
+def next_version():
+    """Monotonic room version, microsecond based so a new leader never reuses old values"""
+    global _last_version
+    with _version_lock:
+        _last_version = max(_last_version + 1, time.time_ns() // 1000)
+        return _last_version
+
+def observe_version(version):
+    """Never hand out a version below one seen from another server
+
+    After a failover the new leader's clock may be behind the old one's; without this
+    its writes would carry versions the standbys reject as stale.
+    """
+    global _last_version
+    with _version_lock:
+        if version > _last_version:
+            _last_version = version
+
+class RoomEntry:
+    """Cached room state"""
+
+    __slots__ = ("game", "version", "touched_at", "stale")
+
+    def __init__(self, game, version):
+        self.game = game
+        self.version = version
+        self.touched_at = time.monotonic()
+        self.stale = False  # The database may have moved on; reload before use
+
+class RoomCache:
+    """In-memory copy of active rooms, written through to the ORM"""
+
+    def __init__(self, idle_ttl=600.0, max_rooms=100000):
+        self.idle_ttl = idle_ttl
+        self.max_rooms = max_rooms
+        self.rooms = {}
+        self.players = {}  # player -> game_id, for CheckSession on replicas
+        self.listeners = []
+        self.evict_listeners = []
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        """Call listener(game_id, game, version, deleted) on every change"""
+        self.listeners.append(listener)
+
+    def add_evict_listener(self, listener):
+        """Call listener(game_ids) for rooms forgotten without a change: idle, over capacity or cleared"""
+        self.evict_listeners.append(listener)
+
+    def get(self, game_id):
+        """Return a private copy of the room and its version, or (None, 0); stale rooms count as missing"""
+        with self._lock:
+            entry = self.rooms.get(game_id)
+            if entry is None or entry.stale:
+                self.misses += 1
+                return None, 0
+            self.hits += 1
+            entry.touched_at = time.monotonic()
+            return copy.copy(entry.game), entry.version
+
+    def peek(self, game_id):
+        """The cached room itself, or None; read-only, and it does not count as a use"""
+        with self._lock:
+            entry = self.rooms.get(game_id)
+            return entry.game if entry is not None else None
+
+    def game_ids(self):
+        with self._lock:
+            return list(self.rooms)
+
+    def version(self, game_id):
+        """Version of the cached room without copying it, 0 if not cached or stale"""
+        with self._lock:
+            entry = self.rooms.get(game_id)
+            if entry is None or entry.stale:
+                return 0
+            entry.touched_at = time.monotonic()
+            return entry.version
+
+    def put(self, game_id, game):
+        """Store a new state of the room and return its version"""
+        version = next_version()
+        evicted = None
+        with self._lock:
+            self._store(game_id, RoomEntry(copy.copy(game), version))
+            if len(self.rooms) > self.max_rooms:
+                evicted = self._evict_oldest()
+        self._notify(game_id, game, version, False)
+        if evicted is not None:
+            self._notify_evicted([evicted])
+        return version
+
+    def keep(self, game_id, game):
+        """Like put(), but a room whose cached copy holds the same stored state keeps its version
+
+        For a reload that finds what we had and a save that changed nothing: clients and
+        spectators already have that version, so it is not news to them.
+        """
+        with self._lock:
+            entry = self.rooms.get(game_id)
+            if (entry is not None and game.stored is not None and game.changed_fields() == []
+                    and entry.game.stored == game.stored and entry.game.changed_fields() == []):
+                entry.stale = False
+                entry.touched_at = time.monotonic()
+                return entry.version
+        return self.put(game_id, game)
+
+    def apply(self, game_id, game, version, deleted=False):
+        """Apply a replicated state if it is newer than ours"""
+        observe_version(version)
+        with self._lock:
+            entry = self.rooms.get(game_id)
+            if entry is not None and entry.version >= version:
+                return False
+            if deleted:
+                self._drop(game_id)
+            else:
+                self._store(game_id, RoomEntry(game, version))
+        self._notify(game_id, game, version, deleted)
+        return True
+
+    def remove(self, game_id):
+        """Drop a room so the next access reloads it from the ORM"""
+        with self._lock:
+            entry = self._drop(game_id)
+        if entry is not None:
+            self._notify(game_id, None, next_version(), True)
+
+    def mark_stale(self, game_id):
+        """Keep the room but reload it from the ORM on next access (get() misses it until then)"""
+        with self._lock:
+            entry = self.rooms.get(game_id)
+            if entry is not None:
+                entry.stale = True
+
+    def retain(self, game_ids):
+        """Drop every room not listed in game_ids"""
+        with self._lock:
+            dropped = [g for g in self.rooms if g not in game_ids]
+            for game_id in dropped:
+                self._drop(game_id)
+        self._notify_evicted(dropped)
+
+    def clear(self):
+        with self._lock:
+            dropped = list(self.rooms)
+            self.rooms.clear()
+            self.players.clear()
+        self._notify_evicted(dropped)
+
+    def find_player(self, player_id):
+        """Return (game_id, version) of the cached room the player is in, or (None, 0)"""
+        with self._lock:
+            game_id = self.players.get(player_id)
+            if game_id is None:
+                return None, 0
+            return game_id, self.rooms[game_id].version
+
+    def snapshot(self):
+        """List of (game_id, game, version) for every cached room"""
+        with self._lock:
+            return [(game_id, copy.copy(entry.game), entry.version)
+                    for game_id, entry in self.rooms.items()]
+
+    def evict_idle(self):
+        """Forget rooms nobody touched for idle_ttl seconds"""
+        cutoff = time.monotonic() - self.idle_ttl
+        with self._lock:
+            idle = [game_id for game_id, entry in self.rooms.items() if entry.touched_at < cutoff]
+            for game_id in idle:
+                self._drop(game_id)
+        self._notify_evicted(idle)
+        return len(idle)
+
+    def _evict_oldest(self):
+        oldest = min(self.rooms, key=lambda game_id: self.rooms[game_id].touched_at)
+        self._drop(oldest)
+        return oldest
+
+    def _store(self, game_id, entry):
+        self._drop(game_id)
+        self.rooms[game_id] = entry
+        for player in (entry.game.player1, entry.game.player2):
+            if player:
+                self.players[player] = game_id
+
+    def _drop(self, game_id):
+        entry = self.rooms.pop(game_id, None)
+        if entry is not None:
+            for player in (entry.game.player1, entry.game.player2):
+                if player and self.players.get(player) == game_id:
+                    del self.players[player]
+        return entry
+
+    def _notify(self, game_id, game, version, deleted):
+        for listener in self.listeners:
+            listener(game_id, game, version, deleted)
+
+    def _notify_evicted(self, game_ids):
+        if game_ids:
+            for listener in self.evict_listeners:
+                listener(game_ids)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_room_cache_rooms", {}, len(self.rooms)),
+            ("rps_room_cache_hits_total", {}, self.hits),
+            ("rps_room_cache_misses_total", {}, self.misses),
+        ]
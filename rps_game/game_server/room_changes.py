@@ -0,0 +1,191 @@
+import threading
+import time
+from collections import deque
+
+import grpc
+
+import protos.orm_pb2 as orm_pb2
+
+from common.logs import get_logger
+from game_server.game_logic import STORED_FIELDS
+
+log = get_logger("Room Changes")
+
+# Own writes per room whose echo is still expected; a write the database skipped never echoes
+EXPECTED_PER_ROOM = 8
+
+class RoomChangeListener:
+    """Follows the ORM change feed and drops cached rooms that someone else changed
+
+    A dropped room is reloaded on next access; if it has spectators it is reloaded at
+    once, which pushes the new state to them. Our own writes come back through the feed
+    too; they are recognised by the states we announced with expect() before saving.
+    After a resync every cached room is only marked stale, so it is reloaded when next
+    used instead of being lost if the ORM cannot serve it right then.
+    """
+
+    def __init__(self, stub, cache, actors, feed_config, on_stale=None):
+        self.stub = stub  # stub() -> current ORM stub, or None while there is no ORM leader
+        self.cache = cache
+        self.actors = actors
+        self.on_stale = on_stale  # on_stale(game_id), in the room's turn after marking it stale
+        cache.add_listener(self._on_room_change)
+        cache.add_evict_listener(self._forget)
+        self.retry = feed_config.get('retry_s', 2)
+        # A save whose echo has not come back by then never will (the database skipped it)
+        self.expected_ttl = feed_config.get('expected_ttl_s', 30)
+        self.connected = False
+        self.subscribed = False
+        self.changes = 0
+        self.invalidations = 0
+        self.resyncs = 0
+        self.expected = {}  # game_id -> deque of (state, expires_at) saved but not seen in the feed
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+        self._call = None
+        self._wakeup = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def expect(self, game_id, game):
+        """Called before saving the room, so the change it causes is not taken for someone else's
+
+        Without a stream the echo cannot come; the resync after subscribing covers that save.
+        """
+        if not self.subscribed:
+            return
+        state = tuple(getattr(game, field) for field in STORED_FIELDS)
+        now = time.monotonic()
+        with self._lock:
+            self.expected.setdefault(game_id, deque(maxlen=EXPECTED_PER_ROOM)).append(
+                (state, now + self.expected_ttl))
+            if now >= self._next_sweep:
+                self._sweep(now)
+
+    def _sweep(self, now):
+        # Entries are appended in time order, so the expired ones are at the left
+        for game_id in list(self.expected):
+            pending = self.expected[game_id]
+            while pending and pending[0][1] <= now:
+                pending.popleft()
+            if not pending:
+                del self.expected[game_id]
+        self._next_sweep = now + self.expected_ttl
+
+    def _is_own(self, game_id, state):
+        with self._lock:
+            pending = self.expected.get(game_id)
+            if not pending:
+                return False
+            for position, (expected_state, _) in enumerate(pending):
+                if expected_state == state:
+                    break
+            else:
+                return False
+            # Changes arrive in commit order: earlier saves have come back already or never will
+            for _ in range(position + 1):
+                pending.popleft()
+            if not pending:
+                del self.expected[game_id]
+            return True
+
+    def _on_room_change(self, game_id, game, version, deleted):
+        """Cache listener: a dropped room will be loaded again, whatever we were waiting for"""
+        if deleted and game_id in self.expected:
+            self._forget([game_id])
+
+    def _forget(self, game_ids):
+        """Cache evict listener, and on a lost stream: no echo is worth waiting for any more"""
+        with self._lock:
+            for game_id in game_ids:
+                self.expected.pop(game_id, None)
+
+    def reconnect(self):
+        """Follow a new ORM leader"""
+        call = self._call
+        if call is not None:
+            call.cancel()
+        self._wakeup.set()
+
+    def _run(self):
+        subscribed_before = False
+        while True:
+            stub = self.stub()
+            if stub is None:
+                self._wakeup.wait(self.retry)
+                self._wakeup.clear()
+                continue
+            try:
+                self._call = stub.Subscribe(orm_pb2.SubscribeRequest())
+                self.subscribed = True
+                if subscribed_before:
+                    # Anything could have changed while we were not subscribed
+                    self._resync()
+                subscribed_before = True
+                for change in self._call:
+                    self.connected = True
+                    self._on_change(change)
+            except grpc.RpcError as e:
+                if e.code() != grpc.StatusCode.CANCELLED:
+                    log.warning("Feed lost", code=e.code().name)
+            except Exception as e:
+                log.error("Feed failed", error=e)
+            self.connected = False
+            self.subscribed = False
+            self._call = None
+            with self._lock:
+                self.expected.clear()
+            self._wakeup.wait(self.retry)
+            self._wakeup.clear()
+
+    def _on_change(self, change):
+        self.changes += 1
+        if change.op == "resync":
+            self._resync()
+            return
+        if change.op == "upsert" and self._is_own(
+                change.game_id, tuple(getattr(change.game, field) for field in STORED_FIELDS)):
+            return
+        if self.cache.peek(change.game_id) is not None:
+            # In the room's turn, so the check sees the result of any write still in progress
+            self.actors.tell(change.game_id, lambda: self._check(change))
+
+    def _check(self, change):
+        game = self.cache.peek(change.game_id)
+        if game is None:
+            return
+        if change.op == "upsert":
+            # A standby's replicated copy may already hold the change the leader made
+            stored = game.stored
+            if stored is None:
+                stored = tuple(getattr(game, field) for field in STORED_FIELDS)
+            if tuple(getattr(change.game, field) for field in STORED_FIELDS) == stored:
+                return
+        self.invalidations += 1
+        self.cache.remove(change.game_id)
+
+    def _resync(self):
+        self.resyncs += 1
+        # Echoes from before the gap are lost or meaningless against reloaded rooms
+        with self._lock:
+            self.expected.clear()
+        game_ids = self.cache.game_ids()
+        log.warning("Resync, marking cached rooms stale", rooms=len(game_ids))
+        for game_id in game_ids:
+            self.actors.tell(game_id, lambda game_id=game_id: self._mark_stale(game_id))
+
+    def _mark_stale(self, game_id):
+        self.cache.mark_stale(game_id)
+        if self.on_stale is not None:
+            self.on_stale(game_id)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_room_feed_connected", {}, 1 if self.connected else 0),
+            ("rps_room_feed_changes_total", {}, self.changes),
+            ("rps_room_feed_invalidations_total", {}, self.invalidations),
+            ("rps_room_feed_resyncs_total", {}, self.resyncs),
+            ("rps_room_feed_expected_rooms", {}, len(self.expected)),
+        ]
@@ -0,0 +1,138 @@
+import threading
+from collections import deque
+
+import grpc
+
+class Subscriber:
+    """One spectator stream: a bounded queue of already-serialized states"""
+
+    __slots__ = ("game_id", "pending", "queue_size", "wakeup", "closed", "_lock")
+
+    def __init__(self, game_id, queue_size):
+        self.game_id = game_id
+        self.pending = deque()
+        self.queue_size = queue_size
+        self.wakeup = threading.Event()
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def offer(self, version, payload):
+        """Queue a state; returns True if older queued states had to be discarded"""
+        with self._lock:
+            conflated = len(self.pending) >= self.queue_size
+            if conflated:
+                # Every message is a full state, so a slow viewer only needs the latest one
+                self.pending.clear()
+            self.pending.append((version, payload))
+            self.wakeup.set()
+        return conflated
+
+    def take(self):
+        with self._lock:
+            items = list(self.pending)
+            self.pending.clear()
+            self.wakeup.clear()
+        return items
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+class SpectatorHub:
+    """Fans each room update out to its spectators, serialized once per update"""
+
+    def __init__(self, spectate_config):
+        self.max_spectators = spectate_config.get('max_spectators', 1000)
+        self.queue_size = spectate_config.get('queue_size', 8)
+        self.check_interval = spectate_config.get('check_interval_s', 5)
+        self.rooms = {}  # game_id -> set of Subscriber
+        self.count = 0
+        self.published = 0
+        self.delivered = 0
+        self.conflated = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, game_id):
+        """Register a spectator, or None if the server is at max_spectators"""
+        with self._lock:
+            if self.count >= self.max_spectators:
+                return None
+            subscriber = Subscriber(game_id, self.queue_size)
+            self.rooms.setdefault(game_id, set()).add(subscriber)
+            self.count += 1
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            room = self.rooms.get(subscriber.game_id)
+            if room is not None and subscriber in room:
+                room.discard(subscriber)
+                self.count -= 1
+                if not room:
+                    del self.rooms[subscriber.game_id]
+        subscriber.close()
+
+    def close_all(self):
+        """End every stream, e.g. when the server shuts down; viewers reconnect elsewhere"""
+        with self._lock:
+            subscribers = [s for room in self.rooms.values() for s in room]
+        for subscriber in subscribers:
+            subscriber.close()
+        return len(subscribers)
+
+    def watching(self, game_id):
+        return game_id in self.rooms
+
+    def publish(self, game_id, version, payload, last=False):
+        """Hand the same bytes to every spectator of the room; last ends their streams"""
+        with self._lock:
+            subscribers = list(self.rooms.get(game_id, ()))
+        conflated = 0
+        for subscriber in subscribers:
+            if subscriber.offer(version, payload):
+                conflated += 1
+            if last:
+                subscriber.closed = True
+        with self._lock:
+            self.published += 1
+            self.delivered += len(subscribers)
+            self.conflated += conflated
+
+    def stream(self, subscriber, initial, context):
+        """Generator for the Spectate RPC: the initial state, then updates newer than it"""
+        sent_version = initial[0]
+        context.add_callback(lambda: self.unsubscribe(subscriber))
+        try:
+            yield initial[1]
+            while context.is_active() and not subscriber.closed:
+                subscriber.wakeup.wait(self.check_interval)
+                for version, payload in subscriber.take():
+                    if version and version <= sent_version:
+                        continue
+                    sent_version = version
+                    yield payload
+                if subscriber.closed:
+                    for version, payload in subscriber.take():
+                        yield payload
+        finally:
+            self.unsubscribe(subscriber)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_spectators", {}, self.count),
+            ("rps_spectator_rooms", {}, len(self.rooms)),
+            ("rps_spectator_updates_total", {}, self.published),
+            ("rps_spectator_deliveries_total", {}, self.delivered),
+            ("rps_spectator_conflated_total", {}, self.conflated),
+        ]
+
+def spectate_handler(service_name, method, request_deserializer):
+    """Generic handler whose responses are pre-serialized bytes, passed through untouched"""
+    return grpc.method_handlers_generic_handler(service_name, {
+        "Spectate": grpc.unary_stream_rpc_method_handler(
+            method,
+            request_deserializer=request_deserializer,
+            response_serializer=None
+        )
+    })
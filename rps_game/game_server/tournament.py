@@ -0,0 +1,659 @@
+import heapq
+import itertools
+import math
+import queue
+import threading
+import time
+from threading import Thread
+
+from game_server.game_logic import RockPaperScissorsGame
+from common.logs import get_logger
+
+log = get_logger("Tournament")
+
+SINGLE_ELIMINATION = "single_elimination"
+SWISS = "swiss"
+FORMATS = (SINGLE_ELIMINATION, SWISS)
+
+RESOLVED = ("player1_won", "player2_won", "draw")
+
+class Timer:
+    """A scheduled call; cancelling only marks it, the heap drops it when it comes due"""
+
+    __slots__ = ("due", "fn", "args", "cancelled")
+
+    def __init__(self, due, fn, args):
+        self.due = due
+        self.fn = fn
+        self.args = args
+        self.cancelled = False
+
+class Scheduler:
+    """One timer thread and a heap of deadlines shared by every match; callbacks run on a small pool"""
+
+    def __init__(self, workers=4):
+        self.heap = []
+        # A bare queue and fixed workers: submitting is one C-level put, with no pool bookkeeping
+        self.ready = queue.SimpleQueue()
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.running = True
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        Thread(target=self._run, name="scheduler-timer", daemon=True).start()
+        for i in range(workers):
+            Thread(target=self._work, name=f"scheduler-{i}", daemon=True).start()
+
+    def call_later(self, delay, fn, *args):
+        timer = Timer(time.monotonic() + delay, fn, args)
+        with self._cond:
+            heapq.heappush(self.heap, (timer.due, next(self._seq), timer))
+            self.scheduled += 1
+            if self.heap[0][2] is timer:
+                self._cond.notify()
+        return timer
+
+    def call_soon(self, fn, *args):
+        """Run fn on the pool without going through the heap"""
+        self.ready.put((fn, args))
+
+    def cancel(self, timer):
+        if timer is not None and not timer.cancelled:
+            timer.cancelled = True
+            self.cancelled += 1
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify()
+        self.ready.put(None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self.running:
+                    timeout = self.heap[0][0] - time.monotonic() if self.heap else None
+                    if timeout is not None and timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+                if not self.running:
+                    return
+                now = time.monotonic()
+                due = []
+                while self.heap and self.heap[0][0] <= now:
+                    due.append(heapq.heappop(self.heap)[2])
+            for timer in due:
+                if not timer.cancelled:
+                    self.ready.put((timer.fn, timer.args))
+
+    def _work(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                # Pass the stop on to the next worker
+                self.ready.put(None)
+                return
+            fn, args = item
+            try:
+                fn(*args)
+                self.fired += 1
+            except Exception as e:
+                self.failed += 1
+                log.error("Scheduled call failed", call=getattr(fn, '__name__', fn), error=e)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_scheduler_pending", {}, len(self.heap)),
+            ("rps_scheduler_ready", {}, self.ready.qsize()),
+            ("rps_scheduler_scheduled_total", {}, self.scheduled),
+            ("rps_scheduler_fired_total", {}, self.fired),
+            ("rps_scheduler_cancelled_total", {}, self.cancelled),
+            ("rps_scheduler_failed_total", {}, self.failed),
+        ]
+
+def _keep_seeds(older, newer):
+    """The newer tournament record, still carrying the roster if only the older one had it"""
+    if older is not None and older[9] and not newer[9]:
+        return newer[:9] + (older[9],)
+    return newer
+
+class BracketWriter:
+    """Collects tournament states and finished matches and persists them in batches"""
+
+    def __init__(self, persist, scheduler, batch_size=500, flush_interval=0.5):
+        self.persist = persist  # persist(tournaments, matches); raises on failure
+        self.scheduler = scheduler
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.tournaments = {}  # tournament_id -> latest record
+        self.matches = []
+        self.flush_pending = False  # A timed flush is scheduled
+        self.flush_queued = False   # A full batch is waiting for a worker
+        self.batches = 0
+        self.written = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def add_tournament(self, record):
+        with self._lock:
+            self.tournaments[record[0]] = _keep_seeds(self.tournaments.get(record[0]), record)
+            self._request_flush(False)
+
+    def add_match(self, record):
+        with self._lock:
+            self.matches.append(record)
+            self._request_flush(len(self.matches) >= self.batch_size)
+
+    def _request_flush(self, now):
+        if now:
+            if not self.flush_queued:
+                self.flush_queued = True
+                self.scheduler.call_soon(self.flush)
+        elif not self.flush_pending:
+            self.flush_pending = True
+            self.scheduler.call_later(self.flush_interval, self._timed_flush)
+
+    def _timed_flush(self):
+        with self._lock:
+            self.flush_pending = False
+        self.flush()
+
+    def flush(self):
+        """Write everything buffered, batch_size matches at a time"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    self.flush_queued = False
+                    if not self.matches and not self.tournaments:
+                        return
+                    tournaments = list(self.tournaments.values())
+                    matches = self.matches[:self.batch_size]
+                    self.tournaments = {}
+                    del self.matches[:self.batch_size]
+                try:
+                    self.persist(tournaments, matches)
+                except Exception as e:
+                    self.failures += 1
+                    log.error("Bracket write failed", matches=len(matches), error=e)
+                    with self._lock:
+                        # Put the batch back, keeping any newer tournament state
+                        for record in tournaments:
+                            newer = self.tournaments.get(record[0])
+                            self.tournaments[record[0]] = _keep_seeds(record, newer) if newer else record
+                        self.matches[:0] = matches
+                        if not self.flush_pending:
+                            self.flush_pending = True
+                            self.scheduler.call_later(max(self.flush_interval, 1.0), self._timed_flush)
+                    return
+                self.batches += 1
+                self.written += len(matches)
+
+class Match:
+    """Two players in one room, playing games until one has wins_needed"""
+
+    __slots__ = ("tournament", "round", "slot", "room_id", "player1", "player2",
+                 "wins1", "wins2", "games", "winner", "resolving", "timer")
+
+    def __init__(self, tournament, round, slot, player1, player2):
+        self.tournament = tournament
+        self.round = round
+        self.slot = slot
+        self.room_id = f"{tournament.tournament_id}-r{round}-m{slot}"
+        self.player1 = player1
+        self.player2 = player2
+        self.wins1 = 0
+        self.wins2 = 0
+        self.games = 0
+        self.winner = ""
+        self.resolving = False
+        self.timer = None
+
+class Tournament:
+    """Bracket state of one tournament; players are given in seed order"""
+
+    def __init__(self, tournament_id, format, players, wins_needed, rounds):
+        self.tournament_id = tournament_id
+        self.format = format
+        self.players = list(players)
+        self.seed = {player: i for i, player in enumerate(self.players)}
+        self.wins_needed = wins_needed
+        log_rounds = max(1, math.ceil(math.log2(len(self.players))))
+        self.total_rounds = rounds if format == SWISS and rounds else log_rounds
+        self.round = 0
+        self.status = "scheduled"
+        self.champion = ""
+        self.alive = list(self.players)  # Single elimination: still in, in bracket order
+        self.eliminated = set()
+        self.points = dict.fromkeys(self.players, 0)  # Swiss: match wins, byes included
+        self.opponents = {player: set() for player in self.players}  # Swiss: avoid rematches
+        self.had_bye = set()
+        self.current = []  # Matches of the running round
+        self.byes = []
+        self.pending = 0
+        self.rooms = {}  # player -> room of their live match
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seeds=False):
+        """Row for the bracket writer; the roster only goes along when asked, it never changes"""
+        return (self.tournament_id, self.format, len(self.players), self.total_rounds,
+                self.round, self.status, self.champion, int(time.time() * 1000),
+                self.wins_needed, tuple(self.players) if seeds else ())
+
+    def pair(self):
+        """Pairs for the next round and the players who sit it out"""
+        if self.format == SINGLE_ELIMINATION:
+            # An odd field gives the best remaining seed a bye
+            byes = self.alive[:len(self.alive) % 2]
+            rest = self.alive[len(byes):]
+            return list(zip(rest[0::2], rest[1::2])), byes
+
+        # Swiss: by points then seed, each player meets the next one they have not played
+        order = sorted(self.players, key=lambda p: (-self.points[p], self.seed[p]))
+        byes = []
+        if len(order) % 2:
+            bye = next((p for p in reversed(order) if p not in self.had_bye), order[-1])
+            order.remove(bye)
+            byes.append(bye)
+        pairs = []
+        taken = set()
+        for i, player in enumerate(order):
+            if player in taken:
+                continue
+            taken.add(player)
+            played = self.opponents[player]
+            partner = None
+            fallback = None
+            for j in range(i + 1, len(order)):
+                candidate = order[j]
+                if candidate in taken:
+                    continue
+                if fallback is None:
+                    fallback = candidate
+                if candidate not in played:
+                    partner = candidate
+                    break
+            # Everyone left has been played already: a rematch beats leaving someone out
+            partner = partner or fallback
+            taken.add(partner)
+            pairs.append((player, partner))
+        return pairs, byes
+
+    def standings(self):
+        """Players by points, then Buchholz (opponents' points), then seed"""
+        buchholz = {p: sum(self.points[o] for o in self.opponents[p]) for p in self.players}
+        return sorted(self.players, key=lambda p: (-self.points[p], -buchholz[p], self.seed[p]))
+
+class TournamentEngine:
+    """Runs tournaments on top of the room cache: opens match rooms, advances winners
+
+    Match rooms are written in their actor's turn, like the players' own moves. A newly
+    elected leader resumes unfinished tournaments from the stored brackets and match rooms.
+    """
+
+    def __init__(self, cache, actors, scheduler, persist, tournament_config,
+                 load_room=None, save_room=None, load_brackets=None):
+        self.cache = cache
+        self.actors = actors
+        self.scheduler = scheduler
+        # Match rooms go through the same load and save as every room; cache only by default
+        self.load_room = load_room or (lambda room_id: cache.get(room_id)[0])
+        self.save_room = save_room or cache.put
+        self.load_brackets = load_brackets  # () -> (tournaments, matches) to resume, None: no resume
+        self.owns = lambda tournament_id: True  # A worker resumes only its own shard's tournaments
+        self.writer = BracketWriter(
+            persist, scheduler,
+            batch_size=tournament_config.get('batch_size', 500),
+            flush_interval=tournament_config.get('flush_interval_ms', 500) / 1000.0
+        )
+        self.max_players = tournament_config.get('max_players', 65536)
+        self.wins_needed = tournament_config.get('wins_needed', 2)
+        self.move_timeout = tournament_config.get('move_timeout_s', 30)
+        self.result_display = tournament_config.get('result_display_s', 3)
+        self.round_break = tournament_config.get('round_break_s', 10)
+        self.resume_retry = tournament_config.get('resume_retry_s', 5)
+
+        self.tournaments = {}
+        self.matches = {}  # room_id -> live Match
+        self.matches_started = 0
+        self.matches_finished = 0
+        self.games_played = 0
+        self.forfeits = 0
+        self.resumed = 0
+        self.active = True  # Only the leader drives matches
+        self._lock = threading.Lock()
+        cache.add_listener(self._on_room_change)
+
+    def create(self, tournament_id, format, players, wins_needed=0, rounds=0, start_in=0):
+        """Schedule a tournament; raises ValueError for a bad request"""
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format: {format}")
+        if not tournament_id or '|' in tournament_id:
+            raise ValueError("Bad tournament id")
+        if len(players) < 2 or len(players) > self.max_players:
+            raise ValueError(f"Need 2 to {self.max_players} players")
+        if len(set(players)) != len(players) or not all(players):
+            raise ValueError("Players must be unique and named")
+        tournament = Tournament(tournament_id, format, players, wins_needed or self.wins_needed, rounds)
+        with self._lock:
+            if tournament_id in self.tournaments:
+                raise ValueError("Tournament exists")
+            self.tournaments[tournament_id] = tournament
+        self.writer.add_tournament(tournament.record(seeds=True))
+        self.scheduler.call_later(start_in, self._start_round, tournament)
+        log.info("Scheduled", tournament_id=tournament_id, format=format,
+                 players=len(players), start_in_s=start_in)
+        return tournament
+
+    def get(self, tournament_id):
+        return self.tournaments.get(tournament_id)
+
+    def _drives(self, tournament):
+        """True while we lead and this object is the tournament's current state
+
+        Timers of a tournament replaced by resume() still fire; they must not touch its rooms.
+        """
+        return self.active and self.tournaments.get(tournament.tournament_id) is tournament
+
+    def _start_round(self, tournament):
+        if not self._drives(tournament):
+            return
+        matches, byes = self._pair_round(tournament)
+        for slot, player in byes:
+            self.writer.add_match((tournament.tournament_id, tournament.round, slot, "",
+                                   player, "", 0, 0, player, int(time.time() * 1000)))
+        self.writer.add_tournament(tournament.record())
+        for match in matches:
+            self._open(match)
+
+    def _pair_round(self, tournament):
+        """Pair the next round and give the byes their point; returns its matches and (slot, player) byes"""
+        with tournament.lock:
+            if tournament.round == 0:
+                tournament.started_at = time.monotonic()
+            tournament.round += 1
+            tournament.status = "running"
+            pairs, byes = tournament.pair()
+            tournament.current = [Match(tournament, tournament.round, slot, player1, player2)
+                                  for slot, (player1, player2) in enumerate(pairs)]
+            tournament.byes = byes
+            tournament.pending = len(pairs)
+            tournament.rooms = {}
+            for match in tournament.current:
+                tournament.rooms[match.player1] = match.room_id
+                tournament.rooms[match.player2] = match.room_id
+            for player in byes:
+                tournament.points[player] += 1
+                tournament.had_bye.add(player)
+            return list(tournament.current), list(enumerate(byes, start=len(pairs)))
+
+    def _open(self, match):
+        with self._lock:
+            self.matches[match.room_id] = match
+            self.matches_started += 1
+        match.timer = self.scheduler.call_later(self.move_timeout, self._on_move_timeout, match, 0)
+        self.actors.tell(match.room_id, lambda: self._store(match.room_id, self._new_room(match)))
+
+    def _new_room(self, match):
+        game = RockPaperScissorsGame()
+        game.set_players(match.player1, match.player2)
+        return game
+
+    def _store(self, room_id, game):
+        try:
+            self.save_room(room_id, game)
+        except Exception as e:
+            # Play on from the cache; the room's next save writes it whole
+            log.error("Match room save failed", room_id=room_id, error=e)
+            self.cache.put(room_id, game)
+
+    def _on_room_change(self, game_id, game, version, deleted):
+        """Cache listener: a match room resolved a game"""
+        match = self.matches.get(game_id)
+        if match is None or deleted or game is None or game.status not in RESOLVED:
+            return
+        with match.tournament.lock:
+            if match.resolving:
+                return
+            match.resolving = True
+        self.scheduler.cancel(match.timer)
+        # Off the caller's thread: finishing the last match may open a whole round
+        self.scheduler.call_soon(self._on_game_over, match, game.player1_score, game.player2_score)
+
+    def _on_game_over(self, match, score1, score2):
+        if not self._drives(match.tournament):
+            return
+        tournament = match.tournament
+        with tournament.lock:
+            match.wins1 = score1
+            match.wins2 = score2
+            match.games += 1
+            self.games_played += 1
+            if max(score1, score2) < tournament.wins_needed:
+                # Let the players see the result, then start the next game
+                match.timer = self.scheduler.call_later(self.result_display, self._next_game, match)
+                return
+            match.winner = match.player1 if score1 > score2 else match.player2
+        self._finish_match(match)
+
+    def _room(self, match):
+        try:
+            game = self.load_room(match.room_id)
+        except Exception as e:
+            log.warning("Match room load failed", room_id=match.room_id, error=e)
+            game = None
+        if game is None:
+            # Gone from cache and storage: the match itself knows enough to rebuild the room
+            game = self._new_room(match)
+        # The match is the record of the score
+        game.player1_score = match.wins1
+        game.player2_score = match.wins2
+        return game
+
+    def _next_game(self, match):
+        if not self._drives(match.tournament):
+            return
+        with match.tournament.lock:
+            match.resolving = False
+            games = match.games
+        match.timer = self.scheduler.call_later(self.move_timeout, self._on_move_timeout, match, games)
+        self.actors.tell(match.room_id, lambda: self._reset_room(match))
+
+    def _reset_room(self, match):
+        if not self._drives(match.tournament):
+            return
+        game = self._room(match)
+        game.reset_round()
+        self._store(match.room_id, game)
+
+    def _on_move_timeout(self, match, games):
+        if self._drives(match.tournament):
+            self.actors.tell(match.room_id, lambda: self._forfeit(match, games))
+
+    def _forfeit(self, match, games):
+        if not self._drives(match.tournament):
+            return
+        with match.tournament.lock:
+            if match.resolving or match.games != games or match.winner:
+                return
+        game = self._room(match)
+        if game.status in RESOLVED:
+            return
+        # Whoever has chosen takes the game; if nobody has, the higher seed does
+        if game.player2_choice != "waiting" and game.player1_choice == "waiting":
+            game.player2_score += 1
+            game.status = "player2_won"
+        else:
+            game.player1_score += 1
+            game.status = "player1_won"
+        self.forfeits += 1
+        # The listener sees a resolved game like any other
+        self._store(match.room_id, game)
+
+    def _finish_match(self, match):
+        tournament = match.tournament
+        with self._lock:
+            if self.matches.get(match.room_id) is match:
+                del self.matches[match.room_id]
+            self.matches_finished += 1
+        self.writer.add_match((tournament.tournament_id, match.round, match.slot, match.room_id,
+                               match.player1, match.player2, match.wins1, match.wins2,
+                               match.winner, int(time.time() * 1000)))
+        if self._settle(match):
+            self._finish_round(tournament)
+
+    def _settle(self, match):
+        """Count a decided match in the bracket; True if it was the last of its round"""
+        tournament = match.tournament
+        with tournament.lock:
+            tournament.rooms.pop(match.player1, None)
+            tournament.rooms.pop(match.player2, None)
+            if tournament.format == SINGLE_ELIMINATION:
+                tournament.eliminated.add(match.player2 if match.winner == match.player1 else match.player1)
+            else:
+                tournament.points[match.winner] += 1
+                tournament.opponents[match.player1].add(match.player2)
+                tournament.opponents[match.player2].add(match.player1)
+            tournament.pending -= 1
+            return tournament.pending == 0
+
+    def _finish_round(self, tournament):
+        finished, champion = self._close_round(tournament)
+        self.writer.add_tournament(tournament.record())
+        if finished:
+            log.info("Finished", tournament_id=tournament.tournament_id, champion=champion,
+                     rounds=tournament.round)
+            self.writer.flush()
+        else:
+            self.scheduler.call_later(self.round_break, self._start_round, tournament)
+
+    def _close_round(self, tournament):
+        """Advance the bracket past a fully played round; returns (finished, champion)"""
+        with tournament.lock:
+            if tournament.format == SINGLE_ELIMINATION:
+                tournament.alive = tournament.byes + [match.winner for match in tournament.current]
+                finished = len(tournament.alive) == 1
+                champion = tournament.alive[0] if finished else ""
+            else:
+                finished = tournament.round >= tournament.total_rounds
+                champion = tournament.standings()[0] if finished else ""
+            tournament.current = []
+            if finished:
+                tournament.status = "finished"
+                tournament.champion = champion
+                tournament.finished_at = time.monotonic()
+        return finished, champion
+
+    # ---- Resuming after a change of leader ----
+
+    def resume(self):
+        """Pick up every unfinished tournament where the previous leader left it"""
+        if not self.active or self.load_brackets is None:
+            return
+        try:
+            tournaments, matches = self.load_brackets()
+        except Exception as e:
+            log.error("Resume failed", error=e)
+            self.scheduler.call_later(self.resume_retry, self.resume)
+            return
+        results = {}
+        for record in matches:
+            results.setdefault(record[0], {})[(record[1], record[2])] = record
+        for record in tournaments:
+            if not self.owns(record[0]):
+                continue
+            try:
+                self._restore(record, results.get(record[0], {}))
+            except Exception as e:
+                log.error("Resume failed", tournament_id=record[0], error=e)
+
+    def _restore(self, record, results):
+        """Rebuild a tournament by replaying its stored results through the same pairing"""
+        tournament_id, format, _, rounds, round, _, _, _, wins_needed, seeds = record
+        if not seeds:
+            log.warning("Cannot resume, roster not stored", tournament_id=tournament_id)
+            return
+        tournament = Tournament(tournament_id, format, seeds, wins_needed or self.wins_needed, rounds)
+        with self._lock:
+            replaced = self.tournaments.get(tournament_id)
+            self.tournaments[tournament_id] = tournament
+            for room_id, match in list(self.matches.items()):
+                if match.tournament is replaced:
+                    del self.matches[room_id]
+                    self.scheduler.cancel(match.timer)
+        self.resumed += 1
+        if round == 0:
+            # Its start time is not stored; it has waited long enough
+            self.scheduler.call_soon(self._start_round, tournament)
+            return
+
+        while True:
+            matches, _ = self._pair_round(tournament)
+            unplayed = []
+            for match in matches:
+                result = results.get((tournament.round, match.slot))
+                if result is None:
+                    unplayed.append(match)
+                    continue
+                match.wins1, match.wins2, match.winner = result[6], result[7], result[8]
+                match.games = match.wins1 + match.wins2
+                self._settle(match)
+            # Results are written in batches: an earlier round can still miss some, resume there
+            if unplayed or tournament.round >= round:
+                break
+            finished, _ = self._close_round(tournament)
+            if finished:
+                self.writer.add_tournament(tournament.record())
+                return
+
+        log.info("Resumed", tournament_id=tournament_id, round=tournament.round, live_matches=len(unplayed))
+        if not unplayed:
+            self._finish_round(tournament)
+        for match in unplayed:
+            with self._lock:
+                self.matches[match.room_id] = match
+            self.actors.tell(match.room_id, lambda match=match: self._reopen(match))
+
+    def _reopen(self, match):
+        """In the room's turn: go on with a match from its stored room, or open the room afresh"""
+        try:
+            game = self.load_room(match.room_id)
+        except Exception as e:
+            log.warning("Match room load failed", room_id=match.room_id, error=e)
+            game = None
+        if game is None or (game.player1, game.player2) != (match.player1, match.player2):
+            self._store(match.room_id, self._new_room(match))
+            match.timer = self.scheduler.call_later(self.move_timeout, self._on_move_timeout, match, 0)
+            return
+        with match.tournament.lock:
+            match.wins1 = game.player1_score
+            match.wins2 = game.player2_score
+            match.games = match.wins1 + match.wins2
+            # The listener may have seen this room resolve since the match was registered
+            resolved = game.status in RESOLVED and not match.resolving
+            if resolved:
+                match.resolving = True
+        if resolved:
+            # A game the previous leader never got to count
+            self.scheduler.call_soon(self._on_game_over, match, game.player1_score, game.player2_score)
+        else:
+            match.timer = self.scheduler.call_later(self.move_timeout, self._on_move_timeout, match, match.games)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        running = sum(1 for t in list(self.tournaments.values()) if t.status == "running")
+        return [
+            ("rps_tournaments_running", {}, running),
+            ("rps_tournament_live_matches", {}, len(self.matches)),
+            ("rps_tournament_matches_total", {}, self.matches_finished),
+            ("rps_tournament_games_total", {}, self.games_played),
+            ("rps_tournament_forfeits_total", {}, self.forfeits),
+            ("rps_tournaments_resumed_total", {}, self.resumed),
+            ("rps_tournament_bracket_batches_total", {}, self.writer.batches),
+            ("rps_tournament_bracket_failures_total", {}, self.writer.failures),
+        ] + self.scheduler.metrics()
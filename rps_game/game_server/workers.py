@@ -0,0 +1,347 @@
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter
+
+import grpc
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+
+from common.logs import get_logger
+
+log = get_logger("Supervisor")
+
+# Tournament match rooms are "<tournament_id>-r<round>-m<slot>"; they live with their tournament
+MATCH_ROOM = re.compile(r"^(.+)-r\d+-m\d+$")
+
+FORWARD_TIMEOUT = 10.0
+# Spectate streams are long-lived; a forwarded one still ends by then and the client
+# reconnects. Channel keepalive notices a dead owner well before that
+FORWARD_STREAM_TIMEOUT = 3600.0
+# Set on forwarded calls: the receiving worker's own socket skips admission, the sender ran it
+FORWARDED_HEADER = "x-rps-forwarded"
+ORM_FAST_POLL_S = 5.0
+
+def shard_of(key, count):
+    """Worker that owns a room or tournament"""
+    match = MATCH_ROOM.match(key)
+    if match:
+        key = match.group(1)
+    return zlib.crc32(key.encode('utf-8')) % count
+
+def _created_room(request):
+    # CreateGame carries "Nickname|RoomID"; a malformed id is answered by whoever gets it
+    parts = request.player_id.split('|')
+    return parts[1] if len(parts) >= 2 else None
+
+# Methods that touch one room or tournament, and how to find its key in the request
+SHARD_KEYS = {
+    "CreateGame": _created_room,
+    "MakeMove": lambda request: request.game_id,
+    "GetState": lambda request: request.game_id,
+    "ResetGame": lambda request: request.game_id,
+    "ExitGame": lambda request: request.game_id,
+    "Spectate": lambda request: request.game_id,
+    "CreateTournament": lambda request: request.tournament_id,
+    "GetTournament": lambda request: request.tournament_id,
+}
+
+def worker_address(server_config, shard):
+    """Local socket on which a worker takes requests forwarded by the others"""
+    directory = server_config.get('worker_socket_dir') or tempfile.gettempdir()
+    name = f"rps-game-{server_config['port']}-{shard}.sock"
+    return f"unix:{os.path.join(directory, name)}"
+
+class RawSpectateStub:
+    """Spectate stub that passes the owner's pre-serialized bytes through untouched"""
+
+    def __init__(self, channel):
+        self.Spectate = channel.unary_stream(
+            '/rps.GameService/Spectate',
+            request_serializer=game_pb2.SpectateRequest.SerializeToString,
+            response_deserializer=None
+        )
+
+class ShardingInterceptor(grpc.ServerInterceptor):
+    """Handles requests for this worker's rooms, forwards the others to the owning worker"""
+
+    def __init__(self, shard, peers, channels):
+        self.shard = shard
+        self.peers = peers  # shard -> worker_address
+        self.channels = channels
+        self.local = 0
+        self.forwarded = Counter()  # method -> requests sent to another worker
+        self.failures = 0
+        self.forwarded_metadata = ((FORWARDED_HEADER, str(shard)),)
+
+    def owner(self, key):
+        if key is None:
+            return self.shard
+        return shard_of(key, len(self.peers))
+
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        method = handler_call_details.method.rsplit('/', 1)[-1]
+        key_of = SHARD_KEYS.get(method)
+        if handler is None or key_of is None or handler.request_streaming:
+            return handler
+
+        if handler.response_streaming:
+            behavior = handler.unary_stream
+
+            def routed_stream(request, context):
+                shard = self.owner(key_of(request))
+                if shard == self.shard:
+                    self.local += 1
+                    return behavior(request, context)
+                return self._forward_stream(method, shard, request, context)
+
+            return grpc.unary_stream_rpc_method_handler(
+                routed_stream,
+                request_deserializer=handler.request_deserializer,
+                response_serializer=handler.response_serializer
+            )
+
+        behavior = handler.unary_unary
+
+        def routed(request, context):
+            shard = self.owner(key_of(request))
+            if shard == self.shard:
+                self.local += 1
+                return behavior(request, context)
+            return self._forward(method, shard, request, context)
+
+        return grpc.unary_unary_rpc_method_handler(
+            routed,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer
+        )
+
+    def _forward(self, method, shard, request, context):
+        self.forwarded[method] += 1
+        stub = self.channels.stub(self.peers[shard], game_pb2_grpc.GameServiceStub)
+        try:
+            # Without a client deadline time_remaining() is effectively infinite
+            return getattr(stub, method)(request, timeout=min(context.time_remaining(), FORWARD_TIMEOUT),
+                                         metadata=self.forwarded_metadata)
+        except grpc.RpcError as e:
+            # The owner is restarting or overloaded; the caller retries like any failed call
+            self.failures += 1
+            context.abort(e.code(), f"Worker {shard}: {e.details()}")
+
+    def _forward_stream(self, method, shard, request, context):
+        self.forwarded[method] += 1
+        stream = self.channels.stub(self.peers[shard], RawSpectateStub).Spectate(
+            request, timeout=min(context.time_remaining(), FORWARD_STREAM_TIMEOUT),
+            metadata=self.forwarded_metadata
+        )
+        # The client went away: stop the owner's stream too, it holds a worker there
+        context.add_callback(stream.cancel)
+        return self._relay(shard, stream, context)
+
+    def _relay(self, shard, stream, context):
+        try:
+            yield from stream
+        except grpc.RpcError as e:
+            if not context.is_active():
+                return  # Cancelled by the callback above, nobody is listening
+            self.failures += 1
+            context.abort(e.code(), f"Worker {shard}: {e.details()}")
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        samples = [
+            ("rps_shard_local_total", {}, self.local),
+            ("rps_shard_forward_failures_total", {}, self.failures),
+        ]
+        for method, count in list(self.forwarded.items()):
+            samples.append(("rps_shard_forwarded_total", {"method": method}, count))
+        return samples
+
+class WorkerLink:
+    """Worker end of the supervisor's pipe"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, kind, *args):
+        try:
+            with self._lock:
+                self.conn.send((kind,) + args)
+        except (OSError, ValueError):
+            pass  # The supervisor is gone; serve() returns and the worker exits
+
+    def serve(self, handlers):
+        """Apply the supervisor's messages until it says stop or goes away"""
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                log.warning("Supervisor gone, stopping worker", pid=os.getpid())
+                return
+            kind, args = message[0], message[1:]
+            if kind == "stop":
+                return
+            try:
+                handlers[kind](*args)
+            except Exception as e:
+                log.error("Supervisor message failed", kind=kind, error=e)
+
+class WorkerHandle:
+    """Supervisor's view of one worker process"""
+
+    def __init__(self, shard, process, conn):
+        self.shard = shard
+        self.process = process
+        self.conn = conn
+        self._lock = threading.Lock()
+
+    def send(self, kind, *args):
+        try:
+            with self._lock:
+                self.conn.send((kind,) + args)
+        except (OSError, ValueError):
+            pass  # Dead worker, the watcher restarts it
+
+class Supervisor:
+    """Starts the workers, restarts the ones that die and relays leadership and the ORM leader
+
+    Workers never talk to Consul: this process registers the port and runs the election.
+    """
+
+    def __init__(self, config, count, target):
+        self.config = config
+        self.count = count
+        self.target = target  # target(config, shard, count, conn) runs one worker
+        # Never fork a process that may already have gRPC threads
+        self.context = multiprocessing.get_context('spawn')
+        self.workers = [None] * count
+        self.is_leader = False
+        self.orm_url = None
+        self.orm_failing_until = 0.0
+        self.restarts = 0
+        self.stopping = False
+        self.stepped_down = set()  # Shards done with their writes after step_down()
+        self._stepped_down = threading.Condition()
+        self._orm_recheck = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        for shard in range(self.count):
+            self._spawn(shard)
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _spawn(self, shard):
+        conn, child_conn = self.context.Pipe()
+        process = self.context.Process(
+            target=self.target,
+            args=(self.config, shard, self.count, child_conn),
+            name=f"rps-game-{shard}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = WorkerHandle(shard, process, conn)
+        with self._lock:
+            self.workers[shard] = worker
+            # Queued in the pipe until the worker is up
+            worker.send("orm", self.orm_url)
+            worker.send("leader", self.is_leader)
+        threading.Thread(target=self._listen, args=(worker,), daemon=True).start()
+
+    def _listen(self, worker):
+        while True:
+            try:
+                kind = worker.conn.recv()[0]
+            except (EOFError, OSError):
+                return
+            if kind == "stepped_down":
+                with self._stepped_down:
+                    self.stepped_down.add(worker.shard)
+                    self._stepped_down.notify_all()
+            elif kind == "orm_failing":
+                self.orm_failing_until = time.monotonic() + ORM_FAST_POLL_S
+                self._orm_recheck.set()
+
+    def _watch(self):
+        """Restart workers that exit, at most once a second each"""
+        while not self.stopping:
+            time.sleep(1)
+            for shard, worker in enumerate(self.workers):
+                if self.stopping or worker.process.is_alive():
+                    continue
+                log.error("Worker died, restarting", shard=shard, exitcode=worker.process.exitcode)
+                worker.conn.close()
+                self.restarts += 1
+                self._spawn(shard)
+
+    def _broadcast(self, kind, *args):
+        with self._lock:
+            for worker in self.workers:
+                worker.send(kind, *args)
+
+    def set_leader(self, is_leader):
+        with self._lock:
+            if is_leader == self.is_leader:
+                return
+            self.is_leader = is_leader
+        self._broadcast("leader", is_leader)
+
+    def step_down(self, timeout):
+        """Stop every worker taking writes and wait until their room commands are done"""
+        with self._stepped_down:
+            self.stepped_down.clear()
+        with self._lock:
+            self.is_leader = False
+        self._broadcast("leader", False)
+        with self._stepped_down:
+            if not self._stepped_down.wait_for(lambda: len(self.stepped_down) == self.count, timeout):
+                log.warning("Workers did not step down in time", done=len(self.stepped_down))
+
+    def set_orm_leader(self, url):
+        with self._lock:
+            if url == self.orm_url:
+                return
+            self.orm_url = url
+        log.info("ORM leader changed", orm_leader=url)
+        self._broadcast("orm", url)
+
+    def watch_orm_leader(self, consul_client):
+        """Follow the ORM leader key for every worker"""
+        while not self.stopping:
+            try:
+                index, data = consul_client.kv.get("service/rps-orm/leader")
+                self.set_orm_leader(data['Value'].decode('utf-8') if data else None)
+            except Exception as e:
+                log.error("ORM leader lookup failed", orm_leader=self.orm_url, error=e)
+            # Poll fast for a while after a worker lost its ORM channel so the switch is quick
+            failing = self.orm_url is None or time.monotonic() < self.orm_failing_until
+            self._orm_recheck.wait(0.2 if failing else 1)
+            self._orm_recheck.clear()
+
+    def stop(self, timeout=5):
+        """Ask the workers to stop, then make sure they have"""
+        self.stopping = True
+        self._broadcast("stop")
+        deadline = time.monotonic() + timeout
+        for worker in self.workers:
+            worker.process.join(max(0.0, deadline - time.monotonic()))
+            if worker.process.is_alive():
+                log.warning("Worker did not stop in time", shard=worker.shard)
+                worker.process.terminate()
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        alive = sum(1 for worker in self.workers if worker is not None and worker.process.is_alive())
+        return [
+            ("rps_workers", {}, self.count),
+            ("rps_workers_alive", {}, alive),
+            ("rps_worker_restarts_total", {}, self.restarts),
+            ("rps_supervisor_leader", {}, 1 if self.is_leader else 0),
+        ]
@@ -0,0 +1,121 @@
+"""
+Benchmark for ORM query paths against PostgreSQL:
+  - connect+text:   new connection and plain SQL per call (the original OrmService path)
+  - pool+text:      pooled connection, plain SQL
+  - pool+prepared:  pooled connection, statements prepared once and run by name
+Also reports server-side planning time per query from EXPLAIN ANALYZE.
+
+Run from rps_game/:  python -m orm_service.bench_statements --iterations 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import protos.orm_pb2 as orm_pb2
+
+from orm_service.postgres_engine import PostgresEngine, TEXT_STATEMENTS
+
+ROOMS = 100
+
+def percentile(samples, p):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+def report(name, samples):
+    mean = sum(samples) / len(samples)
+    print(f"  {name:<16} mean {mean * 1e6:8.1f} us   p50 {percentile(samples, 0.5) * 1e6:8.1f} us"
+          f"   p99 {percentile(samples, 0.99) * 1e6:8.1f} us")
+    return mean
+
+def run(engine, operation, iterations):
+    game = orm_pb2.Game(player1="bench1", player2="bench2", player1_choice="waiting",
+                        player2_choice="waiting", status="ready")
+    samples = []
+    for i in range(iterations):
+        game_id = f"bench-{i % ROOMS}"
+        started = time.perf_counter()
+        if operation == "save":
+            engine.save(game_id, game)
+        else:
+            engine.load(game_id)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+class ConnectPerCallEngine(PostgresEngine):
+    """The original path: a new connection for every call"""
+
+    def connection(self):
+        engine = self
+
+        class Scope:
+            def __enter__(self):
+                self.conn = engine.get_connection()
+                return self.conn
+
+            def __exit__(self, *exc):
+                if exc[0] is None:
+                    self.conn.commit()
+                self.conn.close()
+
+        return Scope()
+
+def planning_time(conn, sql, params, repeats):
+    """Average server-side planning time (ms) reported by EXPLAIN ANALYZE"""
+    cursor = conn.cursor()
+    total = 0.0
+    for _ in range(repeats):
+        cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}", params)
+        total += cursor.fetchone()[0][0]["Planning Time"]
+    cursor.close()
+    return total / repeats
+
+def main():
+    parser = argparse.ArgumentParser(description='ORM statement benchmark')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    db_config = dict(config['database'], pool={"min": 1, "max": 2})
+
+    engines = [
+        ("connect+text", ConnectPerCallEngine(dict(db_config, prepared_statements=False))),
+        ("pool+text", PostgresEngine(dict(db_config, prepared_statements=False))),
+        ("pool+prepared", PostgresEngine(dict(db_config, prepared_statements=True))),
+    ]
+
+    means = {}
+    for operation in ("save", "load"):
+        print(f"{operation.upper()} x {args.iterations}")
+        for name, engine in engines:
+            run(engine, operation, min(100, args.iterations))  # Warm up plan caches
+            means[(operation, name)] = report(name, run(engine, operation, args.iterations))
+
+    print("Per-call saving of prepared statements over pool+text:")
+    for operation in ("save", "load"):
+        saved = means[(operation, "pool+text")] - means[(operation, "pool+prepared")]
+        print(f"  {operation:<5} {saved * 1e6:8.1f} us")
+
+    # Planning is only part of what PREPARE saves (parse/analyze/rewrite are not in EXPLAIN)
+    pool_engine = engines[2][1]
+    with pool_engine.connection() as conn:
+        text_sql, order = TEXT_STATEMENTS["rps_load"]
+        text_plan = planning_time(conn, text_sql, ["bench-1"], 200)
+        prepared_plan = planning_time(conn, "EXECUTE rps_load (%s)", ["bench-1"], 200)
+    print("Planning time per Load (EXPLAIN ANALYZE):")
+    print(f"  text      {text_plan * 1000:8.1f} us")
+    print(f"  prepared  {prepared_plan * 1000:8.1f} us")
+
+    with pool_engine.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM games WHERE game_id LIKE 'bench-%'")
+        cursor.close()
+    for name, engine in engines:
+        engine.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import threading
+from collections import deque
+
+import protos.orm_pb2 as orm_pb2
+
+from common.logs import get_logger
+
+log = get_logger("ChangeFeed")
+
+class FeedSubscriber:
+    """One Subscribe stream: a bounded queue of GameChange messages"""
+
+    __slots__ = ("pending", "queue_size", "wakeup", "closed", "_lock")
+
+    def __init__(self, queue_size):
+        self.pending = deque()
+        self.queue_size = queue_size
+        self.wakeup = threading.Event()
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def offer(self, change):
+        """Queue a change; returns True if the subscriber fell behind and gets a resync instead"""
+        with self._lock:
+            overflow = len(self.pending) >= self.queue_size
+            if overflow:
+                # Individual changes are lost now, so the subscriber has to recheck everything
+                self.pending.clear()
+                change = orm_pb2.GameChange(op="resync")
+            self.pending.append(change)
+            self.wakeup.set()
+        return overflow
+
+    def take(self):
+        with self._lock:
+            items = list(self.pending)
+            self.pending.clear()
+            self.wakeup.clear()
+        return items
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+
+class ChangeFeed:
+    """Relays every change to games to the Subscribe streams
+
+    Engines that see all writers (PostgreSQL, through LISTEN) feed it from a background
+    thread; for embedded engines this ORM is the only writer and reports its own writes.
+    """
+
+    def __init__(self, engine, feed_config):
+        self.engine = engine
+        self.max_subscribers = feed_config.get('max_subscribers', 64)
+        self.queue_size = feed_config.get('queue_size', 1000)
+        self.retry = feed_config.get('retry_s', 2)
+        self.subscribers = set()
+        self.listening = not engine.shared_changes
+        self.changes = 0
+        self.resyncs = 0
+        self.overflows = 0
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        if engine.shared_changes:
+            threading.Thread(target=self._listen, daemon=True).start()
+
+    @property
+    def local(self):
+        """True if OrmService has to report its own writes"""
+        return not self.engine.shared_changes
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            try:
+                self.engine.listen(self._on_listening, self.publish, self._stopping)
+            except Exception as e:
+                log.error("Listen failed", error=e)
+            self.listening = False
+            self._stopping.wait(self.retry)
+
+    def _on_listening(self):
+        self.listening = True
+        log.info("Listening", subscribers=len(self.subscribers))
+        # Streams opened before now (or before a reconnect) may have missed changes
+        self.resync()
+
+    def subscribe(self):
+        """Register a stream, or None if there are max_subscribers already"""
+        with self._lock:
+            if len(self.subscribers) >= self.max_subscribers:
+                return None
+            subscriber = FeedSubscriber(self.queue_size)
+            self.subscribers.add(subscriber)
+            return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self.subscribers.discard(subscriber)
+        subscriber.close()
+
+    def publish(self, op, game_id, game=None):
+        self.changes += 1
+        with self._lock:
+            if not self.subscribers:
+                return
+            subscribers = list(self.subscribers)
+        # Built once, shared by every stream
+        change = orm_pb2.GameChange(op=op, game_id=game_id, game=game)
+        for subscriber in subscribers:
+            if subscriber.offer(change):
+                self.overflows += 1
+
+    def resync(self):
+        """Tell every subscriber that changes were missed"""
+        if self.subscribers:
+            self.resyncs += 1
+        self.publish("resync", "")
+
+    def stream(self, subscriber, context):
+        """Generator for the Subscribe RPC"""
+        context.add_callback(lambda: self.unsubscribe(subscriber))
+        try:
+            while context.is_active() and not subscriber.closed:
+                subscriber.wakeup.wait(1)
+                for change in subscriber.take():
+                    yield change
+        finally:
+            self.unsubscribe(subscriber)
+
+    def close(self):
+        """Stop listening and end every stream; subscribers reconnect to the next leader"""
+        self._stopping.set()
+        with self._lock:
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_change_feed_listening", {}, 1 if self.listening else 0),
+            ("rps_change_feed_subscribers", {}, len(self.subscribers)),
+            ("rps_change_feed_changes_total", {}, self.changes),
+            ("rps_change_feed_resyncs_total", {}, self.resyncs),
+            ("rps_change_feed_overflows_total", {}, self.overflows),
+        ]
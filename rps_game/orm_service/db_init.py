@@ -3,6 +3,11 @@ import json
 import time
 import subprocess
 import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from orm_service.migrations import migrate
 
 def load_config():
     with open('config.json', 'r') as f:
@@ -73,34 +78,9 @@ def create_schema(config):
         cursor.close()
         conn.close()
         
-        # Connect to the game database
-        conn = psycopg2.connect(
-            host=config['database']['host'],
-            port=config['database']['port'],
-            user=config['database']['user'],
-            password=config['database']['password'],
-            database=config['database']['database']
-        )
-        cursor = conn.cursor()
-        
-        # Create games table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS games (
-                game_id VARCHAR(50) PRIMARY KEY,
-                player1 VARCHAR(100),
-                player2 VARCHAR(100),
-                player1_choice VARCHAR(20),
-                player2_choice VARCHAR(20),
-                status VARCHAR(20),
-                player1_score INTEGER DEFAULT 0,
-                player2_score INTEGER DEFAULT 0
-            )
-        """)
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        print("[DB] Schema ready.")
+        # Tables, indexes and later changes are numbered migrations
+        applied = migrate(config['database'])
+        print(f"[DB] Schema ready, applied migrations: {applied or 'none'}")
         
     except Exception as e:
         print(f"[DB Error] {e}")
@@ -109,6 +89,11 @@ def initialize():
     print("[DB] Initializing...")
     config = load_config()
     
+    if config['database'].get('engine', 'postgres') != 'postgres':
+        # Embedded engines create their own schema
+        print(f"[DB] Engine '{config['database']['engine']}' needs no database server.")
+        return
+    
     if not is_database_reachable(config):
         print("[DB] Database not reachable. Starting Docker container...")
         ensure_postgres_container(config)
@@ -0,0 +1,505 @@
+import bisect
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from threading import Thread
+
+import protos.orm_pb2 as orm_pb2
+
+from common.logs import get_logger
+from orm_service.storage import StorageEngine, stat_deltas
+
+log = get_logger("LogEngine")
+
+# Record: crc32 | value length | op | key length | key | value
+RECORD_HEADER = struct.Struct('<IIBH')
+OP_PUT = 1
+OP_DELETE = 2
+
+# Snapshot: magic | log segment and offset it covers | entry count | entries
+SNAPSHOT_MAGIC = b'RPSIDX01'
+SNAPSHOT_HEADER = struct.Struct('<QQI')
+SNAPSHOT_ENTRY = struct.Struct('<QII')
+SNAPSHOT_FILE = 'index.snap'
+ROUNDS_FILE = 'rounds.tsv'  # Round history, one tab-separated event per line
+BRACKET_FILE = 'brackets.tsv'  # Tournament states (T) and finished matches (M), latest line wins
+
+LOG_SUFFIX = '.seg'      # Appended by Save, replayed on startup
+COMPACT_SUFFIX = '.cmp'  # Written by compaction, only reachable through a snapshot
+
+class LogEngine(StorageEngine):
+    """Append-only segment files with an in-memory hash index (Bitcask style)"""
+
+    name = "log"
+
+    def __init__(self, log_config):
+        self.dir = log_config.get('dir', 'rps_log')
+        self.segment_bytes = log_config.get('segment_bytes', 16 * 1024 * 1024)
+        self.fsync = log_config.get('fsync', 'interval')
+        self.fsync_interval = log_config.get('fsync_interval_ms', 100) / 1000.0
+        self.snapshot_interval = log_config.get('snapshot_interval_s', 30)
+        self.compact_min_segments = log_config.get('compact_min_segments', 4)
+
+        self.index = {}    # game_id -> (segment id, value offset, value size)
+        self.players = {}  # player -> game_id
+        self.rooms = {}    # game_id -> (player1, player2)
+        self.files = {}    # segment id -> path
+        self.readers = {}  # segment id -> read fd
+        self.active_id = 0
+        self.active_fd = None
+        self.active_size = 0
+        self.dirty = False
+        self.writes_since_snapshot = 0
+        self.running = True
+        self._stopping = threading.Event()
+        self._lock = threading.RLock()
+        self._rounds_lock = threading.Lock()
+        self.stats = {}  # player -> [wins, losses, draws], rebuilt from the round history
+        self.round_seqs = {}  # game_id -> highest round_seq in the history
+
+        os.makedirs(self.dir, exist_ok=True)
+        started = time.monotonic()
+        replayed = self._recover()
+        self._load_stats()
+        log.info("Recovered", rooms=len(self.index), replayed=replayed,
+                 ms=round((time.monotonic() - started) * 1000, 1))
+
+        self._threads = [Thread(target=self._maintenance_loop, daemon=True)]
+        if self.fsync == 'interval':
+            self._threads.append(Thread(target=self._flush_loop, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    # ---- StorageEngine ----
+
+    def find_session(self, player_id):
+        with self._lock:
+            return self.players.get(player_id)
+
+    def load(self, game_id):
+        with self._lock:
+            location = self.index.get(game_id)
+            if location is None:
+                return None
+            data = self._read(location)
+        return orm_pb2.Game.FromString(data)
+
+    def save(self, game_id, game, columns=None):
+        # A record always holds the whole room; appending it costs the same either way
+        value = game.SerializeToString()
+        with self._lock:
+            location = self._append(OP_PUT, game_id, value)
+            self.index[game_id] = location
+            self._index_players(game_id, game.player1, game.player2)
+
+    def delete(self, game_id):
+        with self._lock:
+            if game_id not in self.index:
+                return
+            self._append(OP_DELETE, game_id, b'')
+            del self.index[game_id]
+            self._index_players(game_id, None, None)
+
+    def exit_game(self, game_id, player_id):
+        # The engine lock makes load-modify-write atomic
+        with self._lock:
+            super().exit_game(game_id, player_id)
+
+    def record_rounds(self, rows):
+        # History is append-only and never indexed, so it stays out of the segments
+        with self._rounds_lock:
+            rows, seqs = self._new_rounds(rows)
+            if not rows:
+                return
+            lines = "".join(
+                "\t".join(str(value).replace("\t", " ").replace("\n", " ") for value in row) + "\n"
+                for row in rows
+            ).encode()
+            fd = os.open(os.path.join(self.dir, ROUNDS_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines)
+            finally:
+                os.close(fd)
+            self.round_seqs.update(seqs)
+            self._add_stats(rows)
+
+    def _new_rounds(self, rows):
+        """Rounds not in the history yet, and the highest round_seq of each of their rooms
+
+        A room's rounds arrive in sequence order, so a retried Save repeats ones at or below the
+        highest number recorded for the room. round_seq 0 is unknown and always kept.
+        """
+        new = []
+        seqs = {}
+        for row in rows:
+            round_seq = int(row[7]) if len(row) > 7 else 0
+            if round_seq:
+                game_id = row[0]
+                if round_seq <= seqs.get(game_id, self.round_seqs.get(game_id, 0)):
+                    continue
+                seqs[game_id] = round_seq
+            new.append(row)
+        return new, seqs
+
+    def record_bracket(self, tournaments, matches):
+        rows = [("T",) + tuple(row[:9]) + (json.dumps(list(row[9])) if row[9] else "",) for row in tournaments]
+        rows += [("M",) + tuple(row) for row in matches]
+        lines = "".join(
+            "\t".join(str(value).replace("\t", " ").replace("\n", " ") for value in row) + "\n"
+            for row in rows
+        ).encode()
+        with self._rounds_lock:
+            fd = os.open(os.path.join(self.dir, BRACKET_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, lines)
+            finally:
+                os.close(fd)
+
+    def load_tournaments(self):
+        path = os.path.join(self.dir, BRACKET_FILE)
+        tournaments = {}
+        matches = {}
+        with self._rounds_lock:
+            if not os.path.exists(path):
+                return [], []
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                lines = [line.rstrip('\n').split('\t') for line in f if line.endswith('\n')]
+        for fields in lines:
+            if fields[0] == "T" and len(fields) in (9, 11):
+                # Lines from before the roster was stored have no wins_needed and seeds
+                wins_needed, seeds = (int(fields[9]), fields[10]) if len(fields) == 11 else (2, "")
+                previous = tournaments.get(fields[1])
+                if not seeds and previous is not None:
+                    seeds = previous[9]
+                tournaments[fields[1]] = (fields[1], fields[2], int(fields[3]), int(fields[4]),
+                                          int(fields[5]), fields[6], fields[7], int(fields[8]),
+                                          wins_needed, seeds)
+            elif fields[0] == "M" and len(fields) == 11:
+                matches[(fields[1], fields[2], fields[3])] = (
+                    fields[1], int(fields[2]), int(fields[3]), fields[4], fields[5], fields[6],
+                    int(fields[7]), int(fields[8]), fields[9], int(fields[10]))
+        unfinished = [row[:9] + (json.loads(row[9]) if row[9] else [],)
+                      for row in tournaments.values() if row[5] != "finished"]
+        ids = {row[0] for row in unfinished}
+        return unfinished, [row for row in matches.values() if row[0] in ids]
+
+    def load_player_stats(self, after_player_id, limit):
+        with self._rounds_lock:
+            players = sorted(self.stats)
+            start = bisect.bisect_right(players, after_player_id)
+            return [(player,) + tuple(self.stats[player]) for player in players[start:start + limit]]
+
+    def _add_stats(self, rows):
+        for player, wins, losses, draws in stat_deltas(rows):
+            counts = self.stats.setdefault(player, [0, 0, 0])
+            counts[0] += wins
+            counts[1] += losses
+            counts[2] += draws
+
+    def _load_stats(self):
+        """Player totals are derived data: one pass over the round history at startup"""
+        path = os.path.join(self.dir, ROUNDS_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            rows = [line.rstrip('\n').split('\t') for line in f if line.endswith('\n')]
+        # Lines written before round_seq existed have 7 fields
+        rows, self.round_seqs = self._new_rounds([row for row in rows if len(row) in (7, 8)])
+        self._add_stats(rows)
+
+    def close(self):
+        # Flipped under the lock: whoever sees running there also sees the active segment open
+        with self._lock:
+            self.running = False
+        self._stopping.set()
+        # A compaction in progress gives up at its next check; after this nothing but us
+        # touches the files
+        for thread in self._threads:
+            thread.join()
+        with self._lock:
+            self._write_snapshot(*self._capture_snapshot())
+            if self.active_fd is not None:
+                os.fsync(self.active_fd)
+                os.close(self.active_fd)
+                self.active_fd = None
+            for fd in self.readers.values():
+                os.close(fd)
+            self.readers = {}
+
+    # ---- Write path ----
+
+    def _append(self, op, game_id, value):
+        if self.active_size >= self.segment_bytes:
+            self._roll_segment()
+
+        key = game_id.encode('utf-8')
+        header_tail = struct.pack('<IBH', len(value), op, len(key))
+        crc = zlib.crc32(header_tail + key + value)
+        record = struct.pack('<I', crc) + header_tail + key + value
+        offset = self.active_size
+
+        # One write() per record keeps appends sequential and atomic for small states
+        os.write(self.active_fd, record)
+        self.active_size += len(record)
+        self.writes_since_snapshot += 1
+        if self.fsync == 'always':
+            os.fsync(self.active_fd)
+        else:
+            self.dirty = True
+
+        return (self.active_id, offset + RECORD_HEADER.size + len(key), len(value))
+
+    def _roll_segment(self):
+        if self.active_fd is not None:
+            os.fsync(self.active_fd)
+            os.close(self.active_fd)
+        self.active_id = self._new_segment_id()
+        path = self._path(self.active_id, LOG_SUFFIX)
+        self.active_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.active_size = os.fstat(self.active_fd).st_size
+        self.files[self.active_id] = path
+
+    def _new_segment_id(self):
+        return max(self.files, default=0) + 1
+
+    def _index_players(self, game_id, player1, player2):
+        for player in self.rooms.pop(game_id, ()):
+            if player and self.players.get(player) == game_id:
+                del self.players[player]
+        if player1 is None and player2 is None:
+            return
+        self.rooms[game_id] = (player1, player2)
+        for player in (player1, player2):
+            if player:
+                self.players[player] = game_id
+
+    # ---- Read path ----
+
+    def _read(self, location):
+        segment_id, offset, size = location
+        fd = self.readers.get(segment_id)
+        if fd is None:
+            fd = os.open(self.files[segment_id], os.O_RDONLY)
+            self.readers[segment_id] = fd
+        return os.pread(fd, size, offset)
+
+    def _path(self, segment_id, suffix):
+        return os.path.join(self.dir, f"{segment_id:08d}{suffix}")
+
+    # ---- Recovery ----
+
+    def _recover(self):
+        """Index = memory-mapped snapshot + replay of the log written after it"""
+        log_segments = []
+        compacted = []
+        for name in os.listdir(self.dir):
+            stem, suffix = os.path.splitext(name)
+            if suffix in (LOG_SUFFIX, COMPACT_SUFFIX) and stem.isdigit():
+                segment_id = int(stem)
+                self.files[segment_id] = os.path.join(self.dir, name)
+                (log_segments if suffix == LOG_SUFFIX else compacted).append(segment_id)
+            elif name.endswith('.tmp'):
+                os.remove(os.path.join(self.dir, name))
+
+        snap_segment, snap_offset = self._load_snapshot()
+
+        # Files a finished compaction made obsolete, or an unfinished one left behind
+        referenced = {location[0] for location in self.index.values()}
+        for segment_id in compacted + [s for s in log_segments if s < snap_segment]:
+            if segment_id not in referenced:
+                os.remove(self.files.pop(segment_id))
+
+        replayed = 0
+        for segment_id in sorted(s for s in log_segments if s >= snap_segment):
+            start = snap_offset if segment_id == snap_segment else 0
+            replayed += self._replay_segment(segment_id, start)
+
+        # Rebuild the player lookup from live values
+        for game_id, location in self.index.items():
+            game = orm_pb2.Game.FromString(self._read(location))
+            self._index_players(game_id, game.player1, game.player2)
+
+        last_log = max(log_segments, default=0)
+        if last_log and last_log in self.files:
+            self.active_id = last_log
+            self.active_fd = os.open(self.files[last_log], os.O_WRONLY | os.O_APPEND)
+            self.active_size = os.fstat(self.active_fd).st_size
+        else:
+            self._roll_segment()
+        return replayed
+
+    def _load_snapshot(self):
+        path = os.path.join(self.dir, SNAPSHOT_FILE)
+        if not os.path.exists(path) or os.path.getsize(path) < len(SNAPSHOT_MAGIC) + SNAPSHOT_HEADER.size:
+            return 0, 0
+
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                    log.warning("Ignoring snapshot with unknown format", path=path)
+                    return 0, 0
+                pos = len(SNAPSHOT_MAGIC)
+                segment, offset, count = SNAPSHOT_HEADER.unpack_from(data, pos)
+                pos += SNAPSHOT_HEADER.size
+                for _ in range(count):
+                    key_len, = struct.unpack_from('<H', data, pos)
+                    pos += 2
+                    game_id = data[pos:pos + key_len].decode('utf-8')
+                    pos += key_len
+                    self.index[game_id] = SNAPSHOT_ENTRY.unpack_from(data, pos)
+                    pos += SNAPSHOT_ENTRY.size
+        return segment, offset
+
+    def _replay_segment(self, segment_id, start):
+        path = self.files[segment_id]
+        size = os.path.getsize(path)
+        replayed = 0
+        good_end = start
+        if size > start:
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    pos = start
+                    while pos + RECORD_HEADER.size <= size:
+                        crc, value_len, op, key_len = RECORD_HEADER.unpack_from(data, pos)
+                        end = pos + RECORD_HEADER.size + key_len + value_len
+                        if end > size or zlib.crc32(data[pos + 4:end]) != crc:
+                            break
+                        key_start = pos + RECORD_HEADER.size
+                        game_id = data[key_start:key_start + key_len].decode('utf-8')
+                        if op == OP_PUT:
+                            self.index[game_id] = (segment_id, key_start + key_len, value_len)
+                        else:
+                            self.index.pop(game_id, None)
+                        replayed += 1
+                        pos = good_end = end
+
+        if good_end < size:
+            # Torn write from a crash: drop the partial record
+            log.warning("Truncating torn tail", path=path, bytes=size - good_end)
+            os.truncate(path, good_end)
+        return replayed
+
+    # ---- Snapshots and compaction ----
+
+    def _capture_snapshot(self):
+        """Copy the index and the log position it covers (call under the lock)"""
+        return dict(self.index), self.active_id, self.active_size
+
+    def _write_snapshot(self, index, segment, offset):
+        path = os.path.join(self.dir, SNAPSHOT_FILE)
+        tmp = path + '.tmp'
+        parts = [SNAPSHOT_MAGIC, SNAPSHOT_HEADER.pack(segment, offset, len(index))]
+        for game_id, location in index.items():
+            key = game_id.encode('utf-8')
+            parts.append(struct.pack('<H', len(key)))
+            parts.append(key)
+            parts.append(SNAPSHOT_ENTRY.pack(*location))
+        with open(tmp, 'wb') as f:
+            f.write(b''.join(parts))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def snapshot(self):
+        """Persist the index so recovery only replays the log written after this point"""
+        with self._lock:
+            if not self.running:
+                return
+            os.fsync(self.active_fd)
+            self.dirty = False
+            captured = self._capture_snapshot()
+            self.writes_since_snapshot = 0
+        self._write_snapshot(*captured)
+
+    def compact(self):
+        """Rewrite live values of sealed segments into one compacted file"""
+        with self._lock:
+            if not self.running:
+                return False
+            sealed = [s for s in self.files if s != self.active_id]
+            if len(sealed) < self.compact_min_segments:
+                return False
+            sealed_set = set(sealed)
+            live = [(game_id, location) for game_id, location in self.index.items()
+                    if location[0] in sealed_set]
+            target_id = self._new_segment_id()
+            # Reserve the id so a segment roll does not reuse it
+            self.files[target_id] = self._path(target_id, COMPACT_SUFFIX)
+
+        tmp = self._path(target_id, COMPACT_SUFFIX) + '.tmp'
+        try:
+            moved = self._copy_live(live, target_id, tmp)
+        except Exception:
+            self._abandon_compaction(target_id, tmp)
+            raise
+
+        with self._lock:
+            if moved is None or not self.running:
+                # Closed meanwhile: the log is as it was, and its snapshot is close()'s to write
+                self._abandon_compaction(target_id, tmp)
+                return False
+            for game_id, (old, new) in moved.items():
+                # Keep writes that landed while we were copying
+                if self.index.get(game_id) == old:
+                    self.index[game_id] = new
+            captured = self._capture_snapshot()
+            self.writes_since_snapshot = 0
+            os.fsync(self.active_fd)
+
+        # The new snapshot is the commit point; only then are the old files garbage
+        self._write_snapshot(*captured)
+        with self._lock:
+            for segment_id in sealed:
+                fd = self.readers.pop(segment_id, None)
+                if fd is not None:
+                    os.close(fd)
+                os.remove(self.files.pop(segment_id))
+        log.info("Compacted", segments=len(sealed), live=len(live))
+        return True
+
+    def _abandon_compaction(self, target_id, tmp):
+        with self._lock:
+            path = self.files.pop(target_id, None)
+        for leftover in (tmp, path):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+
+    def _copy_live(self, live, target_id, tmp):
+        """Write live records to tmp and move it into place; None if the engine closed meanwhile"""
+        moved = {}
+        with open(tmp, 'wb') as out:
+            offset = 0
+            for game_id, location in live:
+                with self._lock:
+                    if not self.running:
+                        return None
+                    value = self._read(location)
+                key = game_id.encode('utf-8')
+                header_tail = struct.pack('<IBH', len(value), OP_PUT, len(key))
+                record = struct.pack('<I', zlib.crc32(header_tail + key + value)) + header_tail + key + value
+                out.write(record)
+                moved[game_id] = (location, (target_id, offset + RECORD_HEADER.size + len(key), len(value)))
+                offset += len(record)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self._path(target_id, COMPACT_SUFFIX))
+        return moved
+
+    def _flush_loop(self):
+        while not self._stopping.wait(self.fsync_interval):
+            with self._lock:
+                if self.dirty and self.running:
+                    os.fsync(self.active_fd)
+                    self.dirty = False
+
+    def _maintenance_loop(self):
+        while not self._stopping.wait(self.snapshot_interval):
+            try:
+                if not self.compact() and self.writes_since_snapshot:
+                    self.snapshot()
+            except Exception as e:
+                log.error("Maintenance failed", error=e)
@@ -0,0 +1,333 @@
+"""
+Numbered schema migrations for the PostgreSQL engine.
+
+Applied versions are recorded in schema_migrations. The runner holds an advisory lock,
+so several ORM instances starting at once apply each migration exactly once; the others
+wait, then find nothing left to do.
+
+Run from rps_game/:
+  python -m orm_service.migrations            apply pending migrations
+  python -m orm_service.migrations --status   list applied and pending versions
+  python -m orm_service.migrations --bloat    table and index bloat report
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.logs import get_logger
+
+log = get_logger("Migrations")
+
+# pg_advisory_lock key shared by every ORM instance of this schema
+MIGRATION_LOCK = 0x525053  # "RPS"
+
+# (version, name, statements); every migration runs in one transaction, so it applies fully or not at all
+MIGRATIONS = [
+    (1, "initial schema", [
+        # IF NOT EXISTS everywhere: databases created by the old db_init adopt this version as is
+        """CREATE TABLE IF NOT EXISTS games (
+               game_id VARCHAR(50) PRIMARY KEY,
+               player1 VARCHAR(100),
+               player2 VARCHAR(100),
+               player1_choice VARCHAR(20),
+               player2_choice VARCHAR(20),
+               status VARCHAR(20),
+               player1_score INTEGER DEFAULT 0,
+               player2_score INTEGER DEFAULT 0
+           )""",
+        # Append-only round history, filled in batches with COPY
+        """CREATE TABLE IF NOT EXISTS rounds (
+               game_id VARCHAR(50) NOT NULL,
+               player1 VARCHAR(100),
+               player2 VARCHAR(100),
+               player1_choice VARCHAR(20),
+               player2_choice VARCHAR(20),
+               outcome VARCHAR(20),
+               played_at TIMESTAMPTZ NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS rounds_game_idx ON rounds (game_id, played_at)",
+        # Rows arrive in time order, so a BRIN index covers time ranges at almost no write cost
+        "CREATE INDEX IF NOT EXISTS rounds_played_at_brin ON rounds USING brin (played_at)",
+        # Running per-player totals, updated with every history batch
+        """CREATE TABLE IF NOT EXISTS player_stats (
+               player_id VARCHAR(100) PRIMARY KEY,
+               wins INTEGER NOT NULL DEFAULT 0,
+               losses INTEGER NOT NULL DEFAULT 0,
+               draws INTEGER NOT NULL DEFAULT 0
+           )""",
+        # Matches the leaderboard order, so top-K is an index scan
+        "CREATE INDEX IF NOT EXISTS player_stats_rank_idx ON player_stats (wins DESC, losses, player_id)",
+        # Tournament brackets, written in batches by the game server
+        """CREATE TABLE IF NOT EXISTS tournaments (
+               tournament_id VARCHAR(100) PRIMARY KEY,
+               format VARCHAR(30) NOT NULL,
+               players INTEGER NOT NULL,
+               rounds INTEGER NOT NULL,
+               round INTEGER NOT NULL,
+               status VARCHAR(20) NOT NULL,
+               champion VARCHAR(100),
+               updated_at TIMESTAMPTZ NOT NULL
+           )""",
+        """CREATE TABLE IF NOT EXISTS tournament_matches (
+               tournament_id VARCHAR(100) NOT NULL,
+               round INTEGER NOT NULL,
+               slot INTEGER NOT NULL,
+               room_id VARCHAR(50),
+               player1 VARCHAR(100),
+               player2 VARCHAR(100),
+               player1_wins INTEGER NOT NULL,
+               player2_wins INTEGER NOT NULL,
+               winner VARCHAR(100),
+               finished_at TIMESTAMPTZ NOT NULL,
+               PRIMARY KEY (tournament_id, round, slot)
+           )""",
+    ]),
+    (2, "games tuned for frequent small updates", [
+        # A move rewrites choices, status and scores. None of them is indexed, and with
+        # 30% of every page left free the new row version fits next to the old one: a HOT
+        # update, with no index entries to add and nothing for VACUUM to clean in indexes.
+        # Choices and status come from a fixed vocabulary: a 4-byte enum instead of a string.
+        "CREATE TYPE rps_choice AS ENUM ('waiting', 'rock', 'paper', 'scissors')",
+        "CREATE TYPE rps_status AS ENUM ('waiting', 'ready', 'player1_won', 'player2_won', 'draw')",
+        "LOCK TABLE games IN ACCESS EXCLUSIVE MODE",
+        # Rebuilt rather than altered: fillfactor only applies to pages written after it is set,
+        # and the rebuild also puts the fixed-width columns first so rows carry no padding
+        """CREATE TABLE games_new (
+               game_id VARCHAR(50) NOT NULL,
+               player1_score INTEGER NOT NULL DEFAULT 0,
+               player2_score INTEGER NOT NULL DEFAULT 0,
+               player1_choice rps_choice,
+               player2_choice rps_choice,
+               status rps_status,
+               player1 VARCHAR(100) NOT NULL DEFAULT '',
+               player2 VARCHAR(100) NOT NULL DEFAULT ''
+           ) WITH (fillfactor = 70, autovacuum_vacuum_scale_factor = 0.05)""",
+        """INSERT INTO games_new
+           SELECT game_id,
+                  COALESCE(player1_score, 0), COALESCE(player2_score, 0),
+                  NULLIF(player1_choice, '')::rps_choice, NULLIF(player2_choice, '')::rps_choice,
+                  NULLIF(status, '')::rps_status,
+                  COALESCE(player1, ''), COALESCE(player2, '')
+           FROM games""",
+        "DROP TABLE games",
+        "ALTER TABLE games_new RENAME TO games",
+        "ALTER TABLE games ADD CONSTRAINT games_pkey PRIMARY KEY (game_id)",
+        # CheckSession looks players up by name; it used to scan the whole table. Names only
+        # change on join and exit, so these indexes do not stop moves from being HOT.
+        "CREATE INDEX games_player1_idx ON games (player1)",
+        "CREATE INDEX games_player2_idx ON games (player2)",
+        # Leaderboard totals change with every history batch; leave room for HOT there too
+        "ALTER TABLE player_stats SET (fillfactor = 80)",
+    ]),
+    (3, "games change feed", [
+        # Every committed change to a room is sent to LISTEN rps_games, whoever made it
+        """CREATE FUNCTION rps_games_changed() RETURNS trigger LANGUAGE plpgsql AS $$
+           BEGIN
+               IF TG_OP = 'DELETE' THEN
+                   PERFORM pg_notify('rps_games', json_build_object('op', 'delete', 'game_id', OLD.game_id)::text);
+               ELSE
+                   PERFORM pg_notify('rps_games', json_build_object('op', 'upsert', 'game', row_to_json(NEW))::text);
+               END IF;
+               RETURN NULL;
+           END
+           $$""",
+        """CREATE TRIGGER games_changed AFTER INSERT OR DELETE ON games
+           FOR EACH ROW EXECUTE FUNCTION rps_games_changed()""",
+        # An upsert that rewrites the same values changes nothing anyone needs to hear about
+        """CREATE TRIGGER games_updated AFTER UPDATE ON games
+           FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) EXECUTE FUNCTION rps_games_changed()""",
+    ]),
+    (4, "idempotent round history", [
+        # A Save retried after a commit it never heard back from carries the same rounds again;
+        # their sequence number lets the history keep one copy and count it once
+        "ALTER TABLE games ADD COLUMN round_seq BIGINT NOT NULL DEFAULT 0",
+        "ALTER TABLE rounds ADD COLUMN round_seq BIGINT",
+        # Rows from before this migration have no number; NULLs never conflict
+        "CREATE UNIQUE INDEX rounds_game_seq_idx ON rounds (game_id, round_seq)",
+    ]),
+    (5, "resumable tournaments", [
+        # With the roster and the stored results a new leader replays the bracket and goes on
+        "ALTER TABLE tournaments ADD COLUMN wins_needed INTEGER NOT NULL DEFAULT 2",
+        "ALTER TABLE tournaments ADD COLUMN seeds JSONB",
+        "CREATE INDEX tournaments_unfinished_idx ON tournaments (tournament_id) WHERE status <> 'finished'",
+    ]),
+]
+
+def connect(db_config):
+    return psycopg2.connect(
+        host=db_config['host'],
+        port=db_config['port'],
+        user=db_config['user'],
+        password=db_config['password'],
+        database=db_config['database']
+    )
+
+def _applied(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def migrate(db_config):
+    """Apply pending migrations in order; returns the versions applied by this call"""
+    lock_timeout = db_config.get('migrations', {}).get('lock_timeout_s', 5)
+    conn = connect(db_config)
+    conn.autocommit = True
+    cursor = conn.cursor()
+    applied_now = []
+    try:
+        waited = time.monotonic()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK,))
+        waited = time.monotonic() - waited
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+                    duration_ms INTEGER NOT NULL
+                )
+            """)
+            # Read under the lock: another instance may have just applied everything
+            applied = _applied(cursor)
+            for version, name, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                started = time.monotonic()
+                cursor.execute("BEGIN")
+                try:
+                    # Fail instead of queueing every query behind a table lock held by live traffic
+                    cursor.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout * 1000)}ms'")
+                    for statement in statements:
+                        cursor.execute(statement)
+                    duration_ms = int((time.monotonic() - started) * 1000)
+                    cursor.execute(
+                        "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+                        (version, name, duration_ms)
+                    )
+                    cursor.execute("COMMIT")
+                except Exception:
+                    cursor.execute("ROLLBACK")
+                    raise
+                applied_now.append(version)
+                log.info("Applied", version=version, name=name, ms=duration_ms)
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK,))
+        log.info("Schema up to date", version=MIGRATIONS[-1][0], applied=len(applied_now),
+                 lock_wait_ms=round(waited * 1000, 1))
+    finally:
+        cursor.close()
+        conn.close()
+    return applied_now
+
+def status(db_config):
+    """(version, name, applied_at or None) for every known migration"""
+    conn = connect(db_config)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+        applied = {}
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT version, applied_at FROM schema_migrations")
+            applied = dict(cursor.fetchall())
+        cursor.close()
+    finally:
+        conn.close()
+    return [(version, name, applied.get(version)) for version, name, statements in MIGRATIONS]
+
+def bloat_report(db_config):
+    """Per-table and per-index sizes, dead rows and HOT share; exact figures if pgstattuple is installed"""
+    conn = connect(db_config)
+    conn.autocommit = True
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'")
+        exact = cursor.fetchone() is not None
+
+        cursor.execute("""
+            SELECT s.relname, pg_table_size(s.relid), s.n_live_tup, s.n_dead_tup,
+                   s.n_tup_upd, s.n_tup_hot_upd, c.reloptions, s.last_autovacuum
+            FROM pg_stat_user_tables s JOIN pg_class c ON c.oid = s.relid
+            ORDER BY pg_table_size(s.relid) DESC
+        """)
+        tables = []
+        for name, size, live, dead, updates, hot, options, vacuumed in cursor.fetchall():
+            row = {
+                "table": name,
+                "bytes": size,
+                "live_rows": live,
+                "dead_rows": dead,
+                "dead_pct": round(100.0 * dead / (live + dead), 1) if live + dead else 0.0,
+                "hot_update_pct": round(100.0 * hot / updates, 1) if updates else None,
+                "options": ",".join(options or []),
+                "last_autovacuum": vacuumed,
+            }
+            if exact:
+                cursor.execute("SELECT dead_tuple_percent, free_percent FROM pgstattuple(%s::regclass)", (name,))
+                row["dead_pct"], row["free_pct"] = cursor.fetchone()
+            tables.append(row)
+
+        cursor.execute("""
+            SELECT s.relname, s.indexrelname, pg_relation_size(s.indexrelid), s.idx_scan, a.amname
+            FROM pg_stat_user_indexes s
+            JOIN pg_class c ON c.oid = s.indexrelid
+            JOIN pg_am a ON a.oid = c.relam
+            ORDER BY pg_relation_size(s.indexrelid) DESC
+        """)
+        indexes = []
+        for table, name, size, scans, method in cursor.fetchall():
+            row = {"table": table, "index": name, "bytes": size, "scans": scans}
+            if exact and method == "btree":
+                # A fresh B-tree is ~90% full; much lower means pages emptied by deletes or splits
+                cursor.execute("SELECT avg_leaf_density FROM pgstatindex(%s::regclass)", (name,))
+                row["leaf_density_pct"] = cursor.fetchone()[0]
+            indexes.append(row)
+        cursor.close()
+    finally:
+        conn.close()
+    return tables, indexes, exact
+
+def _size(size):
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024.0
+
+def print_bloat(db_config):
+    tables, indexes, exact = bloat_report(db_config)
+    print("Tables" + ("" if exact else " (estimated from statistics; install pgstattuple for exact figures)"))
+    for row in tables:
+        hot = "-" if row["hot_update_pct"] is None else f"{row['hot_update_pct']}%"
+        free = f"  free {row['free_pct']}%" if "free_pct" in row else ""
+        print(f"  {row['table']:<20} {_size(row['bytes']):>10}  live {row['live_rows']:>9}"
+              f"  dead {row['dead_pct']:>5}%{free}  HOT updates {hot:>6}  {row['options']}")
+    print("Indexes")
+    for row in indexes:
+        density = f"  leaf density {row['leaf_density_pct']}%" if "leaf_density_pct" in row else ""
+        print(f"  {row['index']:<26} {row['table']:<20} {_size(row['bytes']):>10}  scans {row['scans']:>9}{density}")
+
+def main():
+    parser = argparse.ArgumentParser(description='RPS schema migrations')
+    parser.add_argument('--status', action='store_true', help='List applied and pending migrations')
+    parser.add_argument('--bloat', action='store_true', help='Report table and index bloat')
+    args = parser.parse_args()
+
+    with open('config.json', 'r') as f:
+        config = json.load(f)
+    db_config = config['database']
+
+    if args.status:
+        for version, name, applied_at in status(db_config):
+            print(f"  {version:>3}  {'applied ' + str(applied_at) if applied_at else 'pending':<40}  {name}")
+    elif args.bloat:
+        print_bloat(db_config)
+    else:
+        applied = migrate(db_config)
+        print(f"[DB] Applied migrations: {applied or 'none'}")
+
+if __name__ == '__main__':
+    main()
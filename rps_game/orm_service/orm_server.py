@@ -1,13 +1,11 @@
 import grpc
-from concurrent import futures
-import psycopg2
 import json
 import sys
 import os
-import time
 import consul
 import socket
 import argparse
+import time
 from threading import Thread
 
 # Add parent directory to path for imports
@@ -17,7 +15,30 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import protos.orm_pb2 as orm_pb2
 import protos.orm_pb2_grpc as orm_pb2_grpc
 
-from orm_service.db_init import initialize
+from orm_service.migrations import migrate
+from orm_service.storage import create_engine, mask_columns
+from orm_service.round_history import RoundHistory
+from orm_service.change_feed import ChangeFeed
+from common.admission import create_server, READ, WRITE
+from common.admin import AdminServer
+from common.profiling import Profiler, ProfilingInterceptor
+from common.channels import server_options
+from common.logs import get_logger, setup_logging
+from common.leader_election import LeaderElection
+from common.shutdown import GracefulShutdown, drain
+
+log = get_logger("ORM")
+
+# Shed order under overload: lookups before writes that would lose player progress
+METHOD_PRIORITIES = {
+    "CheckSession": READ,
+    "Load": READ,
+    "Save": WRITE,
+    "ExitGame": WRITE,
+    "LoadPlayerStats": READ,
+    "SaveBracket": WRITE,
+    "LoadTournaments": READ,
+}
 
 def get_local_ip():
     """Get local IP address"""
@@ -30,189 +51,176 @@ def get_local_ip():
     except:
         return "127.0.0.1"
 
+def database_unavailable(context, error):
+    """Answer a handler's database failure with UNAVAILABLE
+
+    A failed query says the storage is down or overloaded, not that the request was bad.
+    UNAVAILABLE is the code the game servers' retry policy retries and their circuit
+    breaker counts, so they back off instead of treating it as a final answer.
+    """
+    context.set_code(grpc.StatusCode.UNAVAILABLE)
+    context.set_details(str(error))
+
 class OrmService(orm_pb2_grpc.OrmServicer):
-    def __init__(self, config):
+    def __init__(self, config, engine=None):
         self.config = config
-        
-    def get_connection(self):
-        return psycopg2.connect(
-            host=self.config['database']['host'],
-            port=self.config['database']['port'],
-            user=self.config['database']['user'],
-            password=self.config['database']['password'],
-            database=self.config['database']['database']
-        )
+        self.engine = engine or create_engine(config)
+        self.history = RoundHistory(self.engine, config.get('round_history', {}))
+        self.changes = ChangeFeed(self.engine, config.get('change_feed', {}))
     
     def CheckSession(self, request, context):
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT game_id FROM games WHERE player1 = %s OR player2 = %s LIMIT 1",
-                (request.player_id, request.player_id)
-            )
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            game_id = self.engine.find_session(request.player_id)
             
-            if result:
-                return orm_pb2.CheckSessionResponse(exists=True, game_id=result[0])
+            if game_id:
+                return orm_pb2.CheckSessionResponse(exists=True, game_id=game_id)
             else:
                 return orm_pb2.CheckSessionResponse(exists=False, game_id="")
         except Exception as e:
-            print(f"[ORM Error] CheckSession: {e}")
+            log.error("RPC failed", method="CheckSession", player_id=request.player_id, error=e)
+            database_unavailable(context, e)
             return orm_pb2.CheckSessionResponse(exists=False, game_id="")
     
     def ExitGame(self, request, context):
         try:
-            # Load game first
-            load_resp = self.Load(orm_pb2.LoadRequest(game_id=request.game_id), context)
-            
-            if load_resp.success:
-                game = load_resp.game
-                
-                # Remove player
-                if game.player1 == request.player_id:
-                    game.player1 = ""
-                elif game.player2 == request.player_id:
-                    game.player2 = ""
-                
-                # If both players left, delete the game
-                if not game.player1 and not game.player2:
-                    conn = self.get_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("DELETE FROM games WHERE game_id = %s", (request.game_id,))
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
+            # Remove the player and drop an empty room in one transaction
+            self.engine.exit_game(request.game_id, request.player_id)
+            if self.changes.local and self.changes.subscribers:
+                game = self.engine.load(request.game_id)
+                if game is None:
+                    self.changes.publish("delete", request.game_id)
                 else:
-                    # Save updated game
-                    self.Save(orm_pb2.SaveRequest(game=game, game_id=request.game_id), context)
+                    self.changes.publish("upsert", request.game_id, game)
             
             return orm_pb2.ExitGameResponse(success=True)
         except Exception as e:
-            print(f"[ORM Error] ExitGame: {e}")
+            log.error("RPC failed", method="ExitGame", game_id=request.game_id, error=e)
+            database_unavailable(context, e)
             return orm_pb2.ExitGameResponse(success=False)
     
     def Load(self, request, context):
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                """SELECT player1, player2, player1_choice, player2_choice, 
-                   status, player1_score, player2_score 
-                   FROM games WHERE game_id = %s""",
-                (request.game_id,)
-            )
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
+            game = self.engine.load(request.game_id)
             
-            if result:
-                game = orm_pb2.Game(
-                    player1=result[0] or "",
-                    player2=result[1] or "",
-                    player1_choice=result[2] or "",
-                    player2_choice=result[3] or "",
-                    status=result[4] or "",
-                    player1_score=result[5] or 0,
-                    player2_score=result[6] or 0
-                )
+            if game is not None:
                 return orm_pb2.LoadResponse(success=True, game=game)
             else:
                 return orm_pb2.LoadResponse(success=False)
         except Exception as e:
-            print(f"[ORM Error] Load: {e}")
+            log.error("RPC failed", method="Load", game_id=request.game_id, error=e)
+            database_unavailable(context, e)
             return orm_pb2.LoadResponse(success=False)
     
     def Save(self, request, context):
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            try:
+                columns = mask_columns(request.update_mask.paths)
+            except ValueError as e:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(e))
+                return orm_pb2.SaveResponse(success=False)
+            self.engine.save(request.game_id, request.game, columns or None)
+            if self.changes.local:
+                self.changes.publish("upsert", request.game_id, request.game)
+            # Buffered and written in batches, off the Save latency path
+            positions = self.history.append(request.game_id, request.rounds)
             
-            cursor.execute("""
-                INSERT INTO games (game_id, player1, player2, player1_choice, 
-                                   player2_choice, status, player1_score, player2_score)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (game_id) DO UPDATE SET
-                    player1 = EXCLUDED.player1,
-                    player2 = EXCLUDED.player2,
-                    player1_choice = EXCLUDED.player1_choice,
-                    player2_choice = EXCLUDED.player2_choice,
-                    status = EXCLUDED.status,
-                    player1_score = EXCLUDED.player1_score,
-                    player2_score = EXCLUDED.player2_score
-            """, (
-                request.game_id,
-                request.game.player1,
-                request.game.player2,
-                request.game.player1_choice,
-                request.game.player2_choice,
-                request.game.status,
-                request.game.player1_score,
-                request.game.player2_score
-            ))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return orm_pb2.SaveResponse(success=True)
+            return orm_pb2.SaveResponse(
+                success=True, history_id=self.history.history_id, round_positions=positions
+            )
         except Exception as e:
-            print(f"[ORM Error] Save: {e}")
+            log.error("RPC failed", method="Save", game_id=request.game_id, error=e)
+            database_unavailable(context, e)
             return orm_pb2.SaveResponse(success=False)
 
-def leader_election_loop(consul_client, service_id, my_url, config):
-    """Consul leader election loop"""
-    leader_key = "service/rps-orm/leader"
-    
-    while True:
-        session_id = None
+    def Subscribe(self, request, context):
+        """Stream every change to a room until the caller or this server goes away"""
+        subscriber = self.changes.subscribe()
+        if subscriber is None:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, "Too many subscribers")
+        return self.changes.stream(subscriber, context)
+
+    def LoadPlayerStats(self, request, context):
         try:
-            # Create session
-            session_id = consul_client.session.create(
-                name=f"orm-leader-{config['orm']['port']}",
-                ttl=10,
-                lock_delay=0,
-                behavior='delete'
+            # Read between history batches, so the caller knows which of its rounds the totals have
+            rows, position = self.history.snapshot(
+                lambda: self.engine.load_player_stats(request.after_player_id, request.limit or 1000)
             )
-            
-            # Try to acquire leadership
-            acquired = consul_client.kv.put(
-                leader_key,
-                my_url,
-                acquire=session_id
+            return orm_pb2.PlayerStatsResponse(
+                stats=[
+                    orm_pb2.PlayerStats(player_id=player_id, wins=wins, losses=losses, draws=draws)
+                    for player_id, wins, losses, draws in rows
+                ],
+                history_id=self.history.history_id,
+                history_position=position
             )
-            
-            if acquired:
-                print(f"[{time.strftime('%H:%M:%S')}] [Leader] I am the ORM LEADER")
-                
-                # Maintain leadership
-                while True:
-                    try:
-                        consul_client.session.renew(session_id)
-                        time.sleep(1)
-                        
-                        # Check if still leader
-                        index, data = consul_client.kv.get(leader_key)
-                        if not data or data.get('Session') != session_id:
-                            print(f"[{time.strftime('%H:%M:%S')}] [Leader] Leadership LOST")
-                            break
-                    except:
-                        break
-            else:
-                # Not leader, wait
-                time.sleep(1)
-                
         except Exception as e:
-            print(f"[Leader Election Error] {e}")
-            time.sleep(2)
-        finally:
-            if session_id:
-                try:
-                    consul_client.session.destroy(session_id)
-                except:
-                    pass
+            log.error("RPC failed", method="LoadPlayerStats", after=request.after_player_id, error=e)
+            database_unavailable(context, e)
+            return orm_pb2.PlayerStatsResponse()
+
+    def SaveBracket(self, request, context):
+        try:
+            self.engine.record_bracket(
+                [(t.tournament_id, t.format, t.players, t.rounds, t.round, t.status,
+                  t.champion, t.updated_at_ms, t.wins_needed, list(t.seeds)) for t in request.tournaments],
+                [(m.tournament_id, m.round, m.slot, m.room_id, m.player1, m.player2,
+                  m.player1_wins, m.player2_wins, m.winner, m.finished_at_ms) for m in request.matches]
+            )
+            return orm_pb2.SaveResponse(success=True)
+        except Exception as e:
+            log.error("RPC failed", method="SaveBracket", matches=len(request.matches), error=e)
+            database_unavailable(context, e)
+            return orm_pb2.SaveResponse(success=False)
+
+    def LoadTournaments(self, request, context):
+        try:
+            tournaments, matches = self.engine.load_tournaments()
+            return orm_pb2.BracketBatch(
+                tournaments=[
+                    orm_pb2.TournamentRecord(
+                        tournament_id=tournament_id, format=format, players=players, rounds=rounds,
+                        round=round, status=status, champion=champion or "", updated_at_ms=updated_at_ms,
+                        wins_needed=wins_needed, seeds=seeds
+                    )
+                    for (tournament_id, format, players, rounds, round, status, champion,
+                         updated_at_ms, wins_needed, seeds) in tournaments
+                ],
+                matches=[
+                    orm_pb2.MatchRecord(
+                        tournament_id=tournament_id, round=round, slot=slot, room_id=room_id or "",
+                        player1=player1 or "", player2=player2 or "", player1_wins=wins1,
+                        player2_wins=wins2, winner=winner or "", finished_at_ms=finished_at_ms
+                    )
+                    for (tournament_id, round, slot, room_id, player1, player2,
+                         wins1, wins2, winner, finished_at_ms) in matches
+                ]
+            )
+        except Exception as e:
+            log.error("RPC failed", method="LoadTournaments", error=e)
+            database_unavailable(context, e)
+            return orm_pb2.BracketBatch()
+
+def apply_migrations(db_config):
+    """Migrate now, or keep retrying in the background while the database is unreachable"""
+    migrations_config = db_config.get('migrations', {})
+    if not migrations_config.get('run_on_start', True):
+        return
+    
+    def attempt():
+        try:
+            migrate(db_config)
+            return True
+        except Exception as e:
+            log.error("Migrations failed", error=e)
+            return False
+    
+    def retry():
+        while not attempt():
+            time.sleep(migrations_config.get('retry_s', 5))
+    
+    if not attempt():
+        Thread(target=retry, daemon=True).start()
 
 def serve():
     # Parse command line arguments
@@ -220,6 +228,8 @@ def serve():
     parser.add_argument('--port', type=int, help='Port to run the server on')
     parser.add_argument('--consul-host', type=str, help='Consul host address')
     parser.add_argument('--consul-port', type=int, help='Consul port')
+    parser.add_argument('--admin-port', type=int, help='Port for the admin HTTP endpoint (0 disables)')
+    parser.add_argument('--engine', choices=['postgres', 'sqlite', 'log'], help='Storage engine')
     args = parser.parse_args()
     
     # Load config
@@ -233,9 +243,16 @@ def serve():
         config['consul']['host'] = args.consul_host
     if args.consul_port:
         config['consul']['port'] = args.consul_port
+    if args.admin_port is not None:
+        config['orm']['admin_port'] = args.admin_port
+    if args.engine:
+        config['database']['engine'] = args.engine
     
-    # Initialize database
-    #initialize()
+    logs = setup_logging("rps-orm", config.get('logging', {}))
+    
+    # Bring the schema up to date before statements are prepared against it
+    if config['database'].get('engine', 'postgres') == 'postgres':
+        apply_migrations(config['database'])
     
     # Get local IP and port
     host_ip = get_local_ip()
@@ -246,22 +263,49 @@ def serve():
     print(f"  - Port: {port}")
     print(f"  - Consul: {config['consul']['host']}:{config['consul']['port']}")
     
+    engine = create_engine(config)
+    print(f"  - Storage: {engine.name}")
+    
+    # Handlers are profiled on demand through the admin endpoint, so only wrap them when it is on
+    profiler = Profiler("rps-orm", config.get('profiling', {}))
+    profiling = [ProfilingInterceptor(profiler)] if config['orm'].get('admin_port') else []
+    
     # Create gRPC server
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
-    orm_pb2_grpc.add_OrmServicer_to_server(OrmService(config), server)
+    server, limiter = create_server(
+        config['orm'], config.get('admission', {}), METHOD_PRIORITIES,
+        stream_workers=config.get('change_feed', {}).get('max_subscribers', 64),
+        options=server_options(config.get('channels', {})),
+        interceptors=profiling
+    )
+    servicer = OrmService(config, engine)
+    orm_pb2_grpc.add_OrmServicer_to_server(servicer, server)
     server.add_insecure_port(f'[::]:{port}')
     server.start()
     
-    print(f"[ORM Server] Started on {my_url}")
+    log.info("Started", url=my_url)
     
     # Connect to Consul
+    consul_host = config['consul']['host']
+    consul_port = config['consul']['port']
+    consul_client = consul.Consul(host=consul_host, port=consul_port)
+    election = LeaderElection(
+        consul_client, "service/rps-orm/leader", my_url, f"orm-leader-{port}", config.get('election', {})
+    )
+    
+    if config['orm'].get('admin_port'):
+        admin = AdminServer(config['orm']['admin_port'], "rps-orm")
+        admin.add_metrics(limiter.metrics)
+        admin.add_metrics(engine.metrics)
+        admin.add_metrics(servicer.history.metrics)
+        admin.add_metrics(servicer.changes.metrics)
+        admin.add_metrics(election.metrics)
+        admin.add_metrics(logs.metrics)
+        profiler.register(admin)
+        admin.start()
+    
+    service_id = f"rps-orm-{port}"
     try:
-        consul_host = config['consul']['host']
-        consul_port = config['consul']['port']
-        consul_client = consul.Consul(host=consul_host, port=consul_port)
-        
         # Register service
-        service_id = f"rps-orm-{port}"
         consul_client.agent.service.register(
             name="rps-orm-service",
             service_id=service_id,
@@ -270,19 +314,24 @@ def serve():
             check=consul.Check.tcp(host_ip, port, interval="2s")
         )
         
-        print(f"[Consul] Registered as {service_id}")
+        log.info("Registered in Consul", service_id=service_id)
         
         # Start leader election in background
-        Thread(target=leader_election_loop, args=(consul_client, service_id, my_url, config), daemon=True).start()
+        election.start()
         
     except Exception as e:
-        print(f"[Consul Error] {e}")
+        log.error("Consul registration failed", error=e)
     
-    try:
-        server.wait_for_termination()
-    except KeyboardInterrupt:
-        print("[ORM Server] Shutting down...")
-        server.stop(0)
+    # The lock goes first so game servers switch to a standby while we finish what we have
+    shutdown = GracefulShutdown(config.get('shutdown', {}))
+    shutdown.add_step("release leader lock", election.stop)
+    shutdown.add_step("deregister", lambda: consul_client.agent.service.deregister(service_id))
+    shutdown.add_step("close change feed", servicer.changes.close)
+    shutdown.add_step("drain RPCs", lambda: drain(server, shutdown.drain_timeout))
+    shutdown.add_step("flush round history", servicer.history.close)
+    shutdown.add_step("close storage", engine.close)
+    shutdown.install()
+    shutdown.wait()
 
 if __name__ == '__main__':
     serve()
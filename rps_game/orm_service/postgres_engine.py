@@ -0,0 +1,486 @@
+import io
+import json
+import re
+import select
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+import protos.orm_pb2 as orm_pb2
+
+from orm_service.storage import StorageEngine, GAME_FIELDS, stat_deltas
+
+# Statements every pooled connection prepares once and then runs by name
+STATEMENTS = {
+    "rps_check_session": (
+        "(text)",
+        "SELECT game_id FROM games WHERE player1 = $1 OR player2 = $1 LIMIT 1"
+    ),
+    "rps_load": (
+        "(text)",
+        """SELECT player1, player2, player1_choice, player2_choice,
+           status, player1_score, player2_score, round_seq
+           FROM games WHERE game_id = $1"""
+    ),
+    # Choices and status are enums since migration 2; an empty string is stored as NULL
+    "rps_save": (
+        "(text, text, text, text, text, text, integer, integer, bigint)",
+        """INSERT INTO games (game_id, player1, player2, player1_choice,
+                              player2_choice, status, player1_score, player2_score, round_seq)
+           VALUES ($1, $2, $3, NULLIF($4, '')::rps_choice, NULLIF($5, '')::rps_choice,
+                   NULLIF($6, '')::rps_status, $7, $8, $9)
+           ON CONFLICT (game_id) DO UPDATE SET
+               player1 = EXCLUDED.player1,
+               player2 = EXCLUDED.player2,
+               player1_choice = EXCLUDED.player1_choice,
+               player2_choice = EXCLUDED.player2_choice,
+               status = EXCLUDED.status,
+               player1_score = EXCLUDED.player1_score,
+               player2_score = EXCLUDED.player2_score,
+               round_seq = EXCLUDED.round_seq"""
+    ),
+    "rps_delete": (
+        "(text)",
+        "DELETE FROM games WHERE game_id = $1"
+    ),
+    # One statement, one round trip: the room is either deleted (last player left)
+    # or updated, never both. Under concurrent joins the row lock makes PostgreSQL
+    # re-check the DELETE condition against the joined row, so the join is kept.
+    "rps_exit_game": (
+        "(text, text)",
+        """WITH removed AS (
+               DELETE FROM games
+               WHERE game_id = $1
+                 AND COALESCE(CASE WHEN player1 = $2 THEN '' ELSE player1 END, '') = ''
+                 AND COALESCE(CASE WHEN player1 = $2 THEN player2
+                                   WHEN player2 = $2 THEN '' ELSE player2 END, '') = ''
+               RETURNING game_id
+           )
+           UPDATE games SET
+               player1 = CASE WHEN player1 = $2 THEN '' ELSE player1 END,
+               player2 = CASE WHEN player1 = $2 THEN player2
+                              WHEN player2 = $2 THEN '' ELSE player2 END
+           WHERE game_id = $1 AND NOT EXISTS (SELECT 1 FROM removed)"""
+    ),
+    # Whole batch of per-player increments in one statement
+    "rps_add_stats": (
+        "(text[], integer[], integer[], integer[])",
+        """INSERT INTO player_stats (player_id, wins, losses, draws)
+           SELECT * FROM unnest($1::text[], $2::integer[], $3::integer[], $4::integer[])
+           ON CONFLICT (player_id) DO UPDATE SET
+               wins = player_stats.wins + EXCLUDED.wins,
+               losses = player_stats.losses + EXCLUDED.losses,
+               draws = player_stats.draws + EXCLUDED.draws"""
+    ),
+    "rps_load_stats": (
+        "(text, integer)",
+        """SELECT player_id, wins, losses, draws FROM player_stats
+           WHERE player_id > $1 ORDER BY player_id LIMIT $2"""
+    ),
+    # Bracket batches arrive as column arrays; upserts make a retried batch harmless
+    "rps_save_tournaments": (
+        "(text[], text[], integer[], integer[], integer[], text[], text[], bigint[], integer[], text[])",
+        """INSERT INTO tournaments (tournament_id, format, players, rounds, round,
+                                  status, champion, updated_at, wins_needed, seeds)
+           SELECT t, f, p, n, r, s, c, to_timestamp(ms / 1000.0), w, NULLIF(j, '')::jsonb
+           FROM unnest($1::text[], $2::text[], $3::integer[], $4::integer[], $5::integer[],
+                       $6::text[], $7::text[], $8::bigint[], $9::integer[], $10::text[])
+                AS b(t, f, p, n, r, s, c, ms, w, j)
+           ON CONFLICT (tournament_id) DO UPDATE SET
+               round = EXCLUDED.round,
+               status = EXCLUDED.status,
+               champion = EXCLUDED.champion,
+               updated_at = EXCLUDED.updated_at,
+               seeds = COALESCE(EXCLUDED.seeds, tournaments.seeds)"""
+    ),
+    "rps_load_tournaments": (
+        "",
+        """SELECT tournament_id, format, players, rounds, round, status, champion,
+                  (extract(epoch FROM updated_at) * 1000)::bigint, wins_needed, seeds
+           FROM tournaments WHERE status <> 'finished'"""
+    ),
+    "rps_load_matches": (
+        "(text[])",
+        """SELECT tournament_id, round, slot, room_id, player1, player2, player1_wins,
+                  player2_wins, winner, (extract(epoch FROM finished_at) * 1000)::bigint
+           FROM tournament_matches WHERE tournament_id = ANY($1::text[])"""
+    ),
+    "rps_save_matches": (
+        "(text[], integer[], integer[], text[], text[], text[], integer[], integer[], text[], bigint[])",
+        """INSERT INTO tournament_matches (tournament_id, round, slot, room_id, player1, player2,
+                                         player1_wins, player2_wins, winner, finished_at)
+           SELECT t, r, s, g, p1, p2, w1, w2, w, to_timestamp(ms / 1000.0)
+           FROM unnest($1::text[], $2::integer[], $3::integer[], $4::text[], $5::text[], $6::text[],
+                       $7::integer[], $8::integer[], $9::text[], $10::bigint[])
+                AS b(t, r, s, g, p1, p2, w1, w2, w, ms)
+           ON CONFLICT (tournament_id, round, slot) DO UPDATE SET
+               player1_wins = EXCLUDED.player1_wins,
+               player2_wins = EXCLUDED.player2_wins,
+               winner = EXCLUDED.winner,
+               finished_at = EXCLUDED.finished_at"""
+    ),
+}
+
+# How a partial save writes a column: its parameter type and value expression
+UPDATE_COLUMNS = {
+    "player1": ("text", "{}"),
+    "player2": ("text", "{}"),
+    "player1_choice": ("text", "NULLIF({}, '')::rps_choice"),
+    "player2_choice": ("text", "NULLIF({}, '')::rps_choice"),
+    "status": ("text", "NULLIF({}, '')::rps_status"),
+    "player1_score": ("integer", "{}"),
+    "player2_score": ("integer", "{}"),
+    "round_seq": ("bigint", "{}"),
+}
+
+def update_statement(columns):
+    """Name, parameter types and SQL of the UPDATE that writes only these columns"""
+    bits = sum(1 << GAME_FIELDS.index(column) for column in columns)
+    types = ["text"] + [UPDATE_COLUMNS[column][0] for column in columns]
+    assignments = ", ".join(
+        f"{column} = {UPDATE_COLUMNS[column][1].format(f'${i}')}"
+        for i, column in enumerate(columns, start=2)
+    )
+    return f"rps_update_{bits}", f"({', '.join(types)})", f"UPDATE games SET {assignments} WHERE game_id = $1"
+
+# Filled by the trigger from migration 3 with every committed change to games
+CHANGE_CHANNEL = "rps_games"
+
+def _game_from_row(row):
+    return orm_pb2.Game(
+        player1=row['player1'] or "",
+        player2=row['player2'] or "",
+        player1_choice=row['player1_choice'] or "",
+        player2_choice=row['player2_choice'] or "",
+        status=row['status'] or "",
+        player1_score=row['player1_score'] or 0,
+        player2_score=row['player2_score'] or 0,
+        round_seq=row.get('round_seq') or 0
+    )
+
+ROUND_COLUMNS = "(game_id, player1, player2, player1_choice, player2_choice, outcome, played_at, round_seq)"
+
+# Per-session staging table for a COPYed batch; emptied by every commit
+ROUNDS_BATCH = """CREATE TEMP TABLE IF NOT EXISTS rounds_batch (
+    game_id TEXT, player1 TEXT, player2 TEXT, player1_choice TEXT, player2_choice TEXT,
+    outcome TEXT, played_at TIMESTAMPTZ, round_seq BIGINT
+) ON COMMIT DELETE ROWS"""
+
+# Moves the staged batch into the history. Rounds already there (a retried Save) are skipped;
+# only the rows returned, the new ones, go into the player totals.
+INSERT_ROUNDS = """INSERT INTO rounds (game_id, player1, player2, player1_choice, player2_choice,
+                                outcome, played_at, round_seq)
+    SELECT game_id, player1, player2, player1_choice, player2_choice, outcome, played_at, round_seq
+    FROM rounds_batch
+    ON CONFLICT (game_id, round_seq) DO NOTHING
+    RETURNING game_id, player1, player2, player1_choice, player2_choice, outcome"""
+
+def _copy_field(value):
+    """Escape a value for COPY text format"""
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+def _text_statement(sql):
+    """Numbered parameters -> psycopg2 placeholders plus the parameter order"""
+    order = [int(n) - 1 for n in re.findall(r'\$(\d+)', sql)]
+    return re.sub(r'\$\d+', '%s', sql), order
+
+# Plain-text equivalents, used when prepared statements are switched off
+TEXT_STATEMENTS = {name: _text_statement(sql) for name, (types, sql) in STATEMENTS.items()}
+
+class ConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """Opens connections on demand and keeps them once open
+
+    The stock pool closes every returned connection above minconn, and opens minconn of
+    them up front, which fails while the database is down
+    """
+
+    def __init__(self, maxconn, **kwargs):
+        super().__init__(0, maxconn, **kwargs)
+        self.minconn = maxconn
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Connection that remembers whether its statements are prepared"""
+    prepared = False
+    updates = frozenset()  # Partial-save statements prepared on this connection so far
+
+class PostgresEngine(StorageEngine):
+    """Rooms in the PostgreSQL games table, via a pool of prepared connections"""
+
+    name = "postgres"
+    shared_changes = True
+
+    def __init__(self, db_config):
+        self.db_config = db_config
+        pool_config = db_config.get('pool', {})
+        self.use_prepared = db_config.get('prepared_statements', True)
+        # Start empty so the ORM can come up before the database does
+        self.pool = ConnectionPool(
+            pool_config.get('max', 16),
+            host=db_config['host'],
+            port=db_config['port'],
+            user=db_config['user'],
+            password=db_config['password'],
+            database=db_config['database'],
+            connection_factory=PreparedConnection
+        )
+        self.prepares = 0
+        self.partial_saves = 0
+        self.save_inserts = 0  # Partial saves of a missing row, written whole instead
+        self.updates = {}  # columns -> (name, types, sql, text_sql, order), shared by all connections
+        self._stats_lock = threading.Lock()
+        self._warm_up(pool_config.get('min', 2))
+
+    def _warm_up(self, count):
+        """Open and prepare the first connections ahead of traffic"""
+        conns = []
+        try:
+            for _ in range(count):
+                conns.append(self.pool.getconn())
+                self._prepare(conns[-1])
+        except psycopg2.Error as e:
+            print(f"[DB] Pool warm-up failed, connecting on demand: {e}")
+        finally:
+            for conn in conns:
+                self.pool.putconn(conn, close=bool(conn.closed))
+
+    def get_connection(self):
+        """A fresh unpooled connection, for administrative work"""
+        return psycopg2.connect(
+            host=self.db_config['host'],
+            port=self.db_config['port'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            database=self.db_config['database']
+        )
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection with its statements prepared"""
+        conn = self.pool.getconn()
+        broken = False
+        try:
+            if not conn.prepared:
+                self._prepare(conn)
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            # A dead connection is dropped so the pool opens (and prepares) a new one
+            self.pool.putconn(conn, close=broken or bool(conn.closed))
+
+    def _prepare(self, conn):
+        # Single statements commit on their own: no separate COMMIT round trip
+        conn.autocommit = True
+        if self.use_prepared:
+            cursor = conn.cursor()
+            # A connection whose earlier attempt failed halfway still holds the first statements
+            cursor.execute("DEALLOCATE ALL")
+            for name, (types, sql) in STATEMENTS.items():
+                cursor.execute(f"PREPARE {name} {types} AS {sql}")
+            cursor.close()
+            conn.updates = set()
+            with self._stats_lock:
+                self.prepares += 1
+        conn.prepared = True
+
+    def _execute(self, cursor, name, params):
+        if self.use_prepared:
+            placeholders = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})" if params else f"EXECUTE {name}", params)
+        else:
+            sql, order = TEXT_STATEMENTS[name]
+            cursor.execute(sql, [params[i] for i in order])
+
+    def find_session(self, player_id):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "rps_check_session", (player_id,))
+            result = cursor.fetchone()
+            cursor.close()
+        return result[0] if result else None
+
+    def load(self, game_id):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "rps_load", (game_id,))
+            result = cursor.fetchone()
+            cursor.close()
+
+        if not result:
+            return None
+        return orm_pb2.Game(
+            player1=result[0] or "",
+            player2=result[1] or "",
+            player1_choice=result[2] or "",
+            player2_choice=result[3] or "",
+            status=result[4] or "",
+            player1_score=result[5] or 0,
+            player2_score=result[6] or 0,
+            round_seq=result[7] or 0
+        )
+
+    def _update(self, conn, cursor, columns, params):
+        """Run the cached UPDATE for these columns, preparing it on this connection first"""
+        statement = self.updates.get(columns)
+        if statement is None:
+            name, types, sql = update_statement(columns)
+            statement = self.updates.setdefault(columns, (name, types, sql) + _text_statement(sql))
+        name, types, sql, text_sql, order = statement
+        if self.use_prepared:
+            if name not in conn.updates:
+                cursor.execute(f"PREPARE {name} {types} AS {sql}")
+                conn.updates.add(name)
+            placeholders = ", ".join(["%s"] * len(params))
+            cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cursor.execute(text_sql, [params[i] for i in order])
+        return cursor.rowcount
+
+    def save(self, game_id, game, columns=None):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if columns:
+                # Unchanged columns are not rewritten, so a move touches no indexed value
+                params = [game_id] + [getattr(game, column) for column in columns]
+                updated = self._update(conn, cursor, columns, params)
+                with self._stats_lock:
+                    self.partial_saves += 1
+                    self.save_inserts += 0 if updated else 1
+                if updated:
+                    cursor.close()
+                    return
+            self._execute(cursor, "rps_save", (
+                game_id,
+                game.player1,
+                game.player2,
+                game.player1_choice,
+                game.player2_choice,
+                game.status,
+                game.player1_score,
+                game.player2_score,
+                game.round_seq
+            ))
+            cursor.close()
+
+    def delete(self, game_id):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "rps_delete", (game_id,))
+            cursor.close()
+
+    def exit_game(self, game_id, player_id):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "rps_exit_game", (game_id, player_id))
+            cursor.close()
+
+    def record_rounds(self, rows):
+        # COPY streams the whole batch in one statement, far cheaper than row-wise INSERTs
+        buffer = io.StringIO()
+        for row in rows:
+            played_at = datetime.fromtimestamp(row[6] / 1000.0, timezone.utc).isoformat()
+            round_seq = str(row[7]) if row[7] else "\\N"
+            buffer.write("\t".join(_copy_field(value) for value in row[:6] + (played_at,)))
+            buffer.write(f"\t{round_seq}\n")
+        buffer.seek(0)
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            # History and totals commit together so a retried batch is never half counted
+            cursor.execute("BEGIN")
+            try:
+                # COPY cannot skip duplicates itself, so the batch lands in a staging table first
+                cursor.execute(ROUNDS_BATCH)
+                cursor.copy_expert(f"COPY rounds_batch {ROUND_COLUMNS} FROM STDIN", buffer)
+                cursor.execute(INSERT_ROUNDS)
+                deltas = stat_deltas(cursor.fetchall())
+                if deltas:
+                    self._execute(cursor, "rps_add_stats", [list(column) for column in zip(*deltas)])
+                cursor.execute("COMMIT")
+            except Exception:
+                if not conn.closed:
+                    cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+
+    def record_bracket(self, tournaments, matches):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN")
+            try:
+                if tournaments:
+                    # The roster travels as JSON text, '' when the record leaves it as stored
+                    rows = [row[:9] + (json.dumps(list(row[9])) if row[9] else "",) for row in tournaments]
+                    self._execute(cursor, "rps_save_tournaments", [list(c) for c in zip(*rows)])
+                if matches:
+                    self._execute(cursor, "rps_save_matches", [list(c) for c in zip(*matches)])
+                cursor.execute("COMMIT")
+            except Exception:
+                if not conn.closed:
+                    cursor.execute("ROLLBACK")
+                raise
+            finally:
+                cursor.close()
+
+    def load_tournaments(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "rps_load_tournaments", [])
+            tournaments = [row[:9] + (row[9] or [],) for row in cursor.fetchall()]
+            matches = []
+            if tournaments:
+                self._execute(cursor, "rps_load_matches", [[row[0] for row in tournaments]])
+                matches = cursor.fetchall()
+            cursor.close()
+        return tournaments, matches
+
+    def load_player_stats(self, after_player_id, limit):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            self._execute(cursor, "rps_load_stats", (after_player_id, limit))
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def listen(self, on_listening, on_change, stopping):
+        # Its own connection: a LISTEN session stays open for as long as the feed runs
+        conn = self.get_connection()
+        conn.autocommit = True
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"LISTEN {CHANGE_CHANNEL}")
+            cursor.close()
+            on_listening()
+            while not stopping.is_set():
+                if not select.select([conn], [], [], 1.0)[0]:
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    change = json.loads(conn.notifies.pop(0).payload)
+                    if change['op'] == "delete":
+                        on_change("delete", change['game_id'], None)
+                    else:
+                        on_change("upsert", change['game']['game_id'], _game_from_row(change['game']))
+        finally:
+            conn.close()
+
+    def metrics(self):
+        return [
+            ("rps_db_statement_prepares_total", {}, self.prepares),
+            ("rps_db_partial_saves_total", {}, self.partial_saves),
+            ("rps_db_partial_save_inserts_total", {}, self.save_inserts),
+            ("rps_db_update_statements", {}, len(self.updates)),
+        ]
+
+    def close(self):
+        self.pool.closeall()
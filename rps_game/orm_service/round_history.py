@@ -0,0 +1,136 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from threading import Thread
+
+from common.logs import get_logger
+
+log = get_logger("RoundHistory")
+
+class RoundHistory:
+    """Buffers round events from Save and appends them to the engine in batches"""
+
+    def __init__(self, engine, history_config):
+        self.engine = engine
+        self.batch_size = history_config.get('batch_size', 1000)
+        self.flush_interval = history_config.get('flush_interval_ms', 200) / 1000.0
+        self.max_pending = history_config.get('max_pending', 100000)
+        self.pending = deque()
+        # Every queued event gets the next position; the ones before appended - len(pending)
+        # are in the engine (or shed). The id tells positions of different processes apart
+        self.history_id = uuid.uuid4().hex
+        self.appended = 0
+        self.latest = OrderedDict()  # game_id -> (highest round_seq, {round_seq: position} of its last Save)
+        self.recorded = 0
+        self.dropped = 0
+        self.batches = 0
+        self.running = True
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def append(self, game_id, rounds):
+        """Queue the RoundEvent messages of one Save; never blocks on the database
+
+        Returns the position of each round, which the position from snapshot() passes once the
+        round is in the engine. Rounds a retried Save sends again keep their first position.
+        """
+        if not rounds:
+            return []
+        positions = []
+        with self._lock:
+            last_seq, queued = self.latest.get(game_id, (0, {}))
+            appended = {}
+            for event in rounds:
+                if event.round_seq and event.round_seq <= last_seq:
+                    positions.append(queued.get(event.round_seq, 0))
+                    continue
+                self.appended += 1
+                positions.append(self.appended)
+                appended[event.round_seq] = self.appended
+                self.pending.append((
+                    game_id,
+                    event.player1,
+                    event.player2,
+                    event.player1_choice,
+                    event.player2_choice,
+                    event.outcome,
+                    event.played_at_ms,
+                    event.round_seq
+                ))
+            if appended:
+                self.latest[game_id] = (max(last_seq, *appended), appended)
+                self.latest.move_to_end(game_id)
+                while len(self.latest) > self.max_pending:
+                    self.latest.popitem(last=False)
+            # Shed the oldest history rather than grow without bound while the database is down
+            while len(self.pending) > self.max_pending:
+                self.pending.popleft()
+                self.dropped += 1
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return positions
+
+    def snapshot(self, read):
+        """Run read() while no batch is being written; returns (result, applied position)
+
+        Events up to the position are in whatever read() saw, later ones are not.
+        """
+        with self._flush_lock:
+            with self._lock:
+                position = self.appended - len(self.pending)
+            return read(), position
+
+    def flush(self):
+        """Write everything queued so far; returns the number of events written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+                if not batch:
+                    return written
+                try:
+                    self.engine.record_rounds(batch)
+                except Exception:
+                    # Put the batch back in order and retry on the next tick
+                    with self._lock:
+                        self.pending.extendleft(reversed(batch))
+                    raise
+                written += len(batch)
+                with self._lock:
+                    self.recorded += len(batch)
+                    self.batches += 1
+
+    def _flush_loop(self):
+        while self.running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("Flush failed", pending=len(self.pending), error=e)
+                time.sleep(self.flush_interval)
+
+    def close(self):
+        """Stop the flusher and write what is left"""
+        self.running = False
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            log.error("Final flush failed", lost=len(self.pending), error=e)
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return [
+            ("rps_round_history_pending", {}, len(self.pending)),
+            ("rps_round_history_recorded_total", {}, self.recorded),
+            ("rps_round_history_dropped_total", {}, self.dropped),
+            ("rps_round_history_batches_total", {}, self.batches),
+        ]
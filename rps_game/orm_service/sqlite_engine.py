@@ -0,0 +1,295 @@
+import json
+import sqlite3
+import threading
+
+import protos.orm_pb2 as orm_pb2
+
+from orm_service.storage import StorageEngine, stat_deltas
+
+# WAL lets readers run alongside the single writer; NORMAL sync is durable across
+# process crashes and only risks the last commits on power loss
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "temp_store": "MEMORY",
+    "cache_size": -16000,  # 16 MB
+    "mmap_size": 268435456,  # 256 MB
+    "busy_timeout": 5000,
+    "wal_autocheckpoint": 1000,
+}
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS games (
+        game_id TEXT PRIMARY KEY,
+        player1 TEXT,
+        player2 TEXT,
+        player1_choice TEXT,
+        player2_choice TEXT,
+        status TEXT,
+        player1_score INTEGER DEFAULT 0,
+        player2_score INTEGER DEFAULT 0,
+        round_seq INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS games_player1 ON games (player1);
+    CREATE INDEX IF NOT EXISTS games_player2 ON games (player2);
+    CREATE TABLE IF NOT EXISTS rounds (
+        game_id TEXT NOT NULL,
+        player1 TEXT,
+        player2 TEXT,
+        player1_choice TEXT,
+        player2_choice TEXT,
+        outcome TEXT,
+        played_at_ms INTEGER NOT NULL,
+        round_seq INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS rounds_game ON rounds (game_id, played_at_ms);
+    CREATE TABLE IF NOT EXISTS player_stats (
+        player_id TEXT PRIMARY KEY,
+        wins INTEGER NOT NULL DEFAULT 0,
+        losses INTEGER NOT NULL DEFAULT 0,
+        draws INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS player_stats_rank ON player_stats (wins DESC, losses, player_id);
+    CREATE TABLE IF NOT EXISTS tournaments (
+        tournament_id TEXT PRIMARY KEY,
+        format TEXT NOT NULL,
+        players INTEGER NOT NULL,
+        rounds INTEGER NOT NULL,
+        round INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        champion TEXT,
+        updated_at_ms INTEGER NOT NULL,
+        wins_needed INTEGER NOT NULL DEFAULT 2,
+        seeds TEXT
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS tournament_matches (
+        tournament_id TEXT NOT NULL,
+        round INTEGER NOT NULL,
+        slot INTEGER NOT NULL,
+        room_id TEXT,
+        player1 TEXT,
+        player2 TEXT,
+        player1_wins INTEGER NOT NULL,
+        player2_wins INTEGER NOT NULL,
+        winner TEXT,
+        finished_at_ms INTEGER NOT NULL,
+        PRIMARY KEY (tournament_id, round, slot)
+    ) WITHOUT ROWID;
+"""
+
+# Columns added after the first release: (table, column, definition), added to older files on open
+ADDED_COLUMNS = [
+    ("games", "round_seq", "INTEGER NOT NULL DEFAULT 0"),
+    ("rounds", "round_seq", "INTEGER"),
+    ("tournaments", "wins_needed", "INTEGER NOT NULL DEFAULT 2"),
+    ("tournaments", "seeds", "TEXT"),  # Players in seed order, JSON
+]
+
+# A retried Save resends its rounds; the history keeps one copy. NULLs (unknown) never conflict.
+ROUNDS_UNIQUE = "CREATE UNIQUE INDEX IF NOT EXISTS rounds_game_seq ON rounds (game_id, round_seq)"
+
+class SqliteEngine(StorageEngine):
+    """Embedded single-node storage, no database server required"""
+
+    name = "sqlite"
+
+    def __init__(self, sqlite_config):
+        self.path = sqlite_config.get('path', 'rps_game.db')
+        self.pragmas = dict(DEFAULT_PRAGMAS, **sqlite_config.get('pragmas', {}))
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.updates = {}  # columns -> UPDATE statement for a partial save
+
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        for table, column, definition in ADDED_COLUMNS:
+            if column not in [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        conn.execute(ROUNDS_UNIQUE)
+
+    def _connection(self):
+        """One connection per worker thread, opened and tuned on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit mode; transactions are opened explicitly where needed
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            for name, value in self.pragmas.items():
+                conn.execute(f"PRAGMA {name} = {value}")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def find_session(self, player_id):
+        row = self._connection().execute(
+            "SELECT game_id FROM games WHERE player1 = ? UNION ALL "
+            "SELECT game_id FROM games WHERE player2 = ? LIMIT 1",
+            (player_id, player_id)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load(self, game_id):
+        row = self._connection().execute(
+            """SELECT player1, player2, player1_choice, player2_choice,
+               status, player1_score, player2_score, round_seq
+               FROM games WHERE game_id = ?""",
+            (game_id,)
+        ).fetchone()
+        if not row:
+            return None
+        return orm_pb2.Game(
+            player1=row[0] or "",
+            player2=row[1] or "",
+            player1_choice=row[2] or "",
+            player2_choice=row[3] or "",
+            status=row[4] or "",
+            player1_score=row[5] or 0,
+            player2_score=row[6] or 0,
+            round_seq=row[7] or 0
+        )
+
+    def save(self, game_id, game, columns=None):
+        conn = self._connection()
+        if columns:
+            values = [getattr(game, column) for column in columns]
+            if conn.execute(self._update_sql(columns), values + [game_id]).rowcount:
+                return
+        conn.execute("""
+            INSERT INTO games (game_id, player1, player2, player1_choice,
+                               player2_choice, status, player1_score, player2_score, round_seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (game_id) DO UPDATE SET
+                player1 = excluded.player1,
+                player2 = excluded.player2,
+                player1_choice = excluded.player1_choice,
+                player2_choice = excluded.player2_choice,
+                status = excluded.status,
+                player1_score = excluded.player1_score,
+                player2_score = excluded.player2_score,
+                round_seq = excluded.round_seq
+        """, (
+            game_id,
+            game.player1,
+            game.player2,
+            game.player1_choice,
+            game.player2_choice,
+            game.status,
+            game.player1_score,
+            game.player2_score,
+            game.round_seq
+        ))
+
+    def _update_sql(self, columns):
+        # One statement text per set of columns, so sqlite3 reuses its compiled statement
+        sql = self.updates.get(columns)
+        if sql is None:
+            assignments = ", ".join(f"{column} = ?" for column in columns)
+            sql = self.updates[columns] = f"UPDATE games SET {assignments} WHERE game_id = ?"
+        return sql
+
+    def delete(self, game_id):
+        self._connection().execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+
+    def exit_game(self, game_id, player_id):
+        conn = self._connection()
+        # IMMEDIATE takes the write lock up front so a concurrent join cannot interleave
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("""
+                UPDATE games SET
+                    player1 = CASE WHEN player1 = ?1 THEN '' ELSE player1 END,
+                    player2 = CASE WHEN player1 = ?1 THEN player2
+                                   WHEN player2 = ?1 THEN '' ELSE player2 END
+                WHERE game_id = ?2
+            """, (player_id, game_id))
+            conn.execute(
+                "DELETE FROM games WHERE game_id = ? "
+                "AND COALESCE(player1, '') = '' AND COALESCE(player2, '') = ''",
+                (game_id,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def record_rounds(self, rows):
+        conn = self._connection()
+        # One transaction per batch: a single WAL commit instead of one per round
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Row by row to learn which rounds are new: only those are added to the totals
+            inserted = []
+            for row in rows:
+                if conn.execute(
+                    "INSERT INTO rounds (game_id, player1, player2, player1_choice, player2_choice, "
+                    "outcome, played_at_ms, round_seq) VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (game_id, round_seq) DO NOTHING",
+                    row[:7] + (row[7] or None,)
+                ).rowcount:
+                    inserted.append(row)
+            conn.executemany(
+                "INSERT INTO player_stats (player_id, wins, losses, draws) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (player_id) DO UPDATE SET wins = wins + excluded.wins, "
+                "losses = losses + excluded.losses, draws = draws + excluded.draws",
+                stat_deltas(inserted)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def record_bracket(self, tournaments, matches):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Upserts by key make a retried batch harmless; a record without seeds keeps the stored ones
+            conn.executemany(
+                "INSERT INTO tournaments (tournament_id, format, players, rounds, round, status, "
+                "champion, updated_at_ms, wins_needed, seeds) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (tournament_id) DO UPDATE SET round = excluded.round, "
+                "status = excluded.status, champion = excluded.champion, "
+                "updated_at_ms = excluded.updated_at_ms, seeds = COALESCE(excluded.seeds, seeds)",
+                [row[:9] + (json.dumps(list(row[9])) if row[9] else None,) for row in tournaments]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO tournament_matches (tournament_id, round, slot, room_id, "
+                "player1, player2, player1_wins, player2_wins, winner, finished_at_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                matches
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def load_tournaments(self):
+        conn = self._connection()
+        tournaments = [
+            row[:9] + (json.loads(row[9]) if row[9] else [],)
+            for row in conn.execute(
+                "SELECT tournament_id, format, players, rounds, round, status, champion, "
+                "updated_at_ms, wins_needed, seeds FROM tournaments WHERE status <> 'finished'"
+            )
+        ]
+        matches = []
+        for row in tournaments:
+            matches.extend(conn.execute(
+                "SELECT tournament_id, round, slot, room_id, player1, player2, player1_wins, "
+                "player2_wins, winner, finished_at_ms FROM tournament_matches WHERE tournament_id = ?",
+                (row[0],)
+            ).fetchall())
+        return tournaments, matches
+
+    def load_player_stats(self, after_player_id, limit):
+        return self._connection().execute(
+            "SELECT player_id, wins, losses, draws FROM player_stats "
+            "WHERE player_id > ? ORDER BY player_id LIMIT ?",
+            (after_player_id, limit)
+        ).fetchall()
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
@@ -0,0 +1,117 @@
+# Columns of a room, in orm_pb2.Game field order; a Save field mask names a subset of them
+GAME_FIELDS = ("player1", "player2", "player1_choice", "player2_choice",
+               "status", "player1_score", "player2_score", "round_seq")
+
+def mask_columns(paths):
+    """Field mask paths -> tuple of columns in GAME_FIELDS order; raises ValueError on unknown paths"""
+    unknown = set(paths) - set(GAME_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown Game fields in update_mask: {sorted(unknown)}")
+    return tuple(field for field in GAME_FIELDS if field in paths)
+
+class StorageEngine:
+    """Storage used by OrmService; rooms are orm_pb2.Game messages keyed by game_id"""
+
+    name = "base"
+    # True if listen() sees changes made by every writer, not just this process
+    shared_changes = False
+
+    def find_session(self, player_id):
+        """Return the game_id the player is in, or None"""
+        raise NotImplementedError
+
+    def load(self, game_id):
+        """Return the stored orm_pb2.Game, or None"""
+        raise NotImplementedError
+
+    def save(self, game_id, game, columns=None):
+        """Insert or replace the room; with columns, write only those of an existing room
+        (a missing room is still inserted whole). Engines that store whole rooms may ignore columns."""
+        raise NotImplementedError
+
+    def delete(self, game_id):
+        """Remove the room"""
+        raise NotImplementedError
+
+    def exit_game(self, game_id, player_id):
+        """Remove the player from the room and drop the room once it is empty"""
+        # Engines override this to do it atomically
+        game = self.load(game_id)
+        if game is None:
+            return
+        if game.player1 == player_id:
+            game.player1 = ""
+        elif game.player2 == player_id:
+            game.player2 = ""
+        if not game.player1 and not game.player2:
+            self.delete(game_id)
+        else:
+            self.save(game_id, game)
+
+    def record_rounds(self, rows):
+        """Append round events: (game_id, player1, player2, player1_choice, player2_choice,
+        outcome, played_at_ms, round_seq) tuples, and add them to player totals. An event whose
+        (game_id, round_seq) is already recorded is skipped and not counted again; round_seq 0
+        is unknown and never matches."""
+        raise NotImplementedError
+
+    def load_player_stats(self, after_player_id, limit):
+        """Up to limit (player_id, wins, losses, draws) rows with player_id > after_player_id, by id"""
+        raise NotImplementedError
+
+    def record_bracket(self, tournaments, matches):
+        """Upsert tournaments: (tournament_id, format, players, rounds, round, status, champion,
+        updated_at_ms, wins_needed, seeds) and finished matches: (tournament_id, round, slot,
+        room_id, player1, player2, player1_wins, player2_wins, winner, finished_at_ms), all in
+        one transaction. seeds is the list of players in seed order, or empty to keep the stored one."""
+        raise NotImplementedError
+
+    def load_tournaments(self):
+        """Unfinished tournaments and their finished matches, as (tournaments, matches) in the
+        tuple shapes of record_bracket"""
+        raise NotImplementedError
+
+    def listen(self, on_listening, on_change, stopping):
+        """Block until stopping is set, calling on_change(op, game_id, game or None) for every
+        committed change to a room; on_listening() once no change can be missed any more"""
+        raise NotImplementedError
+
+    def metrics(self):
+        """Counters for the admin endpoint"""
+        return []
+
+    def close(self):
+        pass
+
+def stat_deltas(rows):
+    """Round events -> sorted list of (player_id, wins, losses, draws) increments"""
+    deltas = {}
+    for row in rows:
+        player1, player2, outcome = row[1], row[2], row[5]
+        if outcome == "draw":
+            results = ((player1, 2), (player2, 2))
+        elif outcome == "player1_won":
+            results = ((player1, 0), (player2, 1))
+        elif outcome == "player2_won":
+            results = ((player1, 1), (player2, 0))
+        else:
+            continue
+        for player, column in results:
+            if player:
+                deltas.setdefault(player, [0, 0, 0])[column] += 1
+    # Sorted so concurrent writers lock rows in the same order
+    return [(player,) + tuple(counts) for player, counts in sorted(deltas.items())]
+
+def create_engine(config):
+    """Build the storage engine selected by database.engine in config.json"""
+    engine = config['database'].get('engine', 'postgres')
+    if engine == 'postgres':
+        from orm_service.postgres_engine import PostgresEngine
+        return PostgresEngine(config['database'])
+    if engine == 'sqlite':
+        from orm_service.sqlite_engine import SqliteEngine
+        return SqliteEngine(config['database'].get('sqlite', {}))
+    if engine == 'log':
+        from orm_service.log_engine import LogEngine
+        return LogEngine(config['database'].get('log', {}))
+    raise ValueError(f"Unknown storage engine: {engine}")
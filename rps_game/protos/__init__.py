@@ -0,0 +1 @@
+# Generated protobuf package
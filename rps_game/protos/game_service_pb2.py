@@ -14,7 +14,7 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x19protos/game_service.proto\x12\x03rps\"!\n\x0c\x43heckRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"0\n\rCheckResponse\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0e\n\x06\x65xists\x18\x02 \x01(\x08\"8\n\rCreateRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x14\n\x0cis_join_only\x18\x02 \x01(\x08\"2\n\x0cStateRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\"A\n\x0bMoveRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\x12\x0e\n\x06\x63hoice\x18\x03 \x01(\t\"1\n\x0b\x45xitRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\"\x1f\n\x0c\x45xitResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\xef\x01\n\x0cGameResponse\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0f\n\x07player1\x18\x02 \x01(\t\x12\x0f\n\x07player2\x18\x03 \x01(\t\x12\x16\n\x0eplayer1_choice\x18\x04 \x01(\t\x12\x16\n\x0eplayer2_choice\x18\x05 \x01(\t\x12\x0e\n\x06status\x18\x06 \x01(\t\x12\x19\n\x11\x63urrent_player_id\x18\x07 \x01(\t\x12\r\n\x05\x65rror\x18\x08 \x01(\t\x12\x15\n\rplayer1_score\x18\t \x01(\x05\x12\x15\n\rplayer2_score\x18\n \x01(\x05\x12\x14\n\x0cround_result\x18\x0b \x01(\t2\xc0\x02\n\x0bGameService\x12\x33\n\nCreateGame\x12\x12.rps.CreateRequest\x1a\x11.rps.GameResponse\x12/\n\x08MakeMove\x12\x10.rps.MoveRequest\x1a\x11.rps.GameResponse\x12\x30\n\x08GetState\x12\x11.rps.StateRequest\x1a\x11.rps.GameResponse\x12\x35\n\x0c\x43heckSession\x12\x11.rps.CheckRequest\x1a\x12.rps.CheckResponse\x12\x31\n\tResetGame\x12\x11.rps.StateRequest\x1a\x11.rps.GameResponse\x12/\n\x08\x45xitGame\x12\x10.rps.ExitRequest\x1a\x11.rps.ExitResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x19protos/game_service.proto\x12\x03rps\"!\n\x0c\x43heckRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"G\n\rCheckResponse\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0e\n\x06\x65xists\x18\x02 \x01(\x08\x12\x15\n\rstate_version\x18\x03 \x01(\x03\"8\n\rCreateRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x14\n\x0cis_join_only\x18\x02 \x01(\x08\"I\n\x0cStateRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\x12\x15\n\rknown_version\x18\x03 \x01(\x03\"A\n\x0bMoveRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\x12\x0e\n\x06\x63hoice\x18\x03 \x01(\t\"1\n\x0b\x45xitRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\"\x1f\n\x0c\x45xitResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\"\n\x0fSpectateRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\"/\n\x12LeaderboardRequest\x12\t\n\x01k\x18\x01 \x01(\x05\x12\x0e\n\x06offset\x18\x02 \x01(\x05\"`\n\x10LeaderboardEntry\x12\x0c\n\x04rank\x18\x01 \x01(\x05\x12\x11\n\tplayer_id\x18\x02 \x01(\t\x12\x0c\n\x04wins\x18\x03 \x01(\x05\x12\x0e\n\x06losses\x18\x04 \x01(\x05\x12\r\n\x05\x64raws\x18\x05 \x01(\x05\"T\n\x13LeaderboardResponse\x12&\n\x07\x65ntries\x18\x01 \x03(\x0b\x32\x15.rps.LeaderboardEntry\x12\x15\n\rtotal_players\x18\x02 \x01(\x05\"&\n\x11PlayerRankRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"`\n\x12PlayerRankResponse\x12\r\n\x05\x66ound\x18\x01 \x01(\x08\x12$\n\x05\x65ntry\x18\x02 \x01(\x0b\x32\x15.rps.LeaderboardEntry\x12\x15\n\rtotal_players\x18\x03 \x01(\x05\"\x84\x01\n\x11TournamentRequest\x12\x15\n\rtournament_id\x18\x01 \x01(\t\x12\x0e\n\x06\x66ormat\x18\x02 \x01(\t\x12\x0f\n\x07players\x18\x03 \x03(\t\x12\x13\n\x0bwins_needed\x18\x04 \x01(\x05\x12\x0e\n\x06rounds\x18\x05 \x01(\x05\x12\x12\n\nstart_in_s\x18\x06 \x01(\x05\"B\n\x16TournamentStateRequest\x12\x15\n\rtournament_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\"\xe7\x01\n\x12TournamentResponse\x12\x15\n\rtournament_id\x18\x01 \x01(\t\x12\x0e\n\x06\x66ormat\x18\x02 \x01(\t\x12\x0e\n\x06status\x18\x03 \x01(\t\x12\r\n\x05round\x18\x04 \x01(\x05\x12\x0e\n\x06rounds\x18\x05 \x01(\x05\x12\x0f\n\x07players\x18\x06 \x01(\x05\x12\x14\n\x0clive_matches\x18\x07 \x01(\x05\x12\x10\n\x08\x63hampion\x18\x08 \x01(\t\x12\x0f\n\x07room_id\x18\t \x01(\t\x12\x12\n\neliminated\x18\n \x01(\x08\x12\x0e\n\x06points\x18\x0b \x01(\x05\x12\r\n\x05\x65rror\x18\x0c \x01(\t\"\x9c\x02\n\x0cGameResponse\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0f\n\x07player1\x18\x02 \x01(\t\x12\x0f\n\x07player2\x18\x03 \x01(\t\x12\x16\n\x0eplayer1_choice\x18\x04 \x01(\t\x12\x16\n\x0eplayer2_choice\x18\x05 \x01(\t\x12\x0e\n\x06status\x18\x06 \x01(\t\x12\x19\n\x11\x63urrent_player_id\x18\x07 \x01(\t\x12\r\n\x05\x65rror\x18\x08 \x01(\t\x12\x15\n\rplayer1_score\x18\t \x01(\x05\x12\x15\n\rplayer2_score\x18\n \x01(\x05\x12\x14\n\x0cround_result\x18\x0b \x01(\t\x12\x15\n\rstate_version\x18\x0c \x01(\x03\x12\x14\n\x0cnot_modified\x18\r \x01(\x08\"\xe4\x01\n\x0cRoomSnapshot\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0f\n\x07player1\x18\x02 \x01(\t\x12\x0f\n\x07player2\x18\x03 \x01(\t\x12\x16\n\x0eplayer1_choice\x18\x04 \x01(\t\x12\x16\n\x0eplayer2_choice\x18\x05 \x01(\t\x12\x0e\n\x06status\x18\x06 \x01(\t\x12\x15\n\rplayer1_score\x18\x07 \x01(\x05\x12\x15\n\rplayer2_score\x18\x08 \x01(\x05\x12\x0f\n\x07version\x18\t \x01(\x03\x12\x0f\n\x07\x64\x65leted\x18\n \x01(\x08\x12\x11\n\tround_seq\x18\x0b \x01(\x03\"A\n\tRoomBatch\x12\x12\n\nleader_url\x18\x01 \x01(\t\x12 \n\x05rooms\x18\x02 \x03(\x0b\x32\x11.rps.RoomSnapshot\"3\n\x0eReplicationAck\x12\x10\n\x08\x61\x63\x63\x65pted\x18\x01 \x01(\x08\x12\x0f\n\x07\x61pplied\x18\x02 \x01(\x05\x32\x8a\x05\n\x0bGameService\x12\x33\n\nCreateGame\x12\x12.rps.CreateRequest\x1a\x11.rps.GameResponse\x12/\n\x08MakeMove\x12\x10.rps.MoveRequest\x1a\x11.rps.GameResponse\x12\x30\n\x08GetState\x12\x11.rps.StateRequest\x1a\x11.rps.GameResponse\x12\x35\n\x0c\x43heckSession\x12\x11.rps.CheckRequest\x1a\x12.rps.CheckResponse\x12\x31\n\tResetGame\x12\x11.rps.StateRequest\x1a\x11.rps.GameResponse\x12/\n\x08\x45xitGame\x12\x10.rps.ExitRequest\x1a\x11.rps.ExitResponse\x12\x43\n\x0eGetLeaderboard\x12\x17.rps.LeaderboardRequest\x1a\x18.rps.LeaderboardResponse\x12@\n\rGetPlayerRank\x12\x16.rps.PlayerRankRequest\x1a\x17.rps.PlayerRankResponse\x12\x35\n\x08Spectate\x12\x14.rps.SpectateRequest\x1a\x11.rps.GameResponse0\x01\x12\x43\n\x10\x43reateTournament\x12\x16.rps.TournamentRequest\x1a\x17.rps.TournamentResponse\x12\x45\n\rGetTournament\x12\x1b.rps.TournamentStateRequest\x1a\x17.rps.TournamentResponse2x\n\x0fGameReplication\x12\x30\n\tReplicate\x12\x0e.rps.RoomBatch\x1a\x13.rps.ReplicationAck\x12\x33\n\x07Handoff\x12\x11.rps.RoomSnapshot\x1a\x13.rps.ReplicationAck(\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -24,19 +24,45 @@ if _descriptor._USE_C_DESCRIPTORS == False:
   _globals['_CHECKREQUEST']._serialized_start=34
   _globals['_CHECKREQUEST']._serialized_end=67
   _globals['_CHECKRESPONSE']._serialized_start=69
-  _globals['_CHECKRESPONSE']._serialized_end=117
-  _globals['_CREATEREQUEST']._serialized_start=119
-  _globals['_CREATEREQUEST']._serialized_end=175
-  _globals['_STATEREQUEST']._serialized_start=177
-  _globals['_STATEREQUEST']._serialized_end=227
-  _globals['_MOVEREQUEST']._serialized_start=229
-  _globals['_MOVEREQUEST']._serialized_end=294
-  _globals['_EXITREQUEST']._serialized_start=296
-  _globals['_EXITREQUEST']._serialized_end=345
-  _globals['_EXITRESPONSE']._serialized_start=347
-  _globals['_EXITRESPONSE']._serialized_end=378
-  _globals['_GAMERESPONSE']._serialized_start=381
-  _globals['_GAMERESPONSE']._serialized_end=620
-  _globals['_GAMESERVICE']._serialized_start=623
-  _globals['_GAMESERVICE']._serialized_end=943
+  _globals['_CHECKRESPONSE']._serialized_end=140
+  _globals['_CREATEREQUEST']._serialized_start=142
+  _globals['_CREATEREQUEST']._serialized_end=198
+  _globals['_STATEREQUEST']._serialized_start=200
+  _globals['_STATEREQUEST']._serialized_end=273
+  _globals['_MOVEREQUEST']._serialized_start=275
+  _globals['_MOVEREQUEST']._serialized_end=340
+  _globals['_EXITREQUEST']._serialized_start=342
+  _globals['_EXITREQUEST']._serialized_end=391
+  _globals['_EXITRESPONSE']._serialized_start=393
+  _globals['_EXITRESPONSE']._serialized_end=424
+  _globals['_SPECTATEREQUEST']._serialized_start=426
+  _globals['_SPECTATEREQUEST']._serialized_end=460
+  _globals['_LEADERBOARDREQUEST']._serialized_start=462
+  _globals['_LEADERBOARDREQUEST']._serialized_end=509
+  _globals['_LEADERBOARDENTRY']._serialized_start=511
+  _globals['_LEADERBOARDENTRY']._serialized_end=607
+  _globals['_LEADERBOARDRESPONSE']._serialized_start=609
+  _globals['_LEADERBOARDRESPONSE']._serialized_end=693
+  _globals['_PLAYERRANKREQUEST']._serialized_start=695
+  _globals['_PLAYERRANKREQUEST']._serialized_end=733
+  _globals['_PLAYERRANKRESPONSE']._serialized_start=735
+  _globals['_PLAYERRANKRESPONSE']._serialized_end=831
+  _globals['_TOURNAMENTREQUEST']._serialized_start=834
+  _globals['_TOURNAMENTREQUEST']._serialized_end=966
+  _globals['_TOURNAMENTSTATEREQUEST']._serialized_start=968
+  _globals['_TOURNAMENTSTATEREQUEST']._serialized_end=1034
+  _globals['_TOURNAMENTRESPONSE']._serialized_start=1037
+  _globals['_TOURNAMENTRESPONSE']._serialized_end=1268
+  _globals['_GAMERESPONSE']._serialized_start=1271
+  _globals['_GAMERESPONSE']._serialized_end=1555
+  _globals['_ROOMSNAPSHOT']._serialized_start=1558
+  _globals['_ROOMSNAPSHOT']._serialized_end=1786
+  _globals['_ROOMBATCH']._serialized_start=1788
+  _globals['_ROOMBATCH']._serialized_end=1853
+  _globals['_REPLICATIONACK']._serialized_start=1855
+  _globals['_REPLICATIONACK']._serialized_end=1906
+  _globals['_GAMESERVICE']._serialized_start=1909
+  _globals['_GAMESERVICE']._serialized_end=2559
+  _globals['_GAMEREPLICATION']._serialized_start=2561
+  _globals['_GAMEREPLICATION']._serialized_end=2681
 # @@protoc_insertion_point(module_scope)
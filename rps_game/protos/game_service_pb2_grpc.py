@@ -44,6 +44,31 @@ class GameServiceStub(object):
                 request_serializer=protos_dot_game__service__pb2.ExitRequest.SerializeToString,
                 response_deserializer=protos_dot_game__service__pb2.ExitResponse.FromString,
                 )
+        self.GetLeaderboard = channel.unary_unary(
+                '/rps.GameService/GetLeaderboard',
+                request_serializer=protos_dot_game__service__pb2.LeaderboardRequest.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.LeaderboardResponse.FromString,
+                )
+        self.GetPlayerRank = channel.unary_unary(
+                '/rps.GameService/GetPlayerRank',
+                request_serializer=protos_dot_game__service__pb2.PlayerRankRequest.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.PlayerRankResponse.FromString,
+                )
+        self.Spectate = channel.unary_stream(
+                '/rps.GameService/Spectate',
+                request_serializer=protos_dot_game__service__pb2.SpectateRequest.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.GameResponse.FromString,
+                )
+        self.CreateTournament = channel.unary_unary(
+                '/rps.GameService/CreateTournament',
+                request_serializer=protos_dot_game__service__pb2.TournamentRequest.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.TournamentResponse.FromString,
+                )
+        self.GetTournament = channel.unary_unary(
+                '/rps.GameService/GetTournament',
+                request_serializer=protos_dot_game__service__pb2.TournamentStateRequest.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.TournamentResponse.FromString,
+                )
 
 
 class GameServiceServicer(object):
@@ -85,6 +110,37 @@ class GameServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetLeaderboard(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetPlayerRank(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Spectate(self, request, context):
+        """Current state, then every change
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CreateTournament(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def GetTournament(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_GameServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -118,6 +174,31 @@ def add_GameServiceServicer_to_server(servicer, server):
                     request_deserializer=protos_dot_game__service__pb2.ExitRequest.FromString,
                     response_serializer=protos_dot_game__service__pb2.ExitResponse.SerializeToString,
             ),
+            'GetLeaderboard': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetLeaderboard,
+                    request_deserializer=protos_dot_game__service__pb2.LeaderboardRequest.FromString,
+                    response_serializer=protos_dot_game__service__pb2.LeaderboardResponse.SerializeToString,
+            ),
+            'GetPlayerRank': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetPlayerRank,
+                    request_deserializer=protos_dot_game__service__pb2.PlayerRankRequest.FromString,
+                    response_serializer=protos_dot_game__service__pb2.PlayerRankResponse.SerializeToString,
+            ),
+            'Spectate': grpc.unary_stream_rpc_method_handler(
+                    servicer.Spectate,
+                    request_deserializer=protos_dot_game__service__pb2.SpectateRequest.FromString,
+                    response_serializer=protos_dot_game__service__pb2.GameResponse.SerializeToString,
+            ),
+            'CreateTournament': grpc.unary_unary_rpc_method_handler(
+                    servicer.CreateTournament,
+                    request_deserializer=protos_dot_game__service__pb2.TournamentRequest.FromString,
+                    response_serializer=protos_dot_game__service__pb2.TournamentResponse.SerializeToString,
+            ),
+            'GetTournament': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetTournament,
+                    request_deserializer=protos_dot_game__service__pb2.TournamentStateRequest.FromString,
+                    response_serializer=protos_dot_game__service__pb2.TournamentResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'rps.GameService', rpc_method_handlers)
@@ -229,3 +310,187 @@ class GameService(object):
             protos_dot_game__service__pb2.ExitResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetLeaderboard(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.GameService/GetLeaderboard',
+            protos_dot_game__service__pb2.LeaderboardRequest.SerializeToString,
+            protos_dot_game__service__pb2.LeaderboardResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetPlayerRank(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.GameService/GetPlayerRank',
+            protos_dot_game__service__pb2.PlayerRankRequest.SerializeToString,
+            protos_dot_game__service__pb2.PlayerRankResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Spectate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/rps.GameService/Spectate',
+            protos_dot_game__service__pb2.SpectateRequest.SerializeToString,
+            protos_dot_game__service__pb2.GameResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def CreateTournament(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.GameService/CreateTournament',
+            protos_dot_game__service__pb2.TournamentRequest.SerializeToString,
+            protos_dot_game__service__pb2.TournamentResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def GetTournament(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.GameService/GetTournament',
+            protos_dot_game__service__pb2.TournamentStateRequest.SerializeToString,
+            protos_dot_game__service__pb2.TournamentResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+
+class GameReplicationStub(object):
+    """Leader -> standby room state transfer
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.Replicate = channel.unary_unary(
+                '/rps.GameReplication/Replicate',
+                request_serializer=protos_dot_game__service__pb2.RoomBatch.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.ReplicationAck.FromString,
+                )
+        self.Handoff = channel.stream_unary(
+                '/rps.GameReplication/Handoff',
+                request_serializer=protos_dot_game__service__pb2.RoomSnapshot.SerializeToString,
+                response_deserializer=protos_dot_game__service__pb2.ReplicationAck.FromString,
+                )
+
+
+class GameReplicationServicer(object):
+    """Leader -> standby room state transfer
+    """
+
+    def Replicate(self, request, context):
+        """Continuous shadow updates
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Handoff(self, request_iterator, context):
+        """Full snapshot on sync or step-down
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_GameReplicationServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'Replicate': grpc.unary_unary_rpc_method_handler(
+                    servicer.Replicate,
+                    request_deserializer=protos_dot_game__service__pb2.RoomBatch.FromString,
+                    response_serializer=protos_dot_game__service__pb2.ReplicationAck.SerializeToString,
+            ),
+            'Handoff': grpc.stream_unary_rpc_method_handler(
+                    servicer.Handoff,
+                    request_deserializer=protos_dot_game__service__pb2.RoomSnapshot.FromString,
+                    response_serializer=protos_dot_game__service__pb2.ReplicationAck.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'rps.GameReplication', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class GameReplication(object):
+    """Leader -> standby room state transfer
+    """
+
+    @staticmethod
+    def Replicate(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.GameReplication/Replicate',
+            protos_dot_game__service__pb2.RoomBatch.SerializeToString,
+            protos_dot_game__service__pb2.ReplicationAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Handoff(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_unary(request_iterator, target, '/rps.GameReplication/Handoff',
+            protos_dot_game__service__pb2.RoomSnapshot.SerializeToString,
+            protos_dot_game__service__pb2.ReplicationAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
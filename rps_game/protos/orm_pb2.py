@@ -12,33 +12,54 @@ from google.protobuf.internal import builder as _builder
 _sym_db = _symbol_database.Default()
 
 
+from google.protobuf import field_mask_pb2 as google_dot_protobuf_dot_field__mask__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10protos/orm.proto\x12\x03rps\"(\n\x13\x43heckSessionRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"7\n\x14\x43heckSessionResponse\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0e\n\x06\x65xists\x18\x02 \x01(\x08\"5\n\x0f\x45xitGameRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\"#\n\x10\x45xitGameResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x1e\n\x0bLoadRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\"8\n\x0cLoadResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x17\n\x04game\x18\x02 \x01(\x0b\x32\t.rps.Game\"7\n\x0bSaveRequest\x12\x17\n\x04game\x18\x01 \x01(\x0b\x32\t.rps.Game\x12\x0f\n\x07game_id\x18\x02 \x01(\t\"\x1f\n\x0cSaveResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x96\x01\n\x04Game\x12\x0f\n\x07player1\x18\x01 \x01(\t\x12\x0f\n\x07player2\x18\x02 \x01(\t\x12\x16\n\x0eplayer1_choice\x18\x03 \x01(\t\x12\x16\n\x0eplayer2_choice\x18\x04 \x01(\t\x12\x0e\n\x06status\x18\x05 \x01(\t\x12\x15\n\rplayer1_score\x18\x06 \x01(\x05\x12\x15\n\rplayer2_score\x18\x07 \x01(\x05\x32\xdd\x01\n\x03Orm\x12\x43\n\x0c\x43heckSession\x12\x18.rps.CheckSessionRequest\x1a\x19.rps.CheckSessionResponse\x12\x37\n\x08\x45xitGame\x12\x14.rps.ExitGameRequest\x1a\x15.rps.ExitGameResponse\x12+\n\x04Load\x12\x10.rps.LoadRequest\x1a\x11.rps.LoadResponse\x12+\n\x04Save\x12\x10.rps.SaveRequest\x1a\x11.rps.SaveResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x10protos/orm.proto\x12\x03rps\x1a google/protobuf/field_mask.proto\"(\n\x13\x43heckSessionRequest\x12\x11\n\tplayer_id\x18\x01 \x01(\t\"7\n\x14\x43heckSessionResponse\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x0e\n\x06\x65xists\x18\x02 \x01(\x08\"5\n\x0f\x45xitGameRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\x12\x11\n\tplayer_id\x18\x02 \x01(\t\"#\n\x10\x45xitGameResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\"\x1e\n\x0bLoadRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\"8\n\x0cLoadResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x17\n\x04game\x18\x02 \x01(\x0b\x32\t.rps.Game\"\x89\x01\n\x0bSaveRequest\x12\x17\n\x04game\x18\x01 \x01(\x0b\x32\t.rps.Game\x12\x0f\n\x07game_id\x18\x02 \x01(\t\x12\x1f\n\x06rounds\x18\x03 \x03(\x0b\x32\x0f.rps.RoundEvent\x12/\n\x0bupdate_mask\x18\x04 \x01(\x0b\x32\x1a.google.protobuf.FieldMask\"L\n\x0cSaveResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x12\n\nhistory_id\x18\x02 \x01(\t\x12\x17\n\x0fround_positions\x18\x03 \x03(\x03\"\xa9\x01\n\x04Game\x12\x0f\n\x07player1\x18\x01 \x01(\t\x12\x0f\n\x07player2\x18\x02 \x01(\t\x12\x16\n\x0eplayer1_choice\x18\x03 \x01(\t\x12\x16\n\x0eplayer2_choice\x18\x04 \x01(\t\x12\x0e\n\x06status\x18\x05 \x01(\t\x12\x15\n\rplayer1_score\x18\x06 \x01(\x05\x12\x15\n\rplayer2_score\x18\x07 \x01(\x05\x12\x11\n\tround_seq\x18\x08 \x01(\x03\"\x12\n\x10SubscribeRequest\"B\n\nGameChange\x12\n\n\x02op\x18\x01 \x01(\t\x12\x0f\n\x07game_id\x18\x02 \x01(\t\x12\x17\n\x04game\x18\x03 \x01(\x0b\x32\t.rps.Game\"\x98\x01\n\nRoundEvent\x12\x0f\n\x07player1\x18\x01 \x01(\t\x12\x0f\n\x07player2\x18\x02 \x01(\t\x12\x16\n\x0eplayer1_choice\x18\x03 \x01(\t\x12\x16\n\x0eplayer2_choice\x18\x04 \x01(\t\x12\x0f\n\x07outcome\x18\x05 \x01(\t\x12\x14\n\x0cplayed_at_ms\x18\x06 \x01(\x03\x12\x11\n\tround_seq\x18\x07 \x01(\x03\"<\n\x12PlayerStatsRequest\x12\x17\n\x0f\x61\x66ter_player_id\x18\x01 \x01(\t\x12\r\n\x05limit\x18\x02 \x01(\x05\"M\n\x0bPlayerStats\x12\x11\n\tplayer_id\x18\x01 \x01(\t\x12\x0c\n\x04wins\x18\x02 \x01(\x05\x12\x0e\n\x06losses\x18\x03 \x01(\x05\x12\r\n\x05\x64raws\x18\x04 \x01(\x05\"d\n\x13PlayerStatsResponse\x12\x1f\n\x05stats\x18\x01 \x03(\x0b\x32\x10.rps.PlayerStats\x12\x12\n\nhistory_id\x18\x02 \x01(\t\x12\x18\n\x10history_position\x18\x03 \x01(\x03\"\xc6\x01\n\x10TournamentRecord\x12\x15\n\rtournament_id\x18\x01 \x01(\t\x12\x0e\n\x06\x66ormat\x18\x02 \x01(\t\x12\x0f\n\x07players\x18\x03 \x01(\x05\x12\x0e\n\x06rounds\x18\x04 \x01(\x05\x12\r\n\x05round\x18\x05 \x01(\x05\x12\x0e\n\x06status\x18\x06 \x01(\t\x12\x10\n\x08\x63hampion\x18\x07 \x01(\t\x12\x15\n\rupdated_at_ms\x18\x08 \x01(\x03\x12\x13\n\x0bwins_needed\x18\t \x01(\x05\x12\r\n\x05seeds\x18\n \x03(\t\"\xc8\x01\n\x0bMatchRecord\x12\x15\n\rtournament_id\x18\x01 \x01(\t\x12\r\n\x05round\x18\x02 \x01(\x05\x12\x0c\n\x04slot\x18\x03 \x01(\x05\x12\x0f\n\x07room_id\x18\x04 \x01(\t\x12\x0f\n\x07player1\x18\x05 \x01(\t\x12\x0f\n\x07player2\x18\x06 \x01(\t\x12\x14\n\x0cplayer1_wins\x18\x07 \x01(\x05\x12\x14\n\x0cplayer2_wins\x18\x08 \x01(\x05\x12\x0e\n\x06winner\x18\t \x01(\t\x12\x16\n\x0e\x66inished_at_ms\x18\n \x01(\x03\"\x18\n\x16LoadTournamentsRequest\"]\n\x0c\x42racketBatch\x12*\n\x0btournaments\x18\x01 \x03(\x0b\x32\x15.rps.TournamentRecord\x12!\n\x07matches\x18\x02 \x03(\x0b\x32\x10.rps.MatchRecord2\xd2\x03\n\x03Orm\x12\x43\n\x0c\x43heckSession\x12\x18.rps.CheckSessionRequest\x1a\x19.rps.CheckSessionResponse\x12\x37\n\x08\x45xitGame\x12\x14.rps.ExitGameRequest\x1a\x15.rps.ExitGameResponse\x12+\n\x04Load\x12\x10.rps.LoadRequest\x1a\x11.rps.LoadResponse\x12+\n\x04Save\x12\x10.rps.SaveRequest\x1a\x11.rps.SaveResponse\x12\x44\n\x0fLoadPlayerStats\x12\x17.rps.PlayerStatsRequest\x1a\x18.rps.PlayerStatsResponse\x12\x33\n\x0bSaveBracket\x12\x11.rps.BracketBatch\x1a\x11.rps.SaveResponse\x12\x41\n\x0fLoadTournaments\x12\x1b.rps.LoadTournamentsRequest\x1a\x11.rps.BracketBatch\x12\x35\n\tSubscribe\x12\x15.rps.SubscribeRequest\x1a\x0f.rps.GameChange0\x01\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'protos.orm_pb2', _globals)
 if _descriptor._USE_C_DESCRIPTORS == False:
   DESCRIPTOR._options = None
-  _globals['_CHECKSESSIONREQUEST']._serialized_start=25
-  _globals['_CHECKSESSIONREQUEST']._serialized_end=65
-  _globals['_CHECKSESSIONRESPONSE']._serialized_start=67
-  _globals['_CHECKSESSIONRESPONSE']._serialized_end=122
-  _globals['_EXITGAMEREQUEST']._serialized_start=124
-  _globals['_EXITGAMEREQUEST']._serialized_end=177
-  _globals['_EXITGAMERESPONSE']._serialized_start=179
-  _globals['_EXITGAMERESPONSE']._serialized_end=214
-  _globals['_LOADREQUEST']._serialized_start=216
-  _globals['_LOADREQUEST']._serialized_end=246
-  _globals['_LOADRESPONSE']._serialized_start=248
-  _globals['_LOADRESPONSE']._serialized_end=304
-  _globals['_SAVEREQUEST']._serialized_start=306
-  _globals['_SAVEREQUEST']._serialized_end=361
-  _globals['_SAVERESPONSE']._serialized_start=363
-  _globals['_SAVERESPONSE']._serialized_end=394
-  _globals['_GAME']._serialized_start=397
-  _globals['_GAME']._serialized_end=547
-  _globals['_ORM']._serialized_start=550
-  _globals['_ORM']._serialized_end=771
+  _globals['_CHECKSESSIONREQUEST']._serialized_start=59
+  _globals['_CHECKSESSIONREQUEST']._serialized_end=99
+  _globals['_CHECKSESSIONRESPONSE']._serialized_start=101
+  _globals['_CHECKSESSIONRESPONSE']._serialized_end=156
+  _globals['_EXITGAMEREQUEST']._serialized_start=158
+  _globals['_EXITGAMEREQUEST']._serialized_end=211
+  _globals['_EXITGAMERESPONSE']._serialized_start=213
+  _globals['_EXITGAMERESPONSE']._serialized_end=248
+  _globals['_LOADREQUEST']._serialized_start=250
+  _globals['_LOADREQUEST']._serialized_end=280
+  _globals['_LOADRESPONSE']._serialized_start=282
+  _globals['_LOADRESPONSE']._serialized_end=338
+  _globals['_SAVEREQUEST']._serialized_start=341
+  _globals['_SAVEREQUEST']._serialized_end=478
+  _globals['_SAVERESPONSE']._serialized_start=480
+  _globals['_SAVERESPONSE']._serialized_end=556
+  _globals['_GAME']._serialized_start=559
+  _globals['_GAME']._serialized_end=728
+  _globals['_SUBSCRIBEREQUEST']._serialized_start=730
+  _globals['_SUBSCRIBEREQUEST']._serialized_end=748
+  _globals['_GAMECHANGE']._serialized_start=750
+  _globals['_GAMECHANGE']._serialized_end=816
+  _globals['_ROUNDEVENT']._serialized_start=819
+  _globals['_ROUNDEVENT']._serialized_end=971
+  _globals['_PLAYERSTATSREQUEST']._serialized_start=973
+  _globals['_PLAYERSTATSREQUEST']._serialized_end=1033
+  _globals['_PLAYERSTATS']._serialized_start=1035
+  _globals['_PLAYERSTATS']._serialized_end=1112
+  _globals['_PLAYERSTATSRESPONSE']._serialized_start=1114
+  _globals['_PLAYERSTATSRESPONSE']._serialized_end=1214
+  _globals['_TOURNAMENTRECORD']._serialized_start=1217
+  _globals['_TOURNAMENTRECORD']._serialized_end=1415
+  _globals['_MATCHRECORD']._serialized_start=1418
+  _globals['_MATCHRECORD']._serialized_end=1618
+  _globals['_LOADTOURNAMENTSREQUEST']._serialized_start=1620
+  _globals['_LOADTOURNAMENTSREQUEST']._serialized_end=1644
+  _globals['_BRACKETBATCH']._serialized_start=1646
+  _globals['_BRACKETBATCH']._serialized_end=1739
+  _globals['_ORM']._serialized_start=1742
+  _globals['_ORM']._serialized_end=2208
 # @@protoc_insertion_point(module_scope)
@@ -34,6 +34,26 @@ class OrmStub(object):
                 request_serializer=protos_dot_orm__pb2.SaveRequest.SerializeToString,
                 response_deserializer=protos_dot_orm__pb2.SaveResponse.FromString,
                 )
+        self.LoadPlayerStats = channel.unary_unary(
+                '/rps.Orm/LoadPlayerStats',
+                request_serializer=protos_dot_orm__pb2.PlayerStatsRequest.SerializeToString,
+                response_deserializer=protos_dot_orm__pb2.PlayerStatsResponse.FromString,
+                )
+        self.SaveBracket = channel.unary_unary(
+                '/rps.Orm/SaveBracket',
+                request_serializer=protos_dot_orm__pb2.BracketBatch.SerializeToString,
+                response_deserializer=protos_dot_orm__pb2.SaveResponse.FromString,
+                )
+        self.LoadTournaments = channel.unary_unary(
+                '/rps.Orm/LoadTournaments',
+                request_serializer=protos_dot_orm__pb2.LoadTournamentsRequest.SerializeToString,
+                response_deserializer=protos_dot_orm__pb2.BracketBatch.FromString,
+                )
+        self.Subscribe = channel.unary_stream(
+                '/rps.Orm/Subscribe',
+                request_serializer=protos_dot_orm__pb2.SubscribeRequest.SerializeToString,
+                response_deserializer=protos_dot_orm__pb2.GameChange.FromString,
+                )
 
 
 class OrmServicer(object):
@@ -63,6 +83,32 @@ class OrmServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def LoadPlayerStats(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SaveBracket(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def LoadTournaments(self, request, context):
+        """Unfinished ones, to resume
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def Subscribe(self, request, context):
+        """Every change to a room, by any writer
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_OrmServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -86,6 +132,26 @@ def add_OrmServicer_to_server(servicer, server):
                     request_deserializer=protos_dot_orm__pb2.SaveRequest.FromString,
                     response_serializer=protos_dot_orm__pb2.SaveResponse.SerializeToString,
             ),
+            'LoadPlayerStats': grpc.unary_unary_rpc_method_handler(
+                    servicer.LoadPlayerStats,
+                    request_deserializer=protos_dot_orm__pb2.PlayerStatsRequest.FromString,
+                    response_serializer=protos_dot_orm__pb2.PlayerStatsResponse.SerializeToString,
+            ),
+            'SaveBracket': grpc.unary_unary_rpc_method_handler(
+                    servicer.SaveBracket,
+                    request_deserializer=protos_dot_orm__pb2.BracketBatch.FromString,
+                    response_serializer=protos_dot_orm__pb2.SaveResponse.SerializeToString,
+            ),
+            'LoadTournaments': grpc.unary_unary_rpc_method_handler(
+                    servicer.LoadTournaments,
+                    request_deserializer=protos_dot_orm__pb2.LoadTournamentsRequest.FromString,
+                    response_serializer=protos_dot_orm__pb2.BracketBatch.SerializeToString,
+            ),
+            'Subscribe': grpc.unary_stream_rpc_method_handler(
+                    servicer.Subscribe,
+                    request_deserializer=protos_dot_orm__pb2.SubscribeRequest.FromString,
+                    response_serializer=protos_dot_orm__pb2.GameChange.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'rps.Orm', rpc_method_handlers)
@@ -163,3 +229,71 @@ class Orm(object):
             protos_dot_orm__pb2.SaveResponse.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def LoadPlayerStats(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.Orm/LoadPlayerStats',
+            protos_dot_orm__pb2.PlayerStatsRequest.SerializeToString,
+            protos_dot_orm__pb2.PlayerStatsResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SaveBracket(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.Orm/SaveBracket',
+            protos_dot_orm__pb2.BracketBatch.SerializeToString,
+            protos_dot_orm__pb2.SaveResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def LoadTournaments(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/rps.Orm/LoadTournaments',
+            protos_dot_orm__pb2.LoadTournamentsRequest.SerializeToString,
+            protos_dot_orm__pb2.BracketBatch.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Subscribe(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/rps.Orm/Subscribe',
+            protos_dot_orm__pb2.SubscribeRequest.SerializeToString,
+            protos_dot_orm__pb2.GameChange.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
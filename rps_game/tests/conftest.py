@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+from concurrent import futures
+
+import grpc
+import pytest
+
+# The servers run from rps_game/: modules import each other from there and open config.json by relative path
+RPS_GAME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RPS_GAME)
+
+import protos.orm_pb2_grpc as orm_pb2_grpc
+from orm_service.orm_server import OrmService
+from orm_service.sqlite_engine import SqliteEngine
+from common.profiling import Profiler
+from game_server.game_server import GameServiceImpl, create_game_server
+
+@pytest.fixture(autouse=True)
+def in_rps_game(monkeypatch):
+    monkeypatch.chdir(RPS_GAME)
+
+@pytest.fixture
+def config():
+    """A private copy of config.json"""
+    with open(os.path.join(RPS_GAME, 'config.json'), 'r') as f:
+        return json.load(f)
+
+class OrmUnderTest:
+    """An ORM service on SQLite in a temporary directory, served on a local port"""
+
+    def __init__(self, config, path):
+        self.engine = SqliteEngine({'path': path})
+        self.service = OrmService(config, self.engine)
+        self.server = grpc.server(futures.ThreadPoolExecutor(max_workers=16))
+        orm_pb2_grpc.add_OrmServicer_to_server(self.service, self.server)
+        self.address = f"127.0.0.1:{self.server.add_insecure_port('127.0.0.1:0')}"
+        self.server.start()
+        self.channel = grpc.insecure_channel(self.address)
+        self.stub = orm_pb2_grpc.OrmStub(self.channel)
+
+    def close(self):
+        self.service.changes.close()
+        self.channel.close()
+        self.server.stop(None)
+        self.service.history.close()
+        self.engine.close()
+
+@pytest.fixture
+def orm(config, tmp_path):
+    orm = OrmUnderTest(config, str(tmp_path / "rps.db"))
+    yield orm
+    orm.close()
+
+@pytest.fixture
+def game_servers(config):
+    """Factory for game servicers (no Consul, no port); game_servers(orm, leader=True)"""
+    started = []
+
+    def start(orm=None, leader=False):
+        servicer = GameServiceImpl(config, None)
+        if orm is not None:
+            servicer.set_orm_leader(orm.address)
+        if leader:
+            servicer.take_leadership(False)
+        started.append(servicer)
+        return servicer
+
+    yield start
+    for servicer in started:
+        servicer.give_up_leadership()
+        servicer.actors.wait_idle(5)
+        servicer.tournaments.writer.flush()
+        servicer.scheduler.stop()
+        servicer.set_orm_leader(None)
+        servicer.room_changes.reconnect()
+        servicer.channels.close_all()
+
+@pytest.fixture
+def game_port(config, orm, game_servers):
+    servicer = game_servers(orm, leader=True)
+    server, limiter = create_game_server(config, servicer, Profiler("test", {}))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    yield servicer, port
+    servicer.spectators.close_all()
+    server.stop(None)
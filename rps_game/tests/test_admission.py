@@ -0,0 +1,114 @@
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+from common.admission import AdaptiveConcurrencyLimiter, create_server, READ, WRITE
+
+def echo_server(admission_config, **kwargs):
+    handler = grpc.method_handlers_generic_handler("test.Echo", {
+        "Read": grpc.unary_unary_rpc_method_handler(lambda request, context: request),
+        "Write": grpc.unary_unary_rpc_method_handler(lambda request, context: request),
+    })
+    server, limiter = create_server({'max_workers': 4}, admission_config, {"Read": READ, "Write": WRITE}, **kwargs)
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, limiter, grpc.insecure_channel(f"127.0.0.1:{port}")
+
+@pytest.fixture
+def echo():
+    started = []
+
+    def start(admission_config=None, **kwargs):
+        started.append(echo_server(admission_config or {}, **kwargs))
+        return started[-1]
+
+    yield start
+    for server, limiter, channel in started:
+        channel.close()
+        server.stop(None)
+
+def test_reads_are_shed_before_writes():
+    limiter = AdaptiveConcurrencyLimiter(max_limit=4, read_share=0.5)
+    assert limiter.try_acquire("Write", WRITE, 0.0)
+    assert limiter.try_acquire("Write", WRITE, 0.0)
+    # Half the limit is in flight: reads stop, writes still get in
+    assert not limiter.try_acquire("Read", READ, 0.0)
+    assert limiter.try_acquire("Write", WRITE, 0.0)
+    assert limiter.shed == {("Read", READ): 1}
+
+def test_queue_delay_sheds_reads_first():
+    limiter = AdaptiveConcurrencyLimiter(target_delay=0.05, write_delay_factor=3.0)
+    assert not limiter.try_acquire("Read", READ, 0.1)
+    assert limiter.try_acquire("Write", WRITE, 0.1)
+    assert not limiter.try_acquire("Write", WRITE, 0.2)
+
+def test_limit_backs_off_and_recovers():
+    limiter = AdaptiveConcurrencyLimiter(target_delay=0.0, min_limit=2, max_limit=10)
+    assert limiter.try_acquire("Write", WRITE, 0.0)
+    limiter.release(1.0)
+    assert limiter.limit < 10
+    assert limiter.in_flight == 0
+    lowered = limiter.limit
+    limiter.try_acquire("Write", WRITE, 0.0)
+    limiter.release(0.0)
+    assert limiter.limit > lowered
+
+def test_limit_never_drops_below_min():
+    limiter = AdaptiveConcurrencyLimiter(target_delay=0.0, min_limit=2, max_limit=10)
+    for _ in range(100):
+        limiter._decrease()
+    assert limiter.limit == 2
+
+def test_overloaded_server_answers_resource_exhausted(echo):
+    server, limiter, channel = echo()
+    assert channel.unary_unary("/test.Echo/Read")(b"ping") == b"ping"
+    limiter.limit = 0
+    with pytest.raises(grpc.RpcError) as raised:
+        channel.unary_unary("/test.Echo/Read")(b"ping")
+    assert raised.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    assert ("rps_admission_shed_total", {"method": "Read", "class": READ}, 1) in limiter.metrics()
+
+def test_disabled_admission_admits_everything(echo):
+    server, limiter, channel = echo({'enabled': False})
+    limiter.limit = 0
+    assert channel.unary_unary("/test.Echo/Write")(b"ping") == b"ping"
+
+def test_stream_workers_do_not_widen_the_unary_pool():
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow(request, context):
+        with lock:
+            running.append(request)
+            peak.append(len(running))
+        time.sleep(0.2)
+        with lock:
+            running.remove(request)
+        return request
+
+    handler = grpc.method_handlers_generic_handler("test.Echo", {
+        "Write": grpc.unary_unary_rpc_method_handler(slow),
+        "Watch": grpc.unary_stream_rpc_method_handler(lambda request, context: iter([request])),
+    })
+    server, limiter = create_server({'max_workers': 2}, {'enabled': False}, {}, stream_workers=6)
+    server.add_generic_rpc_handlers((handler,))
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    try:
+        write = channel.unary_unary("/test.Echo/Write")
+        with futures.ThreadPoolExecutor(6) as pool:
+            calls = [pool.submit(write, bytes([i])) for i in range(6)]
+            time.sleep(0.1)
+            # Streams still find a thread while the unary slots are all taken
+            assert list(channel.unary_stream("/test.Echo/Watch")(b"s", timeout=1)) == [b"s"]
+            assert sorted(call.result() for call in calls) == [bytes([i]) for i in range(6)]
+        assert max(peak) == 2
+    finally:
+        channel.close()
+        server.stop(None)
@@ -0,0 +1,197 @@
+import time
+
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+import protos.orm_pb2 as orm_pb2
+from game_server import room_changes
+from game_server.game_logic import RockPaperScissorsGame
+from game_server.room_actors import RoomActors
+from game_server.room_cache import RoomCache
+from game_server.room_changes import RoomChangeListener, EXPECTED_PER_ROOM
+from orm_service.change_feed import ChangeFeed, FeedSubscriber
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+def room(player1="alice", player2="bob", choice="waiting", score=0):
+    game = RockPaperScissorsGame()
+    game.set_players(player1, player2)
+    game.player1_choice = choice
+    game.player1_score = score
+    return game
+
+def change(game_id, game, op="upsert"):
+    return orm_pb2.GameChange(op=op, game_id=game_id, game=orm_pb2.Game(
+        player1=game.player1, player2=game.player2, player1_choice=game.player1_choice,
+        player2_choice=game.player2_choice, status=game.status, player1_score=game.player1_score,
+        player2_score=game.player2_score, round_seq=game.round_seq))
+
+# ---- ORM side ----
+
+class LocalEngine:
+    shared_changes = False
+
+def test_slow_subscriber_gets_one_resync_instead():
+    subscriber = FeedSubscriber(queue_size=2)
+    assert not subscriber.offer(orm_pb2.GameChange(op="upsert", game_id="a"))
+    assert not subscriber.offer(orm_pb2.GameChange(op="upsert", game_id="b"))
+    assert subscriber.offer(orm_pb2.GameChange(op="upsert", game_id="c"))
+    assert [c.op for c in subscriber.take()] == ["resync"]
+    assert subscriber.take() == []
+
+def test_feed_limits_subscribers_and_shares_each_change():
+    feed = ChangeFeed(LocalEngine(), {'max_subscribers': 2, 'queue_size': 10})
+    first, second = feed.subscribe(), feed.subscribe()
+    assert feed.subscribe() is None
+    feed.publish("upsert", "r", orm_pb2.Game(player1="alice"))
+    [mine], [theirs] = first.take(), second.take()
+    assert mine is theirs
+    feed.unsubscribe(second)
+    assert second.closed and feed.subscribe() is not None
+
+def test_resync_is_only_counted_with_someone_listening():
+    feed = ChangeFeed(LocalEngine(), {})
+    feed.resync()
+    assert feed.resyncs == 0
+    subscriber = feed.subscribe()
+    feed.resync()
+    assert feed.resyncs == 1 and [c.op for c in subscriber.take()] == ["resync"]
+
+def test_saves_reach_the_subscribe_stream(orm):
+    stream = orm.stub.Subscribe(orm_pb2.SubscribeRequest(), timeout=10)
+    wait_for(lambda: orm.service.changes.subscribers)
+    orm.stub.Save(orm_pb2.SaveRequest(game_id="r", game=orm_pb2.Game(player1="alice")), timeout=5)
+    first = next(stream)
+    assert (first.op, first.game_id, first.game.player1) == ("upsert", "r", "alice")
+    stream.cancel()
+    wait_for(lambda: not orm.service.changes.subscribers)
+
+# ---- Game server side, driven by hand ----
+
+@pytest.fixture
+def listener():
+    cache = RoomCache()
+    stale = []
+    listener = RoomChangeListener(lambda: None, cache, RoomActors(), {'expected_ttl_s': 30},
+                                  on_stale=stale.append)
+    listener.subscribed = True
+    listener.stale = stale
+    return listener
+
+def test_own_write_is_not_taken_for_someone_elses(listener):
+    game = room(choice="rock")
+    listener.cache.put("r", game)
+    listener.expect("r", game)
+    listener._on_change(change("r", game))
+    assert listener.cache.peek("r") is not None
+    assert listener.invalidations == 0 and listener.expected == {}
+
+def test_foreign_write_drops_the_cached_room(listener):
+    listener.cache.put("r", room())
+    listener.expect("r", room(choice="rock"))
+    listener._on_change(change("r", room(choice="paper")))
+    assert listener.cache.peek("r") is None and listener.invalidations == 1
+    # Dropping the room also dropped what we were waiting for
+    assert listener.expected == {}
+
+def test_matching_echo_skips_saves_that_never_echoed(listener):
+    listener.cache.put("r", room(score=3))
+    for score in range(1, 4):
+        listener.expect("r", room(score=score))
+    listener._on_change(change("r", room(score=2)))
+    assert [state[5] for state, _ in listener.expected["r"]] == [3]
+
+def test_nothing_is_expected_without_a_stream(listener):
+    listener.subscribed = False
+    listener.expect("r", room())
+    assert listener.expected == {}
+
+def test_expected_echoes_per_room_are_bounded(listener):
+    for score in range(EXPECTED_PER_ROOM * 2):
+        listener.expect("r", room(score=score))
+    assert len(listener.expected["r"]) == EXPECTED_PER_ROOM
+
+def test_expected_echoes_expire(listener, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(room_changes.time, "monotonic", lambda: now[0])
+    listener.expect("a", room())
+    now[0] += 31
+    listener.expect("b", room())
+    assert list(listener.expected) == ["b"]
+    assert ("rps_room_feed_expected_rooms", {}, 1) in listener.metrics()
+
+def test_evicted_rooms_stop_waiting_for_echoes(listener):
+    for game_id in ("a", "b", "c"):
+        listener.cache.put(game_id, room())
+        listener.expect(game_id, room(choice="rock"))
+    listener.cache.retain({"a", "b"})
+    assert sorted(listener.expected) == ["a", "b"]
+    listener.cache.remove("a")
+    listener.cache.clear()
+    assert listener.expected == {}
+
+def test_resync_marks_rooms_stale_instead_of_dropping_them(listener):
+    listener.cache.put("r", room())
+    listener.expect("r", room(choice="rock"))
+    listener._on_change(orm_pb2.GameChange(op="resync"))
+    assert listener.expected == {} and listener.resyncs == 1
+    assert listener.cache.get("r") == (None, 0)
+    assert listener.cache.peek("r") is not None
+    assert listener.stale == ["r"]
+
+def test_replica_already_holding_the_change_keeps_it(listener):
+    game = room(choice="rock")
+    game.mark_stored()
+    listener.cache.put("r", game)
+    listener._on_change(change("r", game))
+    assert listener.cache.peek("r") is not None and listener.invalidations == 0
+
+# ---- Through the ORM ----
+
+@pytest.fixture
+def subscribed(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    wait_for(lambda: server.room_changes.subscribed and orm.service.changes.subscribers)
+    return server
+
+def test_own_moves_keep_the_cache(orm, subscribed):
+    server = subscribed
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="alice", choice="rock"), None)
+    wait_for(lambda: server.room_changes.changes >= 3)
+    wait_for(lambda: not server.room_changes.expected)
+    assert server.room_changes.invalidations == 0
+    assert server.cache.peek("r") is not None
+
+def test_another_writer_is_seen_on_next_read(orm, subscribed):
+    server = subscribed
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    wait_for(lambda: server.room_changes.changes >= 1)
+    orm.stub.Save(orm_pb2.SaveRequest(game_id="r", game=orm_pb2.Game(
+        player1="alice", player2="carol", player1_choice="waiting", player2_choice="waiting",
+        status="ready")), timeout=5)
+    wait_for(lambda: server.room_changes.invalidations == 1)
+    assert server.GetState(game_pb2.StateRequest(game_id="r"), None).player2 == "carol"
+
+def test_resync_reloads_rooms_lazily(orm, subscribed):
+    server = subscribed
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|kept"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|gone"), None)
+    # Changed behind the feed's back, then the feed says it lost track
+    orm.engine.save("kept", orm_pb2.Game(player1="alice", player2="dave", player1_choice="waiting",
+                                         player2_choice="waiting", status="ready"))
+    orm.engine.delete("gone")
+    orm.service.changes.resync()
+    wait_for(lambda: server.room_changes.resyncs == 1)
+    server.actors.wait_idle(5)
+    assert sorted(server.cache.game_ids()) == ["gone", "kept"]
+
+    assert server.GetState(game_pb2.StateRequest(game_id="kept"), None).player2 == "dave"
+    assert server.GetState(game_pb2.StateRequest(game_id="gone"), None).error
+    # The stale copy of a room deleted meanwhile does not linger
+    assert server.cache.peek("gone") is None
@@ -0,0 +1,81 @@
+import socket
+import time
+
+import grpc
+
+import protos.orm_pb2_grpc as orm_pb2_grpc
+import protos.game_service_pb2_grpc as game_pb2_grpc
+from common.channels import ChannelManager, channel_options, server_options
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+def unused_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+def test_stubs_share_one_channel_per_target():
+    channels = ChannelManager({})
+    orm_stub = channels.stub("http://127.0.0.1:1", orm_pb2_grpc.OrmStub)
+    assert channels.stub("http://127.0.0.1:1", orm_pb2_grpc.OrmStub) is orm_stub
+    channels.stub("http://127.0.0.1:1", game_pb2_grpc.GameServiceStub)
+    channels.stub("http://127.0.0.1:2", orm_pb2_grpc.OrmStub)
+    assert channels.opened == 2
+    channels.retain({"http://127.0.0.1:2"})
+    assert list(channels.channels) == ["http://127.0.0.1:2"]
+    channels.close_all()
+    assert channels.closed == 2
+    assert channels.state("http://127.0.0.1:2") is None
+
+def test_live_target_becomes_ready(orm):
+    channels = ChannelManager({})
+    channels.stub(f"http://{orm.address}", orm_pb2_grpc.OrmStub)
+    wait_for(lambda: channels.state(f"http://{orm.address}") == grpc.ChannelConnectivity.READY)
+    assert not channels.is_failing(f"http://{orm.address}")
+    channels.close_all()
+
+def test_dead_target_is_reported_before_the_first_call():
+    channels = ChannelManager({'initial_reconnect_backoff_ms': 50, 'max_reconnect_backoff_ms': 100})
+    seen = []
+    channels.add_listener(lambda url, state: seen.append(state))
+    url = f"http://127.0.0.1:{unused_port()}"
+    channels.stub(url, orm_pb2_grpc.OrmStub)
+    wait_for(lambda: channels.is_failing(url))
+    assert grpc.ChannelConnectivity.TRANSIENT_FAILURE in seen
+    failures = [value for name, labels, value in channels.metrics()
+                if name == "rps_channel_failures_total" and labels["target"] == url]
+    assert failures and failures[0] >= 1
+    channels.close_all()
+
+def test_state_delivered_after_close_is_ignored(orm):
+    channels = ChannelManager({})
+    seen = []
+    channels.add_listener(lambda url, state: seen.append(state))
+    url = f"http://{orm.address}"
+    channels.stub(url, orm_pb2_grpc.OrmStub)
+    wait_for(lambda: channels.state(url) == grpc.ChannelConnectivity.READY)
+    managed = channels.channels[url]
+    channels.close(url)
+    seen.clear()
+    # Would reconnect a closed channel if it got through
+    managed.callback(grpc.ChannelConnectivity.IDLE)
+    assert seen == []
+
+def test_keepalive_pings_are_accepted_by_the_server():
+    client = dict(channel_options({'keepalive_time_ms': 4000}))
+    server = dict(server_options({'keepalive_time_ms': 4000}))
+    assert client['grpc.keepalive_time_ms'] == 4000
+    assert server['grpc.http2.min_ping_interval_without_data_ms'] <= client['grpc.keepalive_time_ms']
+
+def test_leader_switch_closes_the_old_channel(orm, game_servers):
+    server = game_servers(orm)
+    old = f"127.0.0.1:{unused_port()}"
+    server.set_orm_leader(old)
+    assert old in server.channels.channels
+    server.set_orm_leader(orm.address)
+    assert list(server.channels.channels) == [orm.address]
+    assert server.orm_client is server.channels.stub(orm.address, orm_pb2_grpc.OrmStub)
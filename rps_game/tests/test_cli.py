@@ -0,0 +1,52 @@
+import io
+import json
+import subprocess
+import sys
+
+from client import rps_cli
+
+def run(port, *argv):
+    return rps_cli.main(["--server", f"127.0.0.1:{port}", "--timeout", "5", *argv])
+
+def test_commands_print_one_line_each(game_port, capsys):
+    servicer, port = game_port
+    assert run(port, "create", "r", "alice") == 0
+    assert run(port, "join", "r", "--player", "bob") == 0
+    assert run(port, "move", "r", "rock", "alice") == 0
+    assert run(port, "state", "r", "--leader") == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 4
+    assert lines[-1].startswith("room=r status=ready players=alice/bob choices=chosen/waiting")
+
+def test_failed_command_exits_with_1(game_port, capsys):
+    servicer, port = game_port
+    assert run(port, "join", "missing", "bob") == 1
+    assert capsys.readouterr().out.startswith("error=")
+
+def test_json_lines(game_port, capsys):
+    servicer, port = game_port
+    assert run(port, "--json", "create", "r", "alice") == 0
+    line = json.loads(capsys.readouterr().out)
+    assert line["ok"] and line["command"] == "create"
+    assert line["response"]["player1"] == "alice"
+
+def test_batch_reads_stdin(game_port, capsys, monkeypatch):
+    servicer, port = game_port
+    monkeypatch.setattr(sys, "stdin", io.StringIO(
+        "# a round\ncreate r alice\n\njoin r bob\nmove r rock alice\nmove r paper bob\nbogus\nbatch\n"))
+    assert run(port, "batch") == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == 6
+    assert "status=player2_won" in lines[3]
+    assert lines[4:] == ["error=invalid command", "error=batch cannot be nested"]
+
+def test_no_leader_fails_fast(capsys):
+    # Nothing listens there; the fixed server is still taken as the leader, the call fails
+    assert rps_cli.main(["--server", "127.0.0.1:1", "--timeout", "0.5", "session", "alice"]) == 1
+    assert capsys.readouterr().out.startswith("error=")
+
+def test_startup_skips_tk_and_consul():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, client.rps_cli; print(sorted(sys.modules))"],
+        capture_output=True, text=True, check=True).stdout
+    assert "tkinter" not in modules and "consul" not in modules
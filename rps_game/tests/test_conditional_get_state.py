@@ -0,0 +1,48 @@
+import protos.game_service_pb2 as game_pb2
+
+def get_state(server, known_version=0):
+    return server.GetState(game_pb2.StateRequest(game_id="r", known_version=known_version), None)
+
+def test_unchanged_room_answers_not_modified(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    created = server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    assert created.state_version > 0
+    unchanged = get_state(server, created.state_version)
+    assert unchanged.not_modified
+    assert unchanged.state_version == created.state_version
+    # Nothing but the version travels back
+    assert unchanged.player1 == "" and unchanged.status == ""
+
+def test_changed_room_answers_in_full(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    created = server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    joined = server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    assert joined.state_version > created.state_version
+    state = get_state(server, created.state_version)
+    assert not state.not_modified
+    assert (state.player2, state.state_version) == ("bob", joined.state_version)
+
+def test_unknown_version_of_a_cold_room_loads_it(orm, game_servers):
+    first = game_servers(orm, leader=True)
+    created = first.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    # Another leader has no version for the room yet: it loads and answers in full
+    second = game_servers(orm, leader=True)
+    state = get_state(second, created.state_version)
+    assert not state.not_modified
+    assert state.player1 == "alice"
+    assert get_state(second, state.state_version).not_modified
+
+def test_reload_and_no_op_save_keep_the_version(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    created = server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    # Reloaded after a stale mark, the database still has what we had
+    server.cache.mark_stale("r")
+    assert get_state(server, created.state_version).not_modified
+    # A reset with no round to reset writes nothing
+    reset = server.ResetGame(game_pb2.StateRequest(game_id="r"), None)
+    assert reset.state_version == created.state_version
+    assert get_state(server, created.state_version).not_modified
+
+def test_missing_room(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    assert get_state(server, 12345).error == "NOT_FOUND"
@@ -0,0 +1,28 @@
+import protos.orm_pb2 as orm_pb2
+import protos.game_service_pb2 as game_pb2
+
+def test_orm_exit_removes_the_player_then_the_room(orm):
+    orm.stub.Save(orm_pb2.SaveRequest(game_id="r", game=orm_pb2.Game(
+        player1="alice", player2="bob", status="ready")))
+    assert orm.stub.ExitGame(orm_pb2.ExitGameRequest(game_id="r", player_id="alice")).success
+    assert orm.stub.Load(orm_pb2.LoadRequest(game_id="r")).game.player2 == "bob"
+    assert orm.stub.ExitGame(orm_pb2.ExitGameRequest(game_id="r", player_id="bob")).success
+    assert not orm.stub.Load(orm_pb2.LoadRequest(game_id="r")).success
+    assert not orm.stub.CheckSession(orm_pb2.CheckSessionRequest(player_id="bob")).exists
+
+def test_leaving_players_close_the_room(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    assert server.ExitGame(game_pb2.ExitRequest(game_id="r", player_id="alice"), None).success
+    state = server.GetState(game_pb2.StateRequest(game_id="r"), None)
+    assert (state.player1, state.player2) == ("", "bob")
+
+    # The room is free again for someone else to join
+    joined = server.CreateGame(game_pb2.CreateRequest(player_id="carol|r", is_join_only=True), None)
+    assert (joined.player1, joined.player2, joined.status) == ("carol", "bob", "ready")
+
+    server.ExitGame(game_pb2.ExitRequest(game_id="r", player_id="bob"), None)
+    server.ExitGame(game_pb2.ExitRequest(game_id="r", player_id="carol"), None)
+    assert server.GetState(game_pb2.StateRequest(game_id="r"), None).error == "NOT_FOUND"
+    assert not server.CheckSession(game_pb2.CheckRequest(player_id="carol"), None).exists
@@ -0,0 +1,66 @@
+import grpc
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+import protos.orm_pb2 as orm_pb2
+from orm_service.sqlite_engine import SqliteEngine
+from orm_service.storage import mask_columns, GAME_FIELDS
+
+def test_mask_columns_follow_game_field_order():
+    assert mask_columns(["status", "player1_choice"]) == ("player1_choice", "status")
+    assert mask_columns([]) == ()
+    assert set(mask_columns(list(GAME_FIELDS))) == set(orm_pb2.Game.DESCRIPTOR.fields_by_name)
+    with pytest.raises(ValueError):
+        mask_columns(["player1_choice", "game_id"])
+
+def test_sqlite_writes_only_the_masked_columns(tmp_path):
+    engine = SqliteEngine({'path': str(tmp_path / "rps.db")})
+    engine.save("r", orm_pb2.Game(player1="alice", player2="bob", status="ready"))
+    # Columns outside the mask are not touched, even if the message disagrees
+    engine.save("r", orm_pb2.Game(player1="mallory", player1_choice="rock", status="ready"),
+                ("player1_choice",))
+    stored = engine.load("r")
+    assert (stored.player1, stored.player2, stored.player1_choice) == ("alice", "bob", "rock")
+
+def test_unknown_path_is_invalid_argument(orm):
+    request = orm_pb2.SaveRequest(game_id="r", game=orm_pb2.Game(player1="alice"))
+    request.update_mask.paths.append("game_id")
+    with pytest.raises(grpc.RpcError) as error:
+        orm.stub.Save(request, timeout=5)
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert orm.engine.load("r") is None
+
+def test_masked_save_over_grpc(orm):
+    orm.stub.Save(orm_pb2.SaveRequest(game_id="r", game=orm_pb2.Game(
+        player1="alice", player2="bob", status="ready")), timeout=5)
+    request = orm_pb2.SaveRequest(game_id="r", game=orm_pb2.Game(
+        player1="alice", player2="bob", status="ready", player2_choice="paper"))
+    request.update_mask.paths.append("player2_choice")
+    assert orm.stub.Save(request, timeout=5).success
+    assert orm.engine.load("r").player2_choice == "paper"
+
+def test_game_server_sends_only_what_changed(orm, game_servers, monkeypatch):
+    saves = []
+    save = orm.engine.save
+
+    def spy(game_id, game, columns=None):
+        saves.append(columns)
+        save(game_id, game, columns)
+
+    monkeypatch.setattr(orm.engine, "save", spy)
+    server = game_servers(orm, leader=True)
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="alice", choice="rock"), None)
+    server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="bob", choice="paper"), None)
+    assert saves[0] is None  # A new room is written whole
+    assert saves[1] == ("player2", "status")
+    assert saves[2] == ("player1_choice",)
+    assert saves[3] == ("player2_choice", "status", "player2_score", "round_seq")
+
+    # A room reloaded from the database knows what is stored and still sends only its changes
+    server.cache.clear()
+    server.ResetGame(game_pb2.StateRequest(game_id="r"), None)
+    assert saves[4] == ("player1_choice", "player2_choice", "status")
+    stored = orm.engine.load("r")
+    assert (stored.status, stored.player2_score) == ("ready", 1)
@@ -0,0 +1,51 @@
+import protos.game_service_pb2 as game_pb2
+from game_server.game_logic import RockPaperScissorsGame
+from game_server.replication import ReplicationServicer, to_snapshot
+
+def replicate(replica, game_id, version, player1="alice", player2="bob"):
+    game = RockPaperScissorsGame()
+    game.player1 = player1
+    game.player2 = player2
+    game.status = "ready"
+    replica.Replicate(game_pb2.RoomBatch(leader_url="http://leader:1",
+                                         rooms=[to_snapshot(game_id, game, version)]), None)
+
+def standby_of(game_servers, orm=None):
+    servicer = game_servers(orm)
+    servicer.replica = ReplicationServicer(servicer.cache, lambda: servicer.is_leader)
+    return servicer
+
+def test_standby_without_fresh_copy_refuses_reads(game_servers):
+    standby = standby_of(game_servers)
+    assert standby.GetState(game_pb2.StateRequest(game_id="r"), None).error == "STALE_REPLICA"
+
+def test_standby_serves_its_shadow_copy(game_servers):
+    standby = standby_of(game_servers)
+    replicate(standby.replica, "r", 77)
+    response = standby.GetState(game_pb2.StateRequest(game_id="r"), None)
+    assert (response.player1, response.player2, response.state_version) == ("alice", "bob", 77)
+    assert standby.GetState(game_pb2.StateRequest(game_id="r", known_version=77), None).not_modified
+    session = standby.CheckSession(game_pb2.CheckRequest(player_id="bob"), None)
+    assert (session.exists, session.game_id) == (True, "r")
+
+def test_standby_refuses_writes(game_servers):
+    standby = standby_of(game_servers)
+    replicate(standby.replica, "r", 77)
+    move = standby.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="alice", choice="rock"), None)
+    assert move.error == "NOT_LEADER"
+
+def test_too_old_copy_is_not_served(game_servers):
+    standby = standby_of(game_servers)
+    replicate(standby.replica, "r", 77)
+    standby.max_read_staleness = 0.0
+    assert standby.GetState(game_pb2.StateRequest(game_id="r"), None).error == "STALE_REPLICA"
+
+def test_cold_room_is_read_from_the_database(orm, game_servers):
+    leader = game_servers(orm, leader=True)
+    leader.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    standby = standby_of(game_servers, orm)
+    replicate(standby.replica, "other", 5)
+    response = standby.GetState(game_pb2.StateRequest(game_id="r"), None)
+    assert (response.player1, response.status) == ("alice", "waiting")
+    # Read-through only: nothing is cached on the standby
+    assert standby.cache.peek("r") is None
@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+import uuid
+
+import pytest
+
+from common.leader_election import LeaderElection
+
+class FakeConsul:
+    """KV with blocking queries and sessions that expire, as much of Consul as the election uses"""
+
+    def __init__(self):
+        self.kv = FakeKV(self)
+        self.session = FakeSessions(self)
+        self.index = 1
+        self.values = {}
+        self.sessions = {}  # session_id -> (ttl, expires_at)
+        self.cond = threading.Condition()
+
+    def changed(self):
+        self.index += 1
+        self.cond.notify_all()
+
+    def kill(self, session_id):
+        """Session gone: its locks are released, and with behavior=delete the keys go too"""
+        with self.cond:
+            self.sessions.pop(session_id, None)
+            for key, value in list(self.values.items()):
+                if value.get('Session') == session_id:
+                    del self.values[key]
+            self.changed()
+
+    def expire(self):
+        now = time.monotonic()
+        for session_id, (ttl, expires_at) in list(self.sessions.items()):
+            if now > expires_at:
+                self.kill(session_id)
+
+class FakeKV:
+    def __init__(self, consul):
+        self.consul = consul
+
+    def get(self, key, index=None, wait=None):
+        consul = self.consul
+        with consul.cond:
+            consul.expire()
+            if index is not None and wait:
+                amount, unit = re.match(r"([\d.]+)(ms|s)", wait).groups()
+                deadline = time.monotonic() + float(amount) / (1000 if unit == "ms" else 1)
+                while consul.index <= index and time.monotonic() < deadline:
+                    consul.cond.wait(min(0.05, deadline - time.monotonic()))
+                    consul.expire()
+            value = consul.values.get(key)
+            return consul.index, dict(value) if value else None
+
+    def put(self, key, value, acquire=None):
+        consul = self.consul
+        with consul.cond:
+            holder = (consul.values.get(key) or {}).get('Session')
+            if acquire is not None and (acquire not in consul.sessions or holder not in (None, acquire)):
+                return False
+            consul.values[key] = {'Value': value.encode('utf-8'), 'Session': acquire}
+            consul.changed()
+            return True
+
+class FakeSessions:
+    def __init__(self, consul):
+        self.consul = consul
+
+    def create(self, name=None, ttl=None, lock_delay=15, behavior='release'):
+        with self.consul.cond:
+            session_id = str(uuid.uuid4())
+            self.consul.sessions[session_id] = (ttl, time.monotonic() + ttl)
+            return session_id
+
+    def renew(self, session_id):
+        with self.consul.cond:
+            if session_id not in self.consul.sessions:
+                raise KeyError(session_id)
+            ttl, _ = self.consul.sessions[session_id]
+            self.consul.sessions[session_id] = (ttl, time.monotonic() + ttl)
+
+    def destroy(self, session_id):
+        self.consul.kill(session_id)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+@pytest.fixture
+def consul():
+    return FakeConsul()
+
+@pytest.fixture
+def candidates(consul):
+    """candidates(name, **config) -> started election recording its callbacks"""
+    started = []
+
+    def start(name, **config):
+        events = []
+        election = LeaderElection(consul, "service/test/leader", name, name, dict({'ttl_s': 2}, **config),
+                                  on_elected=lambda: events.append("elected"),
+                                  on_lost=lambda: events.append("lost"))
+        election.events = events
+        election.start()
+        started.append(election)
+        return election
+
+    yield start
+    for election in started:
+        election.stop()
+
+def test_single_candidate_is_elected(consul, candidates):
+    first = candidates("a")
+    wait_for(lambda: first.is_leader)
+    assert first.events == ["elected"]
+    assert consul.values["service/test/leader"]['Value'] == b"a"
+
+def test_standby_takes_over_when_the_leader_stops(consul, candidates):
+    first = candidates("a")
+    wait_for(lambda: first.is_leader)
+    second = candidates("b")
+    time.sleep(0.2)
+    assert not second.is_leader
+    # Waiting on a blocking query, not polling
+    assert second.requests <= 3
+
+    stopped = time.monotonic()
+    first.stop()
+    wait_for(lambda: second.is_leader)
+    assert time.monotonic() - stopped < 1.0
+    assert second.last_acquire < 0.5
+    assert first.events == ["elected", "lost"]
+    assert consul.values["service/test/leader"]['Value'] == b"b"
+
+def test_leader_renews_its_session(consul, candidates):
+    # Renewals are at least a second apart, so the ttl has to be longer than that
+    first = candidates("a", ttl_s=1.5)
+    wait_for(lambda: first.is_leader)
+    # Beyond the ttl: without renewals the session would have expired
+    time.sleep(2)
+    assert first.is_leader and first.renewals >= 1
+    assert first.events == ["elected"]
+
+def test_lost_session_ends_leadership_and_it_is_won_again(consul, candidates):
+    first = candidates("a", retry_s=0.1)
+    wait_for(lambda: first.is_leader)
+    session_id = first.session_id
+    consul.kill(session_id)
+    wait_for(lambda: first.losses == 1)
+    wait_for(lambda: first.is_leader and first.session_id != session_id)
+    assert first.events == ["elected", "lost", "elected"]
+    assert first.elections == 2
+
+def test_only_one_of_many_candidates_leads(consul, candidates):
+    elections = [candidates(name) for name in "abcd"]
+    wait_for(lambda: any(election.is_leader for election in elections))
+    time.sleep(0.2)
+    assert sum(election.is_leader for election in elections) == 1
@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+from game_server.leaderboard import IndexableSkipList, Leaderboard
+
+def test_skip_list_matches_a_sorted_list():
+    rng = random.Random(7)
+    skip_list = IndexableSkipList()
+    expected = []
+    for step in range(3000):
+        if expected and rng.random() < 0.4:
+            key = expected.pop(rng.randrange(len(expected)))
+            skip_list.remove(key)
+        else:
+            key = rng.randrange(10 ** 6)
+            if key in expected:
+                continue
+            skip_list.insert(key)
+            expected.append(key)
+            expected.sort()
+        if step % 100 == 0 and expected:
+            probe = expected[rng.randrange(len(expected))]
+            assert skip_list.rank(probe) == expected.index(probe)
+            offset = rng.randrange(len(expected))
+            assert skip_list.slice(offset, 10) == expected[offset:offset + 10]
+    assert len(skip_list) == len(expected)
+    assert skip_list.slice(0, len(expected) + 5) == expected
+
+def test_skip_list_edges():
+    skip_list = IndexableSkipList()
+    assert skip_list.slice(0, 10) == []
+    skip_list.insert(5)
+    assert skip_list.slice(1, 10) == []
+    assert skip_list.slice(0, 0) == []
+    for missing in (4, 6):
+        with pytest.raises(KeyError):
+            skip_list.rank(missing)
+        with pytest.raises(KeyError):
+            skip_list.remove(missing)
+
+def test_ranked_by_wins_then_fewest_losses_then_name():
+    board = Leaderboard()
+    board.load([("carol", 2, 1, 0), ("alice", 2, 0, 0), ("bob", 2, 0, 3), ("dave", 5, 9, 0)])
+    assert [row[1] for row in board.top(10)] == ["dave", "alice", "bob", "carol"]
+    assert board.top(2, offset=1) == [(2, "alice", 2, 0, 0), (3, "bob", 2, 0, 3)]
+    assert board.rank("carol") == (4, 2, 1, 0)
+    assert board.rank("nobody") is None
+
+def test_rounds_move_players():
+    board = Leaderboard()
+    board.record_round("alice", "bob", "player2_won")
+    board.record_round("alice", "bob", "player2_won")
+    board.record_round("alice", "carol", "draw")
+    board.record_round("alice", "", "player1_won")
+    assert board.top(3) == [(1, "bob", 2, 0, 0), (2, "alice", 1, 2, 1), (3, "carol", 0, 0, 1)]
+    assert board.rank("bob") == (1, 2, 0, 0)
+
+def test_rounds_during_a_load_land_on_the_loaded_totals():
+    board = Leaderboard()
+    board.record_round("alice", "bob", "player1_won")
+    board.begin_load()
+    # Played after the totals were read from the ORM, before they are swapped in
+    board.record_round("bob", "carol", "player1_won")
+    board.load([("alice", 10, 0, 0), ("bob", 0, 10, 0)])
+    assert board.rank("alice") == (1, 10, 0, 0)
+    assert board.rank("bob") == (2, 1, 10, 0)
+    assert board.rank("carol") == (3, 0, 1, 0)
+    board.record_round("bob", "carol", "draw")
+    assert board.rank("bob") == (2, 1, 10, 1)
+
+def test_rounds_already_in_the_loaded_totals_are_not_replayed():
+    board = Leaderboard()
+    board.begin_load()
+    board.record_round("alice", "bob", "player1_won", ("h", 4))
+    board.record_round("alice", "bob", "draw", ("h", 9))
+    board.record_round("alice", "bob", "player2_won", ("other", 1))
+    # alice's page was read after position 4 was written, bob's before
+    board.load([("alice", 1, 0, 0), ("bob", 0, 0, 0)], {"alice": ("h", 5), "bob": ("h", 3)})
+    assert board.rank("alice") == (1, 1, 1, 1)
+    assert board.rank("bob") == (2, 1, 1, 1)
+
+def test_cancelled_load_stops_remembering_rounds():
+    board = Leaderboard()
+    board.begin_load()
+    board.cancel_load()
+    board.record_round("alice", "bob", "player1_won")
+    board.load([])
+    assert board.rank("alice") is None
+
+def test_leader_loads_totals_page_by_page(orm, game_servers):
+    orm.engine.record_rounds([
+        (f"r{i}", f"p{i:02d}", f"q{i:02d}", "rock", "scissors", "player1_won", i, i + 1) for i in range(12)
+    ])
+    server = game_servers(orm)
+    server.leaderboard_page = 5
+    server.load_leaderboard()
+    assert len(server.leaderboard.stats) == 24
+    response = server.GetLeaderboard(game_pb2.LeaderboardRequest(k=3), None)
+    assert [entry.player_id for entry in response.entries] == ["p00", "p01", "p02"]
+    assert response.total_players == 24
+    rank = server.GetPlayerRank(game_pb2.PlayerRankRequest(player_id="q11"), None)
+    assert (rank.found, rank.entry.rank, rank.entry.losses) == (True, 24, 1)
+
+def test_round_flushed_during_a_load_is_counted_once(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+
+    def play(alice, bob):
+        server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="alice", choice=alice), None)
+        server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="bob", choice=bob), None)
+        server.ResetGame(game_pb2.StateRequest(game_id="r"), None)
+
+    begin_load = server.leaderboard.begin_load
+    load = server.leaderboard.load
+
+    def begin_then_flush():
+        begin_load()
+        # Saved and written to the totals before the page is read
+        play("rock", "scissors")
+        orm.service.history.flush()
+
+    def play_then_load(rows, read_at=None):
+        # Saved after the page was read, still queued in the history
+        play("paper", "rock")
+        load(rows, read_at)
+
+    server.leaderboard.begin_load = begin_then_flush
+    server.leaderboard.load = play_then_load
+    server.load_leaderboard()
+    assert server.leaderboard.rank("alice") == (1, 2, 0, 0)
+    assert server.leaderboard.rank("bob") == (2, 0, 2, 0)
@@ -0,0 +1,204 @@
+import os
+import threading
+
+import protos.orm_pb2 as orm_pb2
+from orm_service.log_engine import LogEngine, LOG_SUFFIX, COMPACT_SUFFIX, SNAPSHOT_FILE
+
+def game(player1="alice", player2="", score=0):
+    return orm_pb2.Game(player1=player1, player2=player2, status="waiting", player1_score=score)
+
+def open_log(tmp_path, **config):
+    config.setdefault('snapshot_interval_s', 3600)
+    return LogEngine(dict(config, dir=str(tmp_path)))
+
+def crash(engine):
+    """Stop the background threads and leave the files as a killed process would"""
+    engine._stopping.set()
+    for thread in engine._threads:
+        thread.join()
+    engine.running = False
+
+def segments(tmp_path, suffix=LOG_SUFFIX):
+    return sorted(name for name in os.listdir(tmp_path) if name.endswith(suffix))
+
+def test_recovers_rooms_after_a_crash(tmp_path):
+    engine = open_log(tmp_path)
+    engine.save("a", game(score=1))
+    engine.save("b", game("bob"))
+    engine.save("a", game(score=2))
+    engine.delete("b")
+    crash(engine)
+
+    recovered = open_log(tmp_path)
+    assert recovered.load("a") == game(score=2)
+    assert recovered.load("b") is None
+    assert recovered.find_session("alice") == "a"
+    assert recovered.find_session("bob") is None
+    recovered.close()
+
+def test_torn_tail_is_truncated(tmp_path, caplog):
+    engine = open_log(tmp_path)
+    engine.save("a", game(score=1))
+    engine.save("a", game(score=2))
+    crash(engine)
+    path = os.path.join(tmp_path, segments(tmp_path)[-1])
+    intact = os.path.getsize(path)
+    # Half a record: the process died in the middle of the write
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02\x03\x04\x05\x06')
+
+    recovered = open_log(tmp_path)
+    assert os.path.getsize(path) == intact
+    truncated = [r for r in caplog.records if r.getMessage() == "Truncating torn tail"]
+    assert truncated[0].name == "rps.LogEngine"
+    assert truncated[0].fields == {"path": path, "bytes": 6}
+    assert recovered.load("a") == game(score=2)
+    # New writes go after the good records, not after the garbage
+    recovered.save("a", game(score=3))
+    crash(recovered)
+    assert open_log(tmp_path).load("a") == game(score=3)
+
+def test_corrupted_record_ends_the_replay(tmp_path):
+    engine = open_log(tmp_path)
+    engine.save("a", game(score=1))
+    size_after_first = engine.active_size
+    engine.save("a", game(score=2))
+    crash(engine)
+    path = os.path.join(tmp_path, segments(tmp_path)[-1])
+    with open(path, 'r+b') as f:
+        f.seek(size_after_first + 20)
+        f.write(b'\xff')
+
+    recovered = open_log(tmp_path)
+    assert recovered.load("a") == game(score=1)
+    assert os.path.getsize(path) == size_after_first
+    recovered.close()
+
+def test_snapshot_limits_the_replay(tmp_path):
+    engine = open_log(tmp_path)
+    for i in range(20):
+        engine.save(f"r{i}", game(f"p{i}"))
+    engine.snapshot()
+    engine.save("r0", game("p0", score=5))
+    crash(engine)
+
+    recovered = open_log(tmp_path)
+    assert len(recovered.index) == 20
+    assert recovered.load("r0") == game("p0", score=5)
+    assert recovered.writes_since_snapshot == 0
+    recovered.close()
+
+def test_close_writes_a_snapshot(tmp_path):
+    engine = open_log(tmp_path)
+    engine.save("a", game())
+    engine.close()
+    assert os.path.exists(os.path.join(tmp_path, SNAPSHOT_FILE))
+    reopened = open_log(tmp_path)
+    assert reopened.load("a") == game()
+    reopened.close()
+
+def test_segments_roll_at_the_size_limit(tmp_path):
+    engine = open_log(tmp_path, segment_bytes=200)
+    for i in range(30):
+        engine.save("a", game(score=i))
+    assert len(segments(tmp_path)) > 4
+    assert engine.load("a") == game(score=29)
+    engine.close()
+
+def test_compaction_keeps_only_live_values(tmp_path):
+    engine = open_log(tmp_path, segment_bytes=200, compact_min_segments=2)
+    for i in range(40):
+        engine.save(f"r{i % 4}", game(f"p{i % 4}", score=i))
+    engine.delete("r3")
+    sealed = len(segments(tmp_path)) - 1
+
+    assert engine.compact()
+    assert len(segments(tmp_path)) == 1
+    assert len(segments(tmp_path, COMPACT_SUFFIX)) == 1
+    assert sealed > 1
+    assert [engine.load(f"r{i}").player1_score for i in range(3)] == [36, 37, 38]
+    assert engine.load("r3") is None
+    engine.close()
+
+    reopened = open_log(tmp_path)
+    assert [reopened.load(f"r{i}").player1_score for i in range(3)] == [36, 37, 38]
+    assert reopened.load("r3") is None
+    reopened.close()
+
+def test_writes_during_compaction_are_kept(tmp_path):
+    engine = open_log(tmp_path, segment_bytes=200, compact_min_segments=2)
+    for i in range(40):
+        engine.save(f"r{i % 4}", game(f"p{i % 4}", score=i))
+    copy_live = engine._copy_live
+
+    def copy_while_writing(live, target_id, tmp):
+        # Runs outside the lock, like a Save arriving in the middle of the copy
+        writer = threading.Thread(target=engine.save, args=("r0", game("p0", score=100)))
+        writer.start()
+        writer.join()
+        return copy_live(live, target_id, tmp)
+
+    engine._copy_live = copy_while_writing
+    assert engine.compact()
+    assert engine.load("r0").player1_score == 100
+    assert engine.load("r1").player1_score == 37
+    crash(engine)
+    assert open_log(tmp_path).load("r0").player1_score == 100
+
+def test_crash_during_compaction_leaves_the_old_files_usable(tmp_path):
+    engine = open_log(tmp_path, segment_bytes=200, compact_min_segments=2)
+    for i in range(40):
+        engine.save(f"r{i % 4}", game(f"p{i % 4}", score=i))
+
+    def die(live, target_id, tmp):
+        with open(tmp, 'wb') as f:
+            f.write(b'partial')
+        raise OSError("killed")
+
+    engine._copy_live = die
+    try:
+        engine.compact()
+    except OSError:
+        pass
+    crash(engine)
+    # An unfinished compaction leaves a .tmp file and the segments it was copying
+    with open(os.path.join(tmp_path, f"{99:08d}{COMPACT_SUFFIX}.tmp"), 'wb') as f:
+        f.write(b'partial')
+
+    recovered = open_log(tmp_path)
+    assert [recovered.load(f"r{i}").player1_score for i in range(4)] == [36, 37, 38, 39]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+    recovered.close()
+
+def test_close_waits_for_a_compaction_in_progress(tmp_path):
+    engine = open_log(tmp_path, segment_bytes=200, compact_min_segments=2, snapshot_interval_s=0.05)
+    copy_live = engine._copy_live
+    copying = threading.Event()
+    release = threading.Event()
+
+    def slow_copy(live, target_id, tmp):
+        copying.set()
+        release.wait(5)
+        return copy_live(live, target_id, tmp)
+
+    engine._copy_live = slow_copy
+    for i in range(40):
+        engine.save(f"r{i % 4}", game(f"p{i % 4}", score=i))
+    assert copying.wait(5)
+
+    closer = threading.Thread(target=engine.close)
+    closer.start()
+    closer.join(0.2)
+    # The maintenance thread still owns the files
+    assert closer.is_alive()
+    release.set()
+    closer.join(5)
+    assert not closer.is_alive()
+    assert all(thread is not None and not thread.is_alive() for thread in engine._threads)
+
+    # The compaction gave up; close() wrote the snapshot over the old segments
+    assert not segments(tmp_path, COMPACT_SUFFIX)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+    recovered = open_log(tmp_path)
+    assert [recovered.load(f"r{i}").player1_score for i in range(4)] == [36, 37, 38, 39]
+    recovered.close()
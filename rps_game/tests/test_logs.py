@@ -0,0 +1,67 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+from common.logs import (get_logger, setup_logging, KeyValueFormatter, JsonFormatter,
+                         RateLimitFilter, DroppingQueueHandler, ROOT)
+
+def record(message, level=logging.INFO, name=f"{ROOT}.Game Server", **fields):
+    entry = logging.LogRecord(name, level, __file__, 1, message, None, None)
+    entry.fields = fields
+    return entry
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger(ROOT)
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def test_key_value_lines_quote_what_needs_it():
+    line = KeyValueFormatter().format(record("RPC failed", level=logging.ERROR,
+                                             method="MakeMove", error="no such room", empty=""))
+    assert line.split(" ", 1)[1] == 'ERROR [Game Server] RPC failed method=MakeMove error="no such room" empty=""'
+
+def test_json_lines_keep_numbers_and_stringify_the_rest():
+    line = json.loads(JsonFormatter("rps-game").format(record("Saved", rooms=3, error=ValueError("x"))))
+    assert line["service"] == "rps-game" and line["logger"] == "Game Server"
+    assert line["rooms"] == 3 and line["error"] == "x"
+
+def test_rate_limit_reports_what_it_dropped(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("common.logs.time.monotonic", lambda: now[0])
+    limit = RateLimitFilter({logging.WARNING: 2}, interval=10)
+    passed = [limit.filter(record("Feed lost", level=logging.WARNING)) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # Other messages and levels have their own budget
+    assert limit.filter(record("Resync", level=logging.WARNING))
+    assert limit.filter(record("Feed lost", level=logging.INFO))
+    now[0] += 10
+    first = record("Feed lost", level=logging.WARNING)
+    assert limit.filter(first)
+    assert first.fields["suppressed"] == 3 and limit.suppressed == 3
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(record("Saved"))
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+def test_pipeline_writes_from_a_background_thread(restore_logging):
+    stream = io.StringIO()
+    pipeline = setup_logging("rps-orm", {'format': 'json', 'level': 'INFO'}, stream)
+    log = get_logger("ORM").bind(shard=1)
+    log.debug("Hidden")
+    log.info("Saved", game_id="r")
+    pipeline.stop()
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines == [{"ts": lines[0]["ts"], "level": "INFO", "service": "rps-orm", "logger": "ORM",
+                      "msg": "Saved", "shard": 1, "game_id": "r"}]
+    assert ("rps_log_dropped_total", {}, 0) in pipeline.metrics()
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import pytest
+
+from orm_service import migrations, orm_server
+from orm_service.migrations import MIGRATIONS, migrate, status
+
+DB_CONFIG = {'migrations': {'lock_timeout_s': 2, 'retry_s': 0.05}}
+
+class FakeDatabase:
+    """What migrate() sees of PostgreSQL: the version table, transactions and the advisory lock"""
+
+    def __init__(self, applied=()):
+        self.applied = {version: "2026-01-01" for version in applied}
+        self.executed = []  # Committed migration statements, in order
+        self.fail_on = None  # A statement containing this text raises
+        self.advisory = threading.Lock()
+        self.connections = 0
+
+    def connect(self, db_config):
+        self.connections += 1
+        return FakeConnection(self)
+
+class FakeConnection:
+    def __init__(self, database):
+        self.database = database
+        self.autocommit = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def close(self):
+        self.closed = True
+
+class FakeCursor:
+    def __init__(self, database):
+        self.database = database
+        self.transaction = None
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        database = self.database
+        text = " ".join(sql.split())
+        if text.startswith("SELECT pg_advisory_lock"):
+            database.advisory.acquire()
+        elif text.startswith("SELECT pg_advisory_unlock"):
+            database.advisory.release()
+        elif text.startswith("CREATE TABLE IF NOT EXISTS schema_migrations"):
+            pass
+        elif text == "SELECT version FROM schema_migrations":
+            self.rows = [(version,) for version in database.applied]
+        elif text == "SELECT to_regclass('schema_migrations') IS NOT NULL":
+            self.rows = [(bool(database.applied),)]
+        elif text == "SELECT version, applied_at FROM schema_migrations":
+            self.rows = list(database.applied.items())
+        elif text == "BEGIN":
+            self.transaction = {"statements": [], "versions": []}
+        elif text == "COMMIT":
+            database.executed.extend(self.transaction["statements"])
+            for version in self.transaction["versions"]:
+                database.applied[version] = "now"
+            self.transaction = None
+        elif text == "ROLLBACK":
+            self.transaction = None
+        elif text.startswith("INSERT INTO schema_migrations"):
+            self.transaction["versions"].append(params[0])
+        else:
+            assert self.transaction is not None, f"outside a transaction: {text[:40]}"
+            if database.fail_on and database.fail_on in text:
+                raise RuntimeError("lock timeout")
+            self.transaction["statements"].append(text)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(migrations, "connect", database.connect)
+    return database
+
+def statements_of(version):
+    return [" ".join(statement.split()) for v, name, statements in MIGRATIONS if v == version
+            for statement in statements]
+
+def test_versions_are_numbered_in_order():
+    versions = [version for version, name, statements in MIGRATIONS]
+    assert versions == list(range(1, len(versions) + 1))
+
+def test_fresh_database_gets_every_migration(database):
+    assert migrate(DB_CONFIG) == [version for version, _, _ in MIGRATIONS]
+    # Each transaction starts by bounding its lock waits
+    assert database.executed[0] == "SET LOCAL lock_timeout = '2000ms'"
+    assert [s for s in database.executed if not s.startswith("SET LOCAL")] == [
+        s for version, _, _ in MIGRATIONS for s in statements_of(version)]
+    assert not database.advisory.locked()
+
+def test_rerun_applies_nothing(database):
+    migrate(DB_CONFIG)
+    executed = list(database.executed)
+    assert migrate(DB_CONFIG) == []
+    assert database.executed == executed
+
+def test_partly_migrated_database_gets_the_rest(database):
+    database.applied = {1: "then", 2: "then"}
+    assert migrate(DB_CONFIG) == [version for version, _, _ in MIGRATIONS if version > 2]
+    assert not any(s in database.executed for s in statements_of(2))
+
+def test_failed_migration_leaves_no_trace_and_is_retried(database):
+    database.fail_on = "CREATE FUNCTION rps_games_changed"
+    with pytest.raises(RuntimeError):
+        migrate(DB_CONFIG)
+    assert set(database.applied) == {1, 2}
+    assert not any(s in database.executed for s in statements_of(3))
+    assert not database.advisory.locked()
+
+    database.fail_on = None
+    assert migrate(DB_CONFIG) == [version for version, _, _ in MIGRATIONS if version > 2]
+
+def test_instances_starting_together_apply_each_migration_once(database):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(migrate(DB_CONFIG))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results, key=len) == [[], [], [], [version for version, _, _ in MIGRATIONS]]
+    statements = [s for s in database.executed if not s.startswith("SET LOCAL")]
+    assert len(statements) == len(set(statements))
+
+def test_status_lists_pending_versions(database):
+    assert all(applied_at is None for _, _, applied_at in status(DB_CONFIG))
+    database.applied = {1: "then"}
+    assert [(version, applied_at) for version, _, applied_at in status(DB_CONFIG)][:2] == [(1, "then"), (2, None)]
+
+def test_orm_keeps_retrying_until_the_database_is_up(database):
+    database.fail_on = "CREATE TABLE IF NOT EXISTS games"
+    orm_server.apply_migrations(DB_CONFIG)
+    assert database.applied == {}
+    time.sleep(0.1)
+    database.fail_on = None
+    deadline = time.monotonic() + 5
+    while len(database.applied) < len(MIGRATIONS):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def test_migrations_can_be_left_to_an_operator(database):
+    orm_server.apply_migrations({'migrations': {'run_on_start': False}})
+    assert database.connections == 0
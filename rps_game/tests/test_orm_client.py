@@ -0,0 +1,175 @@
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+import protos.orm_pb2 as orm_pb2
+from game_server.orm_client import CircuitBreaker, RetryBudget, ResilientOrmClient, OrmUnavailable
+
+class FakeRpcError(grpc.RpcError):
+    def __init__(self, code):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+class FakeMethod:
+    """Stub method that answers from a script of responses and errors"""
+
+    def __init__(self, outcomes, delay=0.0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if len(self.outcomes) > 1 else self.outcomes[0]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    def __call__(self, request, timeout=None):
+        return self._next()
+
+    def future(self, request, timeout=None):
+        future = futures.Future()
+        delay = self.delay if self.calls == 0 else 0.0
+        try:
+            result = self._next()
+        except Exception as e:
+            result, error = None, e
+        else:
+            error = None
+
+        def finish():
+            time.sleep(delay)
+            # The client cancels the copy that lost the race
+            if not future.set_running_or_notify_cancel():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=finish, daemon=True).start()
+        return future
+
+class FakeStub:
+    def __init__(self, **methods):
+        self.__dict__.update(methods)
+
+def client_for(stub, **config):
+    config.setdefault('backoff_base_ms', 0)
+    config.setdefault('backoff_max_ms', 0)
+    return ResilientOrmClient(lambda: stub, config)
+
+UNAVAILABLE = FakeRpcError(grpc.StatusCode.UNAVAILABLE)
+
+def test_breaker_opens_after_threshold_and_probes_once():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=0.01)
+    for _ in range(5):
+        breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_retry_budget_is_spent_and_earned_back():
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0)
+    budget.tokens = 1.0
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+
+def test_retryable_error_is_retried():
+    load = FakeMethod([UNAVAILABLE, orm_pb2.LoadResponse(success=True)])
+    client = client_for(FakeStub(Load=load), methods={"Load": {"hedge_after_ms": 0}})
+    assert client.call("Load", orm_pb2.LoadRequest(game_id="r")).success
+    assert load.calls == 2
+    assert client.counters[("Load", "retry")] == 1
+
+def test_final_answer_is_not_retried():
+    save = FakeMethod([FakeRpcError(grpc.StatusCode.INVALID_ARGUMENT)])
+    client = client_for(FakeStub(Save=save), methods={"Save": {"retries": 3}})
+    with pytest.raises(OrmUnavailable):
+        client.call("Save", orm_pb2.SaveRequest(game_id="r"))
+    assert save.calls == 1
+    # The ORM answered, so it counts as healthy
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+def test_shed_call_is_retried_without_tripping_the_breaker():
+    shed = FakeRpcError(grpc.StatusCode.RESOURCE_EXHAUSTED)
+    save = FakeMethod([shed, shed, orm_pb2.SaveResponse(success=True)])
+    client = client_for(FakeStub(Save=save), methods={"Save": {"retries": 2}},
+                        breaker={'failure_threshold': 1})
+    assert client.call("Save", orm_pb2.SaveRequest(game_id="r")).success
+    assert save.calls == 3
+    # An overloaded ORM still answered: it is not down
+    assert client.breaker.state == CircuitBreaker.CLOSED
+    assert client.breaker.failures == 0
+
+def test_empty_budget_stops_retries():
+    load = FakeMethod([UNAVAILABLE])
+    client = client_for(FakeStub(Load=load), methods={"Load": {"retries": 5, "hedge_after_ms": 0}})
+    client.budget.tokens = 0.0
+    client.budget.min_per_second = 0.0
+    client.budget.ratio = 0.0
+    with pytest.raises(OrmUnavailable):
+        client.call("Load", orm_pb2.LoadRequest(game_id="r"))
+    assert load.calls == 1
+
+def test_open_breaker_rejects_without_calling():
+    load = FakeMethod([orm_pb2.LoadResponse(success=True)])
+    client = client_for(FakeStub(Load=load), breaker={'failure_threshold': 1})
+    client.breaker.record_failure()
+    with pytest.raises(OrmUnavailable):
+        client.call("Load", orm_pb2.LoadRequest(game_id="r"))
+    assert load.calls == 0
+    assert client.counters[("Load", "rejected_open")] == 1
+
+def test_slow_load_is_hedged():
+    load = FakeMethod([orm_pb2.LoadResponse(success=True)], delay=0.5)
+    client = client_for(FakeStub(Load=load), methods={"Load": {"hedge_after_ms": 20}})
+    started = time.monotonic()
+    assert client.call("Load", orm_pb2.LoadRequest(game_id="r")).success
+    assert time.monotonic() - started < 0.4
+    assert load.calls == 2
+    assert client.counters[("Load", "hedge")] == 1
+
+def test_no_leader_raises_after_waiting():
+    client = ResilientOrmClient(lambda: None, {'leader_wait_ms': 50})
+    with pytest.raises(OrmUnavailable):
+        client.call("Load", orm_pb2.LoadRequest(game_id="r"))
+    assert client.counters[("Load", "no_leader")] == 1
+
+def test_database_failure_reaches_the_client_as_retryable(orm):
+    def broken(game_id):
+        raise RuntimeError("database is down")
+
+    orm.engine.load = broken
+    client = ResilientOrmClient(lambda: orm.stub, {
+        'methods': {"Load": {"retries": 2, "hedge_after_ms": 0}},
+        'backoff_base_ms': 0, 'backoff_max_ms': 0,
+    })
+    with pytest.raises(OrmUnavailable, match="UNAVAILABLE"):
+        client.call("Load", orm_pb2.LoadRequest(game_id="r"))
+    assert client.counters[("Load", "retry")] == 2
+    assert client.breaker.failures == 3
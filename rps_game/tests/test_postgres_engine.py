@@ -0,0 +1,185 @@
+import psycopg2
+import pytest
+
+import protos.orm_pb2 as orm_pb2
+import orm_service.postgres_engine as postgres_engine
+from orm_service.postgres_engine import (PostgresEngine, ConnectionPool, STATEMENTS, update_statement,
+                                         _text_statement)
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 1
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+        if self.conn.fail_with is not None:
+            raise self.conn.fail_with
+        self.rowcount = self.conn.rowcount
+
+    def fetchone(self):
+        return self.conn.rows[0] if self.conn.rows else None
+
+    def fetchall(self):
+        return list(self.conn.rows)
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    """Records SQL instead of talking to PostgreSQL"""
+
+    def __init__(self):
+        self.prepared = False
+        self.updates = frozenset()
+        self.closed = 0
+        self.autocommit = False
+        self.executed = []
+        self.rows = []
+        self.rowcount = 1
+        self.fail_with = None
+        self.rolled_back = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.rolled_back += 1
+
+class FakePool:
+    def __init__(self, *args, **kwargs):
+        self.idle = []
+        self.opened = []
+        self.discarded = []
+
+    def getconn(self):
+        if not self.idle:
+            self.opened.append(FakeConnection())
+            self.idle.append(self.opened[-1])
+        return self.idle.pop()
+
+    def putconn(self, conn, close=False):
+        (self.discarded if close else self.idle).append(conn)
+
+    def closeall(self):
+        pass
+
+@pytest.fixture
+def make_engine(monkeypatch):
+    monkeypatch.setattr(postgres_engine, "ConnectionPool", FakePool)
+
+    def make(**db_config):
+        config = {'host': 'db', 'port': 5432, 'user': 'u', 'password': 'p', 'database': 'rps',
+                  'pool': {'min': 1}}
+        config.update(db_config)
+        return PostgresEngine(config)
+
+    return make
+
+def statements(conn, prefix):
+    return [sql for sql, params in conn.executed if sql.startswith(prefix)]
+
+def test_connections_are_prepared_once(make_engine):
+    engine = make_engine()
+    conn = engine.pool.opened[0]
+    assert conn.autocommit
+    assert len(statements(conn, "PREPARE")) == len(STATEMENTS)
+    conn.rows = [("r",)]
+    assert engine.find_session("alice") == "r"
+    assert engine.find_session("alice") == "r"
+    assert len(engine.pool.opened) == 1
+    assert len(statements(conn, "PREPARE")) == len(STATEMENTS)
+    assert conn.executed[-1] == ("EXECUTE rps_check_session (%s)", ("alice",))
+    assert engine.prepares == 1
+
+class IdleConnection:
+    class info:
+        transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    closed = 0
+
+    def close(self):
+        self.closed = 1
+
+def test_pool_keeps_returned_connections_open(monkeypatch):
+    monkeypatch.setattr(psycopg2, "connect", lambda *args, **kwargs: IdleConnection())
+    pool = ConnectionPool(2, host="db")
+    assert pool._pool == []  # Nothing opened up front
+    first, second = pool.getconn(), pool.getconn()
+    pool.putconn(first)
+    pool.putconn(second)
+    # Reused, not reconnected (and re-prepared) on every call
+    assert not first.closed and not second.closed
+    assert pool.getconn() in (first, second)
+
+def test_text_statements_when_prepared_statements_are_off(make_engine):
+    engine = make_engine(prepared_statements=False)
+    conn = engine.pool.opened[0]
+    assert statements(conn, "PREPARE") == []
+    engine.exit_game("r", "alice")
+    sql, params = conn.executed[-1]
+    assert "$" not in sql
+    # $1 and $2 are repeated in the statement, each occurrence gets its own placeholder
+    assert sql.count("%s") == len(params)
+    assert params == ["r"] + ["alice"] * 6 + ["r"]
+
+def test_text_statement_keeps_parameter_order():
+    sql, order = _text_statement("SELECT $2, $1, $2")
+    assert sql == "SELECT %s, %s, %s"
+    assert order == [1, 0, 1]
+
+def test_load_maps_nulls_to_defaults(make_engine):
+    engine = make_engine()
+    engine.pool.opened[0].rows = [("alice", None, None, None, "waiting", None, None, None)]
+    assert engine.load("r") == orm_pb2.Game(player1="alice", status="waiting")
+    engine.pool.opened[0].rows = []
+    assert engine.load("r") is None
+
+def test_update_statement_per_column_set():
+    name, types, sql = update_statement(("player1_choice", "status"))
+    assert name == "rps_update_20"
+    assert types == "(text, text, text)"
+    assert sql == ("UPDATE games SET player1_choice = NULLIF($2, '')::rps_choice, "
+                   "status = NULLIF($3, '')::rps_status WHERE game_id = $1")
+
+def test_partial_save_prepares_its_update_once_per_connection(make_engine):
+    engine = make_engine()
+    conn = engine.pool.opened[0]
+    game = orm_pb2.Game(player1="alice", player1_choice="rock", status="ready")
+    engine.save("r", game, ("player1_choice",))
+    engine.save("r", game, ("player1_choice",))
+    assert len(statements(conn, "PREPARE rps_update_")) == 1
+    assert conn.executed[-1] == ("EXECUTE rps_update_4 (%s, %s)", ["r", "rock"])
+    assert engine.partial_saves == 2
+
+def test_partial_save_of_a_missing_room_inserts_it_whole(make_engine):
+    engine = make_engine()
+    conn = engine.pool.opened[0]
+    conn.rowcount = 0
+    engine.save("r", orm_pb2.Game(player1="alice", status="waiting"), ("status",))
+    sql, params = conn.executed[-1]
+    assert sql.startswith("EXECUTE rps_save ")
+    assert params[:2] == ("r", "alice")
+    assert engine.save_inserts == 1
+
+def test_broken_connection_is_dropped_from_the_pool(make_engine):
+    engine = make_engine()
+    conn = engine.pool.opened[0]
+    conn.fail_with = psycopg2.OperationalError("server closed the connection")
+    with pytest.raises(psycopg2.OperationalError):
+        engine.load("r")
+    assert engine.pool.discarded == [conn]
+    # The next borrower gets a new connection, prepared on first use
+    conn.fail_with = None
+    engine.load("r")
+    assert len(engine.pool.opened) == 2
+    assert engine.prepares == 2
+
+def test_failed_statement_rolls_back_and_keeps_the_connection(make_engine):
+    engine = make_engine()
+    conn = engine.pool.opened[0]
+    conn.fail_with = psycopg2.IntegrityError("bad")
+    with pytest.raises(psycopg2.IntegrityError):
+        engine.delete("r")
+    assert conn.rolled_back == 1
+    assert engine.pool.discarded == []
@@ -0,0 +1,130 @@
+import pstats
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import grpc
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+from common.admin import AdminServer
+from common.profiling import Profiler, CPROFILE, SAMPLE
+from game_server.game_server import create_game_server
+
+def busy(request, context):
+    total = 0
+    for n in range(20000):
+        total += n * n
+    return total
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = Profiler("test", {'dir': str(tmp_path), 'sample_interval_ms': 1, 'max_seconds': 5})
+    yield profiler
+    profiler.stop()
+
+def test_idle_profiler_just_calls_the_handler(profiler):
+    assert profiler.profile_call("Busy", lambda request, context: request, 7, None) == 7
+    assert profiler.calls == {}
+
+def test_cprofile_writes_one_file_per_method(profiler):
+    profiler.start(CPROFILE, 5)
+    profiler.profile_call("MakeMove", busy, None, None)
+    profiler.profile_call("MakeMove", busy, None, None)
+    profiler.profile_call("GetState", busy, None, None)
+    files = profiler.stop()
+    assert [path.rsplit('-', 1)[-1] for path in files] == ["GetState.pstats", "MakeMove.pstats"]
+    assert pstats.Stats(files[1]).total_calls > 0
+    assert "calls MakeMove=2" in profiler.status()
+    assert profiler.mode is None and profiler.profiles_total == 1
+
+def test_call_outliving_its_profile_is_dropped(profiler):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(request, context):
+        started.set()
+        release.wait(5)
+
+    profiler.start(CPROFILE, 5)
+    caller = threading.Thread(target=profiler.profile_call, args=("Slow", slow, None, None))
+    caller.start()
+    started.wait(5)
+    profiler.stop()
+    profiler.start(CPROFILE, 5)
+    release.set()
+    caller.join()
+    assert "Slow" not in profiler.stats
+
+def test_sampling_roots_stacks_at_the_rpc_method(profiler):
+    profiler.start(SAMPLE, 5)
+    deadline = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        profiler.profile_call("MakeMove", busy, None, None)
+    files = profiler.stop()
+    assert len(files) == 1 and files[0].endswith(".collapsed")
+    with open(files[0]) as f:
+        stacks = [line.rsplit(' ', 1)[0] for line in f]
+    assert any(stack.startswith("MakeMove;busy (test_profiling.py") for stack in stacks)
+    # The executor frames below the handler are cut off
+    assert not any(stack.startswith("MakeMove;") and "profile_call" in stack for stack in stacks)
+
+def test_profile_ends_by_itself(profiler):
+    profiler.start(SAMPLE, 0.1)
+    deadline = time.monotonic() + 5
+    while profiler.mode is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert profiler.mode is None and profiler.profiles_total == 1
+
+def test_bad_requests(profiler):
+    with pytest.raises(ValueError):
+        profiler.start("perf", 5)
+    with pytest.raises(ValueError):
+        profiler.start(SAMPLE, 0)
+    profiler.start(SAMPLE, 5)
+    with pytest.raises(RuntimeError):
+        profiler.start(CPROFILE, 5)
+
+def test_admin_routes(profiler):
+    admin = AdminServer(0, "test")
+    profiler.register(admin)
+    admin.start()
+    base = f"http://127.0.0.1:{admin.httpd.server_address[1]}"
+
+    def post(path):
+        try:
+            with urllib.request.urlopen(urllib.request.Request(base + path, method="POST")) as reply:
+                return reply.status, reply.read().decode()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read().decode()
+
+    try:
+        assert post("/profile/start?mode=cprofile&seconds=5")[0] == 202
+        assert post("/profile/start?mode=sample")[0] == 409
+        assert post("/profile/start?mode=perf")[0] == 400
+        with urllib.request.urlopen(base + "/metrics") as reply:
+            assert 'rps_profile_active{service="test"} 1' in reply.read().decode()
+        assert post("/profile/stop") == (200, "")
+        with urllib.request.urlopen(base + "/profile") as reply:
+            assert reply.read().decode().startswith("mode=idle")
+    finally:
+        admin.stop()
+
+def test_grpc_handlers_are_profiled_when_admin_is_on(config, orm, game_servers, profiler):
+    config['server']['admin_port'] = 1
+    servicer = game_servers(orm, leader=True)
+    server, limiter = create_game_server(config, servicer, profiler)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    try:
+        profiler.start(CPROFILE, 5)
+        with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+            stub = game_pb2_grpc.GameServiceStub(channel)
+            stub.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), timeout=5)
+            stub.GetState(game_pb2.StateRequest(game_id="r"), timeout=5)
+        files = profiler.stop()
+        assert sorted(path.rsplit('-', 1)[-1] for path in files) == ["CreateGame.pstats", "GetState.pstats"]
+    finally:
+        server.stop(None)
@@ -0,0 +1,98 @@
+import threading
+
+import protos.game_service_pb2 as game_pb2
+from client.render_store import RenderStore, view_props, GREEN, ORANGE, RED
+
+class FakeUi:
+    """Runs scheduled redraws when the test says a frame has passed"""
+
+    def __init__(self):
+        self.scheduled = []
+        self.applied = []
+        self.store = RenderStore(self.scheduled.append, lambda widget, options: self.applied.append((widget, options)))
+
+    def frame(self):
+        callbacks, self.scheduled[:] = list(self.scheduled), []
+        for callback in callbacks:
+            callback()
+        applied, self.applied[:] = list(self.applied), []
+        return dict(applied)
+
+def state(**fields):
+    base = dict(game_id="r", player1="alice", player2="bob", status="ready",
+                player1_choice="waiting", player2_choice="waiting")
+    base.update(fields)
+    return game_pb2.GameResponse(**base)
+
+def test_choices_are_enabled_only_while_waiting_for_my_move():
+    props = view_props(state(), "alice", True)
+    assert props["status"]["bg"] == GREEN and props["rock"] == {"state": "normal"}
+    props = view_props(state(player1_choice="chosen"), "alice", True)
+    assert props["status"]["bg"] == ORANGE and props["rock"] == {"state": "disabled"}
+    props = view_props(state(status="player1_won"), "alice", True)
+    assert props["next_round"] == {"state": "normal"}
+
+def test_disconnected_only_touches_status_and_choices():
+    props = view_props(state(), "alice", False)
+    assert props["status"]["bg"] == RED
+    assert set(props) == {"status", "rock", "paper", "scissors"}
+    assert view_props(None, "alice", True) == {}
+
+def test_states_arriving_within_a_frame_cause_one_redraw():
+    ui = FakeUi()
+    ui.store.reset("alice")
+    for score in range(5):
+        ui.store.submit(state(player1_score=score))
+    assert len(ui.scheduled) == 1
+    applied = ui.frame()
+    assert applied["score"] == {"text": "Score: 4 - 0"}
+    assert ui.store.received == 5 and ui.store.redraws == 1
+
+def test_only_changed_options_reach_the_widgets():
+    ui = FakeUi()
+    ui.store.reset("alice")
+    ui.store.submit(state())
+    ui.frame()
+    ui.store.submit(state(player2_choice="chosen"))
+    # The opponent moved: nothing alice sees is different
+    assert ui.frame() == {}
+    ui.store.submit(state(player1_score=1, round_result="alice wins"))
+    assert ui.frame() == {"score": {"text": "Score: 1 - 0"}, "result": {"text": "alice wins"}}
+
+def test_identical_state_is_never_scheduled():
+    ui = FakeUi()
+    ui.store.submit(state())
+    ui.frame()
+    ui.store.submit(state())
+    assert ui.scheduled == []
+
+def test_reset_redraws_everything_for_the_new_room():
+    ui = FakeUi()
+    ui.store.reset("alice")
+    ui.store.submit(state())
+    ui.frame()
+    ui.store.reset("alice")
+    ui.store.submit(state())
+    assert "info" in ui.frame()
+
+def test_connection_loss_and_return():
+    ui = FakeUi()
+    ui.store.reset("alice")
+    ui.store.submit(state())
+    ui.frame()
+    ui.store.set_connected(False)
+    assert ui.frame()["status"]["bg"] == RED
+    ui.store.set_connected(True)
+    applied = ui.frame()
+    assert applied["status"]["bg"] == GREEN and applied["rock"] == {"state": "normal"}
+
+def test_submit_from_many_threads():
+    ui = FakeUi()
+    ui.store.reset("alice")
+    threads = [threading.Thread(target=lambda n=n: ui.store.submit(state(player1_score=n))) for n in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(ui.scheduled) == 1
+    assert ui.store.received == 20
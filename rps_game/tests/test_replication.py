@@ -0,0 +1,129 @@
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+from common.channels import ChannelManager
+from game_server.game_logic import RockPaperScissorsGame
+from game_server.room_cache import RoomCache
+from game_server.replication import RoomReplicator, ReplicationServicer, to_snapshot, from_snapshot
+
+class FakeHealth:
+    def __init__(self, ports):
+        self.ports = ports
+
+    def service(self, name, passing):
+        return 1, [{'Service': {'Address': '127.0.0.1', 'Port': port}} for port in self.ports]
+
+class FakeConsul:
+    def __init__(self, ports):
+        self.health = FakeHealth(ports)
+
+def room(player1="alice", player2="", score=0):
+    game = RockPaperScissorsGame()
+    game.player1 = player1
+    game.player2 = player2
+    game.player1_score = score
+    return game
+
+@pytest.fixture
+def standby():
+    cache = RoomCache()
+    leader = {'value': False}
+    servicer = ReplicationServicer(cache, lambda: leader['value'])
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    game_pb2_grpc.add_GameReplicationServicer_to_server(servicer, server)
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    yield cache, servicer, port, leader
+    server.stop(None)
+
+def wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+def test_snapshot_round_trip():
+    game = room("alice", "bob", score=3)
+    game.round_seq = 42
+    copy = from_snapshot(to_snapshot("r", game, 7))
+    assert (copy.player1, copy.player2, copy.player1_score, copy.round_seq) == ("alice", "bob", 3, 42)
+    assert to_snapshot("r", None, 8, deleted=True).deleted
+
+def test_standby_follows_the_leader(standby):
+    standby_cache, servicer, port, _ = standby
+    cache = RoomCache()
+    cache.put("kept", room())
+    replicator = RoomReplicator(cache, FakeConsul([port]), "http://leader:1",
+                                {'interval_ms': 5, 'heartbeat_ms': 50}, ChannelManager({}))
+    replicator.start()
+    replicator.set_active(True)
+    wait_for(lambda: standby_cache.peek("kept") is not None)
+
+    version = cache.put("kept", room(score=2))
+    cache.put("gone", room())
+    cache.remove("gone")
+    wait_for(lambda: standby_cache.version("kept") == version)
+    assert standby_cache.peek("kept").player1_score == 2
+    assert standby_cache.peek("gone") is None
+    assert servicer.shadow_age() < 1.0
+    replicator.set_active(False)
+
+def test_handoff_warms_the_successor(standby):
+    standby_cache, servicer, port, leader = standby
+    standby_cache.put("stale", room())
+    cache = RoomCache()
+    version = cache.put("live", room(score=5))
+    replicator = RoomReplicator(cache, FakeConsul([port]), "http://leader:1", {}, ChannelManager({}))
+    replicator.handoff()
+    # A full snapshot replaces the shadow copy
+    assert standby_cache.game_ids() == ["live"]
+    assert standby_cache.version("live") == version
+    assert servicer.leader_url == "http://leader:1"
+
+    # Once it leads, its own newer writes survive a late snapshot from the old leader
+    leader['value'] = True
+    newer = standby_cache.put("live", room(score=6))
+    replicator.handoff()
+    assert standby_cache.version("live") == newer
+    assert standby_cache.peek("live").player1_score == 6
+
+class SlowStandby:
+    """Handoff stub that answers after `delay` and remembers the timeouts it was given"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.timeouts = []
+
+    def Handoff(self, snapshots, timeout, metadata):
+        self.timeouts.append(timeout)
+        time.sleep(min(self.delay, timeout))
+        return game_pb2.ReplicationAck(accepted=True)
+
+def test_handoff_fits_in_one_budget_for_all_standbys():
+    replicator = RoomReplicator(RoomCache(), FakeConsul([]), "http://leader:1",
+                                {'handoff_timeout_ms': 300}, ChannelManager({}))
+    slow, late, skipped = SlowStandby(0.2), SlowStandby(0.2), SlowStandby(0.2)
+    replicator.standbys = {"a": [slow, True], "b": [late, True], "c": [skipped, True]}
+    started = time.monotonic()
+    replicator.handoff()
+    # The lock waits for the handoff, so the handoff does not wait for every standby in turn
+    assert time.monotonic() - started < 0.45
+    assert slow.timeouts[0] <= 0.3
+    assert late.timeouts[0] <= 0.1
+    assert skipped.timeouts == []
+
+def test_leader_rejects_replicated_batches(standby):
+    standby_cache, servicer, port, leader = standby
+    leader['value'] = True
+    cache = RoomCache()
+    cache.put("r", room())
+    replicator = RoomReplicator(cache, FakeConsul([port]), "http://leader:1", {}, ChannelManager({}))
+    replicator._discover_standbys()
+    replicator.standbys[f"http://127.0.0.1:{port}"][1] = True
+    replicator._send([to_snapshot("r", room(), 1)])
+    assert standby_cache.peek("r") is None
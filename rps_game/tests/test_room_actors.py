@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+from game_server.room_actors import RoomActors
+
+def test_ask_returns_the_result_or_raises():
+    actors = RoomActors()
+    assert actors.ask("r", lambda: 42) == 42
+    with pytest.raises(KeyError):
+        actors.ask("r", lambda: {}["missing"])
+    # A failed command does not stop the room
+    assert actors.ask("r", lambda: "next") == "next"
+    assert actors.actors == {}
+
+def test_failed_tell_is_only_logged():
+    actors = RoomActors()
+    actors.tell("r", lambda: 1 / 0)
+    assert actors.ask("r", lambda: "still running") == "still running"
+
+def test_commands_for_one_room_run_one_at_a_time_in_order():
+    actors = RoomActors()
+    log = []
+    running = []
+    release = threading.Event()
+
+    def first():
+        running.append(1)
+        release.wait(5)
+        log.append(0)
+
+    blocker = threading.Thread(target=actors.ask, args=("r", first))
+    blocker.start()
+    while not running:
+        time.sleep(0.01)
+    for n in range(1, 6):
+        actors.tell("r", lambda n=n: log.append(n))
+    assert log == [] and actors.queued == 5
+    release.set()
+    blocker.join()
+    assert log == [0, 1, 2, 3, 4, 5]
+
+def test_different_rooms_run_in_parallel():
+    actors = RoomActors()
+    inside = threading.Barrier(2, timeout=5)
+    threads = [threading.Thread(target=actors.ask, args=(room, inside.wait)) for room in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Both commands were in at once, or the barrier would have broken
+    assert not inside.broken
+
+def test_busy_room_is_handed_to_the_next_asker():
+    actors = RoomActors(max_batch=2)
+    running = []
+    release = threading.Event()
+    ran_on = []
+
+    def first():
+        running.append(1)
+        release.wait(5)
+
+    owner = threading.Thread(target=actors.ask, args=("r", first))
+    owner.start()
+    while not running:
+        time.sleep(0.01)
+    actors.tell("r", lambda: ran_on.append(("tell", threading.current_thread().name)))
+    asker = threading.Thread(target=actors.ask, name="asker",
+                             args=("r", lambda: ran_on.append(("ask", threading.current_thread().name))))
+    asker.start()
+    while actors.queued < 2:
+        time.sleep(0.01)
+    actors.tell("r", lambda: ran_on.append(("after", threading.current_thread().name)))
+    release.set()
+    owner.join()
+    asker.join()
+    # The owner ran its batch of two; the waiting asker took over from there
+    assert ran_on == [("tell", owner.name), ("ask", "asker"), ("after", "asker")]
+    assert actors.handoffs == 1
+
+def test_wait_idle():
+    actors = RoomActors()
+    assert actors.wait_idle(0)
+    release = threading.Event()
+    worker = threading.Thread(target=actors.ask, args=("r", lambda: release.wait(5)))
+    worker.start()
+    while not actors.actors:
+        time.sleep(0.01)
+    assert not actors.wait_idle(0.05)
+    threading.Timer(0.05, release.set).start()
+    assert actors.wait_idle(5)
+    worker.join()
+
+def test_concurrent_moves_on_one_room(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    for _ in range(10):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def move(player, choice):
+            barrier.wait()
+            server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id=player, choice=choice), None)
+
+        threads = [threading.Thread(target=move, args=("alice", "rock")),
+                   threading.Thread(target=move, args=("bob", "scissors"))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        state = server.GetState(game_pb2.StateRequest(game_id="r"), None)
+        # Neither move was lost to the other
+        assert state.status == "player1_won"
+        server.ResetGame(game_pb2.StateRequest(game_id="r"), None)
+    assert server.GetState(game_pb2.StateRequest(game_id="r"), None).player1_score == 10
@@ -0,0 +1,88 @@
+import game_server.room_cache as room_cache
+from game_server.room_cache import RoomCache, next_version, observe_version
+from game_server.game_logic import RockPaperScissorsGame
+
+def room(player1="alice", player2=""):
+    game = RockPaperScissorsGame()
+    game.player1 = player1
+    game.player2 = player2
+    return game
+
+def test_versions_only_go_up():
+    cache = RoomCache()
+    first = cache.put("r", room())
+    second = cache.put("r", room())
+    assert second > first
+    assert cache.version("r") == second
+
+def test_keep_reuses_the_version_of_the_same_state():
+    cache = RoomCache()
+    stored = room()
+    stored.mark_stored()
+    version = cache.put("r", stored)
+    cache.mark_stale("r")
+    reloaded = room()
+    reloaded.mark_stored()
+    assert cache.keep("r", reloaded) == version
+    assert cache.get("r")[1] == version
+    changed = room("alice", "bob")
+    changed.mark_stored()
+    assert cache.keep("r", changed) > version
+
+def test_get_returns_a_private_copy():
+    cache = RoomCache()
+    cache.put("r", room())
+    game, version = cache.get("r")
+    game.player1 = "mallory"
+    assert cache.peek("r").player1 == "alice"
+    assert cache.get("missing") == (None, 0)
+
+def test_apply_ignores_older_versions():
+    cache = RoomCache()
+    version = cache.put("r", room())
+    assert not cache.apply("r", room("old"), version - 1)
+    assert cache.apply("r", room("new"), version + 1)
+    assert cache.peek("r").player1 == "new"
+    assert cache.apply("r", None, version + 2, deleted=True)
+    assert cache.peek("r") is None
+
+def test_versions_continue_past_a_replicated_one():
+    # A failover to a server whose clock is behind must not hand out lower versions
+    far_ahead = next_version() + 10 ** 9
+    cache = RoomCache()
+    cache.apply("r", room(), far_ahead)
+    assert cache.put("r", room()) > far_ahead
+    observe_version(1)
+    assert room_cache._last_version > far_ahead
+
+def test_players_follow_their_room():
+    cache = RoomCache()
+    version = cache.put("r", room("alice", "bob"))
+    assert cache.find_player("bob") == ("r", version)
+    cache.put("r", room("alice"))
+    assert cache.find_player("bob") == (None, 0)
+    cache.remove("r")
+    assert cache.find_player("alice") == (None, 0)
+
+def test_listeners_see_puts_and_removals():
+    cache = RoomCache()
+    seen = []
+    cache.add_listener(lambda game_id, game, version, deleted: seen.append((game_id, deleted)))
+    cache.put("r", room())
+    cache.remove("r")
+    cache.remove("r")
+    assert seen == [("r", False), ("r", True)]
+
+def test_capacity_evicts_least_recently_used():
+    cache = RoomCache(max_rooms=2)
+    cache.put("a", room())
+    cache.put("b", room())
+    cache.get("a")
+    cache.put("c", room())
+    assert sorted(cache.game_ids()) == ["a", "c"]
+
+def test_idle_rooms_are_evicted():
+    cache = RoomCache(idle_ttl=0.0)
+    cache.put("a", room())
+    assert cache.evict_idle() == 1
+    assert cache.game_ids() == []
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import protos.orm_pb2 as orm_pb2
+import protos.game_service_pb2 as game_pb2
+from orm_service.round_history import RoundHistory
+
+class RecordingEngine:
+    def __init__(self):
+        self.batches = []
+        self.fail = False
+
+    def record_rounds(self, rows):
+        if self.fail:
+            raise RuntimeError("database is down")
+        self.batches.append(list(rows))
+
+def event(round_seq, outcome="player1_won"):
+    return orm_pb2.RoundEvent(player1="alice", player2="bob", player1_choice="rock",
+                              player2_choice="scissors", outcome=outcome, played_at_ms=round_seq,
+                              round_seq=round_seq)
+
+def history_on(engine, **config):
+    config.setdefault('flush_interval_ms', 60000)
+    return RoundHistory(engine, config)
+
+def test_rounds_are_written_in_batches():
+    engine = RecordingEngine()
+    history = history_on(engine, batch_size=2)
+    history.append("r", [event(1), event(2), event(3)])
+    assert history.flush() == 3
+    assert [len(batch) for batch in engine.batches] == [2, 1]
+    assert engine.batches[0][0] == ("r", "alice", "bob", "rock", "scissors", "player1_won", 1, 1)
+    history.close()
+
+def test_failed_batch_is_kept_in_order():
+    engine = RecordingEngine()
+    history = history_on(engine)
+    history.append("r", [event(1), event(2)])
+    engine.fail = True
+    try:
+        history.flush()
+    except RuntimeError:
+        pass
+    history.append("r", [event(3)])
+    engine.fail = False
+    history.flush()
+    assert [row[7] for row in engine.batches[0]] == [1, 2, 3]
+    history.close()
+
+def test_oldest_rounds_are_shed_when_the_buffer_is_full():
+    engine = RecordingEngine()
+    history = history_on(engine, max_pending=2)
+    history.append("r", [event(1), event(2), event(3)])
+    history.close()
+    assert [row[7] for row in engine.batches[0]] == [2, 3]
+    assert history.dropped == 1
+
+def test_full_batch_wakes_the_flusher():
+    engine = RecordingEngine()
+    history = history_on(engine, batch_size=2)
+    history.append("r", [event(1), event(2)])
+    deadline = time.monotonic() + 2
+    while not engine.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert engine.batches
+    history.close()
+
+def test_positions_tell_which_rounds_a_read_has_seen():
+    engine = RecordingEngine()
+    history = history_on(engine)
+    assert history.append("r", [event(1), event(2)]) == [1, 2]
+    assert history.append("s", [event(1)]) == [3]
+    history.flush()
+    # A retried Save keeps the positions its rounds were first queued at
+    assert history.append("r", [event(2), event(3)]) == [2, 4]
+    assert history.snapshot(lambda: "read") == ("read", 3)
+    history.flush()
+    assert history.snapshot(lambda: "read") == ("read", 4)
+    assert [row[7] for batch in engine.batches for row in batch] == [1, 2, 1, 3]
+    history.close()
+
+def test_retried_save_records_its_rounds_once(config, orm, game_servers):
+    # The first Save carrying rounds commits, then answers too late: the game server retries it
+    config['orm_client']['methods']['Save'].update(timeout_ms=200, retries=1)
+    append = orm.service.history.append
+    delayed = threading.Event()
+
+    def slow_append(game_id, rounds):
+        append(game_id, rounds)
+        if rounds and not delayed.is_set():
+            delayed.set()
+            time.sleep(0.5)
+
+    orm.service.history.append = slow_append
+    server = game_servers(orm, leader=True)
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="alice", choice="rock"), None)
+    response = server.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="bob", choice="paper"), None)
+    assert response.error == ""
+    assert response.player2_score == 1
+    assert server.orm.counters[("Save", "retry")] == 1
+
+    orm.service.history.flush()
+    rounds = orm.engine._connection().execute("SELECT count(*) FROM rounds").fetchone()[0]
+    assert rounds == 1
+    assert orm.engine.load_player_stats("", 10) == [("alice", 0, 1, 0), ("bob", 1, 0, 0)]
+    assert server.leaderboard.rank("bob") == (1, 1, 0, 0)
@@ -0,0 +1,114 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent import futures
+
+import grpc
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+from common.shutdown import GracefulShutdown, drain
+from game_server.game_server import step_down, add_drain_steps
+
+def test_steps_run_in_order_past_a_failure():
+    shutdown = GracefulShutdown({})
+    ran = []
+    shutdown.add_step("first", lambda: ran.append("first"))
+    shutdown.add_step("broken", lambda: 1 / 0)
+    shutdown.add_step("last", lambda: ran.append("last"))
+    shutdown.run()
+    assert ran == ["first", "last"]
+
+def test_signal_starts_the_shutdown():
+    shutdown = GracefulShutdown({'drain_timeout_s': 3})
+    ran = []
+    shutdown.add_step("step", lambda: ran.append(shutdown.signal_name))
+    previous = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    try:
+        shutdown.install()
+        os.kill(os.getpid(), signal.SIGTERM)
+        shutdown.wait()
+    finally:
+        signal.signal(signal.SIGTERM, previous[0])
+        signal.signal(signal.SIGINT, previous[1])
+    assert ran == ["SIGTERM"] and shutdown.drain_timeout == 3
+
+def test_second_signal_exits_at_once():
+    script = (
+        "import os, signal, time\n"
+        "from common.shutdown import GracefulShutdown\n"
+        "shutdown = GracefulShutdown({})\n"
+        "shutdown.add_step('stuck', lambda: (os.kill(os.getpid(), signal.SIGINT), time.sleep(30)))\n"
+        "shutdown.install()\n"
+        "os.kill(os.getpid(), signal.SIGTERM)\n"
+        "shutdown.wait()\n"
+    )
+    started = time.monotonic()
+    result = subprocess.run([sys.executable, "-c", script], timeout=20)
+    assert result.returncode == 1
+    assert time.monotonic() - started < 20
+
+def test_drain_finishes_running_calls_and_refuses_new_ones():
+    inside = threading.Event()
+
+    def slow(request, context):
+        inside.set()
+        time.sleep(0.3)
+        return request
+
+    server = grpc.server(futures.ThreadPoolExecutor(4))
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(
+        't.S', {'Slow': grpc.unary_unary_rpc_method_handler(slow)}),))
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+        call = channel.unary_unary('/t.S/Slow')
+        running = call.future(b'x', timeout=5)
+        assert inside.wait(5)
+        drainer = threading.Thread(target=drain, args=(server, 5))
+        drainer.start()
+        time.sleep(0.05)
+        with pytest.raises(grpc.RpcError) as error:
+            call(b'late', timeout=5)
+        assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+        assert running.result() == b'x'
+        drainer.join()
+
+def test_step_down_lets_queued_room_commands_finish(orm, game_servers):
+    server = game_servers(orm, leader=True)
+    server.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    release = threading.Event()
+    finished = []
+    holder = threading.Thread(target=server.actors.ask, args=("r", lambda: release.wait(5)))
+    holder.start()
+    server.actors.tell("r", lambda: finished.append("queued"))
+    threading.Timer(0.1, release.set).start()
+    step_down(server, 5)
+    holder.join()
+    assert finished == ["queued"]
+    # Nothing new is written once we have stepped down
+    response = server.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    assert response.error == "NOT_LEADER"
+
+def test_drain_steps_end_streams_then_flush(game_port):
+    servicer, port = game_port
+    servicer.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stream = game_pb2_grpc.GameServiceStub(channel).Spectate(
+            game_pb2.SpectateRequest(game_id="r"), timeout=10)
+        assert next(stream).game_id == "r"
+        step_down(servicer, 5)
+        shutdown = GracefulShutdown({'drain_timeout_s': 2})
+        add_drain_steps(shutdown, servicer, [])
+        started = time.monotonic()
+        shutdown.run()
+        # The spectator's stream ended instead of holding the drain up
+        assert list(stream) == []
+        assert time.monotonic() - started < 2
+    assert [name for name, _ in shutdown.steps] == [
+        "close spectator streams", "flush brackets", "stop scheduler", "close channels"]
+    assert not servicer.scheduler.running
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import grpc
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+from game_server.spectators import SpectatorHub
+
+class StreamContext:
+    def __init__(self):
+        self.active = True
+        self.callbacks = []
+
+    def is_active(self):
+        return self.active
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+def test_every_spectator_gets_the_same_bytes():
+    hub = SpectatorHub({})
+    first, second = hub.subscribe("r"), hub.subscribe("r")
+    other = hub.subscribe("s")
+    payload = b"state"
+    hub.publish("r", 2, payload)
+    assert first.take()[0][1] is payload
+    assert second.take()[0][1] is payload
+    assert other.take() == []
+    assert (hub.published, hub.delivered) == (1, 2)
+
+def test_slow_spectator_keeps_only_the_latest_state():
+    hub = SpectatorHub({'queue_size': 2})
+    subscriber = hub.subscribe("r")
+    for version in (1, 2, 3):
+        hub.publish("r", version, str(version).encode())
+    assert subscriber.take() == [(3, b"3")]
+    assert hub.conflated == 1
+
+def test_spectator_limit():
+    hub = SpectatorHub({'max_spectators': 1})
+    subscriber = hub.subscribe("r")
+    assert hub.subscribe("s") is None
+    hub.unsubscribe(subscriber)
+    assert not hub.watching("r")
+    assert hub.subscribe("s") is not None
+
+def test_stream_skips_states_older_than_the_initial_one():
+    hub = SpectatorHub({'check_interval_s': 0.05})
+    subscriber = hub.subscribe("r")
+    context = StreamContext()
+    stream = hub.stream(subscriber, (5, b"initial"), context)
+    assert next(stream) == b"initial"
+    hub.publish("r", 4, b"older")
+    hub.publish("r", 6, b"newer")
+    assert next(stream) == b"newer"
+    hub.publish("r", 0, b"closed", last=True)
+    assert list(stream) == [b"closed"]
+    assert hub.count == 0
+
+def test_close_all_ends_the_streams():
+    hub = SpectatorHub({'check_interval_s': 0.05})
+    stream = hub.stream(hub.subscribe("r"), (1, b"initial"), StreamContext())
+    next(stream)
+    assert hub.close_all() == 1
+    assert list(stream) == []
+
+def test_spectator_sees_moves_over_grpc(game_port):
+    servicer, port = game_port
+    servicer.CreateGame(game_pb2.CreateRequest(player_id="alice|r"), None)
+    channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+    seen = []
+    stream = game_pb2_grpc.GameServiceStub(channel).Spectate(game_pb2.SpectateRequest(game_id="r"))
+
+    def watch():
+        try:
+            for state in stream:
+                seen.append(state)
+        except grpc.RpcError:
+            pass  # Cancelled at the end of the test
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    deadline = time.monotonic() + 3
+    while not seen and time.monotonic() < deadline:
+        time.sleep(0.01)
+    servicer.CreateGame(game_pb2.CreateRequest(player_id="bob|r"), None)
+    servicer.MakeMove(game_pb2.MoveRequest(game_id="r", player_id="alice", choice="rock"), None)
+    while len(seen) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stream.cancel()
+    channel.close()
+
+    assert seen[0].status == "waiting"
+    assert seen[1].player2 == "bob"
+    # Spectators never see a choice before both players made theirs
+    assert seen[2].player1_choice == "chosen"
+    versions = [state.state_version for state in seen]
+    assert versions == sorted(versions)
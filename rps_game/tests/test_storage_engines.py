@@ -0,0 +1,187 @@
+import sqlite3
+import threading
+
+import pytest
+
+import protos.orm_pb2 as orm_pb2
+from orm_service.storage import create_engine, stat_deltas
+from orm_service.sqlite_engine import SqliteEngine
+from orm_service.log_engine import LogEngine
+
+ENGINES = {
+    "sqlite": lambda tmp_path: SqliteEngine({'path': str(tmp_path / "rps.db")}),
+    "log": lambda tmp_path: LogEngine({'dir': str(tmp_path / "log")}),
+}
+
+@pytest.fixture(params=sorted(ENGINES))
+def open_engine(request, tmp_path):
+    """open_engine() -> engine on tmp_path; a second call reopens the same files"""
+    opened = []
+
+    def open_():
+        opened.append(ENGINES[request.param](tmp_path))
+        return opened[-1]
+
+    yield open_
+    for engine in opened:
+        engine.close()
+
+@pytest.fixture
+def engine(open_engine):
+    return open_engine()
+
+def game(player1="alice", player2="", status="waiting", **fields):
+    return orm_pb2.Game(player1=player1, player2=player2, player1_choice="waiting",
+                        player2_choice="waiting", status=status, **fields)
+
+def test_save_and_load(engine):
+    assert engine.load("r") is None
+    engine.save("r", game(player2="bob", status="ready", player1_score=2))
+    assert engine.load("r") == game(player2="bob", status="ready", player1_score=2)
+    engine.save("r", game(player2="bob", status="finished"))
+    assert engine.load("r").status == "finished"
+
+def test_find_session(engine):
+    engine.save("r", game(player2="bob"))
+    assert engine.find_session("alice") == "r"
+    assert engine.find_session("bob") == "r"
+    assert engine.find_session("carol") is None
+
+def test_delete(engine):
+    engine.save("r", game())
+    engine.delete("r")
+    assert engine.load("r") is None
+    engine.delete("r")
+
+def test_exit_game_drops_the_room_once_empty(engine):
+    engine.save("r", game(player2="bob", status="ready"))
+    engine.exit_game("r", "alice")
+    assert (engine.load("r").player1, engine.load("r").player2) == ("", "bob")
+    engine.exit_game("r", "bob")
+    assert engine.load("r") is None
+    engine.exit_game("missing", "bob")
+
+def test_rooms_survive_reopening(open_engine):
+    engine = open_engine()
+    engine.save("r", game(player2="bob", player2_score=1))
+    engine.close()
+    assert open_engine().load("r") == game(player2="bob", player2_score=1)
+
+def test_concurrent_writers_on_different_rooms(engine):
+    def write(thread):
+        for i in range(50):
+            engine.save(f"{thread}-{i}", game(player1=f"p{thread}-{i}"))
+
+    threads = [threading.Thread(target=write, args=(t,)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(engine.load(f"{t}-49") is not None for t in range(4))
+
+def test_create_engine_by_name(tmp_path):
+    engine = create_engine({'database': {'engine': 'sqlite', 'sqlite': {'path': str(tmp_path / "x.db")}}})
+    assert engine.name == "sqlite"
+    engine.close()
+    with pytest.raises(ValueError):
+        create_engine({'database': {'engine': 'nosuch'}})
+
+def test_players_leaving_together_never_strand_an_empty_room(engine):
+    for attempt in range(30):
+        game_id = f"r{attempt}"
+        engine.save(game_id, game(player2="bob", status="ready"))
+        threads = [threading.Thread(target=engine.exit_game, args=(game_id, player))
+                   for player in ("alice", "bob")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert engine.load(game_id) is None
+
+def round_row(game_id, round_seq, outcome="player1_won", player1="alice", player2="bob"):
+    return (game_id, player1, player2, "rock", "scissors", outcome, 1700000000000 + round_seq, round_seq)
+
+def test_round_totals(engine):
+    engine.record_rounds([
+        round_row("r", 1),
+        round_row("r", 2, "draw"),
+        round_row("s", 1, "player2_won", player1="carol"),
+    ])
+    assert engine.load_player_stats("", 10) == [("alice", 1, 0, 1), ("bob", 1, 1, 1), ("carol", 0, 1, 0)]
+    assert engine.load_player_stats("alice", 1) == [("bob", 1, 1, 1)]
+
+def test_resent_rounds_are_recorded_once(engine):
+    engine.record_rounds([round_row("r", 1), round_row("r", 2)])
+    # A retried Save resends the same rounds, possibly together with new ones
+    engine.record_rounds([round_row("r", 2), round_row("r", 3)])
+    engine.record_rounds([round_row("r", 3)])
+    assert engine.load_player_stats("", 10) == [("alice", 3, 0, 0), ("bob", 0, 3, 0)]
+
+def test_rounds_without_a_number_are_never_merged(engine):
+    engine.record_rounds([round_row("r", 0), round_row("r", 0)])
+    assert engine.load_player_stats("", 1) == [("alice", 2, 0, 0)]
+
+def test_round_numbers_are_remembered_across_reopening(open_engine):
+    engine = open_engine()
+    engine.record_rounds([round_row("r", 1)])
+    engine.close()
+    reopened = open_engine()
+    reopened.record_rounds([round_row("r", 1), round_row("r", 2)])
+    assert reopened.load_player_stats("", 1) == [("alice", 2, 0, 0)]
+
+def test_stat_deltas():
+    rows = [
+        ("r", "alice", "bob", "rock", "paper", "player2_won", 1, 1),
+        ("r", "alice", "bob", "rock", "rock", "draw", 2, 2),
+        ("r", "alice", "", "rock", "", "player1_won", 3, 3),
+    ]
+    assert stat_deltas(rows) == [("alice", 1, 1, 1), ("bob", 1, 0, 1)]
+
+def test_sqlite_upgrades_an_older_file(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE games (game_id TEXT PRIMARY KEY, player1 TEXT, player2 TEXT, player1_choice TEXT,
+                            player2_choice TEXT, status TEXT, player1_score INTEGER DEFAULT 0,
+                            player2_score INTEGER DEFAULT 0) WITHOUT ROWID;
+        CREATE TABLE rounds (game_id TEXT NOT NULL, player1 TEXT, player2 TEXT, player1_choice TEXT,
+                             player2_choice TEXT, outcome TEXT, played_at_ms INTEGER NOT NULL);
+        INSERT INTO games VALUES ('r', 'alice', 'bob', 'waiting', 'waiting', 'ready', 1, 0);
+        INSERT INTO rounds VALUES ('r', 'alice', 'bob', 'rock', 'paper', 'player2_won', 1);
+    """)
+    conn.close()
+
+    engine = SqliteEngine({'path': path})
+    assert engine.load("r").round_seq == 0
+    assert engine.load("r").player1_score == 1
+    engine.record_rounds([round_row("r", 5), round_row("r", 5)])
+    assert engine.load_player_stats("", 1) == [("alice", 1, 0, 0)]
+    engine.close()
+
+def test_brackets_of_unfinished_tournaments_are_loaded(open_engine):
+    engine = open_engine()
+    engine.record_bracket(
+        [("cup", "single_elimination", 4, 2, 1, "running", "", 1, 1, ["a", "b", "c", "d"]),
+         ("old", "swiss", 2, 1, 1, "finished", "a", 1, 1, ["a", "b"])],
+        [("cup", 1, 0, "cup-r1-m0", "a", "b", 1, 0, "a", 2),
+         ("old", 1, 0, "old-r1-m0", "a", "b", 1, 0, "a", 2)])
+    # A later state without the roster keeps the stored one; a retried match is written once
+    engine.record_bracket(
+        [("cup", "single_elimination", 4, 2, 2, "running", "", 3, 1, [])],
+        [("cup", 1, 0, "cup-r1-m0", "a", "b", 1, 0, "a", 2)])
+    engine = open_engine()
+    tournaments, matches = engine.load_tournaments()
+    assert [tuple(t[:9]) + (list(t[9]),) for t in tournaments] == [
+        ("cup", "single_elimination", 4, 2, 2, "running", "", 3, 1, ["a", "b", "c", "d"])]
+    assert [tuple(m) for m in matches] == [("cup", 1, 0, "cup-r1-m0", "a", "b", 1, 0, "a", 2)]
+
+def test_partial_save_keeps_the_room_whole(engine):
+    stored = game(player2="bob", status="ready", player1_score=1)
+    engine.save("r", stored)
+    stored.player1_choice = "rock"
+    engine.save("r", stored, ("player1_choice",))
+    assert engine.load("r") == stored
+
+def test_partial_save_of_a_missing_room_inserts_it(engine):
+    engine.save("r", game(player2="bob", status="ready"), ("status",))
+    assert engine.load("r") == game(player2="bob", status="ready")
@@ -0,0 +1,272 @@
+import threading
+import time
+
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+from game_server.room_actors import RoomActors
+from game_server.room_cache import RoomCache
+from game_server.tournament import (Scheduler, BracketWriter, Tournament, TournamentEngine,
+                                    SINGLE_ELIMINATION, SWISS)
+
+FAST = {'result_display_s': 0, 'round_break_s': 0, 'flush_interval_ms': 20, 'move_timeout_s': 30}
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(2)
+    yield scheduler
+    scheduler.stop()
+
+class Brackets:
+    """persist() for the writer, keeping what a storage engine would"""
+
+    def __init__(self):
+        self.tournaments = {}
+        self.matches = {}
+        self.calls = 0
+        self.fail = 0
+
+    def persist(self, tournaments, matches):
+        self.calls += 1
+        if self.fail:
+            self.fail -= 1
+            raise OSError("database down")
+        for record in tournaments:
+            seeds = record[9] or self.tournaments.get(record[0], (None,) * 10)[9]
+            self.tournaments[record[0]] = record[:9] + (seeds,)
+        for record in matches:
+            self.matches[record[:3]] = record
+
+    def load(self):
+        unfinished = [record for record in self.tournaments.values() if record[5] != "finished"]
+        ids = {record[0] for record in unfinished}
+        return unfinished, [record for key, record in self.matches.items() if key[0] in ids]
+
+@pytest.fixture
+def brackets():
+    return Brackets()
+
+@pytest.fixture
+def engine(scheduler, brackets):
+    cache = RoomCache()
+    actors = RoomActors()
+    return TournamentEngine(cache, actors, scheduler, brackets.persist, dict(FAST),
+                            load_brackets=brackets.load)
+
+def play(engine, room_id, winner):
+    """Both players move in the room's turn; winner is 1 or 2"""
+    def move():
+        game, _ = engine.cache.get(room_id)
+        game.make_move(game.player1, "rock")
+        game.make_move(game.player2, "scissors" if winner == 1 else "paper")
+        engine.cache.put(room_id, game)
+
+    wait_for(lambda: engine.cache.get(room_id)[0] is not None
+             and engine.cache.get(room_id)[0].status == "ready")
+    engine.actors.ask(room_id, move)
+
+def play_round(engine, tournament):
+    rooms = sorted(set(tournament.rooms.values()))
+    for room_id in rooms:
+        play(engine, room_id, 1)
+    return rooms
+
+# ---- Scheduler ----
+
+def test_timers_fire_in_deadline_order(scheduler):
+    fired = []
+    done = threading.Event()
+    scheduler.call_later(0.06, lambda: (fired.append("late"), done.set()))
+    scheduler.call_later(0.02, fired.append, "early")
+    scheduler.cancel(scheduler.call_later(0.04, fired.append, "cancelled"))
+    scheduler.call_soon(fired.append, "now")
+    assert done.wait(5)
+    assert fired == ["now", "early", "late"]
+    assert scheduler.cancelled == 1
+
+def test_failing_callback_is_counted(scheduler):
+    done = threading.Event()
+    scheduler.call_soon(lambda: 1 / 0)
+    scheduler.call_soon(done.set)
+    assert done.wait(5)
+    wait_for(lambda: scheduler.failed == 1)
+
+# ---- Pairing ----
+
+def test_odd_field_gives_the_top_seed_a_bye():
+    tournament = Tournament("t", SINGLE_ELIMINATION, ["a", "b", "c", "d", "e"], 1, 0)
+    assert tournament.total_rounds == 3
+    assert tournament.pair() == ([("b", "c"), ("d", "e")], ["a"])
+
+def test_swiss_avoids_rematches():
+    tournament = Tournament("t", SWISS, ["a", "b", "c", "d"], 1, 3)
+    assert tournament.pair() == ([("a", "b"), ("c", "d")], [])
+    tournament.points.update(a=1, c=1)
+    for one, other in (("a", "b"), ("c", "d")):
+        tournament.opponents[one].add(other)
+        tournament.opponents[other].add(one)
+    assert tournament.pair() == ([("a", "c"), ("b", "d")], [])
+
+def test_swiss_gives_the_bye_to_someone_who_has_not_had_one():
+    tournament = Tournament("t", SWISS, ["a", "b", "c"], 1, 2)
+    tournament.had_bye.add("c")
+    assert tournament.pair()[1] == ["b"]
+
+def test_standings_break_ties_by_opponents_points():
+    tournament = Tournament("t", SWISS, ["a", "b", "c", "d"], 1, 2)
+    tournament.points.update(a=1, b=1, c=2, d=0)
+    tournament.opponents.update(a={"d"}, b={"c"}, c={"b"}, d={"a"})
+    assert tournament.standings() == ["c", "b", "a", "d"]
+
+# ---- Bracket writer ----
+
+def test_writer_batches_and_keeps_the_roster(scheduler, brackets):
+    writer = BracketWriter(brackets.persist, scheduler, batch_size=2, flush_interval=60)
+    writer.add_tournament(("t", SWISS, 2, 1, 0, "scheduled", "", 0, 1, ("a", "b")))
+    writer.add_tournament(("t", SWISS, 2, 1, 1, "running", "", 0, 1, ()))
+    writer.add_match(("t", 1, 0, "t-r1-m0", "a", "b", 1, 0, "a", 0))
+    writer.add_match(("t", 1, 1, "t-r1-m1", "c", "d", 0, 1, "d", 0))
+    # A full batch goes out without waiting for the interval
+    wait_for(lambda: writer.batches == 1)
+    assert brackets.tournaments["t"][4:6] == (1, "running")
+    assert brackets.tournaments["t"][9] == ("a", "b")
+    assert len(brackets.matches) == 2
+
+def test_failed_batch_is_retried_in_order(scheduler, brackets):
+    writer = BracketWriter(brackets.persist, scheduler, batch_size=100, flush_interval=60)
+    brackets.fail = 1
+    writer.add_match(("t", 1, 0, "t-r1-m0", "a", "b", 1, 0, "a", 0))
+    writer.flush()
+    assert writer.failures == 1 and not brackets.matches
+    writer.add_match(("t", 1, 1, "t-r1-m1", "c", "d", 0, 1, "d", 0))
+    writer.flush()
+    assert list(brackets.matches) == [("t", 1, 0), ("t", 1, 1)]
+
+# ---- Engine ----
+
+def test_single_elimination_runs_to_a_champion(engine, brackets):
+    tournament = engine.create("cup", SINGLE_ELIMINATION, ["a", "b", "c", "d", "e"], wins_needed=1)
+    wait_for(lambda: tournament.round == 1 and tournament.rooms)
+    assert sorted(play_round(engine, tournament)) == ["cup-r1-m0", "cup-r1-m1"]
+    wait_for(lambda: tournament.round == 2 and tournament.rooms)
+    assert tournament.alive == ["a", "b", "d"]
+    play_round(engine, tournament)
+    wait_for(lambda: tournament.round == 3 and tournament.rooms)
+    play_round(engine, tournament)
+    wait_for(lambda: tournament.status == "finished")
+    # a sat out round 2 as the top seed and beat b, who played player1 in the final
+    assert tournament.champion == "a"
+    engine.writer.flush()
+    assert brackets.tournaments["cup"][5:7] == ("finished", "a")
+    # Byes are recorded as matches without a room
+    assert brackets.matches[("cup", 1, 2)][3:5] == ("", "a")
+
+def test_match_needs_wins_needed_games(engine):
+    tournament = engine.create("t", SINGLE_ELIMINATION, ["a", "b"], wins_needed=2)
+    wait_for(lambda: tournament.rooms)
+    play(engine, "t-r1-m0", 2)
+    wait_for(lambda: engine.cache.get("t-r1-m0")[0].status == "ready")
+    assert tournament.status == "running"
+    play(engine, "t-r1-m0", 2)
+    wait_for(lambda: tournament.status == "finished")
+    assert tournament.champion == "b"
+
+def test_idle_player_forfeits(scheduler, brackets):
+    engine = TournamentEngine(RoomCache(), RoomActors(), scheduler, brackets.persist,
+                              dict(FAST, move_timeout_s=0.05))
+    tournament = engine.create("t", SINGLE_ELIMINATION, ["a", "b"], wins_needed=1)
+    wait_for(lambda: tournament.rooms)
+    game, _ = engine.cache.get("t-r1-m0")
+    game.make_move("b", "rock")
+    engine.cache.put("t-r1-m0", game)
+    wait_for(lambda: tournament.status == "finished")
+    assert tournament.champion == "b" and engine.forfeits == 1
+
+def test_bad_requests(engine):
+    with pytest.raises(ValueError):
+        engine.create("t", "round_robin", ["a", "b"])
+    with pytest.raises(ValueError):
+        engine.create("t|x", SWISS, ["a", "b"])
+    with pytest.raises(ValueError):
+        engine.create("t", SWISS, ["a", "a"])
+    engine.create("t", SWISS, ["a", "b"], start_in=60)
+    with pytest.raises(ValueError):
+        engine.create("t", SWISS, ["a", "b"])
+
+def test_resume_replays_stored_results(scheduler, engine, brackets):
+    tournament = engine.create("cup", SINGLE_ELIMINATION, ["a", "b", "c", "d"], wins_needed=1)
+    wait_for(lambda: tournament.rooms)
+    play(engine, "cup-r1-m0", 2)
+    wait_for(lambda: tournament.pending == 1)
+    engine.writer.flush()
+    engine.active = False
+
+    # The next leader shares the storage and the rooms, not the memory
+    successor = TournamentEngine(engine.cache, engine.actors, scheduler, brackets.persist, dict(FAST),
+                                 load_brackets=brackets.load)
+    successor.resume()
+    resumed = successor.get("cup")
+    assert resumed is not tournament
+    assert resumed.round == 1 and resumed.pending == 1 and resumed.rooms == {"c": "cup-r1-m1", "d": "cup-r1-m1"}
+    play(successor, "cup-r1-m1", 1)
+    wait_for(lambda: resumed.round == 2 and resumed.rooms)
+    assert resumed.alive == ["b", "c"]
+    play_round(successor, resumed)
+    wait_for(lambda: resumed.status == "finished")
+    assert resumed.champion == "b" and successor.resumed == 1
+    # The old leader's copy never moved on
+    assert tournament.round == 1
+
+def test_resume_counts_a_game_the_old_leader_missed(scheduler, engine, brackets):
+    tournament = engine.create("t", SINGLE_ELIMINATION, ["a", "b"], wins_needed=1)
+    wait_for(lambda: tournament.rooms)
+    engine.writer.flush()
+    engine.active = False
+    play(engine, "t-r1-m0", 1)
+
+    successor = TournamentEngine(engine.cache, engine.actors, scheduler, brackets.persist, dict(FAST),
+                                 load_brackets=brackets.load)
+    successor.resume()
+    resumed = successor.get("t")
+    wait_for(lambda: resumed.status == "finished")
+    assert resumed.champion == "a"
+
+# ---- Through the game server ----
+
+def test_new_leader_finishes_the_tournament(config, orm, game_servers):
+    config['tournament'].update(FAST)
+    first = game_servers(orm, leader=True)
+    response = first.CreateTournament(game_pb2.TournamentRequest(
+        tournament_id="T", players=["p0", "p1", "p2", "p3"], wins_needed=1), None)
+    assert not response.error
+    tournament = first.tournaments.get("T")
+    wait_for(lambda: tournament.rooms)
+    first.MakeMove(game_pb2.MoveRequest(game_id="T-r1-m0", player_id="p0", choice="rock"), None)
+    first.MakeMove(game_pb2.MoveRequest(game_id="T-r1-m0", player_id="p1", choice="scissors"), None)
+    # Half a game in the other match when the leader goes
+    first.MakeMove(game_pb2.MoveRequest(game_id="T-r1-m1", player_id="p2", choice="paper"), None)
+    wait_for(lambda: tournament.pending == 1)
+    first.give_up_leadership()
+    first.actors.wait_idle(5)
+    first.tournaments.writer.flush()
+
+    second = game_servers(orm, leader=True)
+    wait_for(lambda: second.tournaments.get("T") is not None)
+    resumed = second.tournaments.get("T")
+    wait_for(lambda: resumed.rooms)
+    state = second.GetState(game_pb2.StateRequest(game_id="T-r1-m1"), None)
+    assert state.player1_choice == "chosen"
+    second.MakeMove(game_pb2.MoveRequest(game_id="T-r1-m1", player_id="p3", choice="scissors"), None)
+    wait_for(lambda: resumed.round == 2 and resumed.rooms)
+    second.MakeMove(game_pb2.MoveRequest(game_id="T-r2-m0", player_id="p0", choice="rock"), None)
+    second.MakeMove(game_pb2.MoveRequest(game_id="T-r2-m0", player_id="p3", choice="paper"), None)
+    wait_for(lambda: resumed.status == "finished")
+    assert resumed.champion == "p3"
+    response = second.GetTournament(game_pb2.TournamentStateRequest(tournament_id="T"), None)
+    assert (response.status, response.champion) == ("finished", "p3")
@@ -0,0 +1,152 @@
+import time
+
+import grpc
+import pytest
+
+import protos.game_service_pb2 as game_pb2
+import protos.game_service_pb2_grpc as game_pb2_grpc
+from common.admission import create_server
+from common.profiling import Profiler
+from game_server.game_server import create_game_server
+from game_server.workers import (shard_of, worker_address, ShardingInterceptor, Supervisor,
+                                 WorkerLink, FORWARDED_HEADER)
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+def test_match_rooms_live_with_their_tournament():
+    for count in (2, 3, 8):
+        assert shard_of("cup-r3-m17", count) == shard_of("cup", count)
+        assert shard_of("room", count) == shard_of("room", count)
+    # A room that merely looks like a match room of nothing still gets a shard
+    assert 0 <= shard_of("-r1-m1", 4) < 4
+
+def test_rooms_spread_over_the_workers():
+    counts = [0] * 4
+    for i in range(1000):
+        counts[shard_of(f"room{i}", 4)] += 1
+    assert min(counts) > 150
+
+def test_worker_sockets_are_per_port_and_shard(tmp_path):
+    server_config = {'port': 50051, 'worker_socket_dir': str(tmp_path)}
+    assert worker_address(server_config, 1) == f"unix:{tmp_path}/rps-game-50051-1.sock"
+
+def test_marked_calls_skip_admission():
+    def echo(request, context):
+        return request
+
+    server, limiter = create_server({'max_workers': 2}, {}, {}, admitted_header=FORWARDED_HEADER)
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(
+        't.S', {'Echo': grpc.unary_unary_rpc_method_handler(echo)}),))
+    port = server.add_insecure_port('127.0.0.1:0')
+    server.start()
+    limiter.limit = limiter.max_limit = 0
+    try:
+        with grpc.insecure_channel(f'127.0.0.1:{port}') as channel:
+            call = channel.unary_unary('/t.S/Echo')
+            with pytest.raises(grpc.RpcError) as error:
+                call(b'x', timeout=5)
+            assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+            assert call(b'x', timeout=5, metadata=((FORWARDED_HEADER, '1'),)) == b'x'
+    finally:
+        server.stop(None)
+
+@pytest.fixture
+def workers(config, orm, game_servers, tmp_path):
+    """Two in-process workers wired like serve_worker: public port plus a local socket each"""
+    config['server']['worker_socket_dir'] = str(tmp_path)
+    peers = [worker_address(config['server'], shard) for shard in range(2)]
+    started = []
+    for shard in range(2):
+        servicer = game_servers(orm, leader=True)
+        sharding = ShardingInterceptor(shard, peers, servicer.channels)
+        profiler = Profiler(f"worker-{shard}", {})
+        server, limiter = create_game_server(config, servicer, profiler, [sharding])
+        port = server.add_insecure_port("127.0.0.1:0")
+        internal, internal_limiter = create_game_server(config, servicer, profiler,
+                                                        admitted_header=FORWARDED_HEADER)
+        internal.add_insecure_port(peers[shard])
+        server.start()
+        internal.start()
+        started.append((servicer, sharding, port, internal_limiter, [server, internal]))
+    yield started
+    for servicer, sharding, port, internal_limiter, servers in started:
+        for server in servers:
+            server.stop(None)
+
+def test_requests_reach_the_owning_worker(workers):
+    (first, first_sharding, port, _, _), (second, second_sharding, _, second_internal, _) = workers
+    rooms = [f"room{i}" for i in range(10)]
+    with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = game_pb2_grpc.GameServiceStub(channel)
+        for room in rooms:
+            response = stub.CreateGame(game_pb2.CreateRequest(player_id=f"alice-{room}|{room}"), timeout=5)
+            assert response.game_id == room
+        # Forwarded calls were admitted by the first worker; the owner does not count them again
+        second_internal.limit = second_internal.max_limit = 0
+        owned = [room for room in rooms if shard_of(room, 2) == 1]
+        for room in owned:
+            assert stub.GetState(game_pb2.StateRequest(game_id=room), timeout=5).player1 == f"alice-{room}"
+    assert sorted(second.cache.game_ids()) == sorted(owned)
+    assert sorted(first.cache.game_ids()) == sorted(set(rooms) - set(owned))
+    assert first_sharding.forwarded["CreateGame"] == len(owned)
+    assert first_sharding.forwarded["GetState"] == len(owned)
+    assert not second_internal.shed
+
+def test_forward_to_a_missing_worker_is_unavailable(workers):
+    (first, first_sharding, port, _, _), (_, _, _, _, second_servers) = workers
+    for server in second_servers:
+        server.stop(None)
+    room = next(f"room{i}" for i in range(100) if shard_of(f"room{i}", 2) == 1)
+    with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = game_pb2_grpc.GameServiceStub(channel)
+        with pytest.raises(grpc.RpcError) as error:
+            stub.GetState(game_pb2.StateRequest(game_id=room), timeout=5)
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+    assert "Worker 1" in error.value.details()
+    assert first_sharding.failures == 1
+
+def test_cancelled_spectator_ends_the_forwarded_stream(workers):
+    (first, first_sharding, port, _, _), (second, _, _, _, _) = workers
+    room = next(f"room{i}" for i in range(100) if shard_of(f"room{i}", 2) == 1)
+    with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+        stub = game_pb2_grpc.GameServiceStub(channel)
+        stub.CreateGame(game_pb2.CreateRequest(player_id=f"alice|{room}"), timeout=5)
+        stream = stub.Spectate(game_pb2.SpectateRequest(game_id=room))
+        assert next(stream).player1 == "alice"
+        assert second.spectators.count == 1
+        stream.cancel()
+        # The owner stops streaming to a spectator the first worker no longer has
+        wait_for(lambda: second.spectators.count == 0)
+    assert first_sharding.forwarded["Spectate"] == 1
+    assert first_sharding.failures == 0
+
+def fake_worker(config, shard, count, conn):
+    """Worker process for the supervisor tests: steps down when told, like serve_worker"""
+    link = WorkerLink(conn)
+
+    def on_leader(is_leader):
+        if not is_leader:
+            link.send("stepped_down", shard)
+
+    link.serve({"leader": on_leader, "orm": lambda url: None})
+
+def test_supervisor_steps_down_restarts_and_stops():
+    supervisor = Supervisor({}, 2, fake_worker)
+    supervisor.start()
+    try:
+        supervisor.set_leader(True)
+        started = time.monotonic()
+        supervisor.step_down(10)
+        assert supervisor.stepped_down == {0, 1}
+        assert time.monotonic() - started < 10
+
+        supervisor.workers[1].process.terminate()
+        wait_for(lambda: supervisor.restarts == 1, timeout=10)
+        wait_for(lambda: supervisor.workers[1].process.is_alive(), timeout=10)
+    finally:
+        supervisor.stop(10)
+    assert not any(worker.process.is_alive() for worker in supervisor.workers)